@@ -0,0 +1,30 @@
+"""
+Times the import of some of the modules of logics, each in a fresh interpreter.
+
+Run from the root of the repository with ``python benchmarks/import_time.py``
+"""
+import subprocess
+import sys
+
+MODULES = [
+    'logics.utils.parsers',
+    'logics.instances.propositional.sequents',
+    'logics.instances.propositional.tableaux',
+    'logics.instances.propositional.natural_deduction',
+]
+REPEATS = 3
+
+
+def import_time(module):
+    """Returns the time (in seconds) that a fresh interpreter takes to import module, the best of REPEATS runs"""
+    code = f'import time\nstart = time.perf_counter()\nimport {module}\nprint(time.perf_counter() - start)'
+    times = []
+    for _ in range(REPEATS):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        times.append(float(output))
+    return min(times)
+
+
+if __name__ == '__main__':
+    for module in MODULES:
+        print(f'{module}: {import_time(module) * 1000:.1f} ms')
@@ -26,6 +26,16 @@ class SolverError(Exception):
     pass
 
 
+class BudgetExceeded(SolverError):
+    """
+    Exception raised when a solver runs out of its budget (see logics.utils.solvers.budget.Budget) or exceeds its
+    maximum depth. The attribute partial_result has what the solver built until then
+    """
+    def __init__(self, message, partial_result=None):
+        super().__init__(message)
+        self.partial_result = partial_result
+
+
 class SolverWarning(Warning):
     """
     Same as above but Warning instead of Exception
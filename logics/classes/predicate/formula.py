@@ -442,20 +442,22 @@ class PredicateFormula(Formula):
                                                       _bound_variables=_bound_variables))
         return new_formula
 
-    def _molecular_instantiate(self, language, subst_dict):
+    def _molecular_instantiate(self, language, subst_dict, share_subformulae=False):
         # Handle only the case of quantifiers, the rest is done by the super method
         if self[0] in language.quantifiers:
             instantiation = self.__class__([self[0]])
             instantiation.append(self._term_instantiate(self[1], language, subst_dict))  # variable
             if self[2] == '∈':  # bounded quantifier
                 instantiation.extend(['∈', self._term_instantiate(self[3], language, subst_dict)])
-                instantiation.append(self[4].instantiate(language, subst_dict))
+                instantiation.append(self[4].instantiate(language, subst_dict, share_subformulae))
             else:  # non-bounded
-                instantiation.append(self[2].instantiate(language, subst_dict))
+                instantiation.append(self[2].instantiate(language, subst_dict, share_subformulae))
+            if share_subformulae and instantiation[-1] is self[-1] and instantiation[1:-1] == self[1:-1]:
+                return self
             return instantiation
-        return super()._molecular_instantiate(language, subst_dict)
+        return super()._molecular_instantiate(language, subst_dict, share_subformulae)
 
-    def _atomic_instantiate(self, language, subst_dict):
+    def _atomic_instantiate(self, language, subst_dict, share_subformulae=False):
         # Same as the propositional formula method but includes instantiation of variable and ind constant metavars
 
         # Instantiate things of the form [α/χ]A, useful for things like ND solver
@@ -466,19 +468,22 @@ class PredicateFormula(Formula):
             if var_mv not in subst_dict:
                 raise ValueError(f'PredicateFormula {self} has no substitution assigned for {var_mv}')
             # First instantiate the A
-            f = self.__class__([self[0][5:]]).instantiate(language, subst_dict)
+            f = self.__class__([self[0][5:]]).instantiate(language, subst_dict, share_subformulae)
             # Then substitute the free occurences of whatever χ is for whatever α is
             f = f.vsubstitute(subst_dict[var_mv], subst_dict[ind_mv])
             return f
 
         # Sentential metavar is covered in the super method
         if language.is_metavariable_string(self[0]):
-            return super()._atomic_instantiate(language, subst_dict)
+            return super()._atomic_instantiate(language, subst_dict, share_subformulae)
 
         # Else, look for individual or variable metavars
         f = self.__class__([self[0]])
         for term in self[1:]:
             f.append(self._term_instantiate(term, language, subst_dict))  # _term_instantiate returns a deepcopy
+        # Terms are immutable, so an atomic that did not change can be shared
+        if share_subformulae and f == self:
+            return self
         return f
 
     def _term_instantiate(self, term, language, subst_dict):
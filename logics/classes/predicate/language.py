@@ -1,8 +1,6 @@
 """
 Classes for defining a predicate language
 """
-from itertools import chain
-
 from logics.classes.propositional.language import Language, InfiniteLanguage
 
 
@@ -116,7 +114,21 @@ class PredicateLanguage(Language):
     True
     >>> arithmetic_numeral_language.is_well_formed(PredicateFormula(['=', '1', '1']))
     True
+
+    ``classify`` also knows about the categories specific to predicate languages
+
+    >>> language.classify('x2')
+    'variable'
+    >>> language.classify('X')
+    'predicate_variable'
+    >>> language.classify('R')
+    'predicate_letter'
+    >>> language.classify('g')
+    'function_symbol'
+    >>> arithmetic_numeral_language.classify('15')
+    'individual_constant'
     """
+    indexed_categories = frozenset({'variable', 'predicate_variable'})
 
 
     def __init__(self, individual_constants=None, individual_metavariables=None, variables=None,
@@ -137,6 +149,21 @@ class PredicateLanguage(Language):
         self.sentential_constants = sentential_constants or []
         self.allow_predicates_as_terms = allow_predicates_as_terms  # To be able to say things like ∀x ∈ P (Formula)
 
+    def _symbol_families(self):
+        return [
+            ('constant', self.constant_arity_dict),
+            ('quantifier', self.quantifiers),
+            ('sentential_constant', self.sentential_constants),
+            ('metavariable', self.metavariables),
+            ('individual_metavariable', self.individual_metavariables),
+            ('variable_metavariable', self.variable_metavariables),
+            ('individual_constant', self.individual_constants),
+            ('variable', self.variables),
+            ('predicate_letter', self.predicate_letters),
+            ('predicate_variable', self.predicate_variables),
+            ('function_symbol', self.function_symbols),
+        ]
+
     def predicates(self, arity=None):
         """Returns the set of predicates of a given arity. If `arity` is ``None``, will return the set of all predicates
 
@@ -184,141 +211,109 @@ class PredicateLanguage(Language):
             return self.predicate_letters[string]
         elif string in self.function_symbols:
             return self.function_symbols[string]
-        # Predicate variables can contain a digit afterwards
-        for v in self.predicate_variables:
-            if string == v:
-                return self.predicate_variables[v]
-            # We assume that X1 has the same arity as X
-            if string[:len(v)] == v and string[len(v):].isdigit():
-                return self.predicate_variables[v]
+        # Predicate variables can contain a digit afterwards. We assume that X1 has the same arity as X
+        variable = self._symbol_info(string).get('predicate_variable')
+        if variable is not None:
+            return self.predicate_variables[variable]
         raise ValueError(f'Incorrect symbol {string}, does not have arity')
 
     def _is_term_well_formed(self, term):
-        # Strings (can be either individual constants or variables)
-        if type(term) == str:
-            if self.allow_predicates_as_terms and \
-                    (term in self.predicate_letters or term in self.predicate_variables or
-                     term in self.function_symbols):
-                return True
-            return self._is_valid_individual_constant_or_variable(term)  # includes individual metavariables
-
-        # If not a string, it must be a tuple, of the form ('f', term, term, ...)
-        else:
-            # Check that the first element is a function symbol
+        # Terms are either strings (individual constants or variables) or tuples of the form ('f', term, term, ...)
+        stack = [term]
+        while stack:
+            term = stack.pop()
+            if type(term) == str:
+                if self.allow_predicates_as_terms and \
+                        (term in self.predicate_letters or term in self.predicate_variables or
+                         term in self.function_symbols):
+                    continue
+                if not self._is_valid_individual_constant_or_variable(term):  # includes individual metavariables
+                    return False
+                continue
+            # Check that the first element is a function symbol, and the arity
             function_symbol = term[0]
             if not self._is_valid_function_symbol(function_symbol):
                 return False
-            # Check the arity
-            arity = self.arity(function_symbol)
-            if len(term) != arity + 1:
+            if len(term) != self.function_symbols[function_symbol] + 1:
                 return False
-            # Check the subterms
-            for subterm in term[1:]:
-                if not self._is_term_well_formed(subterm):
-                    return False
-            return True
+            stack.extend(term[1:])
+        return True
 
-    def _is_atomic_well_formed(self, formula, return_error):
+    def _atomic_error(self, formula):
         # Sentential metavariables and constants
-        if formula[0] in self.metavariables or self.is_sentential_constant_string(formula[0]):
-            if not return_error:
-                return True
-            return True, ''
+        info = self._symbol_info(formula[0])
+        if 'metavariable' in info or 'sentential_constant' in info:
+            return None
 
         # n-ary predicate followed by n valid terms
         predicate = formula[0]
         if not self._is_valid_predicate(predicate):
-            if not return_error:
-                return False
-            return False, f'{formula} is not well-formed: {predicate} is not a valid predicate'
+            return f'{predicate} is not a valid predicate'
         arity = self.arity(predicate)
         if len(formula) != arity + 1:
-            if not return_error:
-                return False
-            return False, f'{formula} is not well-formed: Incorrect number of arguments ' \
-                          f'for {arity}-ary predicate {predicate}'
+            return f'Incorrect number of arguments for {arity}-ary predicate {predicate}'
         for term in formula[1:]:
             if not self._is_term_well_formed(term):
-                if not return_error:
-                    return False
-                return False, f'{formula} is not well-formed: Term {term} is not well-formed'
-
-        if not return_error:
-            return True
-        return True, ''
+                return f'Term {term} is not well-formed'
+        return None
 
-    def _is_molecular_well_formed(self, formula, return_error):
+    def _molecular_error(self, formula):
         # We only need to take into account the case of quantified formulae, the rest is the same
-        if formula.main_symbol in self.quantifiers:
+        if 'quantifier' in self._symbol_info(formula[0]):
             if not self._is_valid_variable(formula[1], allow_metavariables=True):  # includes ind and pred metavariables
-                if not return_error:
-                    return False
-                return False, f'{formula} is not well-formed: {formula[1]} is not a valid variable'
+                return f'{formula[1]} is not a valid variable', ()
             # Bounded quantifier
             if formula[2] == '∈':
                 if not self._is_term_well_formed(formula[3]):
-                    if not return_error:
-                        return False
-                    return False, f'{formula} is not well-formed: Quantifier bound {formula[3]} is not a term'
-                return self.is_well_formed(formula[4], return_error)
+                    return f'Quantifier bound {formula[3]} is not a term', ()
+                body_index = 4
             # Non-bounded quantifier
             else:
-                return self.is_well_formed(formula[2], return_error)
+                body_index = 2
+            if not isinstance(formula[body_index], formula.__class__):
+                return f'Argument {formula[body_index]} is not a formula', ()
+            return None, [(body_index, formula[body_index])]
 
         # Non-quantified cases, call the super method
-        return super()._is_molecular_well_formed(formula, return_error)
+        return super()._molecular_error(formula)
 
     def is_atomic_string(self, string):
         raise ValueError('Method only available in propositional languages')
 
     def _is_valid_predicate(self, string):
-        return self._is_valid_variable(string, only_predicate=True, allow_metavariables=True) or \
-            string in self.predicate_letters
+        info = self._symbol_info(string)
+        return 'predicate_variable' in info or 'predicate_letter' in info
 
     def _is_valid_function_symbol(self, string):
-        return string in self.function_symbols
+        return 'function_symbol' in self._symbol_info(string)
 
     def is_valid_individual_constant(self, string):
-        if string in self.individual_metavariables:
-            return True
-        if callable(self.individual_constants):
-            return self.individual_constants(string)
-        return string in self.individual_constants
+        info = self._symbol_info(string)
+        return 'individual_metavariable' in info or 'individual_constant' in info
 
     def _is_valid_variable(self, string, only_individual=False, only_predicate=False, allow_metavariables=True):
         """There is always an infinite supply of both individual and predicate variables"""
         if only_individual and only_predicate:
             raise ValueError("only_individual and only_predicate parameters cannot be both True")
-        elif only_individual:
-            bound = self.variables
-            meta_bound = self.variable_metavariables
-        elif only_predicate:
-            bound = self.predicate_variables
-            meta_bound = []
-        else:
-            bound = chain(self.variables, self.predicate_variables)
-            meta_bound = self.variable_metavariables
-        for vv in bound:
-            if string == vv:
+        info = self._symbol_info(string)
+        if not only_predicate:
+            # Variable metavariables cannot have digits after
+            if 'variable' in info or (allow_metavariables and 'variable_metavariable' in info):
                 return True
-            if string[:len(vv)] == vv and string[len(vv):].isdigit():
+        if not only_individual:
+            if 'predicate_variable' in info:
                 return True
-        if allow_metavariables:
-            for mv in meta_bound:
-                if string == mv:
-                    return True
-                # these canot have digits after
         return False
 
     def _is_valid_individual_constant_or_variable(self, string):
-        return self.is_valid_individual_constant(string) or self._is_valid_variable(string, only_individual=True,
-                                                                                    allow_metavariables=True)
+        info = self._symbol_info(string)
+        return 'individual_constant' in info or 'individual_metavariable' in info or 'variable' in info or \
+            'variable_metavariable' in info
 
     def is_metavariable_string(self, string):
         """Determines if a string is among the (individual/predicate/formula) metavariables of the language."""
-        return string in self.metavariables or \
-            string in self.individual_metavariables or \
-            string in self.variable_metavariables
+        info = self._symbol_info(string)
+        return 'metavariable' in info or 'individual_metavariable' in info or 'variable_metavariable' in info
 
 
 class InfinitePredicateLanguage(PredicateLanguage, InfiniteLanguage):
@@ -344,35 +339,15 @@ class InfinitePredicateLanguage(PredicateLanguage, InfiniteLanguage):
     >>> language.is_well_formed(PredicateFormula(['A1']))
     True
     """
-    # Inherits from InfiniteLanguage only to have the overloaded is_metavariable_string method
+    indexed_categories = frozenset({'variable', 'predicate_variable', 'predicate_letter', 'individual_constant'})
 
     def arity(self, string):
-        # We consider only the case of predicate letters
-        for v in self.predicate_letters:
-            if string == v:
-                return self.predicate_letters[v]
-            # We assume that P1 has the same arity as P
-            if string[:len(v)] == v and string[len(v):].isdigit():
-                return self.predicate_letters[v]
+        # We consider only the case of predicate letters. We assume that P1 has the same arity as P
+        predicate = self._symbol_info(string).get('predicate_letter')
+        if predicate is not None:
+            return self.predicate_letters[predicate]
         return super().arity(string)
 
-    def _is_valid_predicate(self, string):
-        for pred in chain(self.predicate_letters, self.predicate_variables):
-            if string == pred:
-                return True
-            if string[:len(pred)] == pred and string[len(pred):].isdigit():
-                return True
-        return False
-
-    def _is_valid_individual_constant_or_variable(self, string):
-        if super()._is_valid_individual_constant_or_variable(string):
-            return True
-        if not callable(self.individual_constants):
-            for c in self.individual_constants:
-                if string[:len(c)] == c and string[len(c):].isdigit():
-                    return True
-        return False
-
 
 class TruthPredicateLanguage(PredicateLanguage):
     """Language for arithmetic containing a truth predicate
@@ -381,20 +356,14 @@ class TruthPredicateLanguage(PredicateLanguage):
     begin with predicate ``'Tr'`` must have a numeral as its only argument. I.e. truth predicate atomics must be of the
     form ``PredicateFormula(['Tr', '514951'])``
     """
-    def _is_atomic_well_formed(self, formula, return_error):
+    def _atomic_error(self, formula):
         if formula[0] == 'Tr':
             if len(formula) != 2:
-                if not return_error:
-                    return False
-                return False, f'{formula} is not well-formed: Incorrect number of arguments for 1-ary predicate Tr'
+                return 'Incorrect number of arguments for 1-ary predicate Tr'
             # Check that the argument is a numeral
             try:
                 int(formula[1])
-                if not return_error:
-                    return True
-                return True, ''
+                return None
             except ValueError:
-                if not return_error:
-                    return False
-                return False, f'Argument in {formula} is not a numeral'
-        return super()._is_atomic_well_formed(formula, return_error)
+                return f'Argument in {formula} is not a numeral'
+        return super()._atomic_error(formula)
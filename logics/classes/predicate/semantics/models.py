@@ -3,11 +3,10 @@ from itertools import product, combinations
 
 from logics.classes.predicate import PredicateFormula
 from logics.classes.exceptions import DenotationError
-from logics.utils.parsers.parser_utils import godel_decode
-from logics.utils.parsers.predicate_parser import arithmetic_truth_parser
+from logics.classes.serialization import SerializableMixin
 
 
-class Model(dict):
+class Model(SerializableMixin, dict):
     """Class for representing classical models
 
     Extends ``dict``. The keys should be:
@@ -692,9 +691,8 @@ class TruthPredicateModelTheory(ModelTheory):
                                       free_variable_denotation_dict)
 
             if formula[0] == 'Tr':
-                argument_code = formula[1]
-                argument_formula_unparsed = self.parser.godel_decode(argument_code)
-                argument_formula_parsed = self.parser.parse(argument_formula_unparsed)
+                # The parser keeps the formulae it decodes, so the same code is not decoded and parsed every time
+                argument_formula_parsed = self.parser.parse_code(formula[1], copy=False)
                 return self.valuation(argument_formula_parsed, model)  # No dict, the argument is isolated
 
         return super().valuation(formula, model, free_variable_denotation_dict)
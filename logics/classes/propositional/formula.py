@@ -3,8 +3,10 @@ Classes for handling propositional formulae.
 """
 from copy import deepcopy
 
+from logics.classes.serialization import SerializableMixin
 
-class Formula(list):
+
+class Formula(SerializableMixin, list):
     """Class for representing propositional formulae.
 
     The class Formula extends `list`. Every subformula within a Formula must also be a Formula.
@@ -29,13 +31,93 @@ class Formula(list):
     Working with Formula elements directly is somewhat uncomfortable and cumbersome. You may instead want to take a
     look at :doc:`parsers`. For random generation of formulae, see :doc:`formula_generators`
     """
+    _transient_attributes = frozenset({'_well_formed_in'})
+    _generation = 0  # Number of in-place modifications of well-formed formulae so far (see _modified below)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         for index in range(len(self)):
             argument = self[index]
             if type(argument) == list:
                 argument = self.__class__(argument)
-                self[index] = argument
+                list.__setitem__(self, index, argument)
+
+    def _modified(self):
+        # Formulae that are found well-formed are marked (see Language.well_formedness_error), along with all of their
+        # subformulae, so modifying a formula without a mark (e.g. one that is being built) leaves every mark valid.
+        # Since subformulae can be shared and do not know the formulae they are in, modifying a marked one cannot drop
+        # the marks of the formulae above it. Instead, it starts a new generation, and the marks of previous ones are no
+        # longer valid
+        if self.__dict__.pop('_well_formed_in', None) is not None:
+            Formula._generation += 1
+
+    def __setitem__(self, index, value):
+        self._modified()
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        self._modified()
+        super().__delitem__(index)
+
+    def __iadd__(self, other):
+        self._modified()
+        return super().__iadd__(other)
+
+    def __imul__(self, other):
+        self._modified()
+        return super().__imul__(other)
+
+    def append(self, element):
+        self._modified()
+        super().append(element)
+
+    def extend(self, elements):
+        self._modified()
+        super().extend(elements)
+
+    def insert(self, index, element):
+        self._modified()
+        super().insert(index, element)
+
+    def pop(self, index=-1):
+        self._modified()
+        return super().pop(index)
+
+    def remove(self, element):
+        self._modified()
+        super().remove(element)
+
+    def clear(self):
+        self._modified()
+        super().clear()
+
+    def reverse(self):
+        self._modified()
+        super().reverse()
+
+    def sort(self, *args, **kwargs):
+        self._modified()
+        super().sort(*args, **kwargs)
+
+    def __deepcopy__(self, memo):
+        # Subformulae are copied directly instead of going through copy.deepcopy (atomics, which are strings, need not
+        # be copied). Subformulae that appear more than once are still shared by the copy
+        cls = self.__class__
+        new = cls.__new__(cls)
+        memo[id(self)] = new
+        elements = list()
+        for element in self:
+            if element.__class__ is str:
+                elements.append(element)
+            elif isinstance(element, Formula):
+                copied_element = memo.get(id(element))
+                elements.append(element.__deepcopy__(memo) if copied_element is None else copied_element)
+            else:
+                elements.append(deepcopy(element, memo))
+        list.extend(new, elements)
+        if self.__dict__:
+            new.__dict__.update(deepcopy(self._copyable_attributes(), memo))
+        return new
 
     @property
     def is_atomic(self):
@@ -181,10 +263,11 @@ class Formula(list):
                     at = argument.atomics_inside(language, prev_at=at)
             return at
 
-    def substitute(self, sf_to_substitute, sf_with):
+    def substitute(self, sf_to_substitute, sf_with, share_subformulae=False):
         """Substitutes a subformula for another subformula.
 
-        Will return a different ``Formula`` object, and not modify the original.
+        Will return a different ``Formula`` object, and not modify the original (unless `share_subformulae` is
+        ``True``, see below).
 
         The substituted one must match exactly, for example, calling ``Formula(['∧', ['p'], ['B']]).substitute``
         with arguments
@@ -198,11 +281,17 @@ class Formula(list):
             The subformula you wish to substitute
         sf_with: logics.classes.propositional.Formula
             The subformula you wish to substitute it with
+        share_subformulae: bool, optional
+            If ``False`` (default), the result shares no subformula with the original or with `sf_with`. If ``True``,
+            subformulae that do not change are not copied: they are the same objects as in the original formula
+            (and `sf_with` is placed as is), so only the formulae that contain a substitution are built anew. This is
+            much faster for large formulae, but the result should then not be modified in place.
 
         Returns
         -------
         logics.classes.propositional.Formula
-            A *different* formula instance from the original
+            A *different* formula instance from the original (or the original itself, if `share_subformulae` is
+            ``True`` and there was nothing to substitute)
 
         Examples
         --------
@@ -212,21 +301,35 @@ class Formula(list):
         ['∧', ['p'], ['~', ['p']]]
         >>> f
         ['∧', ['p'], ['~', ['A']]]
+        >>> g = f.substitute(Formula(['A']), Formula(['q']), share_subformulae=True)
+        >>> g
+        ['∧', ['p'], ['~', ['q']]]
+        >>> g[1] is f[1]
+        True
         """
         # If the entire formula is the one you want to substitute (e.g. you wish to substitute ['p'] for ['q'] in ['p'])
         if self == sf_to_substitute:
+            if share_subformulae:
+                return sf_with
             return deepcopy(sf_with)  # This is just in case the user does something like f.substitute(..., f)
 
-        substitution = self.__class__([self[0]])  # Leave [0] instead of .main_symbol bc it may be atomic
+        arguments = list()
+        changed = False
         # For molecular formulae, substitute the arguments
         for subelement in self[1:]:
             if isinstance(subelement, self.__class__):
-                substitution.append(subelement.substitute(sf_to_substitute, sf_with))
+                new_subelement = subelement.substitute(sf_to_substitute, sf_with, share_subformulae)
+                changed = changed or new_subelement is not subelement
+                arguments.append(new_subelement)
             else:
-                substitution.append(subelement)  # This will happen with the variables next to a quantifier in predicate
+                arguments.append(subelement)  # This will happen with the variables next to a quantifier in predicate
+        if share_subformulae and not changed:
+            return self
+        substitution = self.__class__([self[0]])  # Leave [0] instead of .main_symbol bc it may be atomic
+        list.extend(substitution, arguments)
         return substitution
 
-    def instantiate(self, language, subst_dict):
+    def instantiate(self, language, subst_dict, share_subformulae=False):
         """Given a schematic Formula, a language and a substitution dict, returns the schema instantiated with the dict.
 
         Will return a different Formula object, and not modify the original.
@@ -237,11 +340,16 @@ class Formula(list):
             Instance of Language or InfiniteLanguage
         subst_dict: dict
             The susbstitution dict must have form ``{'A': someformula, 'B': someformula}``
+        share_subformulae: bool, optional
+            If ``True``, non-schematic subformulae of the schema are not copied but shared with the result (as are
+            the formulae in `subst_dict`, which are never copied), so that only the schematic part of the formula is
+            built anew. Defaults to ``False``. If you set it to ``True``, do not modify the result in place.
 
         Returns
         -------
         logics.classes.propositional.Formula
-            A *different* formula instance from the original
+            A *different* formula instance from the original (or the original itself, if `share_subformulae` is
+            ``True`` and the formula is not schematic)
 
         Raises
         ------
@@ -265,30 +373,39 @@ class Formula(list):
         """
         # Atomic
         if self.is_atomic:
-            return self._atomic_instantiate(language, subst_dict)
+            return self._atomic_instantiate(language, subst_dict, share_subformulae)
 
         # Molecular
-        return self._molecular_instantiate(language, subst_dict)
+        return self._molecular_instantiate(language, subst_dict, share_subformulae)
 
-    def _atomic_instantiate(self, language, subst_dict):
+    def _atomic_instantiate(self, language, subst_dict, share_subformulae=False):
         # Schematic atomic
         if language.is_metavariable_string(self[0]):
             if self[0] in subst_dict:
                 return subst_dict[self[0]]
             raise ValueError(f'Metavariable {self[0]} not present in substitution dict given')
         # Non-schematic atomic
+        if share_subformulae:
+            return self
         return deepcopy(self)
 
-    def _molecular_instantiate(self, language, subst_dict):
-        instantiation = self.__class__([self.main_symbol])
+    def _molecular_instantiate(self, language, subst_dict, share_subformulae=False):
+        arguments = list()
+        changed = False
         for subelement in self[1:]:
             if isinstance(subelement, self.__class__):
-                instantiation.append(subelement.instantiate(language, subst_dict))
+                new_subelement = subelement.instantiate(language, subst_dict, share_subformulae)
+                changed = changed or new_subelement is not subelement
+                arguments.append(new_subelement)
             else:
-                instantiation.append(subelement)
+                arguments.append(subelement)
+        if share_subformulae and not changed:
+            return self
+        instantiation = self.__class__([self.main_symbol])
+        list.extend(instantiation, arguments)
         return instantiation
 
-    def schematic_substitute(self, language, schema_to_substitute, schema_with):
+    def schematic_substitute(self, language, schema_to_substitute, schema_with, share_subformulae=False):
         """Takes a Formula and two schematic Formula, and substitutes any subformula instance of the first schema for
         the corresponding instance of the second schema.
 
@@ -302,6 +419,8 @@ class Formula(list):
             The schema of the subformula you wish to substitute
         schema_with: logics.classes.propositional.Formula
             The schema of the subformula you wish to substitute it with
+        share_subformulae: bool, optional
+            As in ``substitute``. If ``True``, subformulae that are left unchanged are shared with the original.
 
         Returns
         -------
@@ -320,23 +439,32 @@ class Formula(list):
         ['→', ['p'], ['→', ['p'], ['q']]]
         """
         if self.is_atomic:
-            new_formula = deepcopy(self)  # Atomic PredicateFormula are not equal to self[0]
-        else:
-            new_formula = self.__class__([self[0]])
+            # Atomic PredicateFormula are not equal to self[0]
+            new_formula = self if share_subformulae else deepcopy(self)
 
         # Molecular
-        if not self.is_atomic:
+        else:
+            arguments = list()
+            changed = False
             # First substitute the subformulae
             for subelement in self[1:]:
                 if isinstance(subelement, self.__class__):
-                    new_formula.append(subelement.schematic_substitute(language, schema_to_substitute, schema_with))
+                    new_subelement = subelement.schematic_substitute(language, schema_to_substitute, schema_with,
+                                                                     share_subformulae)
+                    changed = changed or new_subelement is not subelement
+                    arguments.append(new_subelement)
                 else:
-                    new_formula.append(subelement)
+                    arguments.append(subelement)
+            if share_subformulae and not changed:
+                new_formula = self
+            else:
+                new_formula = self.__class__([self[0]])
+                list.extend(new_formula, arguments)
 
         # Once arguments have been substituted (or if the formula is atomic), substitute it
         instance, subst_dict = new_formula.is_instance_of(schema_to_substitute, language, return_subst_dict=True)
         if instance:
-            new_formula = schema_with.instantiate(language, subst_dict)
+            new_formula = schema_with.instantiate(language, subst_dict, share_subformulae)
 
         return new_formula
 
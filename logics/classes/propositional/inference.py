@@ -4,9 +4,10 @@ from itertools import permutations
 
 from logics.classes.propositional import Formula
 from logics.classes.exceptions import IncorrectLevels, LevelsWarning
+from logics.classes.serialization import SerializableMixin
 
 
-class Inference:
+class Inference(SerializableMixin):
     """Class for propositional inferences and metainferences.
 
     Parameters
@@ -184,7 +185,7 @@ class Inference:
                 return True
         return False
 
-    def substitute(self, sf_or_inf_to_substitute, sf_or_inf_with):
+    def substitute(self, sf_or_inf_to_substitute, sf_or_inf_with, share_subformulae=False):
         """Substitutes either a formula or an inference for another inside an inference
 
         The substituted formula or inference must match exactly. Does not modify the original inference.
@@ -194,6 +195,9 @@ class Inference:
         ----------
         sf_or_inf_to_substitute: Formula or Inference
         sf_or_inf_with: Formula or Inference
+        share_subformulae: bool, optional
+            If ``True``, the premises and conclusions that do not change are shared with the original inference
+            instead of copied (see the ``substitute`` method of :doc:`formula`). Defaults to ``False``.
 
         Examples
         --------
@@ -221,16 +225,24 @@ class Inference:
         ([([['~', ['p']]] / [['~', ['q']]])] // [([['q']] / [['p']])])
         """
         if self == sf_or_inf_to_substitute:
+            if share_subformulae:
+                return sf_or_inf_with
             return deepcopy(sf_or_inf_with)  # In case the user asks i.substitute(..., i)
 
         substituted_premises = []
         for premise in self.premises:
-            substituted_premises.append(premise.substitute(sf_or_inf_to_substitute, sf_or_inf_with))
+            substituted_premises.append(premise.substitute(sf_or_inf_to_substitute, sf_or_inf_with,
+                                                           share_subformulae))
 
         substituted_conclusions = []
         for conclusion in self.conclusions:
-            substituted_conclusions.append(conclusion.substitute(sf_or_inf_to_substitute, sf_or_inf_with))
+            substituted_conclusions.append(conclusion.substitute(sf_or_inf_to_substitute, sf_or_inf_with,
+                                                                 share_subformulae))
 
+        if share_subformulae and \
+                all(new is old for new, old in zip(substituted_premises + substituted_conclusions,
+                                                   self.premises + self.conclusions)):
+            return self
         return self.__class__(substituted_premises, substituted_conclusions)
 
     def is_instance_of(self, inference, language, subst_dict=None, return_subst_dict=False, order=False):
@@ -1,4 +1,57 @@
+import re
+
 from logics.classes.exceptions import NotWellFormed
+from logics.classes.propositional.formula import Formula
+
+
+class _SymbolClassifier:
+    """Compiled version of the vocabulary of a language. Maps each token to a dict of the form ``{category: symbol}``,
+    where `symbol` is the symbol of the language that the token is (or an indexed version of, e.g. ``'p'`` for
+    ``'p12'``). Categories are kept in order of priority."""
+    def __init__(self, families, indexed_categories, cache_size):
+        self.order = [category for category, _ in families]
+        self.finite = dict()  # token -> {category: token}
+        self.patterns = list()  # (category, compiled regex) for the indexed categories
+        self.predicates = list()  # (category, callable) for the categories given as a callable
+        for category, symbols in families:
+            if callable(symbols):
+                self.predicates.append((category, symbols))
+                continue
+            symbols = frozenset(symbols or ())
+            if category in indexed_categories:
+                if symbols:
+                    alternatives = '|'.join(re.escape(s) for s in sorted(symbols, key=len, reverse=True))
+                    self.patterns.append((category, re.compile(f'({alternatives})[0-9]*')))
+            else:
+                for symbol in symbols:
+                    self.finite.setdefault(symbol, dict())[category] = symbol
+        self.cache_size = cache_size
+        self.cache = dict()
+
+    def lookup(self, token):
+        if type(token) is not str:
+            return dict()
+        info = self.cache.get(token)
+        if info is not None:
+            return info
+
+        info = self.finite.get(token, dict())
+        if self.patterns or self.predicates:
+            info = dict(info)
+            for category, pattern in self.patterns:
+                match = pattern.fullmatch(token)
+                if match is not None:
+                    info[category] = match.group(1)
+            for category, predicate in self.predicates:
+                if predicate(token):
+                    info[category] = token
+            if len(info) > 1:
+                info = {category: info[category] for category in self.order if category in info}
+
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[token] = info
+        return info
 
 
 class Language:
@@ -33,7 +86,16 @@ class Language:
     ...                     sentential_constants=['⊥', '⊤'],
     ...                     metavariables=['A', 'B', 'C'],
     ...                     context_variables=['Γ', 'Δ', 'Σ', 'Λ', 'Π', 'Θ'])
+    >>> language.classify('p')
+    'atomic'
+    >>> language.classify('∧')
+    'constant'
+    >>> language.classify('Γ')
+    'context_variable'
     """
+    symbol_cache_size = 4096  # Max number of tokens whose classification is remembered
+    indexed_categories = frozenset()  # Categories where a symbol followed by digits is also a symbol of the category
+
     def __init__(self, atomics=None, constant_arity_dict=None, sentential_constants=None, metavariables=None,
                  context_variables=None):
         self.atomics = atomics or []
@@ -43,6 +105,77 @@ class Language:
         self.context_variables = context_variables or []
         self.quantifiers = []  # Necessary to avoid bugs when subclassing this with PredicateLanguage
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Changing the vocabulary of the language means the classifier must be built again
+        if name[0] != '_':
+            self.__dict__.pop('_classifier', None)
+
+    def __getstate__(self):
+        # The classifier is not copied (so that copies of the language can be safely modified)
+        state = self.__dict__.copy()
+        state.pop('_classifier', None)
+        return state
+
+    def _symbol_families(self):
+        """List of (category, symbols) pairs that make up the vocabulary of the language, in order of priority"""
+        return [
+            ('constant', self.constant_arity_dict),
+            ('quantifier', self.quantifiers),
+            ('sentential_constant', self.sentential_constants),
+            ('atomic', self.atomics),
+            ('metavariable', self.metavariables),
+            ('context_variable', self.context_variables),
+        ]
+
+    def _get_classifier(self):
+        classifier = self.__dict__.get('_classifier')
+        if classifier is None:
+            classifier = _SymbolClassifier(self._symbol_families(), self.indexed_categories, self.symbol_cache_size)
+            self.__dict__['_classifier'] = classifier
+        return classifier
+
+    def _symbol_info(self, token):
+        return self._get_classifier().lookup(token)
+
+    def classify(self, token):
+        """Returns the category of a string in the language, or ``None`` if it does not belong to the language.
+
+        The categories are ``'constant'``, ``'quantifier'``, ``'sentential_constant'``, ``'atomic'``,
+        ``'metavariable'`` and ``'context_variable'`` (predicate languages add a few more, see
+        ``PredicateLanguage``). The vocabulary is compiled (into sets, and a regex for the categories that admit
+        indexed symbols) the first time it is needed, and the classification of each token is cached.
+
+        Notes
+        -----
+        Assigning a new value to an attribute of the language (e.g. ``language.atomics = ['p', 'q']``) will
+        recompile the vocabulary automatically. If you modify one of them in place after the language has been used,
+        call ``refresh_classifier``.
+
+        Examples
+        --------
+        >>> from logics.instances.propositional.languages import classical_infinite_language_with_sent_constants
+        >>> classical_infinite_language_with_sent_constants.classify('p')
+        'atomic'
+        >>> classical_infinite_language_with_sent_constants.classify('p12')
+        'atomic'
+        >>> classical_infinite_language_with_sent_constants.classify('A1')
+        'metavariable'
+        >>> classical_infinite_language_with_sent_constants.classify('⊥')
+        'sentential_constant'
+        >>> classical_infinite_language_with_sent_constants.classify('~')
+        'constant'
+        >>> classical_infinite_language_with_sent_constants.classify('pq') is None
+        True
+        """
+        for category in self._symbol_info(token):
+            return category
+        return None
+
+    def refresh_classifier(self):
+        """Forces the vocabulary of the language to be compiled again (see ``classify``)"""
+        self.__dict__.pop('_classifier', None)
+
     def arity(self, constant):
         """Returns the arity of a logical constant.
 
@@ -112,62 +245,96 @@ class Language:
         logics.classes.propositional.Formula
         logics.classes.propositional.proof_theories.tableaux.ConstructiveTreeSystem
         """
-        # Atomic formulae
-        if formula.is_atomic:
-            return self._is_atomic_well_formed(formula, return_error)
-        # Molecular formulae
-        return self._is_molecular_well_formed(formula, return_error)
-
-    def _is_atomic_well_formed(self, formula, return_error):
-        if not self.is_atomic_string(formula[0]) and not self.is_metavariable_string(formula[0]) and \
-                not self.is_sentential_constant_string(formula[0]):
-            if not return_error:
-                return False
-            return False, f'{formula} is not well-formed: {formula[0]} is not an atomic nor a ' \
-                          f'sentential constant of the language'
+        error = self.well_formedness_error(formula)
         if not return_error:
-            return True
-        return True, ''
-
-    def _is_molecular_well_formed(self, formula, return_error):
-        if formula.main_symbol not in self.constants():
-            if not return_error:
-                return False
-            return False, f'{formula} is not well-formed: ' \
-                          f'First member of the list is not a logical constant of the language'
-
-        arity = self.arity(formula.main_symbol)
-        if len(formula.arguments()) != arity:
-            if not return_error:
-                return False
-            return False, f'{formula} is not well-formed: ' \
-                          f'Number of arguments does not coincide with the arity of the logical constant'
-
-        for argument in formula.arguments():
-            if not isinstance(argument, formula.__class__):
-                if not return_error:
-                    return False
-                return False, f'{formula} is not well-formed: Argument {argument} is not a formula'
-            if not self.is_well_formed(argument, return_error):
-                if not return_error:
-                    return False
-                return False, f'{formula} is not well-formed: Argument {argument} is not a well-formed formula'
+            return error is None
+        if error is None:
+            return True, ''
+        return False, error[1]
+
+    def well_formedness_error(self, formula):
+        """Returns the first reason why a formula is not well-formed, or ``None`` if it is well-formed.
+
+        Subformulae are visited in prefix order, without recursion. Formulae found to be well-formed are marked as
+        such, so that checking them again (or checking a formula that contains them) does not visit them again. The
+        mark is lost if the vocabulary of the language changes, or if any formula found to be well-formed is modified
+        in place (e.g. ``formula[1] = Formula(['q'])``).
+
+        Returns
+        -------
+        tuple or None
+            ``None`` if the formula is well-formed. Otherwise, a tuple of the form ``(position, message)``, where
+            `position` is the tuple of indexes that lead from `formula` to the offending subformula (e.g. ``(2, 1)`` is
+            ``formula[2][1]``), and `message` is an informative message.
 
-        if not return_error:
-            return True
-        return True, ''
+        Examples
+        --------
+        >>> from logics.instances.propositional.languages import classical_language
+        >>> from logics.classes.propositional import Formula
+        >>> classical_language.well_formedness_error(Formula(['∧', ['p'], ['~', ['p']]])) is None
+        True
+        >>> classical_language.well_formedness_error(Formula(['∧', ['p'], ['~', ['~', '~', ['p']]]]))
+        ((2, 1), "['~', '~', ['p']] is not well-formed: Number of arguments does not coincide with the arity of the logical constant")
+        >>> classical_language.well_formedness_error(Formula(['∧', ['p'], ['p1']]))
+        ((2,), "['p1'] is not well-formed: p1 is not an atomic nor a sentential constant of the language")
+        """
+        # The mark is valid for the present vocabulary and generation of formulae (see Formula._modified)
+        mark = (self._get_classifier(), Formula._generation)
+        visited = list()
+        stack = [((), formula)]
+        while stack:
+            position, subformula = stack.pop()
+            if subformula.__dict__.get('_well_formed_in') == mark:
+                continue
+            if subformula.is_atomic:
+                error = self._atomic_error(subformula)
+                arguments = ()
+            else:
+                error, arguments = self._molecular_error(subformula)
+            if error is not None:
+                return position, f'{subformula} is not well-formed: {error}'
+            visited.append(subformula)
+            for index, argument in reversed(arguments):
+                stack.append((position + (index,), argument))
+
+        # Everything visited is well-formed
+        for subformula in visited:
+            subformula.__dict__['_well_formed_in'] = mark
+        return None
+
+    def _atomic_error(self, formula):
+        """Returns a message if the atomic formula is not well-formed, ``None`` otherwise"""
+        info = self._symbol_info(formula[0])
+        if 'atomic' not in info and 'metavariable' not in info and 'sentential_constant' not in info:
+            return f'{formula[0]} is not an atomic nor a sentential constant of the language'
+        return None
+
+    def _molecular_error(self, formula):
+        """Checks the main symbol and number of arguments of a molecular formula (but not the arguments themselves).
+        Returns a tuple ``(error, arguments)``, where `error` is a message (``None`` if there is no error) and
+        `arguments` a list of ``(index, subformula)`` tuples, with the subformulae that remain to be checked."""
+        main_symbol = formula[0]
+        if 'constant' not in self._symbol_info(main_symbol):
+            return 'First member of the list is not a logical constant of the language', ()
+        if len(formula) - 1 != self.constant_arity_dict[main_symbol]:
+            return 'Number of arguments does not coincide with the arity of the logical constant', ()
+        formula_class = formula.__class__
+        for argument in formula[1:]:
+            if not isinstance(argument, formula_class):
+                return f'Argument {argument} is not a formula', ()
+        return None, list(enumerate(formula[1:], 1))
 
     def is_atomic_string(self, string):
         """Determines if a string is among the atomics of the language. See below for some examples."""
-        return string in self.atomics
+        return 'atomic' in self._symbol_info(string)
 
     def is_sentential_constant_string(self, string):
         """Determines if a string is among the sentential constants of the language. See below for some examples."""
-        return string in self.sentential_constants
+        return 'sentential_constant' in self._symbol_info(string)
 
     def is_metavariable_string(self, string):
         """Determines if a string is among the metavariables of the language. See below for some examples."""
-        return string in self.metavariables
+        return 'metavariable' in self._symbol_info(string)
 
     def is_context_variable_string(self, string):
         """Determines if a string is among the context variables of the language
@@ -188,7 +355,7 @@ class Language:
         >>> classical_language_with_sent_constants.is_context_variable_string('Γ')
         True
         """
-        return string in self.context_variables
+        return 'context_variable' in self._symbol_info(string)
 
 
 class InfiniteLanguage(Language):
@@ -223,18 +390,4 @@ class InfiniteLanguage(Language):
     >>> infinite_language.is_well_formed(Formula(['~', ['p234']]))
         True
     """
-    def is_atomic_string(self, string):
-        for at in self.atomics:
-            if string == at:
-                return True
-            if string[:len(at)] == at and string[len(at):].isdigit():
-                return True
-        return False
-
-    def is_metavariable_string(self, string):
-        for mt in self.metavariables:
-            if string == mt:
-                return True
-            if string[:len(mt)] == mt and string[len(mt):].isdigit():
-                return True
-        return False
+    indexed_categories = frozenset({'atomic', 'metavariable'})
@@ -1,4 +1,7 @@
-class DerivationStep:
+from logics.classes.serialization import SerializableMixin
+
+
+class DerivationStep(SerializableMixin):
     """Step within an axiomatic derivation.
 
     Parameters
@@ -55,7 +58,7 @@ class DerivationStep:
         return f"{self.content}; {self.justification}; {self.on_steps}"
 
 
-class Derivation(list):
+class Derivation(SerializableMixin, list):
     """An axiomatic or natural deduction derivation.
 
     Extends `list`. A derivation is a list of DerivationStep. Each step contains formula, justification, [on_steps]
@@ -1,10 +1,18 @@
+from weakref import WeakValueDictionary
+
 from logics.classes.propositional import Formula, Inference
-from .tableaux import TableauxNode, TableauxSystem
+from .tableaux import TableauxNode, TableauxSystem, _NodeTemplate, _hashable
+from logics.classes.errors import ErrorCode, CorrectionError
+from logics.classes.serialization import SerializableMixin
 
 
-class MetainferentialTableauxStandard:
+class MetainferentialTableauxStandard(SerializableMixin):
     """Class for a standard in metainferential tableaux (the second member of each node)
 
+    Standards are immutable and interned: building a standard that is equal to an existing one returns the existing
+    object, so standards can be shared by every node that has them (and compared and hashed quickly). Their level is
+    computed once, when they are built.
+
     Parameters
     ----------
     content: list or set or string
@@ -16,9 +24,11 @@ class MetainferentialTableauxStandard:
 
     Notes
     -----
-    Note that the `__init__` method of will automatically turn sets and lists within a standard into standard. Thus,
-    you can write ``MetainferentialTableauxStandard([{'1'}, {'1'}])`` instead of
+    Note that the standard will automatically turn sets and lists within it into standards. Thus, you can write
+    ``MetainferentialTableauxStandard([{'1'}, {'1'}])`` instead of
     ``MetainferentialTableauxStandard([MetainferentialTableauxStandard({'1'}), MetainferentialTableauxStandard({'1'})])``
+    The content is kept as a ``frozenset`` (for level-0 standards) or a ``tuple`` of standards (for the rest), and
+    the sets and lists given are not modified.
 
     Examples
     --------
@@ -30,19 +40,65 @@ class MetainferentialTableauxStandard:
     True
     >>> standard.content[0].bar  # bar status is not inherited to content sub-standards
     False
+    >>> standard.content[0] is standard.content[1]  # TS is built once
+    True
+    >>> standard.content[0].content[1].content == {'1'}
+    True
     """
     standard_variables = ['W', 'X', 'Y', 'Z']  # These should not coincide with the formula metavariables of the lang
+    _interned = WeakValueDictionary()
+
+    def __new__(cls, content=None, bar=False):
+        if content is None:
+            # Called without arguments when deserializing (see _after_loads below)
+            return super().__new__(cls)
+        if isinstance(content, MetainferentialTableauxStandard):
+            content = content.content
+        elif isinstance(content, (set, frozenset)):
+            content = frozenset(content)
+        elif isinstance(content, (list, tuple)):
+            content = tuple(element if isinstance(element, MetainferentialTableauxStandard) else cls(element)
+                            for element in content)
+        return cls._intern(content, bool(bar))
+
+    @classmethod
+    def _intern(cls, content, bar):
+        key = (cls, content, bar)
+        standard = cls._interned.get(key)
+        if standard is None:
+            standard = super().__new__(cls)
+            standard.__dict__.update(content=content, bar=bar)
+            standard._cache()
+            cls._interned[key] = standard
+        return standard
+
+    def _cache(self):
+        self.__dict__.update(_hash=hash((self.content, self.bar)), _complements=dict())
+        content = self.content
+        if isinstance(content, frozenset):
+            level = 0
+        elif isinstance(content, tuple):
+            levels = [element._level for element in content]
+            level = None if None in levels else max(levels) + 1
+        else:
+            level = None  # Standard variables
+        self.__dict__['_level'] = level
+
+    def _after_loads(self):
+        # Deserialized standards are replaced by the interned ones
+        return self._intern(self.content, self.bar)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
 
-    def __init__(self, content, bar=False):
-        self.content = content
-        self.bar = bar
+    def __copy__(self):
+        return self
 
-        # At initialization, turn list elements into MetainferentialTableauxStandard
-        if type(self.content) == list:
-            for index in range(len(self.content)):
-                argument = self.content[index]
-                argument = self.__class__(argument)
-                self.content[index] = argument
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self.content, self.bar)
 
     @property
     def level(self):
@@ -70,14 +126,41 @@ class MetainferentialTableauxStandard:
         ...
         ValueError: Variable standard can have any level
         """
-        # The standard is something like 'X'
-        if self.content in self.standard_variables:
+        if self._level is None:
             raise ValueError('Variable standard can have any level')
-        # Sets are standards of level 0
-        elif type(self.content) == set:
-            return 0
-        # For lists -i.e. type [S1, S2], return the maximum level between S1 and S2 + 1
-        return max(self.content[0].level, self.content[1].level) + 1
+        return self._level
+
+    def with_bar(self, bar=True):
+        """Returns the standard with the same content and the `bar` given
+
+        Examples
+        --------
+        >>> from logics.classes.propositional.proof_theories.metainferential_tableaux import MetainferentialTableauxStandard
+        >>> T = MetainferentialTableauxStandard({'1', 'i'})
+        >>> T.with_bar().bar
+        True
+        >>> T.with_bar() is MetainferentialTableauxStandard({'1', 'i'}, bar=True)
+        True
+        """
+        if bar == self.bar:
+            return self
+        return self._intern(self.content, bool(bar))
+
+    def complement(self, base_indexes):
+        """Returns the level-0 standard with the values of `base_indexes` that are not in this (level-0) standard,
+        without a bar. The result is cached for each set of base indexes.
+
+        Examples
+        --------
+        >>> from logics.classes.propositional.proof_theories.metainferential_tableaux import MetainferentialTableauxStandard
+        >>> MetainferentialTableauxStandard({'1'}).complement({'1', 'i', '0'}).content == {'i', '0'}
+        True
+        """
+        base_indexes = frozenset(base_indexes)
+        complement = self._complements.get(base_indexes)
+        if complement is None:
+            complement = self._complements[base_indexes] = self._intern(base_indexes - self.content, False)
+        return complement
 
     def is_instance_of(self, idx2, subst_dict=None, return_subst_dict=False):
         """Determines whether a standard is an instance of another standard
@@ -139,7 +222,7 @@ class MetainferentialTableauxStandard:
                 return True
 
         # Complex index (e.g. [[{1, 'i'}, {'1'}], [{1}, {'1', 'i'}]], aka TS/ST)
-        elif isinstance(std1, list) and isinstance(std2, list) and len(std2) == 2:
+        elif isinstance(std1, tuple) and isinstance(std2, tuple) and len(std2) == 2:
             # both std1 and std2 are MetainferentialTableauxStandard
             result, subst_dict = std1[0].is_instance_of(std2[0], subst_dict, True)
             if not result:
@@ -152,7 +235,7 @@ class MetainferentialTableauxStandard:
             return result2
 
         # Simple index, e.g. {'1', 'i'} or {'1'}
-        elif isinstance(std1, set) and isinstance(std2, set):
+        elif isinstance(std1, frozenset) and isinstance(std2, frozenset):
             if return_subst_dict:
                 return std1 == std2, subst_dict
             return std1 == std2
@@ -162,16 +245,33 @@ class MetainferentialTableauxStandard:
         return False
 
     def __eq__(self, other):
-        # A standard is equal to another if its content and bar are the same
-        return self.content == other.content and self.bar == other.bar
+        # A standard is equal to another if its content and bar are the same (equal standards are usually the same
+        # object, since they are interned)
+        if self is other:
+            return True
+        if not isinstance(other, MetainferentialTableauxStandard):
+            return NotImplemented
+        return self._hash == other._hash and self.content == other.content and self.bar == other.bar
 
     def __ne__(self, other):
         return not self == other
 
+    def __hash__(self):
+        return self._hash
+
     def __repr__(self):
         # Bars are represented as a - sign at the beggining, so you may see things like -[-[{1}, -{1}], [{1}, {1}]]
         s = '-' if self.bar else ''
-        return s + str(self.content)
+        content = self.content
+        if isinstance(content, tuple):
+            return s + '[' + ', '.join(repr(element) for element in content) + ']'
+        if isinstance(content, frozenset):
+            return s + (str(set(content)) if content else 'set()')
+        return s + str(content)
+
+
+# The content of the nodes of the inf0 and inf1 rules (see MetainferentialTableauxNode.content_is_instance_of)
+_INFERENCE_VARIABLE = Inference(premises=[Formula(['Γ'])], conclusions=[Formula(['Δ'])])
 
 
 class MetainferentialTableauxNode(TableauxNode):
@@ -235,8 +335,7 @@ class MetainferentialTableauxNode(TableauxNode):
 
         # This is kind of a hack, it states any inference node's content is an instance of Γ / Δ (useful for inf0, inf1)
         # Since logics has no inference variables, we must treat Γ and Δ as formulae
-        if (content2 == Inference(premises=[Formula(['Γ'])], conclusions=[Formula(['Δ'])]) and
-                isinstance(self.content, Inference)):
+        if isinstance(self.content, Inference) and content2 == _INFERENCE_VARIABLE:
             if return_subst_dict:
                 subst_dict['Γ'] = self.content.premises
                 subst_dict['Δ'] = self.content.conclusions
@@ -294,26 +393,74 @@ class MetainferentialTableauxSystem(TableauxSystem):
     -----
     * This subclasses ``logics.classes.propositional.proof_theories.tableaux.TableauxSystem``,
       and overrides a few methods. The functioning is almost identical
-    * Also note that the ``is_correct_tree`` **method has not been implemented yet for this class.**
+    * The nodes that the rules in ``hardcoded_rules`` add are not given by the trees of the rules, but computed from
+      the node they are applied to (see ``_rule_nodes``). The solver and ``is_correct_tree`` both take them from here.
+    * ``is_correct_tree`` expects the trees that the ``MetainferentialTableauxSolver`` builds. In particular, the
+      only premise node is the root (the inference with its standard, with a bar), and a node that is already in
+      the branch is not added again (nor a node that is the same as the one added just before it by the same rule).
+
+    Examples
+    --------
+    >>> from logics.utils.parsers import classical_parser
+    >>> from logics.instances.propositional.metainferential_tableaux import SK_metainferential_tableaux_system
+    >>> from logics.utils.solvers.tableaux import metainferential_tableaux_solver
+    >>> inference = classical_parser.parse('p ∧ q / p')
+    >>> tree = metainferential_tableaux_solver.solve(inference, SK_metainferential_tableaux_system,
+    ...                                              beggining_index=[{'1'}, {'1', 'i'}])  # ST
+    >>> tree.children[0].content, tree.children[0].children[0].children[0].justification
+    (['∧', ['p'], ['q']], 'R∧1')
+    >>> SK_metainferential_tableaux_system.is_correct_tree(tree, inference)
+    True
+    >>> tree.children[0].children[0].children[0].children[0].justification = 'R∧0'
+    >>> SK_metainferential_tableaux_system.is_correct_tree(tree, inference, return_error_list=True,
+    ...                                                    parser=classical_parser)
+    (False, [(0, 0, 0, 0, 0): Rule incorrectly applied to node q, {'1'} (R∧0)])
     """
     fast_node_is_closed_enabled = True
+    hardcoded_rules = ('inf0', 'inf1', 'singleton', 'intersection', 'complement')
 
     def __init__(self, base_indexes, language, rules, closure_rules, solver=None):
         self.base_indexes = base_indexes
         super().__init__(language, rules, closure_rules, solver)
 
-    @staticmethod
-    def _fast_node_is_closed(node):
-        for node in node.path:
-            # if it finds the empty set at the right, close
-            if node.index.content == set():
-                return True
-            # If it finds the empty inference with no bar, close
-            if (type(node.content) == Inference and
-                    len(node.content.premises) == 0 and len(node.content.conclusions) == 0 and not node.index.bar):
-                return True
+    def _literal_key(self, node):
+        # Closure only depends on each node by itself (see below), but the solver looks up repeated nodes in the branch
+        return _hashable(node.content), node.index
+
+    def _closes_branch(self, node, key, literals, depth):
+        # if it finds the empty set at the right, close
+        if node.index.content == set():
+            return True
+        # If it finds the empty inference with no bar, close
+        if (type(node.content) == Inference and
+                len(node.content.premises) == 0 and len(node.content.conclusions) == 0 and not node.index.bar):
+            return True
         return False
 
+    def branch_valuation(self, node, atomics=()):
+        """Returns the valuation of the atomics given by the nodes of the form ``p, X`` in the path to `node` (where
+        ``X`` is a basic standard, with or without a bar). Each atomic gets the first value (in sorted order) of the
+        `base_indexes` that is in every ``X`` and in none of the barred ones.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.instances.propositional.metainferential_tableaux import SK_metainferential_tableaux_system
+        >>> from logics.utils.solvers.tableaux import metainferential_tableaux_solver
+        >>> metainferential_tableaux_solver.check(classical_parser.parse('p / q'), SK_metainferential_tableaux_system,
+        ...                                       beggining_index=[{'1'}, {'1', 'i'}])  # ST
+        (False, {'p': '1', 'q': '0'})
+        """
+        values = {atomic: set(self.base_indexes) for atomic in atomics}
+        for ancestor in node.path:
+            if self._is_atomic_formula(ancestor.content) and ancestor.index.level == 0:
+                allowed = values.setdefault(ancestor.content[0], set(self.base_indexes))
+                if ancestor.index.bar:
+                    allowed -= ancestor.index.content
+                else:
+                    allowed &= ancestor.index.content
+        return {atomic: min(values[atomic], default=None) for atomic in sorted(values)}
+
     def _rule_is_applicable_additional_conditions(self, node, subst_dict, rule_name):
         # For the inf0 and inf1 rules, check that the level of the inference and of the standard is the same
         if rule_name == 'inf0' or rule_name == 'inf1':
@@ -343,5 +490,118 @@ class MetainferentialTableauxSystem(TableauxSystem):
 
         return True
 
-    def is_correct_tree(self, tree, inference=None, return_error_list=False, exit_on_first_error=False, parser=None):
-        raise NotImplementedError()
+    def _compile_rules(self):
+        # Also record the bar and level of the standard of the last premise of each rule (None for the level if it has
+        # standard variables), see candidate_rules below
+        signature = getattr(self, '_rule_index_signature', None)
+        super()._compile_rules()
+        if self._rule_index_signature != signature:
+            self._rule_standards = {rule_name: (rule_prems[-1].index.bar, rule_prems[-1].index._level)
+                                    for rule_name, (rule_prems, _) in self._rule_templates.items()}
+
+    def candidate_rules(self, node):
+        # Besides the shape of the content, the standard of the node must have the bar of that of the rule, and the
+        # same level (if the standard of the rule has no variables)
+        candidates = super().candidate_rules(node)
+        bar, level = node.index.bar, node.index._level
+        return [rule_name for rule_name in candidates if self._rule_standards[rule_name] in ((bar, level), (bar, None))]
+
+    def _rule_is_determined(self, rule_name, rule_prems, rule_nodes):
+        # The nodes of the hardcoded rules are computed from the substitution dict (see _rule_nodes). For the rest,
+        # standards are compared by equality, so they cannot contain standard variables
+        if rule_name in self.hardcoded_rules:
+            return True
+        if not rule_nodes or any(not isinstance(n.content, Formula) or n.index._level is None for n in rule_nodes):
+            return False
+        if not all(isinstance(n.content, Formula) for n in rule_prems):
+            return False
+        premise_metavariables = set().union(*(self._metavariables(n.content) for n in rule_prems))
+        return all(self._metavariables(n.content) <= premise_metavariables for n in rule_nodes)
+
+    def _rule_nodes(self, rule_name, subst_dict):
+        """Returns the templates of the nodes that applying a rule adds below its last premise. For the rules in
+        ``hardcoded_rules``, these are computed from the substitution dict:
+
+        * ``inf0``: the premises of the inference with the first standard and then its conclusions with the second
+          one, barred, in a single branch
+        * ``inf1``: a branch for each premise, with the first standard barred, and for each conclusion, with the
+          second one
+        * ``singleton``: a branch for each value of the standard, in sorted order, with that value as standard
+        * ``intersection``: the formula with the intersection of both standards
+        * ``complement``: the formula with the complement of the (barred) standard, with respect to ``base_indexes``
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.classes.propositional.proof_theories.metainferential_tableaux import MetainferentialTableauxStandard
+        >>> from logics.instances.propositional.metainferential_tableaux import SK_metainferential_tableaux_system
+        >>> templates = SK_metainferential_tableaux_system._rule_nodes('singleton', {
+        ...     'A': classical_parser.parse('p'), 'X': MetainferentialTableauxStandard({'1', 'i'})})
+        >>> [(classical_parser.unparse(t.content), t.index, t.justification) for t in templates]
+        [('p', {'1'}, 'singleton'), ('p', {'i'}, 'singleton')]
+        """
+        if rule_name not in self.hardcoded_rules:
+            return super()._rule_nodes(rule_name, subst_dict)
+        node_class = MetainferentialTableauxNode
+
+        if rule_name == 'inf0':
+            X, Ybar = subst_dict['X'], subst_dict['Y'].with_bar(True)
+            nodes = [(premise, X) for premise in subst_dict['Γ']] + \
+                    [(conclusion, Ybar) for conclusion in subst_dict['Δ']]
+            children = tuple()
+            for content, index in reversed(nodes):
+                children = (_NodeTemplate(node_class, content, index, 'inf0', children),)
+            return children
+
+        if rule_name == 'inf1':
+            Xbar, Y = subst_dict['X'].with_bar(True), subst_dict['Y']
+            return tuple(_NodeTemplate(node_class, premise, Xbar, 'inf1') for premise in subst_dict['Γ']) + \
+                tuple(_NodeTemplate(node_class, conclusion, Y, 'inf1') for conclusion in subst_dict['Δ'])
+
+        formula, X = subst_dict['A'], subst_dict['X']
+        if rule_name == 'singleton':
+            return tuple(_NodeTemplate(node_class, formula, MetainferentialTableauxStandard({value}), 'singleton')
+                         for value in sorted(X.content))
+        if rule_name == 'intersection':
+            return (_NodeTemplate(node_class, formula, MetainferentialTableauxStandard(X.content & subst_dict['Y'].content),
+                                  'intersection'),)
+        return (_NodeTemplate(node_class, formula, X.complement(self.base_indexes), 'complement'),)
+
+    def _rule_nodes_below(self, node, rule_nodes):
+        # As the MetainferentialTableauxSolver does, leave out the nodes that are already in the branch, or that are the
+        # same as the previous one (along with the nodes below them)
+        below = list()
+        previous = None
+        for template in rule_nodes:
+            if self._is_in_branch(template, node) or \
+                    (previous is not None and
+                     previous.content == template.content and previous.index == template.index):
+                continue
+            previous = template
+            below.append(template)
+        if len(below) == len(rule_nodes):
+            return rule_nodes
+        return tuple(below)
+
+    def _is_correct_premise_node(self, node, inference):
+        """The only premise node is the root, with the inference and a barred standard of the same level (as built by
+        the ``MetainferentialTableauxSolver``)"""
+        if node.parent is None and node.content == inference and node.index.bar and \
+                node.index._level == inference.level:
+            return {0}, set()
+        return set(), set()
+
+    def _all_premises_present(self, inference, present_premises, present_conclusions, return_error_list, error_list,
+                              exit_on_first_error, parser):
+        """Checks that the inference is at the root"""
+        if 0 in present_premises:
+            return True
+        if not return_error_list:
+            return False
+        if parser:
+            inference = parser.unparse(inference)
+        error_list.append(CorrectionError(code=ErrorCode.TBL_PREMISE_NOT_PRESENT, index=tuple(),
+                                          description=f'Inference {inference} is not present in the tree'))
+        if exit_on_first_error:
+            return False
+        return True
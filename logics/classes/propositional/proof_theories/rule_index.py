@@ -0,0 +1,136 @@
+from logics.classes.propositional import Formula
+
+
+class _Wildcard:
+    """Token that stands for an entire subformula (a metavariable, or something the index does not look into)"""
+    def __repr__(self):
+        return '*'
+
+
+WILDCARD = _Wildcard()
+
+
+class _IndexNode:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children = dict()
+        self.keys = list()
+
+
+class RuleIndex:
+    """Discrimination tree over (schematic) formulae, used to quickly retrieve the rules that could apply to a formula.
+
+    Each schema is stored as the sequence of its symbols, read in prefix order, where metavariables (and everything
+    below `max_depth`) are replaced by a wildcard. Given a formula, ``candidates`` walks the tree once and returns the
+    keys of every schema that the formula *could* be an instance of. The index is conservative: it never leaves out a
+    schema of which the formula is an instance, but it may return some of which it is not (e.g. it does not check that
+    two apparitions of the same metavariable are instantiated in the same way), so you still need to call
+    ``is_instance_of`` on the candidates.
+
+    Parameters
+    ----------
+    language: logics.classes.propositional.Language or logics.classes.propositional.InfiniteLanguage
+        Instance of Language or InfiniteLanguage (or their predicate counterparts)
+    schemas: dict, optional
+        Dictionary of the form ``{key: schema}`` to add to the index, in order. `schema` can be a Formula or ``None``.
+        A ``None`` schema (or anything that is not a Formula) is a candidate for every formula.
+    max_depth: int, optional
+        How many levels of the schemas to look into. Default is 3.
+
+    Examples
+    --------
+    >>> from logics.utils.parsers import classical_parser
+    >>> from logics.instances.propositional.languages import classical_infinite_language
+    >>> from logics.classes.propositional.proof_theories.rule_index import RuleIndex
+    >>> index = RuleIndex(classical_infinite_language, {
+    ...     'R~~': classical_parser.parse('~~A'),
+    ...     'R∧': classical_parser.parse('A ∧ B'),
+    ...     'R~∧': classical_parser.parse('~(A ∧ B)'),
+    ...     'R∨': classical_parser.parse('A ∨ B'),
+    ...     'Rp': classical_parser.parse('p ∧ A'),
+    ... })
+    >>> index.candidates(classical_parser.parse('~~(p ∧ q)'))
+    ['R~~']
+    >>> index.candidates(classical_parser.parse('p ∧ q'))
+    ['R∧', 'Rp']
+    >>> index.candidates(classical_parser.parse('q ∧ q'))
+    ['R∧']
+    >>> index.candidates(classical_parser.parse('~p'))
+    []
+
+    Keys are always returned in the order in which they were added (so that solvers that try rules in the order
+    of the rules dict keep behaving in the same way).
+    """
+    def __init__(self, language, schemas=None, max_depth=3):
+        self.language = language
+        self.max_depth = max_depth
+        self._constants = language.constants()
+        self._root = _IndexNode()
+        self._order = dict()
+        if schemas is not None:
+            for key, schema in schemas.items():
+                self.add(key, schema)
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, key, schema):
+        """Adds a schema to the index, under `key`. Keys must be hashable"""
+        if key not in self._order:
+            self._order[key] = len(self._order)
+        node = self._root
+        for token in self._schema_tokens(schema):
+            node = node.children.setdefault(token, _IndexNode())
+        node.keys.append(key)
+
+    def candidates(self, formula):
+        """Returns the list of keys whose schema `formula` may be an instance of (in the order they were added)"""
+        found = set()
+        # Each element of the stack is an index node and the (tuple of) subformulae that remain to be read
+        stack = [(self._root, (formula,))]
+        while stack:
+            node, pending = stack.pop()
+            if not pending:
+                found.update(node.keys)
+                continue
+            current, rest = pending[0], pending[1:]
+            wildcard_child = node.children.get(WILDCARD)
+            if wildcard_child is not None:
+                stack.append((wildcard_child, rest))
+            token, arguments = self._formula_token(current)
+            if token is not None:
+                child = node.children.get(token)
+                if child is not None:
+                    stack.append((child, arguments + rest))
+        return sorted(found, key=self._order.__getitem__)
+
+    def _schema_tokens(self, schema, depth=0):
+        """Prefix-order list of the tokens of a schema"""
+        if not isinstance(schema, Formula) or depth >= self.max_depth:
+            return [WILDCARD]
+        if len(schema) == 1 and isinstance(schema[0], str):
+            if schema.is_schematic(self.language):
+                return [WILDCARD]
+            return [(schema[0],)]
+        if schema[0] in self._constants and all(isinstance(arg, Formula) for arg in schema[1:]):
+            tokens = [(schema[0], len(schema) - 1)]
+            for argument in schema[1:]:
+                tokens.extend(self._schema_tokens(argument, depth + 1))
+            return tokens
+        # Quantified formulae, predicate atomics, etc. are not looked into
+        return [WILDCARD]
+
+    @staticmethod
+    def _formula_token(formula):
+        """Returns the token of the formula and a tuple with the subformulae to read next.
+        If the formula is of a shape that the index does not look into, the token is ``None`` (only wildcards match)"""
+        if not isinstance(formula, Formula) or not formula or not isinstance(formula[0], str):
+            return None, ()
+        if len(formula) == 1:
+            return (formula[0],), ()
+        arguments = tuple(formula[1:])
+        for argument in arguments:
+            if not isinstance(argument, Formula):
+                return None, ()
+        return (formula[0], len(arguments)), arguments
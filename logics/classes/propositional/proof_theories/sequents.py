@@ -3,11 +3,13 @@ from itertools import combinations, combinations_with_replacement
 
 from anytree import NodeMixin, RenderTree, PostOrderIter
 
+from logics.classes.propositional.proof_theories.rule_index import RuleIndex
 from logics.classes.exceptions import SolverError
 from logics.classes.errors import ErrorCode, CorrectionError
+from logics.classes.serialization import SerializableMixin
 
 
-class Sequent(list):
+class Sequent(SerializableMixin, list):
     """Class for representing sequents.
 
     Extends ``list`` instead of ``Inference`` because that allows us to have n-sided calculi. Standard 2-sided sequents
@@ -302,7 +304,7 @@ class Sequent(list):
 
         return new_side
 
-    def instantiate(self, language, subst_dict):
+    def instantiate(self, language, subst_dict, share_subformulae=False):
         """Given a language and a substitution dict, returns the Sequent instantiated with the dict.
 
         Will return a different Sequent object, and not modify the original. For instantiating formulae,
@@ -316,6 +318,9 @@ class Sequent(list):
             Instance of Language or InfiniteLanguage
         subst_dict: dict
             See above for the format
+        share_subformulae: bool, optional
+            If ``True``, the formulae of the new sequent share the parts that do not change with the schema and the
+            substitution dict (see the ``instantiate`` method of :doc:`formula`). Defaults to ``False``.
 
         Returns
         -------
@@ -355,7 +360,7 @@ class Sequent(list):
                     new_side.extend(subst_dict[elem])  # Substitutions of context vars are lists
                 # Formula
                 else:
-                    new_formula = elem.instantiate(language, subst_dict)
+                    new_formula = elem.instantiate(language, subst_dict, share_subformulae=share_subformulae)
                     new_side.append(new_formula)
             new_sequent.append(new_side)
         return Sequent(new_sequent)
@@ -781,7 +786,7 @@ class Sequent(list):
 # ----------------------------------------------------------------------------------------------------------------------
 # Derivations (Trees)
 
-class SequentNode(NodeMixin):
+class SequentNode(SerializableMixin, NodeMixin):
     """Class for nodes in sequent tree-derivations.
 
     Subclasses NodeMixin from the `anytree package <https://anytree.readthedocs.io/en/latest/>`_.
@@ -1063,6 +1068,79 @@ class SequentCalculus:
                 return True
         return False
 
+    def candidate_rules(self, sequent, rule_names=None):
+        """Returns the names of the rules whose conclusion `sequent` might be an instance of.
+
+        A rule is a candidate only if its conclusion has the same number of sides as the sequent, empty sides of the
+        rule correspond to empty sides of the sequent, and every formula (non-context variable) of each side of
+        the rule has, in the corresponding side of the sequent, a formula with the same shape (see ``RuleIndex``).
+        Every rule of which the sequent is an instance is returned, but not every candidate needs to be one.
+
+        Parameters
+        ----------
+        sequent: logics.classes.propositional.proof_theories.Sequent
+            The sequent we want to look at
+        rule_names: list of str, optional
+            The rules to consider, in the order in which they should be returned. If ``None``, will consider every rule
+            of the system, in the order of the `rules` dict.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.instances.propositional.sequents import LK
+        >>> LK.candidate_rules(classical_parser.parse('Gamma, A ∧ B ==> Delta'), ['∧L1', '∧L2', '∧R', '~L', '~R'])
+        ['∧L1', '∧L2']
+        >>> LK.candidate_rules(classical_parser.parse('A ==> ~B'), ['∧L1', '∧L2', '∧R', '~L', '~R'])
+        ['~R']
+        """
+        if rule_names is None:
+            rule_names = list(self.rules)
+
+        signature = tuple((rule_name, id(rule)) for rule_name, rule in self.rules.items())
+        if getattr(self, '_rule_index_signature', None) != signature:
+            # One index per side, keyed by (rule name, position of the formula in the side)
+            self._rule_side_indexes = dict()
+            self._rule_side_patterns = dict()
+            for rule_name, rule in self.rules.items():
+                side_patterns = list()
+                for side_index, side in enumerate(rule.content):
+                    pattern = [elem for elem in side if elem not in self.language.context_variables]
+                    side_patterns.append((side == [], len(pattern)))
+                    if side_index not in self._rule_side_indexes:
+                        self._rule_side_indexes[side_index] = RuleIndex(self.language)
+                    for position, formula in enumerate(pattern):
+                        self._rule_side_indexes[side_index].add((rule_name, position), formula)
+                self._rule_side_patterns[rule_name] = side_patterns
+            self._rule_index_signature = signature
+
+        # For each side, the (rule name, position) pairs that some formula of the sequent side may instantiate
+        matched = list()
+        formula_numbers = list()
+        for side_index, side in enumerate(sequent):
+            side_matched = set()
+            formulae = [elem for elem in side if elem not in self.language.context_variables]
+            if side_index in self._rule_side_indexes:
+                for formula in formulae:
+                    side_matched.update(self._rule_side_indexes[side_index].candidates(formula))
+            matched.append(side_matched)
+            formula_numbers.append(len(formulae))
+
+        candidates = list()
+        for rule_name in rule_names:
+            side_patterns = self._rule_side_patterns[rule_name]
+            if len(side_patterns) != len(sequent):
+                continue
+            for side_index, (empty_side, pattern_length) in enumerate(side_patterns):
+                if empty_side and sequent[side_index]:
+                    break
+                if pattern_length > formula_numbers[side_index]:
+                    break
+                if any((rule_name, position) not in matched[side_index] for position in range(pattern_length)):
+                    break
+            else:
+                candidates.append(rule_name)
+        return candidates
+
     def tree_is_closed(self, node):
         """Given a tree (a *derived* sequent with children -premises-) checks if all descendant branches are closed
         (i.e. if every leaf is an axiom)
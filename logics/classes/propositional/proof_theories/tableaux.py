@@ -2,15 +2,18 @@
 Tableaux implementation using AnyTree. See https://anytree.readthedocs.io/en/latest/
 Because of how AnyTree works, the root node of a tableaux IS the tableaux.
 """
-from copy import copy, deepcopy
+from copy import deepcopy
+from itertools import islice
 
 from anytree import NodeMixin, RenderTree, PreOrderIter, LevelOrderIter
 
-from logics.classes.propositional import Formula
+from logics.classes.propositional import Formula, Inference
+from logics.classes.propositional.proof_theories.rule_index import RuleIndex
 from logics.classes.errors import ErrorCode, CorrectionError
+from logics.classes.serialization import SerializableMixin
 
 
-class TableauxNode(NodeMixin):
+class TableauxNode(SerializableMixin, NodeMixin):
     """Class for a tableaux node.
 
     Subclasses NodeMixin from the `anytree package <https://anytree.readthedocs.io/en/latest/>`_.
@@ -66,15 +69,37 @@ class TableauxNode(NodeMixin):
     """
 
     separator = '==>'
+    # Closure states of the branch that ends in the node, see TableauxSystem.node_is_closed
+    _transient_attributes = frozenset({'_closure_states'})
 
     def __init__(self, content, index=None, justification=None, parent=None, children=None):
-        self.content = content
-        self.index = index
-        self.justification = justification
+        # A new node has no closure states to clear (see __setattr__)
+        self.__dict__.update(content=content, index=index, justification=justification)
         self.parent = parent
         if children:
             self.children = children
 
+    def __setattr__(self, name, value):
+        # Changing the content or index of a node changes the branches it is in, same as moving it
+        if (name == 'content' or name == 'index') and '_closure_states' in self.__dict__:
+            self._clear_closure_states()
+        object.__setattr__(self, name, value)
+
+    def _post_attach(self, parent):
+        self._clear_closure_states()
+
+    def _post_detach(self, parent):
+        self._clear_closure_states()
+
+    def _clear_closure_states(self):
+        """Moving a node (or changing its content or index) changes the branches of it and its descendants, so their
+        cached closure states are removed. Descendants of a node without closure states have none either"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__dict__.pop('_closure_states', None) is not None:
+                stack.extend(node.children)
+
     def is_instance_of(self, node, language, subst_dict=None, return_subst_dict=False):
         """Determines whether a node is as instance of another (schematic) node.
 
@@ -150,7 +175,8 @@ class TableauxNode(NodeMixin):
             return self.index == idx2, subst_dict
         return self.index == idx2
 
-    def instantiate(self, language, subst_dict, instantiate_children=True, first_iteration=True):
+    def instantiate(self, language, subst_dict, instantiate_children=True, first_iteration=True,
+                    share_subformulae=False):
         """Given a TableauxNode with a schematic formula as content and a substitution dict, returns the schema
         instantiated with the dict.
 
@@ -168,6 +194,10 @@ class TableauxNode(NodeMixin):
             will leave them as is.
         first_iteration: bool, optional
             For recursion purposes, should not be altered.
+        share_subformulae: bool, optional
+            If ``True``, the contents of the new nodes share the parts that do not change with the schema and the
+            substitution dict (see the ``instantiate`` method of :doc:`formula`), and the contents that are left as is
+            are not copied. Defaults to ``False``.
 
         Returns
         -------
@@ -206,15 +236,19 @@ class TableauxNode(NodeMixin):
         """
         # If it is the original node or (not the original but you want to instantiate its children as well)
         if first_iteration or instantiate_children:
-            self_content_substitution = self.content.instantiate(language, subst_dict)
+            self_content_substitution = self.content.instantiate(language, subst_dict,
+                                                                 share_subformulae=share_subformulae)
         # Else it is a child and you do not want to instantiate the content
+        elif share_subformulae:
+            self_content_substitution = self.content
         else:
             self_content_substitution = deepcopy(self.content)
         new_tableaux = self.__class__(content=self_content_substitution, index=self.index,
                                       justification=self.justification)
 
         for child_node in self.children:
-            new_child = child_node.instantiate(language, subst_dict, instantiate_children, first_iteration=False)
+            new_child = child_node.instantiate(language, subst_dict, instantiate_children, first_iteration=False,
+                                               share_subformulae=share_subformulae)
             new_child.parent = new_tableaux
 
         return new_tableaux
@@ -324,6 +358,80 @@ class TableauxNode(NodeMixin):
 # ----------------------------------------------------------------------------------------------------------------------
 
 
+def _hashable(obj):
+    """Hashable version of a formula, inference, index, etc. (lists are turned into tuples, and sets into frozensets)"""
+    if isinstance(obj, list):
+        return tuple(_hashable(element) for element in obj)
+    if isinstance(obj, set):
+        return frozenset(obj)
+    if isinstance(obj, Inference):
+        # The class goes first so that inferences never have the same key as a formula
+        return (Inference, tuple(_hashable(premise) for premise in obj.premises),
+                tuple(_hashable(conclusion) for conclusion in obj.conclusions))
+    return obj
+
+
+class _BranchState:
+    """Closure state of the branch that ends in a node.
+
+    `literals` is a dict with the keys of the nodes of the branch (see ``TableauxSystem._literal_key``) and the depth of
+    the first node with each key. It is shared by a node and its first child (the one that `extended` the state), so
+    along a branch without bifurcations nodes are added to a single dict. The dict of a node can thus contain keys of
+    its descendants, which is why the depths are kept.
+    """
+    __slots__ = ('literals', 'depth', 'closed', 'extended')
+
+    def __init__(self, literals, depth, closed):
+        self.literals = literals
+        self.depth = depth
+        self.closed = closed
+        self.extended = False
+
+
+class _NodeTemplate:
+    """A node to add to a tableaux, along with the nodes to add below it.
+
+    The part of a rule that comes after its last premise is compiled into templates once per system (see
+    ``TableauxSystem._rule_template``). Solvers instantiate them once per rule application, and then only create the
+    nodes for each open branch (the contents and indexes are shared by every copy).
+    """
+    __slots__ = ('node_class', 'content', 'index', 'justification', 'children')
+
+    def __init__(self, node_class, content, index=None, justification=None, children=()):
+        self.node_class = node_class
+        self.content = content
+        self.index = index
+        self.justification = justification
+        self.children = children
+
+    @classmethod
+    def from_node(cls, node):
+        """Template of a node and its descendants"""
+        return cls(node.__class__, node.content, node.index, node.justification,
+                   tuple(cls.from_node(child) for child in node.children))
+
+    def instantiate(self, language, subst_dict):
+        """Template with the metavariables of the contents replaced (unchanged subformulae are shared)"""
+        return self.__class__(self.node_class,
+                              self.content.instantiate(language, subst_dict, share_subformulae=True),
+                              self.index, self.justification,
+                              tuple(child.instantiate(language, subst_dict) for child in self.children))
+
+    def build(self, parent=None):
+        """Creates the nodes of the template below `parent`, returns the topmost one"""
+        node = self.node_class(content=self.content, index=self.index, justification=self.justification,
+                               parent=parent)
+        for child in self.children:
+            child.build(node)
+        return node
+
+    def paths(self):
+        """The branches of the template, as lists of templates from the topmost one to a leaf"""
+        if not self.children:
+            return [[self]]
+        return [[self] + path for child in self.children for path in child.paths()]
+
+
 class TableauxSystem:
     """Class for tableaux systems.
 
@@ -410,6 +518,12 @@ class TableauxSystem:
         A node is considered closed when an instance of a closure rule occurs in its path (see also the
         ``fast_node_is_closed_enabled`` class attribute).
 
+        The result is cached in the node along with an index of the nodes of its branch, and the state of a node is
+        obtained from that of its parent. So checking a new leaf only looks at the leaf (and, with closure rules, looks
+        up in the index the nodes that would close the branch along with it). The cached states are removed when a
+        node is attached to or detached from a tree or its content or index is reassigned, but not if you modify the
+        content or index themselves in place.
+
         Examples
         --------
         >>> from logics.utils.parsers import classical_parser
@@ -427,50 +541,107 @@ class TableauxSystem:
         >>> classical_tableaux_system.node_is_closed(n3)
         True
         """
-        # Execute the fast version below if enabled (check for a node and its negation)
+        return self._branch_state(node).closed
+
+    def _branch_state(self, node):
+        """Returns the closure state of the branch that ends in `node`, computing (and caching) the states of the
+        ancestors that do not have one yet"""
+        chain = []
+        state = None
+        while node is not None:
+            states = node.__dict__.get('_closure_states')
+            if states is not None and self in states:
+                state = states[self]
+                break
+            chain.append(node)
+            node = node.parent
+        for node in reversed(chain):
+            state = self._extend_branch_state(state, node)
+            node.__dict__.setdefault('_closure_states', dict())[self] = state
+        return state
+
+    def _extend_branch_state(self, parent_state, node):
+        """Returns the state of the branch that ends in `node` given that of its parent (``None`` for the root)"""
+        if parent_state is None:
+            state = _BranchState(dict(), 0, False)
+        else:
+            depth = parent_state.depth + 1
+            if parent_state.extended:
+                # Another child of the parent already took its literals, so keep only those of the common branch
+                literals = {key: key_depth for key, key_depth in parent_state.literals.items() if key_depth < depth}
+            else:
+                literals = parent_state.literals
+                parent_state.extended = True
+            state = _BranchState(literals, depth, parent_state.closed)
+
+        key = self._literal_key(node)
+        if not state.closed:
+            state.closed = self._closes_branch(node, key, state.literals, state.depth)
+        if key is not None:
+            state.literals.setdefault(key, state.depth)
+        return state
+
+    def _literal_key(self, node):
+        """Hashable key of the content and index of a node, under which it is kept in the literals of its branch.
+        ``None`` if the node does not need to be kept"""
+        return _hashable(node.content), _hashable(node.index)
+
+    def _closes_branch(self, node, key, literals, depth):
+        """Whether `node` closes its branch, given the literals of its ancestors (a dict whose keys are given by
+        `_literal_key` and values are the depth of the first node with that key in the branch)"""
+        # Fast version if enabled, checks whether A, i and ~A, i are present in the branch
         if self.fast_node_is_closed_enabled:
-            return self._fast_node_is_closed(node)
+            content, index = key
+            if literals.get((('~', content), index), depth) < depth:
+                return True
+            if node.content.main_symbol == '~' and literals.get((content[1], index), depth) < depth:
+                return True
+            return False
 
         # Slow version for systems with more complicated closure rules (e.g. K3, FDE)
-        # Checks every pair of nodes to see if they are instance of the closure rule's pair of nodes
-        path = node.path
-        for node2_index in range(len(path)):
-            for node3_index in range(node2_index+1, len(path)):
-                node2 = path[node2_index]
-                node3 = path[node3_index]
-                for closure_rule in self.closure_rules:
-                    instance1, subst_dict2 = node2.is_instance_of(closure_rule[0], self.language,
-                                                                  return_subst_dict=True)
-                    if instance1:
-                        instance2 = node3.is_instance_of(closure_rule[1], self.language, subst_dict2)
-                        if instance2:
-                            return True
-                    # Check the reverse (current node is the second member of the closure rule)
-                    instance3, subst_dict3 = node3.is_instance_of(closure_rule[0], self.language,
-                                                                  return_subst_dict=True)
-                    if instance3:
-                        instance4 = node2.is_instance_of(closure_rule[1], self.language, subst_dict3)
-                        if instance4:
-                            return True
+        # If the node is an instance of a member of a closure rule, the node that would complete the rule is looked up
+        # in the literals of the branch (or, if the node does not determine it, searched for among the ancestors)
+        for schema, other, other_is_determined in self._closure_index():
+            instance, subst_dict = node.is_instance_of(schema, self.language, return_subst_dict=True)
+            if not instance:
+                continue
+            if other_is_determined:
+                other_content = other.content.instantiate(self.language, subst_dict, share_subformulae=True)
+                if literals.get((_hashable(other_content), _hashable(other.index)), depth) < depth:
+                    return True
+            else:
+                # Only the `depth` ancestors of the branch (see tree_is_closed, where it need not start at the root)
+                for ancestor in islice(node.iter_path_reverse(), 1, depth + 1):
+                    if ancestor.is_instance_of(other, self.language, dict(subst_dict)):
+                        return True
         return False
 
-    @staticmethod
-    def _fast_node_is_closed(node):
-        """
-        Much faster (but less general) node_is_closed implementation.
-        Checks whether A, i and ~A, i are present in the branch
+    def _closure_index(self):
+        """Compiles the closure rules into a list of ``(schema, other, other_is_determined)``, one for each member
+        (`schema`) of each rule, where `other` is the other member of the rule.
+
+        `other_is_determined` is ``True`` when a node that is an instance of `schema` fixes the content and index of
+        the node that completes the rule (every metavariable of `other` is in `schema`, and `other` has an index and
+        no justification). Built the first time it is needed, and rebuilt if the closure rules change.
         """
-        path = node.path
-        # Basically, build a new list and add one node at a time, checking that its negation is not present
-        # (or if it is a negated sentence, that the formula it negates is not present)
-        new_list = [(path[0].content, path[0].index)]
-        for node2 in path[1:]:
-            if (Formula(['~', node2.content]), node2.index) in new_list:
-                return True
-            if node2.content.main_symbol == '~' and (node2.content[1], node2.index) in new_list:
-                return True
-            new_list.append((node2.content, node2.index))
-        return False
+        signature = tuple(id(member) for closure_rule in self.closure_rules for member in closure_rule)
+        if getattr(self, '_closure_index_signature', None) != signature:
+            closure_index = list()
+            for closure_rule in self.closure_rules:
+                for schema, other in ((closure_rule[0], closure_rule[1]), (closure_rule[1], closure_rule[0])):
+                    other_is_determined = (
+                        other.index is not None and other.justification is None and
+                        isinstance(schema.content, Formula) and isinstance(other.content, Formula) and
+                        self._metavariables(other.content) <= self._metavariables(schema.content)
+                    )
+                    closure_index.append((schema, other, other_is_determined))
+            self._closure_index_list = closure_index
+            self._closure_index_signature = signature
+        return self._closure_index_list
+
+    def _metavariables(self, schema):
+        return {atomic for atomic in schema.atomics_inside(self.language)
+                if self.language.is_metavariable_string(atomic)}
 
     def tree_is_closed(self, node):
         """Same as above, but checks if all *descendant* branches (including the current node) are closed
@@ -496,20 +667,38 @@ class TableauxSystem:
         >>> classical_tableaux_system.tree_is_closed(n3)
         False
         """
-        # Detach the parent to evaluate closure only from here (the node_is_closed method looks at parents)
-        parent = node.parent
-        node.parent = None
-
-        for node2 in node.leaves:
-            if not self.node_is_closed(node2):
-                # Re-attach parent before returning
-                node.parent = parent
+        if type(self).node_is_closed is not TableauxSystem.node_is_closed:
+            return self._tree_is_closed_by_leaves(node)
+
+        # Below a closed node every branch is closed, so only the open part of the tree is visited. From the root the
+        # cached states are used, otherwise the states of the branches from `node` are computed without caching them
+        # (the tree is not modified, and the cached states of its nodes are kept)
+        stack = [(node, None)]
+        while stack:
+            node2, parent_state = stack.pop()
+            if node.parent is None:
+                state = self._branch_state(node2)
+            else:
+                state = self._extend_branch_state(parent_state, node2)
+            if state.closed:
+                continue
+            if not node2.children:
                 return False
-
-        # Re-attach parent before returning
-        node.parent = parent
+            stack.extend((child, state) for child in reversed(node2.children))
         return True
 
+    def _tree_is_closed_by_leaves(self, node):
+        """``tree_is_closed`` for systems that override ``node_is_closed``, which may look at the ancestors of `node`"""
+        parent = node.parent
+        if parent is None:
+            return all(self.node_is_closed(leaf) for leaf in node.leaves)
+        # Detach the parent to evaluate closure only from here
+        node.parent = None
+        try:
+            return all(self.node_is_closed(leaf) for leaf in node.leaves)
+        finally:
+            node.parent = parent
+
     def rule_is_applicable(self, node, rule_name, return_subst_dict=False):
         """Given a node and a rule name, determines if the rule can be applied to the node.
 
@@ -539,8 +728,7 @@ class TableauxSystem:
         (True, {'A': ['~', ['~', ['p']]], 'B': ['q']})
         True
         """
-        rule = self.rules[rule_name]
-        rule_prems = [n for n in PreOrderIter(rule) if n.justification is None]  # Rule premises
+        rule_prems = self._rule_template(rule_name)[0]  # Rule premises
         instance, subst_dict = node.is_instance_of(rule_prems[-1], self.language, return_subst_dict=True)
         if instance:
             # If it is, check that the rest of the premises of the rule (if there are any) are present
@@ -552,7 +740,8 @@ class TableauxSystem:
                     if first_elem:  # discard the first element (the current node)
                         first_elem = False
                         continue
-                    subst_dict2 = deepcopy(subst_dict)
+                    # Matching only adds keys to the dict (it never modifies its values), so a shallow copy is enough
+                    subst_dict2 = dict(subst_dict)
                     instance2, subst_dict2 = node2.is_instance_of(remaining_prems[-1], self.language, subst_dict2,
                                                                   return_subst_dict=True)
                     # We have to check here as well for the additional conditions before updating the subst_dict,
@@ -580,6 +769,94 @@ class TableauxSystem:
             return False
         return False, subst_dict
 
+    def candidate_rules(self, node):
+        """Returns the names of the rules that might be applicable to a node, in the order of the `rules` dict.
+
+        Uses a ``RuleIndex`` over the last premise of each rule (built the first time it is needed, and rebuilt if
+        the rules of the system change), so that rules whose last premise does not have the same shape as the node
+        are discarded without calling ``rule_is_applicable``. Every rule that is applicable is among the candidates,
+        but not every candidate needs to be applicable.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.classes.propositional.proof_theories import TableauxNode
+        >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+        >>> n1 = TableauxNode(content=classical_parser.parse('~~p ∧ q'))
+        >>> classical_tableaux_system.candidate_rules(n1)
+        ['R∧']
+        >>> n2 = TableauxNode(content=classical_parser.parse('~~(p ∧ q)'))
+        >>> classical_tableaux_system.candidate_rules(n2)
+        ['R~~']
+        """
+        self._compile_rules()
+        return self._rule_index.candidates(node.content)
+
+    def _rule_template(self, rule_name):
+        """Returns the premises of a rule (a list of its nodes without justification, in PreOrder) and the templates
+        of the nodes that applying the rule adds below the last premise (see ``_NodeTemplate``)"""
+        self._compile_rules()
+        return self._rule_templates[rule_name]
+
+    def _compile_rules(self):
+        """Builds the ``RuleIndex`` and the templates of the rules the first time they are needed, and again if the
+        rules of the system change.
+
+        Also records the rules whose nodes are `determined` by their premises (every metavariable of the nodes below the
+        last premise is in some premise, and the contents are formulae, matched as in ``TableauxNode``). For these, once
+        the substitution dict of the premises is known, the nodes that the rule adds are known too (the instantiated
+        templates), and ``is_correct_tree`` compares them with the nodes of the tree instead of matching them against
+        the rule.
+        """
+        signature = (tuple(self.rules), tuple(map(id, self.rules.values())))
+        if getattr(self, '_rule_index_signature', None) != signature:
+            schemas = dict()
+            templates = dict()
+            determined = set()
+            for rule_name, rule in self.rules.items():
+                rule_prems = [n for n in PreOrderIter(rule) if n.justification is None]
+                schemas[rule_name] = rule_prems[-1].content
+                templates[rule_name] = (rule_prems,
+                                        tuple(_NodeTemplate.from_node(child) for child in rule_prems[-1].children))
+                rule_nodes = [n for child in rule_prems[-1].children for n in PreOrderIter(child)]
+                if self._rule_is_determined(rule_name, rule_prems, rule_nodes):
+                    determined.add(rule_name)
+            self._rule_index = RuleIndex(self.language, schemas)
+            self._rule_templates = templates
+            self._determined_rules = determined
+            self._rule_index_signature = signature
+
+    def _rule_is_determined(self, rule_name, rule_prems, rule_nodes):
+        """Whether the nodes that a rule adds below its last premise (`rule_nodes`) are determined by its premises (see
+        ``_compile_rules``)"""
+        if not all(isinstance(n.content, Formula) and
+                   n.content_is_instance_of.__func__ is TableauxNode.content_is_instance_of and
+                   n.index_is_instance_of.__func__ is TableauxNode.index_is_instance_of
+                   for n in rule_prems + rule_nodes):
+            return False
+        premise_metavariables = set().union(*(self._metavariables(n.content) for n in rule_prems))
+        return all(self._metavariables(n.content) <= premise_metavariables for n in rule_nodes)
+
+    def _rule_nodes(self, rule_name, subst_dict):
+        """Returns the templates (see ``_NodeTemplate``) of the nodes that applying a rule adds below its last premise,
+        with the metavariables replaced by the values in `subst_dict`. Can be overriden in systems with rules that are
+        not given as trees (e.g. metainferential tableaux)"""
+        return tuple(template.instantiate(self.language, subst_dict) for template in self._rule_template(rule_name)[1])
+
+    def _rule_nodes_below(self, node, rule_nodes):
+        """Returns the templates of `rule_nodes` that a rule application adds below `node`. Here, all of them. Can be
+        overriden in systems where some are left out (e.g. the nodes that are already in the branch)"""
+        return rule_nodes
+
+    def _is_in_branch(self, template, node):
+        """Whether the topmost node of a template has the same content and index as a node in the path to `node`"""
+        key = self._literal_key(template)
+        if key is not None:
+            # Look it up in the literals of the branch (which may also contain the keys of descendants of `node`)
+            state = self._branch_state(node)
+            return state.literals.get(key, state.depth + 1) <= state.depth
+        return any(n.content == template.content and n.index == template.index for n in node.iter_path_reverse())
+
     def _rule_is_applicable_additional_conditions(self, node, subst_dict, rule_name):
         # Hook for more complex tableaux systems
         return True
@@ -646,20 +923,29 @@ class TableauxSystem:
         # Implementation works top-down, as follows. Will walk the tree from root to leaves, looking at:
         # - If the justification of the node is None (premise node), if inference is not None, will check that the
         #   content is either a premise or the negation of some conclusion, and add them to correctly_derived_nodes
-        # - For all nodes (including premises) will then check if they are the last premise of some rule. If so, calls
-        #   rule_is_applicable, which will look above it to see if the rest of the premises of the rule are present
-        #   If they are:
-        # - Will call the method is_correctly_applied(rule), which will check that the conclusions of the rule are
-        #   present in every OPEN branch (the implementation of that is documented below). If they are, they are added
-        #   to correcrlty_derived_nodes.
-        # - Finally, checks if there are nodes in the tree that are not in correctly_derived_nodes
+        # - For all nodes (including premises) will then check if some rule is applicable to them and was not applied
+        #   in every OPEN branch below them. Which nodes are applications of which rules is worked out beforehand, in a
+        #   single walk of the tree (see _match_rule_applications below). The nodes of the rules that were correctly
+        #   applied are the correctly_derived_nodes.
+        # - Finally, checks if there are nodes in the tree that are not in correctly_derived_nodes (these are collected
+        #   in the same walk, and reported at the end)
+        # The index of each node (its position in the tree, for the errors) is computed from that of its parent
 
         error_list = list()
-        correctly_derived_nodes = set()
+        correctly_derived_nodes, not_applied_rules = self._match_rule_applications(tree)
         present_premises = set()
         present_conclusions = set()
         traversing_premises = True
+        unaccounted_nodes = list()
+        positions = {tree: (0,)}
         for node in LevelOrderIter(tree):
+            position = positions[node]
+            children = node.children
+            for child_index, child in enumerate(children):
+                positions[child] = position + (child_index,)
+            if node.justification is not None and node not in correctly_derived_nodes:
+                unaccounted_nodes.append(node)
+
             # PREMISE NODES
             if node.justification is not None:
                 traversing_premises = False
@@ -669,7 +955,7 @@ class TableauxSystem:
                     if not return_error_list:
                         return False
                     error_list.append(CorrectionError(code=ErrorCode.TBL_PREMISE_NOT_BEGINNING,
-                                                      index=tuple(n.child_index for n in node.path),
+                                                      index=position,
                                                       description='Premise nodes must be at the beggining of the '
                                                                   'tableaux, before applying any rule and before '
                                                                   'opening any new branch'))
@@ -688,42 +974,27 @@ class TableauxSystem:
                         if not return_error_list:
                             return False
                         error_list.append(CorrectionError(code=ErrorCode.TBL_INCORRECT_PREMISE,
-                                                          index=tuple(n.child_index for n in node.path),
+                                                          index=position,
                                                           description=f'Node {node._self_string(parser)} is an '
                                                                       f'incorrect premise node'))
                         if exit_on_first_error:
                             return False, error_list
                 else:
                     correctly_derived_nodes.add(node)  # Not really necessary but leave it just in case
-            if len(node.children) > 1:
+            if len(children) > 1:
                 traversing_premises = False  # Cannot contain any further premises after opening a new branch
 
-            # Check if a rule applies to the node and is correctly applied in the tree
-            # e.g. if the node is a conjunction, see that both conjuncts are below in the tree, and save both conjuncts
-            # as correctly derived nodes
-            for rule_name in self.rules:
-                # For each rule, see if the current node is an instance of the LAST premise of the rule
-                result = self.rule_is_applicable(node, rule_name, return_subst_dict=True)
-                applicable = result[0]
-                if applicable:
-                    subst_dict = result[1]
-                    # Get the rule premises
-                    rule_prems = [n for n in PreOrderIter(self.rules[rule_name]) if n.justification is None]
-                    # See if the rule is correctly applied
-                    # (rule_prems[-1] contains the last premise AND ITS SUBTREE)
-                    result3 = self._is_correctly_applied(node, rule_prems[-1], correctly_derived_nodes, subst_dict)
-                    correct = result3[0]
-                    if not correct:
-                        if not return_error_list:
-                            return False
-                        error_list.append(CorrectionError(code=ErrorCode.TBL_RULE_NOT_APPLIED,
-                                                          index=tuple(n.child_index for n in node.path),
-                                                          description=f'Rule {rule_name} was not applied to '
-                                                                      f'node {node._self_string(parser)}'))
-                        if exit_on_first_error:
-                            return False, error_list
-                    else:
-                        correctly_derived_nodes |= result3[1]
+            # Check that the rules that apply to the node were applied in the tree
+            # e.g. if the node is a conjunction, see that both conjuncts are below in the tree
+            for rule_name in not_applied_rules.get(node, ()):
+                if not return_error_list:
+                    return False
+                error_list.append(CorrectionError(code=ErrorCode.TBL_RULE_NOT_APPLIED,
+                                                  index=position,
+                                                  description=f'Rule {rule_name} was not applied to '
+                                                              f'node {node._self_string(parser)}'))
+                if exit_on_first_error:
+                    return False, error_list
 
         # After visiting all nodes, check that all premises and conclusions are present in the tableaux
         if inference is not None:
@@ -739,14 +1010,12 @@ class TableauxSystem:
         # After checking all nodes and all rules that can be applied to it, the correctly derived nodes should be
         # all the tree nodes (that are not premises),
         # otherwise there is some node which is unnacounted for by its previous nodes & the rules
-        unaccounted_nodes = {n for n in PreOrderIter(tree) if
-                             (n not in correctly_derived_nodes and n.justification is not None)}
         if unaccounted_nodes:
             if not return_error_list:
                 return False
             for node in unaccounted_nodes:
                 error_list.append(CorrectionError(code=ErrorCode.TBL_RULE_INCORRECTLY_APPLIED,
-                                                  index=tuple(n.child_index for n in node.path),
+                                                  index=positions[node],
                                                   description=f'Rule incorrectly applied to '
                                                               f'node {node._self_string(parser)}'))
                 if exit_on_first_error:
@@ -806,86 +1075,206 @@ class TableauxSystem:
                     return False
         return True
 
-    def _is_correctly_applied(self, start_node, rule_subtree, correctly_derived_nodes, subst_dict=None):
-        """
-        Both start_node and rule_subtree are TableauxNode.
-        correctly_derived_nodes is a set of TableauxNodes
-        subst_dict is for uniform substituion, as always
-        Returns a boolean and a set of nodes (to add to correctly_derived_nodes)
-
-        This function works recursively in order to walk the tree. Works like follows:
-        - Rule subtree contains the last premise of the rule and its subtree below
-        - Checks if the derivation provided has as immediate children (instances of) the children of the rule
-          * If it does not, then the rule is applied below in the instance derivation (and another rule was applied at
-            that step). So, it sends the entire rule to all the children to check for application below them
-          * If it does, then the rule may have more children for each branch (for example, biconditional opens two
-            branches and has two children in each branch). So, to each branch it sends as a rule the children (AND THEIR
-            DESCENDANTS) to match with this same algorithm
-          * If you reach the end of the instance tree, check if the final node is closed. If it is, then the rule
-            is considered correctly applied (there is no need to apply further rules to closed branches)
+    def _match_rule_applications(self, tree):
+        """Works out which nodes of the tree are applications of which rules, regardless of the order in which the
+        rules were applied.
+
+        Walks the tree from the root, keeping for each path the rule applications that are pending (one for each rule
+        applicable to a node above, as given by ``rule_is_applicable``). The children of each node can be the first
+        nodes of a pending application, or the next ones of an application that is under way (they can also come
+        further below, if other rules are applied in between). If the children match several pending applications,
+        the one they match completely (the rest of the rule comes right below them, or the branches close) is
+        preferred, and then the oldest. An application that is still pending at an open leaf was not applied in that
+        branch, and none of its nodes count as correctly derived.
+
+        Returns the set of correctly derived nodes, and a dict from nodes to the names of the rules that apply to them
+        but were not applied in every open branch below them.
+
+        The rules whose nodes are determined by their premises (see ``_compile_rules``) are instantiated once for each
+        node they apply to (see ``_rule_nodes``), and their nodes are then compared with those of the tree. For the
+        rest, the nodes of the tree are matched against the nodes of the rule. Where the first nodes of an application
+        of the former come, only those given by ``_rule_nodes_below`` are expected (if there are none, the application
+        needs no nodes in that branch).
         """
+        self._compile_rules()
+        filter_first_nodes = type(self)._rule_nodes_below is not TableauxSystem._rule_nodes_below
+        applications = list()
+        # Each pending item is (application number, nodes of the rule that are missing, substitution dict, whether they
+        # are the first nodes of an instantiated application). The nodes are instantiated templates (and the
+        # substitution dict None) for the rules in self._determined_rules
+        stack = [(tree, tuple())]
+        while stack:
+            node, pending = stack.pop()
+
+            # The rules that apply to the node
+            new_items = list()
+            for rule_name in self.candidate_rules(node):
+                applicable, subst_dict = self.rule_is_applicable(node, rule_name, return_subst_dict=True)
+                if applicable:
+                    if rule_name in self._determined_rules:
+                        new_items.append((len(applications), self._rule_nodes(rule_name, subst_dict), None, True))
+                    else:
+                        new_items.append((len(applications), self._rule_templates[rule_name][0][-1].children,
+                                          subst_dict, False))
+                    applications.append([node, rule_name, set(), True])
+            if new_items:
+                pending = pending + tuple(new_items)
+
+            # The first nodes of the pending applications that would be added below the node
+            if pending and filter_first_nodes:
+                expected = list()
+                for item in pending:
+                    if item[3]:
+                        rule_children = self._rule_nodes_below(node, item[1])
+                        if not rule_children:
+                            continue  # Nothing to add in this branch
+                        item = (item[0], rule_children, item[2], True)
+                    expected.append(item)
+                pending = tuple(expected)
+
+            children = node.children
+            if not children:
+                if pending and not self.node_is_closed(node):
+                    for application_number, _, _, _ in pending:
+                        applications[application_number][3] = False  # not applied in this branch
+                continue
+
+            # See which pending application the children of the node belong to
+            best = None
+            for position, (application_number, rule_children, subst_dict, _) in enumerate(pending):
+                child_substs = self._match_rule_children(children, rule_children, subst_dict)
+                if child_substs is None:
+                    continue
+                complete = all(self._rule_continues_below(child, rule_child, child_subst)
+                               for child, rule_child, child_subst in zip(children, rule_children, child_substs))
+                if best is None or (complete and not best[0]):
+                    best = (complete, position, child_substs)
+                    if complete:
+                        break
+
+            if best is None:
+                # The children are not an application of a pending rule (they will not be correctly derived nodes)
+                for child in children:
+                    stack.append((child, pending))
+                continue
+
+            _, position, child_substs = best
+            application_number, rule_children, _, _ = pending[position]
+            applications[application_number][2].update(children)
+            rest = pending[:position] + pending[position + 1:]
+            for child, rule_child, child_subst in zip(children, rule_children, child_substs):
+                if not rule_child.children:
+                    stack.append((child, rest))
+                else:
+                    # The rest of the rule goes on below the child, in the same place of the pending items
+                    child_pending = rest[:position] + \
+                                    ((application_number, rule_child.children, child_subst, False),) + rest[position:]
+                    stack.append((child, child_pending))
+
+        correctly_derived_nodes = set()
+        not_applied_rules = dict()
+        for node, rule_name, nodes, applied in applications:
+            if applied:
+                correctly_derived_nodes |= nodes
+            else:
+                not_applied_rules.setdefault(node, list()).append(rule_name)
+        return correctly_derived_nodes, not_applied_rules
+
+    def _match_rule_children(self, children, rule_children, subst_dict):
+        """If the nodes `children` are instances of the nodes of the rule `rule_children`, returns the substitution
+        dict of each of them (``None`` otherwise). If `subst_dict` is ``None``, the nodes of the rule are instantiated
+        templates, and are compared with the nodes instead"""
+        if len(children) != len(rule_children):
+            return None
         if subst_dict is None:
-            subst_dict = dict()
+            for child, template in zip(children, rule_children):
+                # Same as is_instance_of, the index and justification only count if the template has them
+                if (template.justification is not None and child.justification != template.justification) or \
+                        (template.index is not None and child.index != template.index) or \
+                        child.content != template.content:
+                    return None
+            return (None,) * len(children)
+        child_substs = list()
+        for child, rule_child in zip(children, rule_children):
+            instance, child_subst = child.is_instance_of(rule_child, self.language, dict(subst_dict),
+                                                         return_subst_dict=True)
+            if not instance:
+                return None
+            child_substs.append(child_subst)
+        return child_substs
+
+    def _rule_continues_below(self, node, rule_node, subst_dict):
+        """Whether the descendants of `rule_node` (a node of a rule or a template) come right below `node` (or the
+        branches close before)"""
+        rule_children = rule_node.children
+        if not rule_children:
+            return True
+        children = node.children
+        if not children:
+            return self.node_is_closed(node)
+        child_substs = self._match_rule_children(children, rule_children, subst_dict)
+        if child_substs is None:
+            return False
+        return all(self._rule_continues_below(child, rule_child, child_subst)
+                   for child, rule_child, child_subst in zip(children, rule_children, child_substs))
+
+    def is_correct_tree_many(self, trees, inferences=None, exit_on_first_error=False, parser=None, workers=None):
+        """Checks many tableaux, yielding the list of errors of each one as soon as it is checked
+
+        Same as calling ``is_correct_tree(tree, inference, return_error_list=True)`` for each tree, but the rules of the
+        system are compiled only once, and the trees can be checked in a pool of processes.
 
-        # Base step: either rule_subtree or start_node are leafs
-        if rule_subtree.is_leaf:
-            return True, correctly_derived_nodes, subst_dict
-            # Since we have already checked that start_node is instance of rule_subtree when calling this method
-        if start_node.is_leaf:
-            if self.node_is_closed(start_node):  # If it is closed, then we dont need to apply the rule in question
-                return True, correctly_derived_nodes, subst_dict
-            return False, correctly_derived_nodes, subst_dict
-
-        # Check if the start node's children are instances of the rule's children
-        children_are_instance = True
-        # If the number of children is different they are not
-        if len(start_node.children) != len(rule_subtree.children):
-            children_are_instance = False
+        Parameters
+        ----------
+        trees: iterable of logics.classes.propositional.proof_theories.TableauxNode
+            The trees to check. Can be a generator, it is consumed lazily
+        inferences: iterable of logics.classes.propositional.Inference, optional
+            The inference of each tree (see ``is_correct_tree``). If ``None``, only the application of the rules is
+            checked
+        exit_on_first_error: bool, optional
+            If True, the list of each tree will have at most one error (see ``is_correct_tree``)
+        parser: logics.utils.parsers.standard_parser.StandardParser, optional
+            If present, the errors will have unparsed instead of parsed formulae (see ``is_correct_tree``)
+        workers: int, optional
+            If given, the trees are checked in a pool of `workers` processes (the trees, inferences, system and parser
+            must be picklable). The lists are yielded in the order of the trees either way
+
+        Returns
+        -------
+        generator
+            Yields a list of ``logics.classes.errors.CorrectionError`` for each tree (empty if the tree is correct)
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.classes.propositional.proof_theories import TableauxNode
+        >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+        >>> n1 = TableauxNode(content=classical_parser.parse('~~p ∧ q'))
+        >>> n2 = TableauxNode(content=classical_parser.parse('~p'), parent=n1)
+        >>> n3 = TableauxNode(content=classical_parser.parse('~~p'), justification='R∧', parent=n2)
+        >>> n4 = TableauxNode(content=classical_parser.parse('q'), justification='R∧', parent=n3)
+        >>> n5 = TableauxNode(content=classical_parser.parse('p'), justification='R~~', parent=n4)
+        >>> inferences = [classical_parser.parse('~~p ∧ q / p'), classical_parser.parse('~~p ∧ q / ~p')]
+        >>> for errors in classical_tableaux_system.is_correct_tree_many([n1, n1], inferences, parser=classical_parser):
+        ...     print(errors)
+        []
+        [(): Conclusion ~p is not present in the tree, (0, 0): Node ~p is an incorrect premise node]
+        """
+        self._compile_rules()
+        if inferences is None:
+            items = ((tree, None) for tree in trees)
         else:
-            subst_dict2 = dict()  # kwargs2 should be used only if all the children are instance
-            for index in range(len(start_node.children)):
-                node_child = start_node.children[index]
-                # If the child is in correctly_derived_nodes then it is an application of a previous rule, not this one
-                if node_child in correctly_derived_nodes:
-                    children_are_instance = False
-                else:
-                    rule_child = rule_subtree.children[index]
-                    result = node_child.is_instance_of(rule_child, self.language, subst_dict, return_subst_dict=True)
-                    instance = result[0]
-                    subst_dict2.update(result[1])
-                    if not instance:
-                        children_are_instance = False
-
-        # If they are not instance, then the rule subtree must be applied to each child for the tree to be correct
-        if not children_are_instance:
-            correctly_derived_nodes2 = copy(correctly_derived_nodes)
-            for node_child in start_node.children:
-                result2 = self._is_correctly_applied(node_child, rule_subtree, correctly_derived_nodes, subst_dict)
-                correct = result2[0]
-                correctly_derived_nodes2 |= result2[1]  # Save the correct nodes in case they are correctly applied
-                subst_dict.update(result2[2])
-                if not correct:
-                    return False, correctly_derived_nodes, subst_dict
-            # If you did not return up to here, it is because the rule was correctly applied
-            return True, correctly_derived_nodes2, subst_dict
-
-        # If the children are instance we need to give each child the corresponding part of the rule subtree
+            items = zip(trees, inferences)
+
+        if workers is None:
+            for tree, inference in items:
+                yield self.is_correct_tree(tree, inference, return_error_list=True,
+                                           exit_on_first_error=exit_on_first_error, parser=parser)[1]
         else:
-            correctly_derived_nodes3 = copy(correctly_derived_nodes)
-            for index in range(len(start_node.children)):
-                node_child = start_node.children[index]
-                rule_child = rule_subtree.children[index]
-                # Use kwargs2 in order to maintain the dict from the above children isntance check
-                result3 = self._is_correctly_applied(node_child, rule_child, correctly_derived_nodes, subst_dict2)
-                correct = result3[0]
-                correctly_derived_nodes3 |= result3[1]
-                subst_dict2.update(result3[2])
-                if not correct:
-                    return False, correctly_derived_nodes, subst_dict2
-            # If you did not return up to here, it is because the rule was correctly applied
-            # We now need to add the start_node's children as correctly derived nodes
-            correctly_derived_nodes3 |= set(start_node.children)
-            return True, correctly_derived_nodes3, subst_dict2
+            # Imported here since logics.utils imports this module
+            from logics.utils.parsers.parser_utils import map_in_processes
+            yield from map_in_processes(_tree_errors, items, workers, initializer=_set_worker_system,
+                                        initargs=(self, exit_on_first_error, parser))
 
     def solve_tree(self, inference):
         """Takes an inference and returns its tree-derivation
@@ -900,12 +1289,12 @@ class TableauxSystem:
         >>> tree.print_tree(classical_parser)
         ~(p ∧ q)
         └── ~(~p ∨ ~q)
-            ├── ~p (R~∧)
-            │   └── ~~p (R~∨)
-            │       └── ~~q (R~∨)
-            └── ~q (R~∧)
-                └── ~~p (R~∨)
-                    └── ~~q (R~∨)
+            └── ~~p (R~∨)
+                └── ~~q (R~∨)
+                    └── p (R~~)
+                        └── q (R~~)
+                            ├── ~p (R~∧)
+                            └── ~q (R~∧)
         """
         if self.solver is not None:
             return self.solver.solve(inference, self)
@@ -914,7 +1303,7 @@ class TableauxSystem:
     def is_valid(self, inference):
         """Takes an inference and determines wheter it is valid
 
-        For this to work, the parameter ``solver`` must be assigned.
+        For this to work, the parameter ``solver`` must be assigned. Does not build the whole tree (see ``check``).
 
         Examples
         --------
@@ -925,8 +1314,64 @@ class TableauxSystem:
         >>> classical_tableaux_system.is_valid(classical_parser.parse("p / q"))
         False
         """
-        tableaux = self.solve_tree(inference)
-        return self.tree_is_closed(tableaux)
+        return self.check(inference)[0]
+
+    def check(self, inference):
+        """Takes an inference and determines whether it is valid, giving a countermodel if it is not
+
+        Does not build the whole tree, but explores its branches one at a time (see the ``check`` method of
+        ``TableauxSolver``). For this to work, the parameter ``solver`` must be assigned.
+
+        Returns
+        -------
+        tuple
+            A pair ``(is_valid, countermodel)``, where `countermodel` is ``None`` for valid inferences, and otherwise a
+            dict with the values of the atomics given by an open branch (see ``branch_valuation``)
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+        >>> classical_tableaux_system.check(classical_parser.parse("~(p ∧ q) / ~p ∨ ~q"))
+        (True, None)
+        >>> classical_tableaux_system.check(classical_parser.parse("p / q"))
+        (False, {'p': '1', 'q': '0'})
+        """
+        if self.solver is not None:
+            return self.solver.check(inference, self)
+        raise AttributeError("The current tableaux system has no solver assigned")
+
+    def branch_valuation(self, node, atomics=()):
+        """Returns the valuation of the atomics given by the literals in the path to `node` (``'1'`` for ``p`` and
+        ``'0'`` for ``~p``). The `atomics` that do not occur as literals are given the value ``'0'``.
+
+        If the branch is open and saturated, the valuation satisfies every node of the branch.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.classes.propositional.proof_theories import TableauxNode
+        >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+        >>> n1 = TableauxNode(content=classical_parser.parse('p ∧ ~q'))
+        >>> n2 = TableauxNode(content=classical_parser.parse('p'), justification='R∧', parent=n1)
+        >>> n3 = TableauxNode(content=classical_parser.parse('~q'), justification='R∧', parent=n2)
+        >>> classical_tableaux_system.branch_valuation(n3, atomics={'r'})
+        {'p': '1', 'q': '0', 'r': '0'}
+        """
+        valuation = dict()
+        for ancestor in node.path:
+            content = ancestor.content
+            if self._is_atomic_formula(content):
+                valuation[content[0]] = '1'
+            elif isinstance(content, Formula) and content.main_symbol == '~' and self._is_atomic_formula(content[1]):
+                valuation[content[1][0]] = '0'
+        for atomic in sorted(atomics):
+            valuation.setdefault(atomic, '0')
+        return dict(sorted(valuation.items()))
+
+    def _is_atomic_formula(self, content):
+        """Whether `content` is a formula that consists of an atomic (and not of a sentential constant)"""
+        return isinstance(content, Formula) and content.is_atomic and self.language.is_atomic_string(content[0])
 
 
 class ManyValuedTableauxSystem(TableauxSystem):
@@ -981,6 +1426,9 @@ class ManyValuedTableauxSystem(TableauxSystem):
     True
     """
     fast_node_is_closed_enabled = False
+    # Value of an atomic in the countermodels given by branch_valuation, according to whether it is true and whether it
+    # is false (the values of FDE, see logics.instances.propositional.many_valued_semantics)
+    countermodel_values = {(True, False): '1', (True, True): 'b', (False, False): 'n', (False, True): '0'}
 
     def _is_correct_premise_node(self, node, inference):
         """A premise A must be initialized as A, 1, a conclusion B as B, 0"""
@@ -990,6 +1438,42 @@ class ManyValuedTableauxSystem(TableauxSystem):
                        (node.index == 0 and inference.conclusions[idx] == node.content)}
         return premises, conclusions
 
+    def branch_valuation(self, node, atomics=()):
+        """Returns the valuation of the atomics given by the literals in the path to `node`
+
+        ``p, 1`` and ``p, 0`` say whether ``p`` is true, and ``~p, 1`` and ``~p, 0`` whether it is false. When a branch
+        says only one of these things, the atomic is taken to be either true or false (but not both), and the atomics
+        that do not occur in literals (in the branch or among the `atomics` given) are false. The values are given by
+        the ``countermodel_values`` attribute, by default those of FDE (``'1'``, ``'b'``, ``'n'`` and ``'0'``).
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.instances.propositional.tableaux import FDE_tableaux_system, LP_tableaux_system
+        >>> FDE_tableaux_system.check(classical_parser.parse("p ∧ ~p / q"))
+        (False, {'p': 'b', 'q': '0'})
+        >>> LP_tableaux_system.check(classical_parser.parse("p ∧ ~p / q"))  # The values of LP_mvl_semantics
+        (False, {'p': 'i', 'q': '0'})
+        """
+        truth, falsity = dict(), dict()
+        for ancestor in node.path:
+            content = ancestor.content
+            if self._is_atomic_formula(content):
+                truth[content[0]] = ancestor.index == 1
+            elif isinstance(content, Formula) and content.main_symbol == '~' and self._is_atomic_formula(content[1]):
+                falsity[content[1][0]] = ancestor.index == 1
+        valuation = dict()
+        for atomic in [*truth, *falsity, *sorted(atomics)]:
+            if atomic in valuation:
+                continue
+            true, false = truth.get(atomic), falsity.get(atomic)
+            if true is None:
+                true = False if false is None else not false
+            if false is None:
+                false = not true
+            valuation[atomic] = self.countermodel_values[(true, false)]
+        return dict(sorted(valuation.items()))
+
 
 class IndexedTableauxSystem(ManyValuedTableauxSystem, TableauxSystem):
     """Class for propositional indexed tableaux.
@@ -998,18 +1482,48 @@ class IndexedTableauxSystem(ManyValuedTableauxSystem, TableauxSystem):
     """
     fast_node_is_closed_enabled = True
 
-    @staticmethod
-    def _fast_node_is_closed(node):
+    def _closes_branch(self, node, key, literals, depth):
         """Checks whether A, 1 and A, 0 are present in the branch"""
-        path = node.path
-        # Basically, build a new list and add one node at a time, checking that its negation is not present
-        # (or if it is a negated sentence, that the formula it negates is not present)
-        new_list = [(path[0].content, path[0].index)]
-        for node2 in path[1:]:
-            if (node2.content, 1 - node2.index) in new_list:
-                return True
-            new_list.append((node2.content, node2.index))
-        return False
+        if not self.fast_node_is_closed_enabled:
+            return super()._closes_branch(node, key, literals, depth)
+        content, index = key
+        return literals.get((content, 1 - index), depth) < depth
+
+    def branch_valuation(self, node, atomics=()):
+        """Returns the valuation of the atomics given by the literals in the path to `node` (``'1'`` for ``p, 1`` and
+        ``'0'`` for ``p, 0``). The `atomics` that do not occur as literals are given the value ``'0'``.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.instances.propositional.tableaux import classical_indexed_tableaux_system
+        >>> classical_indexed_tableaux_system.check(classical_parser.parse("p ∨ q / p"))
+        (False, {'p': '0', 'q': '1'})
+        """
+        valuation = dict()
+        for ancestor in node.path:
+            if self._is_atomic_formula(ancestor.content):
+                valuation[ancestor.content[0]] = '1' if ancestor.index == 1 else '0'
+        for atomic in sorted(atomics):
+            valuation.setdefault(atomic, '0')
+        return dict(sorted(valuation.items()))
+
+
+# Processes that check trees for TableauxSystem.is_correct_tree_many keep the system and the options here
+_worker_system = None
+
+
+def _set_worker_system(tableaux_system, exit_on_first_error, parser):
+    global _worker_system
+    _worker_system = (tableaux_system, exit_on_first_error, parser)
+
+
+def _tree_errors(item):
+    """Returns the list of errors of a ``(tree, inference)`` pair"""
+    tableaux_system, exit_on_first_error, parser = _worker_system
+    tree, inference = item
+    return tableaux_system.is_correct_tree(tree, inference, return_error_list=True,
+                                           exit_on_first_error=exit_on_first_error, parser=parser)[1]
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,517 @@
+"""
+Compact binary serialization for logics objects.
+
+Every payload consists of a symbol table (each distinct string, e.g. ``'p'``, ``'∧'`` or ``'R~~'``, is stored once)
+followed by a prefix-encoded stream of the object, in which symbols are referred to by their index in the table.
+Objects that appear more than once (for example, a formula shared by several tableaux nodes) are also written once,
+and are shared again when decoding.
+"""
+import copyreg
+import importlib
+import struct
+from copy import deepcopy
+
+from anytree import NodeMixin
+
+MAGIC = b'LGC'
+VERSION = 1
+
+# Tags for each kind of value in the stream
+_NONE = 0
+_TRUE = 1
+_FALSE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_TUPLE = 6
+_LIST = 7
+_SET = 8
+_FROZENSET = 9
+_DICT = 10
+_SEQUENCE = 11  # Subclass of list (Formula, Sequent, Derivation, ...)
+_MAPPING = 12  # Subclass of dict (Model, ...)
+_OBJECT = 13  # Any other logics object (Inference, DerivationStep, ...)
+_NODE = 14  # anytree node (TableauxNode, SequentNode, ...), followed by its descendants
+_REFERENCE = 15  # An object already present in the stream
+_BYTES = 16
+
+_float_struct = struct.Struct('<d')
+
+
+def _write_varint(buffer, number):
+    while number > 0x7f:
+        buffer.append((number & 0x7f) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def _public_attributes(obj):
+    # Private attributes (starting with _) are caches or, in nodes, the tree structure itself
+    return [(name, value) for name, value in vars(obj).items() if name[0] != '_']
+
+
+class _Encoder:
+    def __init__(self):
+        self.body = bytearray()
+        self.symbols = dict()
+        self.memo = dict()
+
+    def symbol(self, string):
+        index = self.symbols.get(string)
+        if index is None:
+            index = self.symbols[string] = len(self.symbols)
+        _write_varint(self.body, index)
+
+    def class_symbol(self, cls):
+        if not cls.__module__.startswith('logics.'):
+            raise TypeError(f'Cannot serialize objects of class {cls.__qualname__}')
+        self.symbol(f'{cls.__module__}:{cls.__qualname__}')
+
+    def attributes(self, obj):
+        attributes = _public_attributes(obj)
+        _write_varint(self.body, len(attributes))
+        for name, value in attributes:
+            self.symbol(name)
+            self.encode(value)
+
+    def memoize(self, obj):
+        """Returns True if the object was already written (and writes a reference to it)"""
+        index = self.memo.get(id(obj))
+        if index is not None:
+            self.body.append(_REFERENCE)
+            _write_varint(self.body, index)
+            return True
+        self.memo[id(obj)] = len(self.memo)
+        return False
+
+    def encode(self, obj):
+        body = self.body
+        obj_type = type(obj)
+
+        if obj_type is str:
+            body.append(_STR)
+            self.symbol(obj)
+        elif obj is None:
+            body.append(_NONE)
+        elif obj is True:
+            body.append(_TRUE)
+        elif obj is False:
+            body.append(_FALSE)
+        elif obj_type is int:
+            body.append(_INT)
+            _write_varint(body, obj << 1 if obj >= 0 else ((-obj) << 1) - 1)  # zigzag
+        elif obj_type is float:
+            body.append(_FLOAT)
+            body.extend(_float_struct.pack(obj))
+        elif obj_type is bytes:
+            body.append(_BYTES)
+            _write_varint(body, len(obj))
+            body.extend(obj)
+        elif obj_type is tuple or obj_type is list or obj_type is set or obj_type is frozenset:
+            body.append({tuple: _TUPLE, list: _LIST, set: _SET, frozenset: _FROZENSET}[obj_type])
+            _write_varint(body, len(obj))
+            for element in obj:
+                self.encode(element)
+        elif obj_type is dict:
+            body.append(_DICT)
+            _write_varint(body, len(obj))
+            for key, value in obj.items():
+                self.encode(key)
+                self.encode(value)
+
+        # Logics classes
+        elif isinstance(obj, NodeMixin):
+            if not self.memoize(obj):
+                self.encode_tree(obj)
+        elif isinstance(obj, list):
+            if not self.memoize(obj):
+                body.append(_SEQUENCE)
+                self.class_symbol(obj_type)
+                _write_varint(body, len(obj))
+                for element in obj:
+                    self.encode(element)
+                self.attributes(obj)
+        elif isinstance(obj, dict):
+            if not self.memoize(obj):
+                body.append(_MAPPING)
+                self.class_symbol(obj_type)
+                _write_varint(body, len(obj))
+                for key, value in obj.items():
+                    self.encode(key)
+                    self.encode(value)
+                self.attributes(obj)
+        elif hasattr(obj, '__dict__') and not callable(obj):
+            if not self.memoize(obj):
+                body.append(_OBJECT)
+                self.class_symbol(obj_type)
+                self.attributes(obj)
+        else:
+            raise TypeError(f'Cannot serialize object {obj!r} of type {obj_type.__qualname__}')
+
+    def encode_tree(self, root):
+        # Nodes are written in pre-order without recursion (trees can be deeper than the recursion limit)
+        # The node given is taken as the root, its ancestors are not written
+        stack = [root]
+        first = True
+        while stack:
+            node = stack.pop()
+            if not first:
+                self.memo[id(node)] = len(self.memo)
+            first = False
+            self.body.append(_NODE)
+            self.class_symbol(type(node))
+            self.attributes(node)
+            children = node.children
+            _write_varint(self.body, len(children))
+            stack.extend(reversed(children))
+
+    def getvalue(self):
+        header = bytearray(MAGIC)
+        header.append(VERSION)
+        _write_varint(header, len(self.symbols))
+        for string in self.symbols:
+            encoded = string.encode('utf-8')
+            _write_varint(header, len(encoded))
+            header.extend(encoded)
+        return bytes(header + self.body)
+
+
+class _Decoder:
+    def __init__(self, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError('Data given is not a serialized logics object')
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError(f'Unsupported serialization version {data[len(MAGIC)]}')
+        self.data = data
+        self.position = len(MAGIC) + 1
+        self.memo = list()
+        self.classes = dict()
+        self.symbols = list()
+        for _ in range(self.varint()):
+            length = self.varint()
+            self.symbols.append(str(data[self.position:self.position + length], 'utf-8'))
+            self.position += length
+
+    def varint(self):
+        data = self.data
+        result = 0
+        shift = 0
+        while True:
+            byte = data[self.position]
+            self.position += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def symbol(self):
+        return self.symbols[self.varint()]
+
+    def class_symbol(self):
+        index = self.varint()
+        cls = self.classes.get(index)
+        if cls is None:
+            module_name, _, qualname = self.symbols[index].partition(':')
+            if not module_name.startswith('logics.'):
+                raise ValueError(f'Cannot deserialize objects of class {qualname}')
+            cls = importlib.import_module(module_name)
+            for name in qualname.split('.'):
+                cls = getattr(cls, name)
+            self.classes[index] = cls
+        return cls
+
+    def attributes(self, obj):
+        for _ in range(self.varint()):
+            name = self.symbol()
+            obj.__dict__[name] = self.decode()
+
+    def decode(self):
+        tag = self.data[self.position]
+        self.position += 1
+
+        if tag == _STR:
+            return self.symbols[self.varint()]
+        if tag == _SEQUENCE:
+            cls = self.class_symbol()
+            obj = cls.__new__(cls)  # Does not call __init__ (e.g. Formula would walk the arguments again)
+            self.memo.append(obj)
+            list.extend(obj, [self.decode() for _ in range(self.varint())])
+            self.attributes(obj)
+            return obj
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            number = self.varint()
+            return -((number + 1) >> 1) if number & 1 else number >> 1
+        if tag == _FLOAT:
+            value = _float_struct.unpack_from(self.data, self.position)[0]
+            self.position += _float_struct.size
+            return value
+        if tag == _BYTES:
+            length = self.varint()
+            value = bytes(self.data[self.position:self.position + length])
+            self.position += length
+            return value
+        if tag == _TUPLE:
+            return tuple([self.decode() for _ in range(self.varint())])
+        if tag == _LIST:
+            return [self.decode() for _ in range(self.varint())]
+        if tag == _SET:
+            return {self.decode() for _ in range(self.varint())}
+        if tag == _FROZENSET:
+            return frozenset([self.decode() for _ in range(self.varint())])
+        if tag == _DICT:
+            result = dict()
+            for _ in range(self.varint()):
+                key = self.decode()
+                result[key] = self.decode()
+            return result
+        if tag == _REFERENCE:
+            return self.memo[self.varint()]
+        if tag == _MAPPING:
+            cls = self.class_symbol()
+            obj = cls.__new__(cls)
+            self.memo.append(obj)
+            for _ in range(self.varint()):
+                key = self.decode()
+                dict.__setitem__(obj, key, self.decode())
+            self.attributes(obj)
+            return obj
+        if tag == _OBJECT:
+            cls = self.class_symbol()
+            obj = cls.__new__(cls)
+            position = len(self.memo)
+            self.memo.append(obj)
+            self.attributes(obj)
+            if hasattr(obj, '_after_loads'):
+                # e.g. interned objects, which are replaced by the existing one
+                obj = self.memo[position] = obj._after_loads()
+            return obj
+        if tag == _NODE:
+            return self.decode_tree()
+        raise ValueError(f'Corrupt data: unknown tag {tag} at position {self.position - 1}')
+
+    def node(self):
+        cls = self.class_symbol()
+        node = cls.__new__(cls)
+        self.memo.append(node)
+        self.attributes(node)
+        return node, self.varint()
+
+    def decode_tree(self):
+        # The _NODE tag of the root has already been read
+        root, number_of_children = self.node()
+        # Each element is [node, number of children, children decoded so far]
+        stack = [[root, number_of_children, []]]
+        while stack:
+            node, number_of_children, children = stack[-1]
+            if len(children) == number_of_children:
+                stack.pop()
+                if children:
+                    # Attached bottom-up, so anytree's loop check does not have to walk up long paths
+                    node.children = children
+                continue
+            if self.data[self.position] != _NODE:
+                raise ValueError(f'Corrupt data: expected a tree node at position {self.position}')
+            self.position += 1
+            child, child_number_of_children = self.node()
+            children.append(child)
+            stack.append([child, child_number_of_children, []])
+        return root
+
+
+def dumps(obj):
+    """Serializes a logics object (or a list, tuple, dict, etc. of them) into bytes.
+
+    Supports formulae, inferences, sequents, derivations, tableaux and sequent trees, models and standards, as well
+    as the builtin types (``None``, ``bool``, ``int``, ``float``, ``str``, ``bytes``, ``tuple``, ``list``, ``set``,
+    ``frozenset``, ``dict``). Trees are serialized from the node given downwards (its ancestors are not included).
+
+    Raises
+    ------
+    TypeError
+        If the object contains something that cannot be serialized (e.g. a callable denotation in a model)
+
+    Examples
+    --------
+    >>> from logics.utils.parsers import classical_parser
+    >>> from logics.classes.serialization import dumps, loads
+    >>> f = classical_parser.parse('(p ∧ q) ∨ ~(p ∧ q)')
+    >>> data = dumps(f)
+    >>> type(data)
+    <class 'bytes'>
+    >>> g = loads(data)
+    >>> g
+    ['∨', ['∧', ['p'], ['q']], ['~', ['∧', ['p'], ['q']]]]
+    >>> type(g)
+    <class 'logics.classes.propositional.formula.Formula'>
+    >>> loads(dumps([f, classical_parser.parse('p / q')]))
+    [['∨', ['∧', ['p'], ['q']], ['~', ['∧', ['p'], ['q']]]], ([['p']] / [['q']])]
+    """
+    encoder = _Encoder()
+    encoder.encode(obj)
+    return encoder.getvalue()
+
+
+def loads(data):
+    """Reverses ``dumps``. Only classes defined within the logics package will be instantiated
+
+    Raises
+    ------
+    ValueError
+        If the data given is not a valid serialization
+    """
+    try:
+        return _Decoder(data).decode()
+    except IndexError:
+        raise ValueError('Corrupt data: unexpected end of data')
+
+
+class ObjectWriter:
+    """Writes many logics objects to a binary file, one after the other
+
+    Each object is written as its ``dumps`` serialization preceded by its length. Can be used as a context manager.
+
+    Examples
+    --------
+    >>> import io
+    >>> from logics.utils.parsers import classical_parser
+    >>> from logics.classes.serialization import ObjectWriter, ObjectReader
+    >>> file = io.BytesIO()
+    >>> writer = ObjectWriter(file)
+    >>> writer.write(classical_parser.parse('p ∧ q'))
+    >>> writer.write_many([classical_parser.parse('~p'), classical_parser.parse('p / q')])
+    >>> _ = file.seek(0)
+    >>> list(ObjectReader(file))
+    [['∧', ['p'], ['q']], ['~', ['p']], ([['p']] / [['q']])]
+    """
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, obj):
+        data = dumps(obj)
+        length = bytearray()
+        _write_varint(length, len(data))
+        self.file.write(bytes(length) + data)
+
+    def write_many(self, objects):
+        for obj in objects:
+            self.write(obj)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+
+
+class ObjectReader:
+    """Iterates over the objects of a binary file written with ``ObjectWriter``
+
+    Reads one object at a time, so memory does not depend on the size of the file. Can be used as a context manager.
+    """
+    def __init__(self, file):
+        self.file = file
+
+    def _read_length(self):
+        result = 0
+        shift = 0
+        while True:
+            byte = self.file.read(1)
+            if not byte:
+                if shift:
+                    raise ValueError('Corrupt data: unexpected end of file')
+                return None
+            result |= (byte[0] & 0x7f) << shift
+            if byte[0] < 0x80:
+                return result
+            shift += 7
+
+    def __iter__(self):
+        while True:
+            length = self._read_length()
+            if length is None:
+                return
+            data = self.file.read(length)
+            if len(data) != length:
+                raise ValueError('Corrupt data: unexpected end of file')
+            yield loads(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+
+
+class SerializableMixin:
+    """Mixin that adds ``to_bytes`` and ``from_bytes`` to a class, and makes pickling use them.
+
+    Examples
+    --------
+    >>> import pickle
+    >>> from logics.utils.parsers import classical_parser
+    >>> from logics.classes.propositional import Formula
+    >>> f = classical_parser.parse('p → (q ∨ ~r)')
+    >>> Formula.from_bytes(f.to_bytes()) == f
+    True
+    >>> pickle.loads(pickle.dumps(f)) == f
+    True
+    """
+    _transient_attributes = frozenset()  # Attributes not carried over by copy and deepcopy
+
+    def to_bytes(self):
+        """Returns the compact binary serialization of the object (see ``logics.classes.serialization.dumps``)"""
+        return dumps(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Builds an object from its binary serialization. Raises ``TypeError`` if it is not an instance of the class"""
+        obj = loads(data)
+        if not isinstance(obj, cls):
+            raise TypeError(f'Data given is a serialized {type(obj).__qualname__}, not a {cls.__qualname__}')
+        return obj
+
+    def __reduce__(self):
+        try:
+            return loads, (dumps(self),)
+        except TypeError:
+            # e.g. a model with callable denotations, fall back to the standard way of reducing
+            return (copyreg.__newobj__, (self.__class__,), self.__dict__ or None,
+                    iter(self) if isinstance(self, list) else None,
+                    iter(self.items()) if isinstance(self, dict) else None)
+
+    def _copyable_attributes(self):
+        # Caches that describe the object (e.g. that it was found to be well-formed) are not copied, since copies are
+        # usually made in order to be modified
+        if not self.__dict__.keys() & self._transient_attributes:
+            return self.__dict__
+        return {name: value for name, value in self.__dict__.items() if name not in self._transient_attributes}
+
+    def __copy__(self):
+        # Without this, copy.copy would use __reduce__ above and return a deep copy
+        cls = self.__class__
+        new = cls.__new__(cls)
+        new.__dict__.update(self._copyable_attributes())
+        if isinstance(self, list):
+            list.extend(new, self)
+        elif isinstance(self, dict):
+            dict.update(new, self)
+        return new
+
+    def __deepcopy__(self, memo):
+        # Same as the default deepcopy (which would otherwise also go through __reduce__ above)
+        cls = self.__class__
+        new = cls.__new__(cls)
+        memo[id(self)] = new
+        if isinstance(self, list):
+            list.extend(new, [deepcopy(element, memo) for element in self])
+        elif isinstance(self, dict):
+            for key, value in self.items():
+                dict.__setitem__(new, deepcopy(key, memo), deepcopy(value, memo))
+        new.__dict__.update(deepcopy(self._copyable_attributes(), memo))
+        return new
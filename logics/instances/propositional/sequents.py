@@ -1,15 +1,17 @@
 from copy import deepcopy
 
-from logics.classes.propositional.proof_theories.sequents import SequentNode, SequentCalculus
-from logics.utils.parsers import classical_parser
+from logics.classes.propositional import Formula
+from logics.classes.propositional.proof_theories.sequents import Sequent, SequentNode, SequentCalculus
 from logics.instances.propositional.languages import classical_infinite_language_nobiconditional, \
     classical_infinite_language_noconditional
 from logics.utils.solvers.sequents import LKmin_sequent_reducer, LKminEA_sequent_reducer
 
 # LK and LKmin standard presentations
+# The axioms and rules are written already parsed, so that importing this module does not need to run the parser
+# (e.g. 'Gamma, A ==> Delta' is Sequent([['Γ', Formula(['A'])], ['Δ']]))
 
 # Axioms
-identity = classical_parser.parse('A ==> A')
+identity = Sequent([[Formula(['A'])], [Formula(['A'])]])
 
 # Rules, remember that they are read backwards (the parent of the tree is the conclusion, its children the premises)
 # Exchange rules
@@ -20,11 +22,11 @@ identity = classical_parser.parse('A ==> A')
 # exchange_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, B, A, Pi'),
 #                              children=[exchange_right_premise])
 # With context variables
-exchange_left_premise = SequentNode(content=classical_parser.parse('Gamma, Sigma, Lambda, Delta ==> Pi'))
-exchange_left = SequentNode(content=classical_parser.parse('Gamma, Lambda, Sigma, Delta ==> Pi'),
+exchange_left_premise = SequentNode(content=Sequent([['Γ', 'Σ', 'Λ', 'Δ'], ['Π']]))
+exchange_left = SequentNode(content=Sequent([['Γ', 'Λ', 'Σ', 'Δ'], ['Π']]),
                             children=[exchange_left_premise])
-exchange_right_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Sigma, Lambda, Pi'))
-exchange_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Lambda, Sigma, Pi'),
+exchange_right_premise = SequentNode(content=Sequent([['Γ'], ['Δ', 'Σ', 'Λ', 'Π']]))
+exchange_right = SequentNode(content=Sequent([['Γ'], ['Δ', 'Λ', 'Σ', 'Π']]),
                              children=[exchange_right_premise])
 
 # Weakening rules
@@ -35,11 +37,11 @@ exchange_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, La
 # weakening_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'),
 #                               children=[weakening_right_premise])
 # With context
-weakening_left_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta'))
-weakening_left = SequentNode(content=classical_parser.parse('Pi, Gamma ==> Delta'),
+weakening_left_premise = SequentNode(content=Sequent([['Γ'], ['Δ']]))
+weakening_left = SequentNode(content=Sequent([['Π', 'Γ'], ['Δ']]),
                              children=[weakening_left_premise])
-weakening_right_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta'))
-weakening_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Pi'),
+weakening_right_premise = SequentNode(content=Sequent([['Γ'], ['Δ']]))
+weakening_right = SequentNode(content=Sequent([['Γ'], ['Δ', 'Π']]),
                               children=[weakening_right_premise])
 
 # Contraction rules
@@ -50,58 +52,58 @@ weakening_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, P
 # contraction_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'),
 #                                 children=[contraction_right_premise])
 # With context Variables
-contraction_left_premise = SequentNode(content=classical_parser.parse('Pi, Pi, Gamma ==> Delta'))
-contraction_left = SequentNode(content=classical_parser.parse('Pi, Gamma ==> Delta'),
+contraction_left_premise = SequentNode(content=Sequent([['Π', 'Π', 'Γ'], ['Δ']]))
+contraction_left = SequentNode(content=Sequent([['Π', 'Γ'], ['Δ']]),
                                children=[contraction_left_premise])
-contraction_right_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Pi, Pi'))
-contraction_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Pi'),
+contraction_right_premise = SequentNode(content=Sequent([['Γ'], ['Δ', 'Π', 'Π']]))
+contraction_right = SequentNode(content=Sequent([['Γ'], ['Δ', 'Π']]),
                                 children=[contraction_right_premise])
 
 # Cut Rule
-cut_premise_1 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'))
-cut_premise_2 = SequentNode(content=classical_parser.parse('A, Pi ==> Sigma'))
-cut = SequentNode(content=classical_parser.parse('Gamma, Pi ==> Delta, Sigma'),
+cut_premise_1 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A'])]]))
+cut_premise_2 = SequentNode(content=Sequent([[Formula(['A']), 'Π'], ['Σ']]))
+cut = SequentNode(content=Sequent([['Γ', 'Π'], ['Δ', 'Σ']]),
                   children=[cut_premise_1, cut_premise_2])
 
 # Operational rules
-negation_left_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'))
-negation_left = SequentNode(content=classical_parser.parse('~A, Gamma ==> Delta'),
+negation_left_premise = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A'])]]))
+negation_left = SequentNode(content=Sequent([[Formula(['~', ['A']]), 'Γ'], ['Δ']]),
                             children=[negation_left_premise])
-negation_right_premise = SequentNode(content=classical_parser.parse('A, Gamma ==> Delta'))
-negation_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, ~A'),
+negation_right_premise = SequentNode(content=Sequent([[Formula(['A']), 'Γ'], ['Δ']]))
+negation_right = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['~', ['A']])]]),
                              children=[negation_right_premise])
 
-conjunction_left1_premise = SequentNode(content=classical_parser.parse('A, Gamma ==> Delta'))
-conjunction_left1 = SequentNode(content=classical_parser.parse('A & B, Gamma ==> Delta'),
+conjunction_left1_premise = SequentNode(content=Sequent([[Formula(['A']), 'Γ'], ['Δ']]))
+conjunction_left1 = SequentNode(content=Sequent([[Formula(['∧', ['A'], ['B']]), 'Γ'], ['Δ']]),
                                 children=[conjunction_left1_premise])
-conjunction_left2_premise = SequentNode(content=classical_parser.parse('B, Gamma ==> Delta'))
-conjunction_left2 = SequentNode(content=classical_parser.parse('A & B, Gamma ==> Delta'),
+conjunction_left2_premise = SequentNode(content=Sequent([[Formula(['B']), 'Γ'], ['Δ']]))
+conjunction_left2 = SequentNode(content=Sequent([[Formula(['∧', ['A'], ['B']]), 'Γ'], ['Δ']]),
                                 children=[conjunction_left2_premise])
 
-conjunction_right_premise1 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'))
-conjunction_right_premise2 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, B'))
-conjunction_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A & B'),
+conjunction_right_premise1 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A'])]]))
+conjunction_right_premise2 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['B'])]]))
+conjunction_right = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['∧', ['A'], ['B']])]]),
                                 children=[conjunction_right_premise1, conjunction_right_premise2])
 
-disjunction_left_premise1 = SequentNode(content=classical_parser.parse('A, Gamma ==> Delta'))
-disjunction_left_premise2 = SequentNode(content=classical_parser.parse('B, Gamma ==> Delta'))
-disjunction_left = SequentNode(content=classical_parser.parse('A or B, Gamma ==> Delta'),
+disjunction_left_premise1 = SequentNode(content=Sequent([[Formula(['A']), 'Γ'], ['Δ']]))
+disjunction_left_premise2 = SequentNode(content=Sequent([[Formula(['B']), 'Γ'], ['Δ']]))
+disjunction_left = SequentNode(content=Sequent([[Formula(['∨', ['A'], ['B']]), 'Γ'], ['Δ']]),
                                children=[disjunction_left_premise1, disjunction_left_premise2])
 
-disjunction_right1_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'))
-disjunction_right1 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A or B'),
+disjunction_right1_premise = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A'])]]))
+disjunction_right1 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['∨', ['A'], ['B']])]]),
                                  children=[disjunction_right1_premise])
-disjunction_right2_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, B'))
-disjunction_right2 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A or B'),
+disjunction_right2_premise = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['B'])]]))
+disjunction_right2 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['∨', ['A'], ['B']])]]),
                                  children=[disjunction_right2_premise])
 
-conditional_left_premise1 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A'))
-conditional_left_premise2 = SequentNode(content=classical_parser.parse('B, Pi ==> Sigma'))
-conditional_left = SequentNode(content=classical_parser.parse('A then B, Gamma, Pi ==> Delta, Sigma'),
+conditional_left_premise1 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A'])]]))
+conditional_left_premise2 = SequentNode(content=Sequent([[Formula(['B']), 'Π'], ['Σ']]))
+conditional_left = SequentNode(content=Sequent([[Formula(['→', ['A'], ['B']]), 'Γ', 'Π'], ['Δ', 'Σ']]),
                                children=[conditional_left_premise1, conditional_left_premise2])
 
-conditional_right_premise = SequentNode(content=classical_parser.parse('A, Gamma ==> Delta, B'))
-conditional_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A then B'),
+conditional_right_premise = SequentNode(content=Sequent([[Formula(['A']), 'Γ'], ['Δ', Formula(['B'])]]))
+conditional_right = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['→', ['A'], ['B']])]]),
                                 children=[conditional_right_premise])
 
 LK_rules = {
@@ -147,11 +149,11 @@ LKmin = SequentCalculus(language=classical_infinite_language_nobiconditional, ax
 # EA_weakening_right = SequentNode(content=classical_parser.parse('Gamma, Delta ==> Pi, A, Sigma'),
 #                                  children=[EA_weakening_right_premise])
 # Weakening with context
-EA_weakening_left_premise = SequentNode(content=classical_parser.parse('Gamma, Delta ==> Sigma'))
-EA_weakening_left = SequentNode(content=classical_parser.parse('Gamma, Lambda, Delta ==> Sigma'),
+EA_weakening_left_premise = SequentNode(content=Sequent([['Γ', 'Δ'], ['Σ']]))
+EA_weakening_left = SequentNode(content=Sequent([['Γ', 'Λ', 'Δ'], ['Σ']]),
                                 children=[EA_weakening_left_premise])
-EA_weakening_right_premise = SequentNode(content=classical_parser.parse('Gamma ==> Pi, Sigma'))
-EA_weakening_right = SequentNode(content=classical_parser.parse('Gamma ==> Pi, Lambda, Sigma'),
+EA_weakening_right_premise = SequentNode(content=Sequent([['Γ'], ['Π', 'Σ']]))
+EA_weakening_right = SequentNode(content=Sequent([['Γ'], ['Π', 'Λ', 'Σ']]),
                                  children=[EA_weakening_right_premise])
 
 # CONTRACTION RULES (Also do not need to be applied if the multiplicative rules below are used)
@@ -170,26 +172,26 @@ EA_weakening_right = SequentNode(content=classical_parser.parse('Gamma ==> Pi, L
 # EA_contraction2_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Pi, A, Sigma'),
 #                                     children=[EA_contraction2_right_premise])
 # With context (makes things much much slower, but perhaps some sequents will not be provable without them)
-EA_contraction1_left_premise = SequentNode(content=classical_parser.parse('Gamma, Lambda, Delta, Lambda, Pi ==> Sigma'))
-EA_contraction1_left = SequentNode(content=classical_parser.parse('Gamma, Lambda, Delta, Pi ==> Sigma'),
+EA_contraction1_left_premise = SequentNode(content=Sequent([['Γ', 'Λ', 'Δ', 'Λ', 'Π'], ['Σ']]))
+EA_contraction1_left = SequentNode(content=Sequent([['Γ', 'Λ', 'Δ', 'Π'], ['Σ']]),
                                    children=[EA_contraction1_left_premise])
-EA_contraction2_left_premise = SequentNode(content=classical_parser.parse('Gamma, Lambda, Delta, Lambda, Pi ==> Sigma'))
-EA_contraction2_left = SequentNode(content=classical_parser.parse('Gamma, Delta, Lambda, Pi ==> Sigma'),
+EA_contraction2_left_premise = SequentNode(content=Sequent([['Γ', 'Λ', 'Δ', 'Λ', 'Π'], ['Σ']]))
+EA_contraction2_left = SequentNode(content=Sequent([['Γ', 'Δ', 'Λ', 'Π'], ['Σ']]),
                                    children=[EA_contraction2_left_premise])
 
-EA_contraction1_right_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Lambda, Pi, Lambda, Sigma'))
-EA_contraction1_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Lambda, Pi, Sigma'),
+EA_contraction1_right_premise = SequentNode(content=Sequent([['Γ'], ['Δ', 'Λ', 'Π', 'Λ', 'Σ']]))
+EA_contraction1_right = SequentNode(content=Sequent([['Γ'], ['Δ', 'Λ', 'Π', 'Σ']]),
                                     children=[EA_contraction1_right_premise])
-EA_contraction2_right_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Lambda, Pi, Lambda, Sigma'))
-EA_contraction2_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Pi, Lambda, Sigma'),
+EA_contraction2_right_premise = SequentNode(content=Sequent([['Γ'], ['Δ', 'Λ', 'Π', 'Λ', 'Σ']]))
+EA_contraction2_right = SequentNode(content=Sequent([['Γ'], ['Δ', 'Π', 'Λ', 'Σ']]),
                                     children=[EA_contraction2_right_premise])
 
 # OPERATIONAL RULES
-EA_negation_left_premise = SequentNode(content=classical_parser.parse('Gamma, Delta ==> Pi, A, Sigma'))
-EA_negation_left = SequentNode(content=classical_parser.parse('Gamma, ~A, Delta ==> Pi, Sigma'),
+EA_negation_left_premise = SequentNode(content=Sequent([['Γ', 'Δ'], ['Π', Formula(['A']), 'Σ']]))
+EA_negation_left = SequentNode(content=Sequent([['Γ', Formula(['~', ['A']]), 'Δ'], ['Π', 'Σ']]),
                                children=[EA_negation_left_premise])
-EA_negation_right_premise = SequentNode(content=classical_parser.parse('Gamma, A, Delta ==> Pi, Sigma'))
-EA_negation_right = SequentNode(content=classical_parser.parse('Gamma, Delta ==> Pi, ~A, Sigma'),
+EA_negation_right_premise = SequentNode(content=Sequent([['Γ', Formula(['A']), 'Δ'], ['Π', 'Σ']]))
+EA_negation_right = SequentNode(content=Sequent([['Γ', 'Δ'], ['Π', Formula(['~', ['A']]), 'Σ']]),
                                 children=[EA_negation_right_premise])
 
 # Conjunction additive left rule
@@ -202,24 +204,24 @@ EA_negation_right = SequentNode(content=classical_parser.parse('Gamma, Delta ==>
 
 # Conjunction multiplicative left rule
 # (again, more efficient to work with, no need of contraction) -- i'm following Takeuti here
-EA_conjunction_left1_premise = SequentNode(content=classical_parser.parse('Gamma, A, Delta, B, Pi ==> Sigma'))
-EA_conjunction_left1 = SequentNode(content=classical_parser.parse('Gamma, A & B, Delta, Pi ==> Sigma'),
+EA_conjunction_left1_premise = SequentNode(content=Sequent([['Γ', Formula(['A']), 'Δ', Formula(['B']), 'Π'], ['Σ']]))
+EA_conjunction_left1 = SequentNode(content=Sequent([['Γ', Formula(['∧', ['A'], ['B']]), 'Δ', 'Π'], ['Σ']]),
                                    children=[EA_conjunction_left1_premise])
-EA_conjunction_left2_premise = SequentNode(content=classical_parser.parse('Gamma, A, Delta, B, Pi ==> Sigma'))
-EA_conjunction_left2 = SequentNode(content=classical_parser.parse('Gamma, Delta, A & B, Pi ==> Sigma'),
+EA_conjunction_left2_premise = SequentNode(content=Sequent([['Γ', Formula(['A']), 'Δ', Formula(['B']), 'Π'], ['Σ']]))
+EA_conjunction_left2 = SequentNode(content=Sequent([['Γ', 'Δ', Formula(['∧', ['A'], ['B']]), 'Π'], ['Σ']]),
                                    children=[EA_conjunction_left2_premise])
 
 # Do we need the reverse rules? e.g the one that concludes Gamma, Delta, B & A, Pi ==> Sigma, etc.
 # I think they could be useful for the checker, but idk if for the solver
 
-EA_conjunction_right_premise1 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A, Pi'))
-EA_conjunction_right_premise2 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, B, Pi'))
-EA_conjunction_right = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A & B, Pi'),
+EA_conjunction_right_premise1 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A']), 'Π']]))
+EA_conjunction_right_premise2 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['B']), 'Π']]))
+EA_conjunction_right = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['∧', ['A'], ['B']]), 'Π']]),
                                    children=[EA_conjunction_right_premise1, EA_conjunction_right_premise2])
 
-EA_disjunction_left_premise1 = SequentNode(content=classical_parser.parse('Gamma, A, Delta ==> Pi'))
-EA_disjunction_left_premise2 = SequentNode(content=classical_parser.parse('Gamma, B, Delta ==> Pi'))
-EA_disjunction_left = SequentNode(content=classical_parser.parse('Gamma, A or B, Delta ==> Pi'),
+EA_disjunction_left_premise1 = SequentNode(content=Sequent([['Γ', Formula(['A']), 'Δ'], ['Π']]))
+EA_disjunction_left_premise2 = SequentNode(content=Sequent([['Γ', Formula(['B']), 'Δ'], ['Π']]))
+EA_disjunction_left = SequentNode(content=Sequent([['Γ', Formula(['∨', ['A'], ['B']]), 'Δ'], ['Π']]),
                                   children=[EA_disjunction_left_premise1, EA_disjunction_left_premise2])
 
 # Disjunction additive left rule
@@ -230,11 +232,11 @@ EA_disjunction_left = SequentNode(content=classical_parser.parse('Gamma, A or B,
 # EA_disjunction_right2 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A or B, Pi'),
 #                                     children=[EA_disjunction_right2_premise])
 # Disjunction multiplicative left rule
-EA_disjunction_right1_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A, Pi, B, Sigma'))
-EA_disjunction_right1 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A or B, Pi, Sigma'),
+EA_disjunction_right1_premise = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A']), 'Π', Formula(['B']), 'Σ']]))
+EA_disjunction_right1 = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['∨', ['A'], ['B']]), 'Π', 'Σ']]),
                                     children=[EA_disjunction_right1_premise])
-EA_disjunction_right2_premise = SequentNode(content=classical_parser.parse('Gamma ==> Delta, A, Pi, B, Sigma'))
-EA_disjunction_right2 = SequentNode(content=classical_parser.parse('Gamma ==> Delta, Pi, A or B, Sigma'),
+EA_disjunction_right2_premise = SequentNode(content=Sequent([['Γ'], ['Δ', Formula(['A']), 'Π', Formula(['B']), 'Σ']]))
+EA_disjunction_right2 = SequentNode(content=Sequent([['Γ'], ['Δ', 'Π', Formula(['∨', ['A'], ['B']]), 'Σ']]),
                                     children=[EA_disjunction_right2_premise])
 
 LKminEA_rules = {
@@ -360,6 +360,9 @@ LP_tableaux_system = ManyValuedTableauxSystem(language=classical_infinite_langua
                                               rules=FDE_tableaux_rules,
                                               closure_rules=LP_closure_rules,
                                               solver=indexed_tableaux_solver)
+# Countermodels with the values of K3_mvl_semantics and LP_mvl_semantics (where the third value is 'i')
+K3_tableaux_system.countermodel_values = {(True, False): '1', (False, False): 'i', (False, True): '0'}
+LP_tableaux_system.countermodel_values = {(True, False): '1', (True, True): 'i', (False, True): '0'}
 
 # ----------------------------------------------------------------------------------------------------------------------
 # TABLEAUX FOR MODAL LOGICS
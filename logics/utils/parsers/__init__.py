@@ -1,2 +1,22 @@
-from logics.utils.parsers.standard_parser import classical_parser, modal_parser, LFI_parser
-from logics.utils.parsers.predicate_parser import classical_predicate_parser
+import importlib
+
+# The parser instances are imported on first access (PEP 562), so that importing a module of this package
+# (e.g. parser_utils) does not build every parser
+_lazy_objects = {
+    'classical_parser': 'logics.utils.parsers.standard_parser',
+    'modal_parser': 'logics.utils.parsers.standard_parser',
+    'LFI_parser': 'logics.utils.parsers.standard_parser',
+    'classical_predicate_parser': 'logics.utils.parsers.predicate_parser',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_objects:
+        value = getattr(importlib.import_module(_lazy_objects[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_objects))
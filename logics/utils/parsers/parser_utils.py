@@ -1,3 +1,7 @@
+import re
+from collections import OrderedDict, deque, namedtuple
+from itertools import islice
+
 from logics.classes.exceptions import NotWellFormed
 
 
@@ -101,6 +105,229 @@ def get_closing_parenthesis(string):
                 return char_index
 
 
+class Replacements:
+    """
+    Compiles a replacement dict ({string: string, ...}) into a function that applies every replacement in a single
+    pass over a string. Where more than one expression matches, the longest one is replaced.
+
+    If `separator` is given, every run of separators (counting the expressions that are replaced by separators, such as
+    ``'|='`` for ``'/'``, and those replaced by nothing) is replaced by the separator followed by the length of the run
+    and ``']'``, e.g. ``'//'`` by ``'/2]'``. If `remove_whitespace` is ``True``, whitespaces are deleted (also from the
+    replacements), but not before the runs of separators are found.
+
+    >>> from logics.utils.parsers.parser_utils import Replacements
+    >>> replace = Replacements({' and ': '∧', '|=': '/', 'not ': '~'}, separator='/', remove_whitespace=True)
+    >>> replace('p and not q // p |= q')
+    'p∧~q/2]p/1]q'
+    >>> replace('/ /')
+    '/1]/1]'
+    """
+    def __init__(self, replacement_dict, separator=None, remove_whitespace=False):
+        self.replacement_dict = dict(replacement_dict)
+        self.separator = separator
+        self.remove_whitespace = remove_whitespace
+
+        replacements = {expression: value for expression, value in replacement_dict.items() if expression}
+        if remove_whitespace:
+            replacements = {expression: value.replace(' ', '') for expression, value in replacements.items()}
+        expressions = sorted(replacements, key=len, reverse=True)
+
+        alternatives = list()
+        if separator is not None:
+            def alternation(strings):
+                return '|'.join(re.escape(e) for e in sorted(strings, key=len, reverse=True))
+            separators = [e for e in expressions if replacements[e] and
+                          replacements[e] == separator * (len(replacements[e]) // len(separator))]
+            separators = alternation([separator] + separators)
+            removed = alternation([e for e in expressions if not replacements[e]])
+            separators_or_removed = f'{separators}|{removed}' if removed else separators
+            self._separators = re.compile(separators)
+            # A run must contain at least one separator
+            alternatives.append(f"(?P<separators>(?:{removed})*(?:{separators})(?:{separators_or_removed})*)" if removed
+                                else f"(?P<separators>(?:{separators})+)")
+        if remove_whitespace and ' ' not in replacements:
+            replacements[' '] = ''
+        if replacements:
+            alternatives.append(_trie_pattern(replacements))
+        self._replacements = replacements
+        # Positions where no expression begins are skipped without trying every alternative
+        initials = ''.join(sorted({e[0] for e in replacements} | ({separator[0]} if separator else set())))
+        self._pattern = re.compile(f"(?=[{re.escape(initials)}])(?:{'|'.join(alternatives)})") if alternatives \
+            else None
+
+    def __call__(self, string):
+        if self._pattern is None:
+            return string
+        return self._pattern.sub(self._replace, string)
+
+    def _replace(self, match):
+        if match.lastgroup == 'separators':
+            level = 0
+            for separator_match in self._separators.finditer(match.group()):
+                value = self._replacements.get(separator_match.group(), self.separator)
+                level += len(value) // len(self.separator)
+            return f'{self.separator}{level}]'
+        return self._replacements[match.group()]
+
+
+def _trie_pattern(strings):
+    """Regular expression that matches the longest of the given strings, with their common prefixes factored out
+    (e.g. ``' (?:and |or |)'`` for ``' and '``, ``' or '`` and ``' '``), so that the regex engine does not try every
+    string at every position"""
+    trie = dict()
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, dict())
+        node[''] = None  # end of a string
+
+    def pattern(node):
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if '' in node:
+            branches.append('')  # Matching only up to here is the last option, so that longer strings are preferred
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return pattern(trie)
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache:
+    """
+    Dictionary of bounded size that discards the least recently used entries, and counts hits and misses
+
+    >>> from logics.utils.parsers.parser_utils import LRUCache
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.put('a', 1)
+    >>> cache.put('b', 2)
+    >>> cache.get('a')
+    1
+    >>> cache.put('c', 3)  # discards 'b'
+    >>> cache.get('b') is None
+    True
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, maxsize=2, currsize=2)
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None, is_valid=None):
+        """Returns the value cached for `key`. If `is_valid` is given and returns ``False`` for the value, it is taken
+        as missing"""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if is_valid is not None and not is_valid(value):
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self, statistics=True):
+        """Removes every entry. If `statistics` is ``True`` also resets the count of hits and misses"""
+        self._entries.clear()
+        if statistics:
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def numbered_lines(lines):
+    """
+    Given an iterable of lines, yields (number of line, line) for every non-blank line, without surrounding whitespace.
+    Lines are numbered from 1
+
+    >>> from logics.utils.parsers.parser_utils import numbered_lines
+    >>> list(numbered_lines(['p', '', ' q \\n']))
+    [(1, 'p'), (3, 'q')]
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            yield line_number, line
+
+
+def numbered_blocks(lines):
+    """
+    Given an iterable of lines, yields (number of the first line, block) for every block of non-blank lines. Blocks are
+    separated by one or more blank lines, and their lines are joined by '\\n'
+
+    >>> from logics.utils.parsers.parser_utils import numbered_blocks
+    >>> list(numbered_blocks(['p', 'q', '', '', 'r']))
+    [(1, 'p\\nq'), (5, 'r')]
+    """
+    block = list()
+    first_line_number = None
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            if not block:
+                first_line_number = line_number
+            block.append(line)
+        elif block:
+            yield first_line_number, '\n'.join(block)
+            block = list()
+    if block:
+        yield first_line_number, '\n'.join(block)
+
+
+def chunks(iterable, chunk_size):
+    """
+    Yields lists of `chunk_size` consecutive elements of `iterable` (the last one may be shorter)
+
+    >>> from logics.utils.parsers.parser_utils import chunks
+    >>> list(chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def map_in_processes(function, iterable, workers, initializer=None, initargs=()):
+    """
+    Same as ``map(function, iterable)`` but calling `function` in a pool of `workers` processes. Results are yielded
+    in order, and at most ``2 * workers`` elements of `iterable` are taken before their results are yielded, so that
+    `iterable` can be arbitrarily long.
+
+    `function` must be defined at the top level of a module and the elements and results must be picklable.
+    `initializer` is called with `initargs` at the start of each process.
+    """
+    # Imported here since concurrent.futures is slow to import, and only needed when using processes
+    from concurrent.futures import ProcessPoolExecutor
+
+    iterator = iter(iterable)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        pending = deque(executor.submit(function, element) for element in islice(iterator, 2 * workers))
+        while pending:
+            result = pending.popleft().result()
+            for element in islice(iterator, 1):
+                pending.append(executor.submit(function, element))
+            yield result
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 # Standard Godel encoding and decoding
 
@@ -154,116 +381,22 @@ def godel_encode(string):
     -----
     You will probably not need to call this function directly, the parser will call it for you, see below.
     """
-    new_string = ''
-    current_index = 0
-    skip_characters = 0
-    for char in string:
-        if skip_characters != 0:
-            skip_characters -= 1
-        else:
-            # Constant 0 is represented by 0
-            if char == '0':
-                new_string += '0'
-
-            # Auxiliary symbols begin with 1
-            elif char == '(':
-                new_string += '19'
-            elif char == ')':
-                new_string += '199'
-            elif char == ',':
-                new_string += '1999'
-
-            # Connectives begin with 2
-            elif char == '~':
-                new_string += '29'
-            elif char == '∧':
-                new_string += '299'
-            elif char == '∨':
-                new_string += '2999'
-            elif char == '→':
-                new_string += '29999'
-            elif char == '↔':
-                new_string += '299999'
-
-            # Quantifiers begin with 3
-            elif char == '∀':
-                new_string += '39'
-            elif char == '∃':
-                new_string += '399'
-            elif char == '∈':
-                new_string += '3999'
-
-            # Predicates 4
-            elif char == '=':
-                new_string += '49'
-            elif char == '>':
-                new_string += '499'
-            elif char == '<':
-                new_string += '4999'
-            elif char == 'T' and string[current_index+1 == 'r']:
-                new_string += '49999'
-                skip_characters += 1
-
-            # Variables 5, Predicate variables 6
-            elif char == 'x' or char == 'y' or char == 'z' or char == 'X' or char == 'Y' or char == 'Z':
-                # begin with x 51
-                if char == 'x':
-                    new_string += '51'
-                # begin with y 52
-                elif char == 'y':
-                    new_string += '52'
-                # begin with z 53
-                elif char == 'z':
-                    new_string += '53'
-                # begin with X 61
-                elif char == 'X':
-                    new_string += '61'
-                # begin with Y 62
-                elif char == 'Y':
-                    new_string += '62'
-                # begin with Z 63
-                elif char == 'Z':
-                    new_string += '63'
-                var_number = 0
-                for char2_index in range(current_index + 1, len(string)):
-                    if string[char2_index].isdigit():
-                        var_number = int(string[current_index+1:char2_index+1])
-                        skip_characters += 1
-                    else:
-                        break
-                if var_number != 0:
-                    new_string += '9' * var_number
-
-            # Metavariables and sentential constants 7
-            elif char == 'A':
-                new_string += '79'
-            elif char == 'B':
-                new_string += '799'
-            elif char == 'C':
-                new_string += '7999'
-            elif char == 'λ':
-                new_string += '79999'
-
-            # Function symbols 8
-            elif char == 's':
-                new_string += '89'
-            elif char == '+':
-                new_string += '899'
-            elif char == '*' and string[current_index + 1] != '*':
-                new_string += '8999'
-            elif char == '*' and string[current_index + 1] == '*':
-                new_string += '89999'
-                skip_characters += 1
-            elif char == 'q' and string[current_index:current_index + 5] == 'quote':
-                new_string += '899999'
-                skip_characters += 4
-
-            else:
-                raise NotWellFormed(f'Non-recognized character {char} in Godel encoding')
-
-        current_index += 1
-
-    return new_string
+    # Symbols of one character are translated with a table, the rest (and the non-recognized characters) one by one
+    codes = []
+    index = 0
+    for match in _godel_symbol.finditer(string):
+        codes.append(string[index:match.start()].translate(_godel_table))
+        symbol = match.group()
+        code = _godel_codes.get(symbol)
+        if code is None:
+            if symbol[0] not in _godel_variables:
+                raise NotWellFormed(f'Non-recognized character {symbol} in Godel encoding')
+            # Variables and predicate variables are followed by as many 9s as their subindex
+            code = _godel_codes[symbol[0]] + '9' * int(symbol[1:])
+        codes.append(code)
+        index = match.end()
+    codes.append(string[index:].translate(_godel_table))
+    return ''.join(codes)
 
 
 def godel_decode(string):
@@ -281,147 +414,64 @@ def godel_decode(string):
     >>> godel_decode('395119290490199')
     '∀x(~0=0)'
     """
-    new_string = ''
-    current_index = 0
-    skip_characters = 0
-    for char in string:
-        if skip_characters != 0:
-            skip_characters -= 1
-        else:
-            # Individual constant 0
-            if char == '0':
-                new_string += '0'
-
-            # Auxiliary symbols 1
-            elif char == '1':
-                if string[current_index:current_index + 4] == '1999':
-                    new_string += ','
-                    skip_characters += 3
-                elif string[current_index:current_index + 3] == '199':
-                    new_string += ')'
-                    skip_characters += 2
-                elif string[current_index:current_index + 2] == '19':
-                    new_string += '('
-                    skip_characters += 1
-                else:
-                    raise NotWellFormed(f'Incorrect Godel encoding')
-
-            # Connectives 2
-            elif char == '2':
-                if string[current_index:current_index + 6] == '299999':
-                    new_string += '↔'
-                    skip_characters += 5
-                elif string[current_index:current_index + 5] == '29999':
-                    new_string += '→'
-                    skip_characters += 4
-                elif string[current_index:current_index + 4] == '2999':
-                    new_string += '∨'
-                    skip_characters += 3
-                elif string[current_index:current_index + 3] == '299':
-                    new_string += '∧'
-                    skip_characters += 2
-                elif string[current_index:current_index + 2] == '29':
-                    new_string += '~'
-                    skip_characters += 1
-                else:
-                    raise NotWellFormed(f'Incorrect Godel encoding')
-
-            # Quantifiers 3
-            elif char == '3':
-                if string[current_index:current_index + 4] == '3999':
-                    new_string += '∈'
-                    skip_characters += 3
-                elif string[current_index:current_index + 3] == '399':
-                    new_string += '∃'
-                    skip_characters += 2
-                elif string[current_index:current_index + 2] == '39':
-                    new_string += '∀'
-                    skip_characters += 1
-                else:
-                    raise NotWellFormed(f'Incorrect Godel encoding')
-
-            # Predicates 4
-            elif char == '4':
-                if string[current_index:current_index + 5] == '49999':
-                    new_string += 'Tr'
-                    skip_characters += 4
-                elif string[current_index:current_index + 4] == '4999':
-                    new_string += '<'
-                    skip_characters += 3
-                elif string[current_index:current_index + 3] == '499':
-                    new_string += '>'
-                    skip_characters += 2
-                elif string[current_index:current_index + 2] == '49':
-                    new_string += '='
-                    skip_characters += 1
-                else:
-                    raise NotWellFormed(f'Incorrect Godel encoding')
-
-            # Variables 5 and 6
-            elif char == '5' or char == '6':
-                if string[current_index:current_index + 2] == '51':
-                    new_string += 'x'
-                elif string[current_index:current_index + 2] == '52':
-                    new_string += 'y'
-                elif string[current_index:current_index + 2] == '53':
-                    new_string += 'z'
-                elif string[current_index:current_index + 2] == '61':
-                    new_string += 'X'
-                elif string[current_index:current_index + 2] == '62':
-                    new_string += 'Y'
-                elif string[current_index:current_index + 2] == '63':
-                    new_string += 'Z'
-                skip_characters += 1
-                var_number = 0
-                for char2_index in range(current_index + 2, len(string)):
-                    if string[char2_index] == '9':
-                        var_number += 1
-                        skip_characters += 1
-                    else:
-                        break
-                if var_number != 0:
-                    new_string += str(var_number)
-
-            # Metavariables 7
-            elif char == '7':
-                if string[current_index:current_index + 5] == '79999':
-                    new_string += 'λ'
-                    skip_characters += 4
-                elif string[current_index:current_index + 4] == '7999':
-                    new_string += 'C'
-                    skip_characters += 3
-                elif string[current_index:current_index + 3] == '799':
-                    new_string += 'B'
-                    skip_characters += 2
-                elif string[current_index:current_index + 2] == '79':
-                    new_string += 'A'
-                    skip_characters += 1
-                else:
-                    raise NotWellFormed(f'Incorrect Godel encoding')
-
-            # Function symbols 8
-            elif char == '8':
-                if string[current_index:current_index + 6] == '899999':
-                    new_string += 'quote'
-                    skip_characters += 5
-                elif string[current_index:current_index + 5] == '89999':
-                    new_string += '**'
-                    skip_characters += 4
-                elif string[current_index:current_index + 4] == '8999':
-                    new_string += '*'
-                    skip_characters += 3
-                elif string[current_index:current_index + 3] == '899':
-                    new_string += '+'
-                    skip_characters += 2
-                elif string[current_index:current_index + 2] == '89':
-                    new_string += 's'
-                    skip_characters += 1
-                else:
-                    raise NotWellFormed(f'Incorrect Godel encoding')
-
-            else:
-                raise NotWellFormed(f'Non-recognized character {char} in Godel encoding')
-
-        current_index += 1
-
-    return new_string
+    codes = _godel_code.findall(string)
+    if sum(map(len, codes)) != len(string):
+        # Some characters are not part of any code. Find the first one (the codes before it must be correct)
+        index = 0
+        valid_codes = 0
+        for code in codes:
+            if not string.startswith(code, index):
+                break
+            index += len(code)
+            valid_codes += 1
+        for code in codes[:valid_codes]:
+            if not _is_godel_code(code):
+                raise NotWellFormed(f'Incorrect Godel encoding: {code} is not the code of any symbol')
+        if string[index] in '12345678':
+            raise NotWellFormed(f'Incorrect Godel encoding: {string[index:]} does not begin with the code of '
+                                f'any symbol')
+        raise NotWellFormed(f'Non-recognized character {string[index]} in Godel encoding')
+    return ''.join(map(_godel_symbols.__getitem__, codes))
+
+
+def _is_godel_code(code):
+    """Whether a code found by _godel_code is the code of some symbol (variables, which are followed by as many 9s as
+    their subindex, are not in _godel_symbols until they are decoded)"""
+    return code in _godel_symbols or (code[0] in '56' and code[1:2] in ('1', '2', '3'))
+
+
+class _GodelSymbols(dict):
+    """Symbols of each Godel code. The codes of variables and predicate variables, which are followed by as many 9s as
+    their subindex, are decoded when looked up"""
+    def __missing__(self, code):
+        if not _is_godel_code(code):
+            raise NotWellFormed(f'Incorrect Godel encoding: {code} is not the code of any symbol')
+        return self[code[:2]] + str(len(code) - 2)
+
+
+# Each symbol is coded by a digit indicating its category followed by a number of 9s (variables also have a second
+# digit, and as many 9s after it as their subindex)
+_godel_codes = {
+    # Individual constant
+    '0': '0',
+    # Auxiliary symbols
+    '(': '19', ')': '199', ',': '1999',
+    # Connectives
+    '~': '29', '∧': '299', '∨': '2999', '→': '29999', '↔': '299999',
+    # Quantifiers
+    '∀': '39', '∃': '399', '∈': '3999',
+    # Predicates
+    '=': '49', '>': '499', '<': '4999', 'Tr': '49999',
+    # Variables and predicate variables
+    'x': '51', 'y': '52', 'z': '53', 'X': '61', 'Y': '62', 'Z': '63',
+    # Metavariables and sentential constants
+    'A': '79', 'B': '799', 'C': '7999', 'λ': '79999',
+    # Function symbols
+    's': '89', '+': '899', '*': '8999', '**': '89999', 'quote': '899999',
+}
+_godel_symbols = _GodelSymbols((code, symbol) for symbol, code in _godel_codes.items())
+_godel_variables = 'xyzXYZ'
+_godel_characters = ''.join(symbol for symbol in _godel_codes if len(symbol) == 1)
+_godel_table = str.maketrans({symbol: _godel_codes[symbol] for symbol in _godel_characters})
+_godel_symbol = re.compile(r'quote|Tr|\*\*|[xyzXYZ][0-9]+|[^' + re.escape(_godel_characters) + ']')
+_godel_code = re.compile(r'[56][1-3]9*|[1-8]9*|0')
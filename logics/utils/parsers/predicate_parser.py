@@ -3,7 +3,7 @@ from copy import deepcopy
 from logics.utils.parsers import parser_utils
 from logics.classes.exceptions import NotWellFormed
 from logics.classes.predicate import PredicateFormula
-from logics.utils.parsers.standard_parser import StandardParser
+from logics.utils.parsers.standard_parser import StandardParser, _FormulaScan
 
 
 class PredicateParser(StandardParser):
@@ -38,6 +38,8 @@ class PredicateParser(StandardParser):
         Character (preferrably of len 1) used to separate between the premises and conclusions in an inference
     derivation_step_separator: str, optional
         Character (preferrably of len 1) used to separate the components of a derivation step
+    cache_size: int, optional
+        Number of results of `parse` and `unparse` that are cached. By default 0 (nothing is cached)
 
     Examples
     --------
@@ -81,8 +83,11 @@ class PredicateParser(StandardParser):
     >>> classical_predicate_parser.parse("forall x in f(a) (if ~P(x) then P(x))")
     ['∀', 'x', '∈', ('f', 'a'), ['→', ['~', ['P', 'x']], ['P', 'x']]]
     """
+    _formula_class = PredicateFormula
+
     def __init__(self, language, parse_replacement_dict, unparse_replacement_dict=None, infix_cts=None, infix_pred=None,
-                 infix_func=None, comma_separator=',', inference_separator='/', derivation_step_separator=';'):
+                 infix_func=None, comma_separator=',', inference_separator='/', derivation_step_separator=';',
+                 cache_size=0):
         if infix_pred is None:
             infix_pred = list()
         if infix_func is None:
@@ -92,48 +97,52 @@ class PredicateParser(StandardParser):
         super().__init__(language=language, parse_replacement_dict=parse_replacement_dict,
                          unparse_replacement_dict=unparse_replacement_dict,
                          infix_cts=infix_cts, comma_separator=comma_separator, inference_separator=inference_separator,
-                         derivation_step_separator=derivation_step_separator)
+                         derivation_step_separator=derivation_step_separator, cache_size=cache_size)
 
     # ------------------------------------------------------------------------------------------------------------------
     # PARSE FORMULA METHODS
 
-    def _is_atomic(self, string):
-        """To identify if a string as an atomic formula, check that it does not contain constants and quantifiers"""
-        for quant in self.language.quantifiers:
-            if quant in string:
-                return False
-        for ctt in self.language.constants():
-            if ctt in string:
-                return False
-        return True
+    # Formulae are parsed by StandardParser._parse_formula, which calls the methods below for quantifiers and atomics.
+    # Like formulae, terms are scanned once and parsed top-down with an explicit stack (see _parse_terms)
+
+    def _formula_scan(self, string):
+        arities = {constant: self.language.arity(constant) for constant in self.language.constants()}
+        return _FormulaScan(string, arities, self.infix_cts, self.comma_separator, self.language.quantifiers)
+
+    def _term_scan(self, string):
+        return _FormulaScan(string, dict(), self.infix_func, ',')
+
+    def _is_atomic_range(self, scan, start, end):
+        """Atomic formulae do not contain constants or quantifiers"""
+        return scan.next_constant[start] >= end
+
+    def _parse_atomic_range(self, scan, start, end):
+        return self._parse_atomic(scan.string[start:end])
 
     def _parse_atomic(self, string):
         # First check if it is a sentential constant or a sentential metavariable
         if self.language.is_sentential_constant_string(string) or string in self.language.metavariables:
             return PredicateFormula([string])
 
+        scan = self._term_scan(string)
+
         # Check for an infix predicate
-        # There can only be one, so this will suffice, no need to call parser_utils.get_main_constant
-        infix_predicate = False
+        # There can only be one, so this will suffice, no need to look for the main one
         for pred in self.infix_pred:
-            if pred in string:
-                infix_predicate = True
-                pred_index = string.index(pred)
-                break
-        if infix_predicate:
-            # Infix predicate formulae are always binary
-            return PredicateFormula([pred, self.parse_term(string[:pred_index], replace=False),
-                                     self.parse_term(string[pred_index+len(pred):], replace=False)])
+            pred_index = string.find(pred)
+            if pred_index != -1:
+                # Infix predicate formulae are always binary
+                return PredicateFormula([pred] + self._parse_terms(scan, [(0, pred_index),
+                                                                         (pred_index + len(pred), len(string))]))
 
         # Non-infix predicate
-        for pred in self.language.predicates() | set(self.language.predicate_variables):
-            if string[:len(pred) + 1] == pred + '(':
-                arity = self.language.arity(pred)
-                unparsed_terms = parser_utils.separate_arguments(string[len(pred):], ',')
-                if len(unparsed_terms) != arity:
+        pred = self._prefix_symbol(string, 0, self.language.predicates() | set(self.language.predicate_variables))
+        if pred is not None:
+            arguments = self._argument_ranges(scan, len(pred), len(string))
+            if arguments is not None:
+                if len(arguments) != self.language.arity(pred):
                     raise NotWellFormed(f'Incorrect arity for predicate {pred} in atomic {string}')
-                parsed_arguments = [self.parse_term(term, replace=False) for term in unparsed_terms]
-                return PredicateFormula([pred] + parsed_arguments)
+                return PredicateFormula([pred] + self._parse_terms(scan, arguments))
 
         # If you did not return thus far, string is not a wff
         raise NotWellFormed(f'String {string} is not a valid atomic formula')
@@ -154,141 +163,225 @@ class PredicateParser(StandardParser):
         >>> realnumber_arithmetic_parser.parse_term("(1+(1+2))")
         ('+', '1', ('+', '1', '2'))
         """
-        # If a valid individual variable or constant, return it as it came
         if replace:
             string = self._prepare_to_parse(string)
+        return self._parse_terms(self._term_scan(string), [(0, len(string))])[0]
 
-        if self.language._is_valid_individual_constant_or_variable(string):
-            return string
-
-        # Search for an infix operator
-        # First try adding external parentheses (in order to avoid giving external ones)
-        infix_term = self._parse_infix_term(f'({string})')
-        if infix_term is not None:
-            return infix_term
-        # Then without adding external parentheses
-        infix_term = self._parse_infix_term(string)
-        if infix_term is not None:
-            return infix_term
-
-        # If it did not find infix operators, must be a prefix one
-        for func_symbol in self.language.function_symbols:
-            if string[:len(func_symbol) + 1] == func_symbol + '(':
-                arity = self.language.arity(func_symbol)
-                unparsed_arguments = parser_utils.separate_arguments(string[len(func_symbol):], ',')
-                if len(unparsed_arguments) != arity:
-                    raise NotWellFormed(f'Incorrect arity for function symbol {func_symbol} in term {string}')
-                parsed_arguments = tuple(self.parse_term(term, replace=False) for term in unparsed_arguments)
-                return (func_symbol,) + parsed_arguments
-
-        # If you did not return thus far, string is not a term
-        raise NotWellFormed(f'String {string} is not a valid term')
-
-    def _parse_infix_term(self, string):
-        if not string:
-            return None
-        # If not between parentheses, its something of the form 's(0+0)' and not '(0+0)'
-        if string[0] != '(' or string[-1] != ')':
+    def _parse_terms(self, scan, ranges):
+        """Parses the terms in the given ranges (start, end) of a scanned string and returns them in a list
+
+        A term is an individual constant or variable, a prefix function symbol applied to its arguments between
+        parentheses, or two terms joined by an infix function symbol. The outer parentheses of an infix term are
+        optional, but infix terms inside other infix terms must come between parentheses.
+        """
+        string = scan.string
+        tasks = list(reversed(ranges))  # ranges (start, end) to parse, or (function symbol, number of arguments)
+        parsed = []
+        while tasks:
+            first, second = tasks.pop()
+            if first.__class__ is str:
+                arguments = parsed[len(parsed) - second:]
+                del parsed[len(parsed) - second:]
+                parsed.append((first,) + tuple(arguments))
+                continue
+            start, end = first, second
+
+            # Individual constant or variable
+            if scan.next_bracket[start] >= end and \
+                    self.language._is_valid_individual_constant_or_variable(string[start:end]):
+                parsed.append(string[start:end])
+                continue
+
+            # Infix function symbol, with or without outer parentheses
+            infix_indexes = scan.infix_constant_indexes(start, end) if start < end else []
+            if not infix_indexes and string[start:start + 1] == '(' and scan.closing[start] == end - 1 and \
+                    start in scan.infix_indexes:
+                infix_indexes = scan.infix_indexes[start]
+                start, end = start + 1, end - 1
+            if len(infix_indexes) > 1:
+                raise NotWellFormed(f'({string[start:end]}) contains more than one top-level binary operator')
+            if infix_indexes:
+                func_index = infix_indexes[0]
+                func_symbol = scan.infix_constants[func_index]
+                tasks.extend(((func_symbol, 2), (func_index + len(func_symbol), end), (start, func_index)))
+                continue
+
+            # Prefix function symbol
+            func_symbol = self._prefix_symbol(string, start, self.language.function_symbols)
+            if func_symbol is not None:
+                arguments = self._argument_ranges(scan, start + len(func_symbol), end)
+                if arguments is not None:
+                    if len(arguments) != self.language.arity(func_symbol):
+                        raise NotWellFormed(f'Incorrect arity for function symbol {func_symbol} in term '
+                                            f'{string[start:end]}')
+                    tasks.append((func_symbol, len(arguments)))
+                    tasks.extend(reversed(arguments))
+                    continue
+
+            # If you did not continue thus far, string is not a term
+            raise NotWellFormed(f'String {string[start:end]} is not a valid term')
+        return parsed
+
+    @staticmethod
+    def _prefix_symbol(string, index, symbols):
+        """Returns the longest of the symbols that is followed by an opening parenthesis at `index`, or ``None``"""
+        found = None
+        for symbol in symbols:
+            if string.startswith(symbol + '(', index) and (found is None or len(symbol) > len(found)):
+                found = symbol
+        return found
+
+    @staticmethod
+    def _argument_ranges(scan, opening, end):
+        """If the parenthesis at `opening` closes at the end of the range, returns the ranges of the arguments inside
+        it. Otherwise returns ``None``"""
+        if scan.closing[opening] != end - 1:
             return None
-        infix_function, index = parser_utils.get_main_constant(string, self.infix_func)
-        if infix_function is not None:
-            return (infix_function, self.parse_term(string[1:index], replace=False),
-                    self.parse_term(string[index + len(infix_function):-1], replace=False))
-        return None
-
-    def _parse_molecular(self, string, Formula=PredicateFormula):
-        """Here we need only add the quantifier case and call super"""
-        for quantifier in self.language.quantifiers:
-            # The string begins with the quantifier
-            if string[:len(quantifier)] == quantifier:
-                current_index = len(quantifier)  # The current index is the position after the quantifier
-
-                # Get the variable
-                variable = None
-                for char_index in range(current_index, len(string)):
-                    if self.language._is_valid_variable(string[len(quantifier):char_index+1]):
-                        variable = string[len(quantifier):char_index+1]
-                        current_index = char_index + 1  # The current index is the position after the variable
-                    else:
-                        break
-                if variable is None:
-                    raise NotWellFormed(f'Incorrect variable specification in quantified formula {string}')
-
-                # See if the quantifier is bounded and parse the bound
-                bounded = False
-                if string[current_index] == '∈':
-                    bounded = True
-                    current_index += 1
-                    bound_endind_index = None
-                    for char_index in range(current_index+1, len(string)):
-                        try:
-                            parsed_term = self.parse_term(string[current_index:char_index], replace=False)
-                            bound_endind_index = char_index - 1
-                        except NotWellFormed:
-                            pass
-                    if bound_endind_index is None:
-                        raise NotWellFormed("Incorrect bound for a quantifier")
-                    else:
-                        current_index = bound_endind_index + 1
-
-                # Lastly, parse the formula
-                unparsed_formula = string[current_index:]
-                parsed_formula = self.parse(unparsed_formula)
-
-                if not bounded:
-                    return PredicateFormula([quantifier, variable, parsed_formula])
-                else:
-                    return PredicateFormula([quantifier, variable, '∈', parsed_term, parsed_formula])
-
-        return super()._parse_molecular(string, PredicateFormula)
+        bounds = [opening] + scan.commas.get(opening, []) + [end - 1]
+        return [(bounds[i] + 1, bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+    def _parse_prefix(self, scan, start, end):
+        """Adds quantified formulae, in format ∀x A or ∀x ∈ T A, to the prefixes of StandardParser"""
+        if start in scan.quantifiers:
+            head, body_start = self._parse_quantifier(scan, start, end - 1)
+            return head, [(body_start, end)]
+        return super()._parse_prefix(scan, start, end)
+
+    def _prefix_end(self, scan, start, end):
+        """Quantifiers (along with their variable and bound) also count as unary prefixes"""
+        index = start
+        while index < end:
+            if scan.unary_prefix_end[index] > index:
+                index = scan.unary_prefix_end[index]
+            elif index in scan.quantifiers:
+                try:
+                    index = self._parse_quantifier(scan, index, end)[1]
+                except NotWellFormed:
+                    break
+            else:
+                break
+        return index
+
+    def _parse_quantifier(self, scan, start, limit):
+        """Parses the quantifier at `start` of a scanned string, its variable and its bound (if it has one), which
+        must end before `limit`. Returns the elements that come before the quantified formula and the index where the
+        formula begins"""
+        string = scan.string
+        quantifier = scan.quantifiers[start]
+        index = start + len(quantifier)  # The position after the quantifier
+
+        # The variable is the longest valid one that begins after the quantifier
+        variable = None
+        for char_index in range(index + 1, min(limit + 1, len(string)) + 1):
+            if not self.language._is_valid_variable(string[index:char_index]):
+                break
+            variable = string[index:char_index]
+        if variable is None:
+            raise NotWellFormed(f'Incorrect variable specification in quantified formula at position {start} of '
+                                f'{string}')
+        index += len(variable)
+
+        # See if the quantifier is bounded and parse the bound
+        if string.startswith('∈', index):
+            bound, index = self._parse_bound(scan, index + 1, limit)
+            return (quantifier, variable, '∈', bound), index
+        return (quantifier, variable), index
+
+    def _parse_bound(self, scan, start, limit):
+        """Parses the longest term that begins at `start` of a scanned formula string and ends before `limit`.
+        Returns the term and the index where it ends"""
+        string = scan.string
+        # Where the terms that do not contain an infix function symbol at the top level can end
+        infix_ends = []
+        candidates = []
+        for end in self._simple_term_ends(scan, start, limit):
+            candidates.append(end)
+            for func_symbol in self.infix_func:
+                if string.startswith(func_symbol, end):
+                    infix_ends.extend(self._simple_term_ends(scan, end + len(func_symbol), limit))
+        for end in sorted(set(candidates + infix_ends), reverse=True):
+            try:
+                return self._parse_terms(self._term_scan(string[start:end]), [(0, end - start)])[0], end
+            except NotWellFormed:
+                pass
+        raise NotWellFormed(f'Incorrect bound for a quantifier at position {start} of {string}')
+
+    def _simple_term_ends(self, scan, start, limit):
+        """Indexes where a term beginning at `start` and not containing infix function symbols (except between
+        parentheses) could end"""
+        string = scan.string
+        if start >= limit:
+            return []
+        if string[start] == '(':
+            return [scan.closing[start] + 1] if scan.closing[start] < limit else []
+        func_symbol = self._prefix_symbol(string, start, self.language.function_symbols)
+        if func_symbol is not None:
+            closing = scan.closing[start + len(func_symbol)]
+            return [closing + 1] if closing < limit else []
+        # Individual constant or variable
+        stop = min(scan.next_special[start], limit)
+        for symbol in self.infix_pred + ['∈']:
+            symbol_index = string.find(symbol, start, stop)
+            if symbol_index != -1:
+                stop = symbol_index
+        return [end for end in range(start + 1, stop + 1)
+                if self.language._is_valid_individual_constant_or_variable(string[start:end])]
 
     # ------------------------------------------------------------------------------------------------------------------
     # UNPARSE FORMULA METHODS
 
     def _unparse_term(self, term, add_parentheses=False):
+        fragments = list()
+        self._write_formula(term, fragments, self._unparse_table(), add_parentheses, self._term_fragments)
+        return ''.join(fragments)
+
+    def _term_fragments(self, term, add_parentheses, table):
         # Atomic term
         if not isinstance(term, tuple):
             return term
         # Molecular term (function symbol with arguments)
         # Prefix function symbol
         if term[0] not in self.infix_func:
-            unparsed_term = term[0] + '('
+            fragments = [term[0] + '(']
             for arg in term[1:]:
-                unparsed_term += self._unparse_term(arg) + ', '
-            return unparsed_term[:-2] + ')'
+                fragments.append((self._term_fragments, arg, False))
+                fragments.append(', ')
+            fragments[-1] = ')'
+            return fragments
         # Infix (and thus binary) function symbol
-        else:
-            if not add_parentheses:
-                return f'{self._unparse_term(term[1], True)} {term[0]} {self._unparse_term(term[2], True)}'
-            else:
-                # Infix terms inside other infix terms must come between parentheses
-                return f'({self._unparse_term(term[1], True)} {term[0]} {self._unparse_term(term[2], True)})'
-
-    def _unparse_atomic(self, formula):
-        # Sentential constant or sentential metavariable (atomic formula of length 1)
-        if len(formula) == 1:
-            return formula[0]
-        # Prefix predicate symbol
-        if formula[0] not in self.infix_pred:
-            unparsed_formula = formula[0] + '('
-            for arg in formula[1:]:
-                unparsed_formula += self._unparse_term(arg) + ', '
-            return unparsed_formula[:-2] + ')'
-        # Infix (and thus binary) predicate symbol
-        return f'{self._unparse_term(formula[1])} {formula[0]} {self._unparse_term(formula[2])}'
-
-    def _unparse_molecular(self, formula, remove_external_parentheses):
+        # Infix terms inside other infix terms must come between parentheses
+        fragments = [(self._term_fragments, term[1], True), f' {term[0]} ', (self._term_fragments, term[2], True)]
+        if add_parentheses:
+            return ['('] + fragments + [')']
+        return fragments
+
+    def _formula_fragments(self, formula, remove_external_parentheses, table):
         # Quantified formula
-        if formula.main_symbol in self.language.quantifiers:
+        if formula[0] in self.language.quantifiers:
             # Bounded
             if formula[2] == '∈':
-                return f'{formula[0]}{formula[1]} ∈ {self._unparse_term(formula[3])} ' \
-                       f'{self._unparse_formula(formula[4], remove_external_parentheses=False)}'
+                return [f'{formula[0]}{formula[1]} ∈ ', (self._term_fragments, formula[3], False), ' ',
+                        (self._formula_fragments, formula[4], False)]
             # Unbounded
-            return f'{formula[0]}{formula[1]} {self._unparse_formula(formula[2], remove_external_parentheses=False)}'
+            return [f'{formula[0]}{formula[1]} ', (self._formula_fragments, formula[2], False)]
+
+        # Predicate formula. Sentential constants and sentential metavariables (atomic formulae of length 1) are
+        # handled by super
+        if len(formula) > 1 and formula.is_atomic:
+            # Prefix predicate symbol
+            if formula[0] not in self.infix_pred:
+                fragments = [formula[0] + '(']
+                for arg in formula[1:]:
+                    fragments.append((self._term_fragments, arg, False))
+                    fragments.append(', ')
+                fragments[-1] = ')'
+                return fragments
+            # Infix (and thus binary) predicate symbol
+            return [(self._term_fragments, formula[1], False), f' {formula[0]} ',
+                    (self._term_fragments, formula[2], False)]
 
         # Non-quantified formula
-        return super()._unparse_molecular(formula, remove_external_parentheses)
+        return super()._formula_fragments(formula, remove_external_parentheses, table)
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -306,6 +399,8 @@ class ArithmeticTruthParser(PredicateParser):
         The function with which you wish to encode sentences inside Tr predicates
     godel_decoding_function: callable
         The function with which you wish to decode sentences inside Tr predicates
+    code_cache_size: int, optional
+        Number of formulae returned by `parse_code` that are cached. By default 1024
     everything_else_in_PredicateParser
         Everything else present in the parent PredicateParser class
 
@@ -341,12 +436,48 @@ class ArithmeticTruthParser(PredicateParser):
     >>> arithmetic_truth_parser.parse('λ iff ~Tr(⌜λ⌝)')
     ['↔', ['λ'], ['~', ['Tr', '79999']]]
     """
-    def __init__(self, godel_encoding_function, godel_decoding_function, *args, **kwargs):
+    def __init__(self, godel_encoding_function, godel_decoding_function, *args, code_cache_size=1024, **kwargs):
         # These are two functions that take a string (an UNPARSED formula) and return another string (its code)
         self.godel_encode = godel_encoding_function
         self.godel_decode = godel_decoding_function
+        self._code_cache = parser_utils.LRUCache(code_cache_size) if code_cache_size else None
         super().__init__(*args, **kwargs)
 
+    def parse_code(self, code, copy=True):
+        """Decodes a Godel code (such as the argument of a Tr predicate) and parses the formula it codes
+
+        The formulae are cached by code (see the `code_cache_size` parameter), so that the model theory can evaluate
+        the same coded sentences many times without decoding and parsing them again. If `copy` is ``False``, the
+        cached formula itself is returned, and it must not be modified.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers.predicate_parser import arithmetic_truth_parser
+        >>> arithmetic_truth_parser.parse_code('04908990')
+        ['=', '0', ('+', '0', '0')]
+        >>> arithmetic_truth_parser.parse_code(arithmetic_truth_parser.parse('Tr(⌜Tr(⌜0=0⌝)⌝)')[1])
+        ['Tr', '0490']
+        """
+        if self._code_cache is None:
+            return self.parse(self.godel_decode(code))
+        formula = self._code_cache.get(code)
+        if formula is None:
+            formula = self.parse(self.godel_decode(code))
+            self._code_cache.put(code, formula)
+        return deepcopy(formula) if copy else formula
+
+    def cache_info(self):
+        """Same as in ``StandardParser``, also with the statistics of the `parse_code` cache (under ``'code'``)"""
+        info = super().cache_info()
+        info['code'] = self._code_cache.info() if self._code_cache is not None else None
+        return info
+
+    def cache_clear(self):
+        """Same as in ``StandardParser``, also empties the `parse_code` cache"""
+        super().cache_clear()
+        if self._code_cache is not None:
+            self._code_cache.clear()
+
     def _prepare_to_parse(self, string):
         """Replaces quote(sentence) for code_of_sentence"""
         string = super()._prepare_to_parse(string)
@@ -354,17 +485,29 @@ class ArithmeticTruthParser(PredicateParser):
         return string
 
     def _remove_quotations(self, string):
-        # Search for the first apparition of quote and encode the content
-        while 'quote(' in string:
-            opening_parenthesis_index = string.index('quote(') + 5  # index of the opening parenthesis
+        # Search for each apparition of quote and encode the content. Quotes inside it are encoded with the rest
+        pieces = list()
+        index = 0
+        quote_index = string.find('quote(')
+        while quote_index != -1:
+            opening_parenthesis_index = quote_index + 5  # index of the opening parenthesis
             # Get where the closing parenthesis is
-            closing_parenthesis_index = parser_utils.get_closing_parenthesis(string[opening_parenthesis_index:]) \
-                                        + opening_parenthesis_index
-            string_to_encode = string[opening_parenthesis_index+1:closing_parenthesis_index]
-            codified_string = self.godel_encode(string_to_encode)
-            string = string[:string.index('quote(')] + codified_string + string[closing_parenthesis_index+1:]
-
-        return string
+            depth = 0
+            for closing_parenthesis_index in range(opening_parenthesis_index, len(string)):
+                if string[closing_parenthesis_index] == '(':
+                    depth += 1
+                elif string[closing_parenthesis_index] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+            else:
+                raise NotWellFormed(f'Unclosed quotation at position {quote_index} of {string}')
+            pieces.append(string[index:quote_index])
+            pieces.append(self.godel_encode(string[opening_parenthesis_index+1:closing_parenthesis_index]))
+            index = closing_parenthesis_index + 1
+            quote_index = string.find('quote(', index)
+        pieces.append(string[index:])
+        return ''.join(pieces)
 
     def _parse_atomic(self, string):
         """Since codes are numerals like 514951 and not s(s(...)) we need to provide a special clause for the truth pred
@@ -1,8 +1,10 @@
-from copy import copy
+from bisect import bisect_left
+from copy import copy, deepcopy
 
 from logics.classes.propositional import Formula, Inference
 from logics.classes.propositional.proof_theories import Derivation, DerivationStep, NaturalDeductionStep, \
     Sequent
+from logics.classes.errors import CorrectionError, ErrorCode
 from logics.classes.exceptions import NotWellFormed
 from logics.utils.parsers import parser_utils
 
@@ -33,6 +35,9 @@ class StandardParser:
         Character (preferrably of len 1) used to separate the two sides of a two-sided sequent
     n_sided_sequent_separator: str, optional
         Character (preferrably of len 1) used to separate the sides of an n-sided sequent
+    cache_size: int, optional
+        Number of results of `parse` and `unparse` that are kept in (separate) caches. By default 0, i.e. nothing is
+        cached. See ``set_cache_size`` below
 
     Examples
     --------
@@ -103,9 +108,11 @@ class StandardParser:
     >>> classical_parser.unparse(f)
     '(p ≡ q) ∧ (q ⊃ r)'
     """
+    _formula_class = Formula
+
     def __init__(self, language, parse_replacement_dict=None, unparse_replacement_dict=None, infix_cts=None,
                  comma_separator=',', inference_separator='/', derivation_step_separator=';',
-                 two_sided_sequent_separator='⇒', n_sided_sequent_separator='|'):
+                 two_sided_sequent_separator='⇒', n_sided_sequent_separator='|', cache_size=0):
         if infix_cts is None:
             infix_cts = list()
         if parse_replacement_dict is None:
@@ -121,6 +128,7 @@ class StandardParser:
         self.derivation_step_separator = derivation_step_separator
         self.two_sided_sequent_separator = two_sided_sequent_separator
         self.n_sided_sequent_separator = n_sided_sequent_separator
+        self.set_cache_size(cache_size)
 
     # ------------------------------------------------------------------------------------------------------------------
     # PUBLIC METHODS
@@ -138,6 +146,22 @@ class StandardParser:
         This is to avoid ambiguity, since, for example ``'p / q, r / s //'`` could be read as
         ``'(p / q, r) (/ s) //'``, ``'(p / q), (r / s) //'`` or ``'(p /) (q, r / s) //'``)
         """
+        if replace and self._parse_cache is not None:
+            cache = self._parse_cache
+            # Results depend on the replacement dict, which may have been modified since they were cached
+            replacements = self._replacement_function(self.parse_replacement_dict, self.inference_separator, True)
+            if replacements is not self._parse_cache_replacements:
+                cache.clear(statistics=False)
+                self._parse_cache_replacements = replacements
+            result = cache.get(string)
+            if result is None:
+                result = self._parse(string, replace)
+                cache.put(string, result)
+            # The cached result is never handed out, so that callers cannot modify it
+            return deepcopy(result)
+        return self._parse(string, replace)
+
+    def _parse(self, string, replace):
         if not string:
             raise NotWellFormed('An empty string is neither a formula nor an inference')
 
@@ -147,42 +171,106 @@ class StandardParser:
         if self.two_sided_sequent_separator in string or self.n_sided_sequent_separator in string:
             return self._parse_sequent(string)
 
-        # In both cases, the try block is a trick in order to be able to avoid adding external parentheses
         if self.inference_separator in string:
-            if replace:  # For inferences, it only tries adding external parentheses in the first recursive call
-                try:
-                    return self._parse_inference('(' + string + ')')
-                except NotWellFormed:
-                    return self._parse_inference(string)
-            else:
-                return self._parse_inference(string)
+            # For inferences, the external parentheses are added (only in the first recursive call) unless the whole
+            # string already comes between a pair of them
+            if replace and not (string[0] == '(' and parser_utils.get_closing_parenthesis(string) == len(string) - 1):
+                string = '(' + string + ')'
+            return self._parse_inference(string)
         else:
-            try:
-                return self._parse_formula('(' + string + ')')
-            except Exception:
-                return self._parse_formula(string)
+            # The external parentheses of formulae are optional
+            return self._parse_formula(string)
 
     def unparse(self, logics_object, first_iteration=True):
         """Takes an object (Formula, Inference or Sequent) and returns a readable string version of it.
 
         The `first_iteration` parameter is for recursion purposes and should not be altered.
         """
-        # Sequent
-        if isinstance(logics_object, Sequent):
-            unparsed_object = self._unparse_sequent(logics_object)
-        # Inference
-        elif isinstance(logics_object, Inference):
-            if first_iteration:
-                unparsed_object =  self._unparse_inference(logics_object)[1:-1]
-            else:
-                unparsed_object =  self._unparse_inference(logics_object)
-        # Formula or PredicateFormula
+        if first_iteration and self._unparse_cache is not None:
+            cache = self._unparse_cache
+            replacements = self._replacement_function(self.unparse_replacement_dict)
+            if replacements is not self._unparse_cache_replacements:
+                cache.clear(statistics=False)
+                self._unparse_cache_replacements = replacements
+            # Objects are cached by identity, along with a copy, since they can be modified after being unparsed
+            entry = cache.get(id(logics_object),
+                              is_valid=lambda entry: entry[0] is logics_object and entry[1] == logics_object)
+            if entry is not None:
+                return entry[2]
+            result = self._unparse(logics_object, first_iteration)
+            cache.put(id(logics_object), (logics_object, deepcopy(logics_object), result))
+            return result
+        return self._unparse(logics_object, first_iteration)
+
+    def _unparse(self, logics_object, first_iteration):
+        fragments = list()
+        self._write_object(logics_object, fragments, self._unparse_table(), first_iteration)
+        return self._post_unparse(''.join(fragments))
+
+    def unparse_many(self, logics_objects):
+        """Unparses every object (Formula, Inference or Sequent) of an iterable, and returns the list of strings.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> classical_parser.unparse_many([classical_parser.parse('p and q'), classical_parser.parse('p / ~p')])
+        ['p ∧ q', 'p / ~p']
+        """
+        table = self._unparse_table()
+        post_unparse = self._replacement_function(self.unparse_replacement_dict)
+        unparsed_objects = list()
+        for logics_object in logics_objects:
+            fragments = list()
+            self._write_object(logics_object, fragments, table)
+            unparsed_objects.append(post_unparse(''.join(fragments)))
+        return unparsed_objects
+
+    def set_cache_size(self, cache_size):
+        """Sets how many results of `parse` and `unparse` are cached. With 0 (the default when building a parser) no
+        results are cached.
+
+        Strings given to `parse` are cached as they come, and the objects given to `unparse` by identity (a modified
+        object will be unparsed again). `parse` returns a copy of the cached result, which can be safely modified. If
+        you modify the language of the parser, call ``cache_clear``.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers.standard_parser import StandardParser
+        >>> from logics.instances.propositional.languages import classical_infinite_language
+        >>> parser = StandardParser(language=classical_infinite_language, infix_cts=['∧', '∨'], cache_size=100)
+        >>> f = parser.parse('p ∧ q')
+        >>> f = parser.parse('p ∧ q')
+        >>> f[0] = '∨'  # does not modify the cached result
+        >>> parser.parse('p ∧ q')
+        ['∧', ['p'], ['q']]
+        >>> parser.cache_info()['parse']
+        CacheInfo(hits=2, misses=1, maxsize=100, currsize=1)
+        >>> parser.set_cache_size(0)
+        >>> parser.cache_info()
+        {'parse': None, 'unparse': None}
+        """
+        if cache_size:
+            self._parse_cache = parser_utils.LRUCache(cache_size)
+            self._unparse_cache = parser_utils.LRUCache(cache_size)
         else:
-            unparsed_object =  self._unparse_formula(logics_object)
-
-        return self._post_unparse(unparsed_object)
-
-    def parse_derivation(self, string, natural_deduction=False):
+            self._parse_cache = None
+            self._unparse_cache = None
+        self._parse_cache_replacements = None
+        self._unparse_cache_replacements = None
+
+    def cache_info(self):
+        """Returns a dict with the statistics (``CacheInfo(hits, misses, maxsize, currsize)``) of the `parse` and
+        `unparse` caches, or ``None`` if they are disabled"""
+        return {'parse': self._parse_cache.info() if self._parse_cache is not None else None,
+                'unparse': self._unparse_cache.info() if self._unparse_cache is not None else None}
+
+    def cache_clear(self):
+        """Empties the `parse` and `unparse` caches (if enabled) and resets their statistics"""
+        for cache in (self._parse_cache, self._unparse_cache):
+            if cache is not None:
+                cache.clear()
+
+    def parse_derivation(self, string, natural_deduction=False, previous=None, changed_lines=None):
         """Parse an axiomatic or natural deduction derivation
 
         `string` must come in the following format:
@@ -201,13 +289,148 @@ class StandardParser:
 
         Can also parse Natural deduction derivations, with steps have one extra element for the open suppositions, e.g.:
         ``"p → p; mp; [3, 4]; [1, 2]"``. For that, set `natural_deduction` to True.
+
+        To parse a derivation again after editing it, give the result of parsing it before the edit as `previous`, and
+        the lines that were edited as `changed_lines`, a pair ``(start, stop)`` meaning that the lines from `start` to
+        ``stop - 1`` (0-based, i.e. the steps of `previous` with those indexes) were replaced by any number of lines.
+        Only the lines that replaced them are parsed, the rest of the steps are taken from `previous` (they are the
+        same objects).
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> derivation = classical_parser.parse_derivation('''p; premise
+        ... q; premise
+        ... p ∧ q; I∧; [0, 1]; []''', natural_deduction=True)
+        >>> new_derivation = classical_parser.parse_derivation('''p; premise
+        ... q; premise
+        ... r; premise
+        ... p ∧ q; I∧; [0, 1]; []''', natural_deduction=True, previous=derivation, changed_lines=(2, 2))
+        >>> len(new_derivation)
+        4
+        >>> new_derivation[2]
+        ['r']; premise; []; []
+        >>> new_derivation[3] is derivation[2]
+        True
+        """
+        if previous is None:
+            return Derivation(self.iter_parse_derivation(string, natural_deduction))
+        if changed_lines is None:
+            raise ValueError('changed_lines must be given along with the previous derivation')
+
+        start, stop = changed_lines
+        string_list = string.strip().split('\n')
+        new_stop = len(string_list) - (len(previous) - stop)
+        if not 0 <= start <= stop <= len(previous) or new_stop < start:
+            raise ValueError(f'Lines {start} to {stop} of a derivation of {len(previous)} steps cannot have been '
+                             f'replaced to obtain a derivation of {len(string_list)} steps')
+        changed_steps = self.iter_parse_derivation(string_list[start:new_stop], natural_deduction)
+        return Derivation([*previous[:start], *changed_steps, *previous[stop:]])
+
+    def iter_parse_derivation(self, string_or_lines, natural_deduction=False):
+        """Same as `parse_derivation`, but yields the steps one by one instead of returning a Derivation.
+
+        `string_or_lines` can be a multiline string, or any iterable of lines (e.g. an open file), in which case
+        blank lines are skipped. Only the current line is kept in memory, so this can be used on long derivations.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> steps = classical_parser.iter_parse_derivation(['p; premise', 'p ∨ q; I∨; [0]; []'], natural_deduction=True)
+        >>> next(steps)
+        ['p']; premise; []; []
+        >>> next(steps)
+        ['∨', ['p'], ['q']]; I∨; [0]; []
         """
-        derivation = []
-        string = string.strip()  # remove trailing whitespace
-        string_list = string.split('\n')
+        if isinstance(string_or_lines, str):
+            string_list = string_or_lines.strip().split('\n')  # remove trailing whitespace
+        else:
+            string_list = (line for line in string_or_lines if line.strip())
         for string_step in string_list:
-            derivation.append(self._parse_derivation_step(string_step.strip(), natural_deduction))
-        return Derivation(derivation)
+            yield self._parse_derivation_step(string_step.strip(), natural_deduction)
+
+    def iter_parse(self, file_or_lines, kind='auto', on_error='raise', workers=None, chunk_size=1000):
+        """Parses the lines of a file (or any iterable of strings) one by one, yielding the parsed objects in order.
+
+        Blank lines are skipped. Only the objects of the current chunk (see below) are kept in memory, so this can be
+        used on files of any size.
+
+        Parameters
+        ----------
+        file_or_lines: file or iterable of str
+            An open (text) file, a list of lines, etc. A str is taken as a multiline text, not as a file path
+        kind: str, optional
+            ``'auto'`` (the default) parses each line with `parse`. ``'formula'``, ``'inference'`` and ``'sequent'`` do
+            the same but take any object of another type as an error. ``'derivation'`` and ``'natural_deduction'``
+            parse each block of lines (separated by blank lines) with `parse_derivation`
+        on_error: str, optional
+            What to do with the lines that cannot be parsed. ``'raise'`` (the default) raises NotWellFormed, with the
+            number of the line in the message. ``'skip'`` ignores them. ``'collect'`` yields a
+            ``logics.classes.errors.CorrectionError`` in their place, whose `index` is the number of the line
+        workers: int, optional
+            If given, the lines are parsed in chunks of `chunk_size` lines by a pool of `workers` processes (the parser
+            must be picklable). The objects are still yielded in order
+        chunk_size: int, optional
+            Number of lines (or derivations) in each chunk given to the workers
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> lines = ['p / p', '', 'p &', '~(p or q)']
+        >>> for parsed in classical_parser.iter_parse(lines, on_error='collect'):
+        ...     print(parsed)
+        ([['p']] / [['p']])
+        3: p∧ is not a well-formed propositional formula for the language given (at position 0 of p∧)
+        ['~', ['∨', ['p'], ['q']]]
+        >>> list(classical_parser.iter_parse(lines, on_error='skip', kind='formula'))
+        [['~', ['∨', ['p'], ['q']]]]
+        """
+        if kind not in self._iter_parse_kinds:
+            raise ValueError(f'kind must be one of {", ".join(self._iter_parse_kinds)}')
+        if on_error not in ('raise', 'skip', 'collect'):
+            raise ValueError("on_error must be one of 'raise', 'skip' or 'collect'")
+
+        if isinstance(file_or_lines, str):
+            file_or_lines = file_or_lines.split('\n')
+        items = parser_utils.numbered_blocks(file_or_lines) if kind in ('derivation', 'natural_deduction') else \
+            parser_utils.numbered_lines(file_or_lines)
+
+        if workers is None:
+            results = (self._parse_numbered_item(item, kind) for item in items)
+        else:
+            parsed_chunks = parser_utils.map_in_processes(_parse_chunk, parser_utils.chunks(items, chunk_size), workers,
+                                                          initializer=_set_worker_parser, initargs=(self, kind))
+            results = (result for parsed_chunk in parsed_chunks for result in parsed_chunk)
+
+        for line_number, parsed, error in results:
+            if error is None:
+                yield parsed
+            elif on_error == 'raise':
+                raise NotWellFormed(f'Line {line_number}: {error}')
+            elif on_error == 'collect':
+                code = ErrorCode.GEN_MALFORMED_INFERENCE if kind == 'inference' else ErrorCode.GEN_MALFORMED_FORMULA
+                yield CorrectionError(code=code, index=line_number, description=error)
+
+    _iter_parse_kinds = ('auto', 'formula', 'inference', 'sequent', 'derivation', 'natural_deduction')
+
+    def _parse_numbered_item(self, item, kind):
+        """Parses an item (number of line, string) given by iter_parse. Returns (number of line, parsed object, error),
+        where either the object or the error (a string) is None"""
+        line_number, string = item
+        try:
+            if kind in ('derivation', 'natural_deduction'):
+                parsed = self.parse_derivation(string, natural_deduction=kind == 'natural_deduction')
+            else:
+                parsed = self.parse(string)
+                if kind != 'auto':
+                    parsed_kind = 'sequent' if isinstance(parsed, Sequent) else \
+                        'inference' if isinstance(parsed, Inference) else 'formula'
+                    if parsed_kind != kind:
+                        raise NotWellFormed(f'{string} is a {parsed_kind}, not a {kind}')
+        except (NotWellFormed, ValueError, SyntaxError) as error:
+            # ValueError and SyntaxError come from ill-formed derivation steps (e.g. their lists of steps)
+            return line_number, None, str(error)
+        return line_number, parsed, None
 
     def to_latex(self, formula_or_inference):
         # todo someone with better knowledge of LaTeX than I should do this
@@ -226,39 +449,28 @@ class StandardParser:
         """Prepares a string to be parsed. For example, replaces & for ∧,  deletes whitespaces, etc.
 
         E.g. will turn '(p / q & p) // q' into '(p/1]q∧p)/2]q'
+
+        Replaces / for /1], // for /2], /// for /3] etc, for things like '/ // /', since we'll delete whitespaces
+        and we do not want to return the metainference '////'. The ] at the end is for the PredicateParser, since we
+        could give the string /1+1=2 and we do not want that turned into /11+1=2, taken as an inference of level 11.
+
+        Everything is done in a single pass over the string (see ``parser_utils.Replacements``)
         """
-        # First it replaces the expressions in the dict
-        for expression in self.parse_replacement_dict:
-            string = string.replace(expression, self.parse_replacement_dict[expression])
-
-        # Then replaces / for /1], // for /2], /// for /3] etc, for things like '/ // /', since we'll delete whitespaces
-        # and we do not want to return the metainference '////'
-        # The ] at the end is for the PredicateParser, since we could give the string /1+1=2 and we do not want that
-        # turned into /11+1=2, taken as an inference of level 11
-        if self.inference_separator in string:
-            separator_level = 0
-            # This loop has to go backwards since we will be modifying the string
-            for char_index in range(len(string) - 1, -1, -1):
-                if string[char_index] == self.inference_separator:  # It found an inference separator at the right
-                    separator_level += 1
-                    # if there are further separators at the left
-                    if char_index > 0 and string[char_index - 1] == self.inference_separator:
-                        pass
-                    else:  # If not, replace the following for the separator level
-                        string = string[:char_index + 1] + str(separator_level) + ']' + \
-                                 string[char_index+1+separator_level-1:]
-                        separator_level = 0  # reset the separator level
-
-        # Lastly, deletes whitespaces
-        string = string.replace(' ', '')
-
-        return string
+        return self._replacement_function(self.parse_replacement_dict, self.inference_separator, True)(string)
 
     def _post_unparse(self, string):
         """Runs after unparsing an object"""
-        for expression in self.unparse_replacement_dict:
-            string = string.replace(expression, self.unparse_replacement_dict[expression])
-        return string
+        return self._replacement_function(self.unparse_replacement_dict)(string)
+
+    def _replacement_function(self, replacement_dict, separator=None, remove_whitespace=False):
+        # The replacement dicts can be modified after the parser is built, so the compiled replacements are kept along
+        # with the contents they were compiled from
+        cache = self.__dict__.setdefault('_replacements', dict())
+        replacements = cache.get((separator, remove_whitespace))
+        if replacements is None or replacements.replacement_dict != replacement_dict:
+            replacements = parser_utils.Replacements(replacement_dict, separator, remove_whitespace)
+            cache[(separator, remove_whitespace)] = replacements
+        return replacements
 
     # ------------------------------------------------------------------------------------------------------------------
     # FORMULAE
@@ -266,12 +478,110 @@ class StandardParser:
     def _parse_formula(self, string):
         """Takes a string (prepared by the methods above) and returns an instance of Formula
 
-        Formulae with binary constants must come between parentheses (see the trick above to avoid the outermost ones)
+        Formulae with binary infix constants must come between parentheses, except for the outermost ones, and the
+        outermost ones of the arguments of unary and prefix constants, which are optional.
+
+        The string is scanned once (see ``_FormulaScan``) and then parsed top-down without slicing or backtracking, so
+        parsing takes time linear in the length of the string. Subformulae are processed with an explicit stack, so
+        deeply nested formulae do not hit the recursion limit.
         """
-        # Atomics go back directly
-        if self._is_atomic(string):
-            return self._parse_atomic(string)
-        return self._parse_molecular(string)
+        scan = self._formula_scan(string)
+        # Ranges (start, end) of the string to parse, or (head, number of arguments). The head is a constant or a tuple
+        # of the elements that come before the arguments (e.g. a quantifier and its variable)
+        tasks = [(0, len(string))]
+        parsed = []
+        while tasks:
+            first, second = tasks.pop()
+            if first.__class__ is not int:
+                # Every argument is already parsed, build the molecular formula
+                arguments = parsed[len(parsed) - second:]
+                del parsed[len(parsed) - second:]
+                head = [first] if first.__class__ is str else list(first)
+                parsed.append(self._formula_class(head + arguments))
+                continue
+            start, end = first, second
+            if start >= end:
+                raise NotWellFormed(f'Expected a formula at position {start} of {string}')
+
+            # A binary infix formula whose outer parentheses were omitted. The part to the left of the constant must
+            # not be a sequence of unary constants, since then the infix constant is written in prefix notation
+            # e.g. '~∧(p,q)'
+            constant_index = scan.infix_constant_index(start, end)
+            if constant_index is not None:
+                constant = scan.infix_constants[constant_index]
+                if constant_index + len(constant) < end and self._prefix_end(scan, start, constant_index) < \
+                        constant_index:
+                    tasks.extend(((constant, 2), (constant_index + len(constant), end), (start, constant_index)))
+                    continue
+
+            # Atomic
+            if self._is_atomic_range(scan, start, end):
+                parsed.append(self._parse_atomic_range(scan, start, end))
+                continue
+
+            # Unary or prefix >1-arity constant
+            prefixed = self._parse_prefix(scan, start, end)
+            if prefixed is not None:
+                head, argument_ranges = prefixed
+                tasks.append((head, len(argument_ranges)))
+                tasks.extend(reversed(argument_ranges))
+                continue
+
+            # Binary infix formula between parentheses
+            if string[start] == '(' and scan.closing[start] == end - 1:
+                infix_indexes = scan.infix_indexes.get(start, [])
+                if len(infix_indexes) > 1:
+                    raise NotWellFormed(f'{string[start:end]} contains more than one top-level binary operator '
+                                        f'(at position {infix_indexes[1]} of {string})')
+                if infix_indexes:
+                    constant_index = infix_indexes[0]
+                    constant = scan.infix_constants[constant_index]
+                    tasks.extend(((constant, 2), (constant_index + len(constant), end - 1),
+                                  (start + 1, constant_index)))
+                    continue
+
+            raise NotWellFormed(f'{string[start:end]} is not a well-formed propositional formula for the language '
+                                f'given (at position {start} of {string})')
+        return parsed[0]
+
+    def _formula_scan(self, string):
+        arities = {constant: self.language.arity(constant) for constant in self.language.constants()}
+        return _FormulaScan(string, arities, self.infix_cts, self.comma_separator)
+
+    def _prefix_end(self, scan, start, end):
+        """Index where the sequence of unary constants beginning at `start` ends (`end` at most)"""
+        return scan.unary_prefix_end[start]
+
+    def _is_atomic_range(self, scan, start, end):
+        return scan.next_special[start] >= end
+
+    def _parse_atomic_range(self, scan, start, end):
+        atomic = scan.string[start:end]
+        if self._is_atomic(atomic):
+            return self._parse_atomic(atomic)
+        raise NotWellFormed(f'{atomic} is not a well-formed propositional formula for the language given '
+                            f'(at position {start} of {scan.string})')
+
+    def _parse_prefix(self, scan, start, end):
+        """If the formula between `start` and `end` begins with a unary constant, or is a >1-arity constant written in
+        prefix notation, returns the constant and the ranges of its arguments. Otherwise returns ``None``"""
+        string = scan.string
+        constant = scan.constants.get(start)
+        if constant is None:
+            return None
+        arity = scan.arities[constant]
+        if arity == 1:
+            return constant, [(start + len(constant), end)]
+        opening = start + len(constant)
+        if opening < end and string[opening] == '(':
+            if scan.closing[opening] != end - 1:
+                raise NotWellFormed(f'The arguments of {constant} at position {start} of {string} must '
+                                    f'come between parentheses')
+            bounds = [opening] + scan.commas.get(opening, []) + [end - 1]
+            if len(bounds) - 1 != arity:
+                raise NotWellFormed(f'Incorrect arity for constant {constant} at position {start} of {string}')
+            return constant, [(bounds[i] + 1, bounds[i + 1]) for i in range(arity)]
+        return None
 
     def _is_atomic(self, string):
         """In propositional languages, atomics are either propositional letters, metavariables or
@@ -282,71 +592,96 @@ class StandardParser:
     def _parse_atomic(self, string):
         return Formula([string])
 
-    def _parse_molecular(self, string, Formula=Formula):
-        # Formula is a parameter for the formula class, by default Formula. The predicate parser will call this with
-        # Formula = PredicateFormula
-
-        # Unary, prefix binary or >1-arity (prefix) constant
-        # Check to see if it begins with any of the constants (infix case)
-        for constant in self.language.constants():
-            arity = self.language.arity(constant)
-
-            # Unary constants do not add parenthesis
-            if arity == 1 and string[:len(constant)] == constant:
-                return Formula([constant, self.parse(string[len(constant):], replace=False)])
-
-            # >1-arity constants written in infix notation
-            if string[:len(constant)+1] == constant + '(':  # The string begins with 'constant('
-                # Otherwise, separate the arguments that come between () and parse each one
-                arguments = parser_utils.separate_arguments(string[len(constant):], self.comma_separator)
-                if len(arguments) != arity:
-                    raise NotWellFormed(f'Incorrect arity for constant {constant} in string {string}')
-                parsed_arguments = [self.parse(arg, replace=False) for arg in arguments]
-                return Formula([constant] + parsed_arguments)
-
-        # Binary infix formula
-        # If the string begins and ends with parenthesis, it can be a binary infix formula
-        if string[0] == '(' and string[-1] == ')':
-            binary_ct, binary_ct_index = parser_utils.get_main_constant(string, self.infix_cts)
-            if binary_ct is not None:
-                return Formula([binary_ct, self.parse(string[1:binary_ct_index], replace=False),
-                                self.parse(string[binary_ct_index + len(binary_ct):-1], replace=False)])
-
-        # If we did not return until now, we are in presence of something that is not a wff
-        raise NotWellFormed(string + " is not a well-formed propositional formula for the language given")
-
     def _unparse_formula(self, formula, remove_external_parentheses=True):
         """Turns a Formula back into a readable string
         e.g. Formula('∨', Formula(['q']), Formula(['p'])) is turned into 'q ∨ p'
         """
+        fragments = list()
+        self._write_formula(formula, fragments, self._unparse_table(), remove_external_parentheses)
+        return ''.join(fragments)
+
+    def _unparse_table(self):
+        """Returns a dict {constant: (kind, fragment)}, where kind is 'unary', 'infix' or 'prefix' and fragment is the
+        string that is written for the constant (e.g. ' ∧ ' or '→('). Rebuilt only if the constants change"""
+        table_key = (self.language.constant_arity_dict, self.infix_cts)
+        cached = self.__dict__.get('_unparse_table_cache')
+        if cached is not None and cached[0] == table_key:
+            return cached[1]
+        table = dict()
+        for constant, arity in self.language.constant_arity_dict.items():
+            if arity == 1:
+                table[constant] = ('unary', constant)
+            elif constant in self.infix_cts:
+                table[constant] = ('infix', f' {constant} ')
+            else:
+                table[constant] = ('prefix', constant + '(')
+        for constant in self.infix_cts:
+            table.setdefault(constant, ('infix', f' {constant} '))
+        self._unparse_table_cache = ((dict(self.language.constant_arity_dict), list(self.infix_cts)), table)
+        return table
+
+    def _write_object(self, logics_object, fragments, table, first_iteration=True):
+        """Appends the unparsed Formula, Inference or Sequent to the list `fragments`"""
+        # Sequent
+        if isinstance(logics_object, Sequent):
+            self._write_sequent(logics_object, fragments, table)
+        # Inference (only the outermost one goes without parentheses)
+        elif isinstance(logics_object, Inference):
+            self._write_inference(logics_object, fragments, table, remove_external_parentheses=first_iteration)
+        # Formula or PredicateFormula
+        else:
+            self._write_formula(logics_object, fragments, table)
+
+    def _write_formula(self, formula, fragments, table, remove_external_parentheses=True, method=None):
+        """Appends the unparsed formula to the list `fragments`.
+
+        Uses an explicit stack, whose elements are either strings (written as they are) or tuples
+        (method, element, flag), replaced by what ``method(element, flag, table)`` returns. See ``_formula_fragments``.
+        The `method` for the formula itself is by default ``_formula_fragments``
+        """
+        stack = [(method or self._formula_fragments, formula, remove_external_parentheses)]
+        while stack:
+            entry = stack.pop()
+            if entry.__class__ is str:
+                fragments.append(entry)
+                continue
+            method, element, flag = entry
+            element_fragments = method(element, flag, table)
+            if element_fragments.__class__ is str:
+                fragments.append(element_fragments)
+            else:
+                stack.extend(reversed(element_fragments))
+
+    def _formula_fragments(self, formula, remove_external_parentheses, table):
+        """Returns the string of an atomic formula, or the list of fragments of a molecular one, where subformulae
+        are represented by (self._formula_fragments, subformula, remove_external_parentheses)"""
         # Atomic
         if formula.is_atomic:
             return self._unparse_atomic(formula)
-        return self._unparse_molecular(formula, remove_external_parentheses)
-
-    def _unparse_atomic(self, formula):
-        return formula[0]
 
-    def _unparse_molecular(self, formula, remove_external_parentheses):
+        kind, constant_fragment = table.get(formula[0], ('prefix', formula[0] + '('))
         # Unary operator
-        if formula.main_symbol in self.language.constants(1):
-            return f"{formula[0]}{self._unparse_formula(formula[1], remove_external_parentheses=False)}"
+        if kind == 'unary':
+            return [constant_fragment, (self._formula_fragments, formula[1], False)]
 
         # Binary infix operator
-        elif formula.main_symbol in self.infix_cts:
-            unp_formula = f"({self._unparse_formula(formula[1], False)} {formula[0]} {self._unparse_formula(formula[2], False)})"
+        if kind == 'infix':
+            fragments = [(self._formula_fragments, formula[1], False), constant_fragment,
+                         (self._formula_fragments, formula[2], False)]
             if remove_external_parentheses:
-                return unp_formula[1:-1]
-            return unp_formula
+                return fragments
+            return ['('] + fragments + [')']
 
         # Prefix >1-arity operator
-        else:
-            string = formula.main_symbol + '('
-            for arg in formula.arguments():
-                string += self._unparse_formula(arg, remove_external_parentheses=False)
-                string += ', '
-            string = string[:-2] + ')'  # remove final ', ' and add final parenthesis
-            return string
+        fragments = [constant_fragment]
+        for argument in formula[1:]:
+            fragments.append((self._formula_fragments, argument, False))
+            fragments.append(', ')
+        fragments[-1] = ')'
+        return fragments
+
+    def _unparse_atomic(self, formula):
+        return formula[0]
 
     # ------------------------------------------------------------------------------------------------------------------
     # INFERENCES
@@ -406,23 +741,27 @@ class StandardParser:
 
     def _unparse_inference(self, inference):
         """Same as above but with inferences.
-        e.g. turns Inference([Inference([Formula(['p'])], [Formula(['p'])])], []) into 'p / p //'
+        e.g. turns Inference([Inference([Formula(['p'])], [Formula(['p'])])], []) into '(p / p //)'
         """
-        separator = self.inference_separator * inference.level
-
-        premises = ''
+        fragments = list()
+        self._write_inference(inference, fragments, self._unparse_table(), remove_external_parentheses=False)
+        return ''.join(fragments)
+
+    def _write_inference(self, inference, fragments, table, remove_external_parentheses):
+        if not remove_external_parentheses:
+            fragments.append('(')
+        for premise_index, premise in enumerate(inference.premises):
+            if premise_index:
+                fragments.append(', ')
+            self._write_object(premise, fragments, table, first_iteration=False)
         if inference.premises:
-            for premise in inference.premises:
-                premises += self.unparse(premise, first_iteration=False) + ', '
-            premises = premises[:-2] + ' '  # Remove the final ', ' and add a space
-
-        conclusions = ''
-        if inference.conclusions:
-            for conclusion in inference.conclusions:
-                conclusions += self.unparse(conclusion, first_iteration=False) + ', '
-            conclusions = ' ' + conclusions[:-2]  # Same as before and add a space at the beginning
-
-        return f"({premises}{separator}{conclusions})"
+            fragments.append(' ')
+        fragments.append(self.inference_separator * inference.level)
+        for conclusion_index, conclusion in enumerate(inference.conclusions):
+            fragments.append(', ' if conclusion_index else ' ')
+            self._write_object(conclusion, fragments, table, first_iteration=False)
+        if not remove_external_parentheses:
+            fragments.append(')')
 
     # ------------------------------------------------------------------------------------------------------------------
     # DERIVATIONS
@@ -435,6 +774,8 @@ class StandardParser:
         You can also use 'premise' and 'axiom' as justifications
         """
         string_step_elements = string_step.split(self.derivation_step_separator)
+        if len(string_step_elements) < 2:
+            raise NotWellFormed(f'Derivation step {string_step} has no justification')
         content = self.parse(string_step_elements[0].strip())
         justification = string_step_elements[1].strip()
 
@@ -445,7 +786,7 @@ class StandardParser:
         if len(string_step_elements) == 2 or string_step_elements[2].strip() == '':
             on_steps = []
         else:
-            on_steps = eval(string_step_elements[2].strip())
+            on_steps = self._parse_step_list(string_step_elements[2].strip())
             # Remove repeated steps in the on_steps - and print warning if it does
             if len(on_steps) != len(set(on_steps)):
                 for step_index in range(len(on_steps) - 1, -1, -1):
@@ -458,12 +799,29 @@ class StandardParser:
             if len(string_step_elements) == 2 or string_step_elements[3].strip() == '':
                 open_suppositions = []
             else:
-                open_suppositions = eval(string_step_elements[3].strip())
+                open_suppositions = self._parse_step_list(string_step_elements[3].strip())
             return NaturalDeductionStep(content=content, justification=justification, on_steps=on_steps,
                                         open_suppositions=open_suppositions)
         else:
             return DerivationStep(content=content, justification=justification, on_steps=on_steps)
 
+    @staticmethod
+    def _parse_step_list(string):
+        """Parses the on_steps or open_suppositions of a step, e.g. '[1, 2]'. Lists of ints are read directly, anything
+        else is evaluated"""
+        if string[0] == '[' and string[-1] == ']':
+            elements = string[1:-1]
+            if not elements.strip():
+                return []
+            try:
+                return [int(element) for element in elements.split(',')]
+            except ValueError:
+                pass
+        try:
+            return eval(string)
+        except (NameError, TypeError) as error:
+            raise ValueError(f'Could not read the list of steps {string}: {error}')
+
     # ------------------------------------------------------------------------------------------------------------------
     # SEQUENTS
 
@@ -502,26 +860,146 @@ class StandardParser:
         return Sequent(parsed_sequent)
 
     def _unparse_sequent(self, sequent):
-        if sequent.sides == 2:
-            separator = self.two_sided_sequent_separator
-        else:
-            separator = self.n_sided_sequent_separator
+        fragments = list()
+        self._write_sequent(sequent, fragments, self._unparse_table())
+        return ''.join(fragments)
+
+    def _write_sequent(self, sequent, fragments, table):
+        separator = f' {self.two_sided_sequent_separator if sequent.sides == 2 else self.n_sided_sequent_separator} '
+        element_separator = f'{self.comma_separator} '
+        for side_index, side in enumerate(sequent):
+            if side_index:
+                fragments.append(separator)
+            for element_index, element in enumerate(side):
+                if element_index:
+                    fragments.append(element_separator)
+                # Context variable
+                if element in self.language.context_variables:
+                    fragments.append(element)
+                # Formula
+                else:
+                    self._write_formula(element, fragments, table)
+
+
+# Processes that parse chunks for iter_parse keep the parser here
+_worker_parser = None
+_worker_kind = None
+
+
+def _set_worker_parser(parser, kind):
+    global _worker_parser, _worker_kind
+    _worker_parser, _worker_kind = parser, kind
+
+
+def _parse_chunk(chunk):
+    return [_worker_parser._parse_numbered_item(item, _worker_kind) for item in chunk]
 
-        string = ''
-        for side in sequent:
-            if side:
-                for elem in side:
-                    # Context variable
-                    if elem in self.language.context_variables:
-                        string += f'{elem}{self.comma_separator} '
-                    # Formula
-                    else:
-                        string += f'{self._unparse_formula(elem)}{self.comma_separator} '
-                string = string[:-1 - len(self.comma_separator)]  # Remove the last ', '
-            string += f' {separator} '  # And add ' separator '
 
-        # After unparsing all sides remove the last separator
-        return string[:-2 - len(separator)]
+class _FormulaScan:
+    """Structure of a prepared formula (or term) string, computed in a single left-to-right pass
+
+    Records where each parenthesis closes and, for each parenthesized group, the infix constants and commas that are
+    directly inside it (not inside a nested group). ``-1`` stands for the group of the whole string.
+    ``next_special[i]`` is the index of the first parenthesis, comma, constant or quantifier at or after ``i``,
+    ``next_constant[i]`` that of the first constant or quantifier, ``next_bracket[i]`` that of the first parenthesis or
+    comma, and ``unary_prefix_end[i]`` the index where the sequence of unary constants beginning at ``i`` (if any) ends.
+
+    `arities` is a dict of the (prefix) constants and their arities. The predicate parser also gives the quantifiers.
+    """
+    def __init__(self, string, arities, infix_cts, comma_separator, quantifiers=()):
+        length = len(string)
+        self.string = string
+        self.arities = arities
+        constants = sorted(arities, key=len, reverse=True)
+        infix_cts = sorted(infix_cts, key=len, reverse=True)
+        quantifiers = sorted(quantifiers, key=len, reverse=True)
+        initials = {symbol[0] for symbol in constants + infix_cts + quantifiers}
+
+        self.closing = [-1] * length
+        self.constants = dict()
+        self.quantifiers = dict()
+        self.infix_constants = dict()
+        self.infix_indexes = dict()
+        self.commas = dict()
+        self._group = [-1] * length
+
+        groups = [-1]
+        infix_end = 0  # Infix constants cannot overlap
+        for index, char in enumerate(string):
+            group = groups[-1]
+            self._group[index] = group
+            if char == '(':
+                groups.append(index)
+            elif char == ')':
+                if group == -1:
+                    raise NotWellFormed(f'Unmatched closing parenthesis at position {index} of {string}')
+                groups.pop()
+                self.closing[group] = index
+                self._group[index] = groups[-1]
+            elif string.startswith(comma_separator, index):
+                self.commas.setdefault(group, []).append(index)
+            elif char in initials:
+                for constant in constants:
+                    if string.startswith(constant, index):
+                        self.constants[index] = constant
+                        break
+                for quantifier in quantifiers:
+                    if string.startswith(quantifier, index):
+                        self.quantifiers[index] = quantifier
+                        break
+                if index >= infix_end:
+                    for constant in infix_cts:
+                        if string.startswith(constant, index):
+                            self.infix_constants[index] = constant
+                            self.infix_indexes.setdefault(group, []).append(index)
+                            infix_end = index + len(constant)
+                            break
+        if len(groups) > 1:
+            raise NotWellFormed(f'Unclosed parenthesis at position {groups[-1]} of {string}')
+
+        self.next_special = [length] * (length + 1)
+        self.next_constant = [length] * (length + 1)
+        self.next_bracket = [length] * (length + 1)
+        self.unary_prefix_end = list(range(length + 1))
+        for index in range(length - 1, -1, -1):
+            constant = self.constants.get(index)
+            if string[index] in '()' or string.startswith(comma_separator, index):
+                self.next_bracket[index] = index
+            else:
+                self.next_bracket[index] = self.next_bracket[index + 1]
+            if constant is not None or index in self.quantifiers:
+                self.next_constant[index] = index
+            else:
+                self.next_constant[index] = self.next_constant[index + 1]
+            if self.next_bracket[index] == index or self.next_constant[index] == index or \
+                    index in self.infix_constants:
+                self.next_special[index] = index
+            else:
+                self.next_special[index] = self.next_special[index + 1]
+            if constant is not None and arities[constant] == 1:
+                self.unary_prefix_end[index] = self.unary_prefix_end[min(index + len(constant), length)]
+
+    def infix_constant_indexes(self, start, end):
+        """Returns the indexes of the infix constants between `start` and `end` that are not inside parentheses
+        (relative to `start`)"""
+        indexes = self.infix_indexes.get(self._group[start])
+        if not indexes:
+            return []
+        position = bisect_left(indexes, start)
+        return indexes[position:bisect_left(indexes, end, position)]
+
+    def infix_constant_index(self, start, end):
+        """Returns the index of the infix constant between `start` and `end` that is not inside parentheses (relative
+        to `start`), or ``None`` if there is no such constant or more than one"""
+        indexes = self.infix_indexes.get(self._group[start])
+        if not indexes:
+            return None
+        position = bisect_left(indexes, start)
+        if position + 1 < len(indexes) and indexes[position + 1] < end:
+            return None
+        if position < len(indexes) and indexes[position] < end:
+            return indexes[position]
+        return None
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -1,3 +1,20 @@
-from logics.utils.solvers.natural_deduction import classical_natural_deduction_solver, \
-    classical_natural_deduction_solver2
-from logics.utils.solvers.tableaux import standard_tableaux_solver
+import importlib
+
+# The solver instances are imported on first access (PEP 562), see logics.utils.parsers
+_lazy_objects = {
+    'classical_natural_deduction_solver': 'logics.utils.solvers.natural_deduction',
+    'classical_natural_deduction_solver2': 'logics.utils.solvers.natural_deduction',
+    'standard_tableaux_solver': 'logics.utils.solvers.tableaux',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_objects:
+        value = getattr(importlib.import_module(_lazy_objects[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_objects))
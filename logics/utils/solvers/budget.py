@@ -0,0 +1,138 @@
+from time import monotonic
+
+
+class Budget:
+    """Limits on the resources that a solver can use
+
+    Can be given to the ``solve`` and ``check`` methods of the tableaux solvers, to the ``reduce`` method of the
+    sequent reducer and to the ``solve`` method of the natural deduction solvers. The solver checks the budget as it
+    goes, and if it runs out of it, raises ``logics.classes.exceptions.BudgetExceeded`` with what it had built so far
+    (a ``PartialResult``). Nothing is interrupted from outside, so it can be used to bound the time of a request
+    without killing the thread or process that runs the solver.
+
+    What counts as a node depends on the solver: the nodes of the tableaux (for the tableaux solvers), the sequents
+    that it attempts to reduce (for the sequent reducer) and the goals that it attempts to derive (for the natural
+    deduction solvers). The limits are checked between rule applications, so the tableaux can have a few more nodes
+    than `max_nodes` (those added by the last rule application).
+
+    Every time that a solver starts with a budget, its counters and the clock of `timeout` are reset, so the same
+    budget can be given to several calls (the `deadline` and the `cancel_event` are shared by all of them).
+
+    Parameters
+    ----------
+    max_nodes: int, optional
+        The maximum number of nodes
+    max_rule_applications: int, optional
+        The maximum number of rule applications
+    timeout: float, optional
+        The maximum number of seconds that the solver can run
+    deadline: float, optional
+        A point in time (as given by ``time.monotonic()``) at which the solver must stop
+    cancel_event: threading.Event or multiprocessing.Event, optional
+        Cooperative cancellation. If it is set (e.g. from another thread), the solver stops at its next check of
+        the budget. Any object with an ``is_set`` method will do
+
+    Examples
+    --------
+    >>> from logics.utils.parsers import classical_parser
+    >>> from logics.utils.solvers.budget import Budget
+    >>> from logics.utils.solvers.tableaux import standard_tableaux_solver
+    >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+    >>> from logics.classes.exceptions import BudgetExceeded
+    >>> inference = classical_parser.parse("p ∨ (q ∧ r), ~q / ~(p ∧ ~r)")
+    >>> try:
+    ...     standard_tableaux_solver.solve(inference, classical_tableaux_system,
+    ...                                    budget=Budget(max_rule_applications=3))
+    ... except BudgetExceeded as e:
+    ...     partial_result = e.partial_result
+    >>> partial_result.reason
+    'max_rule_applications'
+    >>> partial_result.tree.print_tree(classical_parser)
+    p ∨ (q ∧ r)
+    └── ~q
+        └── ~~(p ∧ ~r)
+            └── p ∧ ~r (R~~)
+                └── p (R∧)
+                    └── ~r (R∧)
+                        ├── p (R∨)
+                        └── q ∧ r (R∨)
+    >>> [classical_parser.unparse(leaf.content) for leaf in partial_result.frontier]
+    ['p', 'q ∧ r']
+    >>> partial_result.counters['nodes'], partial_result.counters['rule_applications']
+    (8, 3)
+    """
+
+    def __init__(self, max_nodes=None, max_rule_applications=None, timeout=None, deadline=None, cancel_event=None):
+        self.max_nodes = max_nodes
+        self.max_rule_applications = max_rule_applications
+        self.timeout = timeout
+        self.deadline = deadline
+        self.cancel_event = cancel_event
+        self.start()
+
+    def start(self):
+        """Resets the counters and the clock of the timeout. Solvers call it when they start"""
+        self.nodes = 0
+        self.rule_applications = 0
+        self.started = monotonic()
+        self._deadline = self.deadline
+        if self.timeout is not None:
+            timeout_deadline = self.started + self.timeout
+            if self._deadline is None or timeout_deadline < self._deadline:
+                self._deadline = timeout_deadline
+
+    def spend(self, nodes=0, rule_applications=0):
+        """Adds to the counters"""
+        self.nodes += nodes
+        self.rule_applications += rule_applications
+
+    def exceeded(self):
+        """Returns the reason why the budget is exceeded (``'cancelled'``, ``'deadline'``, ``'max_nodes'`` or
+        ``'max_rule_applications'``), or ``None`` if it is not"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return 'cancelled'
+        if self._deadline is not None and monotonic() >= self._deadline:
+            return 'deadline'
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            return 'max_nodes'
+        if self.max_rule_applications is not None and self.rule_applications >= self.max_rule_applications:
+            return 'max_rule_applications'
+        return None
+
+    def counters(self):
+        """Returns a dict with the ``'nodes'``, the ``'rule_applications'`` and the seconds ``'elapsed'`` since the
+        solver started"""
+        return {'nodes': self.nodes, 'rule_applications': self.rule_applications,
+                'elapsed': monotonic() - self.started}
+
+
+class PartialResult:
+    """What a solver had built when it stopped without finishing (see ``Budget``)
+
+    Attributes
+    ----------
+    tree
+        The tree built so far. A ``TableauxNode`` for the tableaux solvers, a ``SequentNode`` for the sequent reducer
+        (its leaves without justification are the sequents that were not reduced) and a ``Derivation`` for the natural
+        deduction solvers (the derivation that was being extended, before cleaning it)
+    frontier: list
+        What was left to do. The open leaves of the tableaux (for ``check``, the tableaux has the current branch and
+        the branches that were left to explore), the sequents that were not reduced (as the ``SequentNode`` leaves of
+        `tree`), or the goals that the natural deduction solver was trying to derive (from the outermost to the
+        innermost)
+    counters: dict
+        The counters of the budget (see ``Budget.counters``)
+    reason: str
+        Why the solver stopped. One of ``'cancelled'``, ``'deadline'``, ``'max_nodes'``, ``'max_rule_applications'``
+        or ``'max_depth'`` (the tableaux solvers also give a partial result when they exceed their `max_depth`)
+    """
+
+    def __init__(self, tree, frontier, counters, reason):
+        self.tree = tree
+        self.frontier = frontier
+        self.counters = counters
+        self.reason = reason
+
+    def __repr__(self):
+        return f'PartialResult(reason={self.reason!r}, frontier={len(self.frontier)} elements, ' \
+               f'counters={self.counters!r})'
@@ -11,7 +11,8 @@ from logics.utils.solvers.natural_deduction import (
     Heuristic,
     ReductioHeuristic,
     EFSQHeuristic,
-    SolverError
+    SolverError,
+    BudgetExceeded
 )
 from logics.classes.predicate.proof_theories import Derivation
 from logics.classes.predicate.proof_theories.natural_deduction import NaturalDeductionStep
@@ -177,7 +178,7 @@ class ExistentialEliminationHeuristic(Heuristic):
     def is_applicable(self, goal):
         return True  # we need to check if applicable below anyway, so let's not repeat the check here
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         # Get the first untried existential
         existential_idx = self.get_first_untried_existential_idx(derivation, tried_existentials)
         if existential_idx is None:
@@ -205,7 +206,8 @@ class ExistentialEliminationHeuristic(Heuristic):
                                            on_steps=[], open_suppositions=new_open_sups))
 
         # Solve for the goal of the original derivation
-        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal, tried_existentials=tried_existentials)
+        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal, tried_existentials=tried_existentials,
+                                          budget=budget)
 
         # If deriv1 has one more step (the supposition), it is because the derivation already contained the goal (this
         # should not happen but just in case) and therefore it just returned. We need to repeat the goal to close it.
@@ -238,7 +240,7 @@ class ExistentialIntroductionHeuristic(Heuristic):
     def _is_arbitrary_constant(self, ind_ct, formula_quantified, derivation):
         return True  # Here we don't care about this, just return true. Will be overloaded in the UnivIntroHeuristic
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         # Basically, try to derive every possible substitution instance
         deriv1 = deepcopy(derivation)
         prev_open_sups = solver._get_current_open_sups(derivation)
@@ -257,7 +259,7 @@ class ExistentialIntroductionHeuristic(Heuristic):
 
             try:
                 deriv1 = solver._solve_derivation(derivation=deriv1, goal=subst_instance,
-                                                  tried_existentials=tried_existentials)
+                                                  tried_existentials=tried_existentials, budget=budget)
 
                 # Look for where the instance is (may not be the last step if it was present in the derivation?)
                 step_num = solver._get_step_of_formula(subst_instance, deriv1, prev_open_sups)
@@ -265,6 +267,8 @@ class ExistentialIntroductionHeuristic(Heuristic):
                                                    on_steps=[step_num],
                                                    open_suppositions=copy(prev_open_sups)))
                 return deriv1
+            except BudgetExceeded:
+                raise
             except SolverError:
                 if not free_vars:
                     break  # if there are no free variables every subst instance will be the same, so just break here
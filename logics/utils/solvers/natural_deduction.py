@@ -2,9 +2,11 @@ from copy import copy, deepcopy
 
 from logics.classes.propositional import Formula, Inference
 from logics.classes.propositional.proof_theories import Derivation, NaturalDeductionStep
+from logics.classes.propositional.proof_theories.rule_index import RuleIndex
 from logics.instances.propositional.languages import classical_infinite_language_with_sent_constants_nobiconditional \
     as cl_language
-from logics.classes.exceptions import SolverError
+from logics.classes.exceptions import SolverError, BudgetExceeded
+from logics.utils.solvers.budget import PartialResult
 
 
 class NaturalDeductionSolver:
@@ -112,28 +114,68 @@ class NaturalDeductionSolver:
         self.derived_rules_derivations = derived_rules_derivations
         self.heuristics = heuristics
 
-    def solve(self, inference):
+    def solve(self, inference, budget=None):
         """Takes an Inference and returns a derivation for it
 
+        Parameters
+        ----------
+        inference: logics.classes.propositional.Inference
+            The inference to derive
+        budget: logics.utils.solvers.budget.Budget, optional
+            Limits on the goals (the nodes), applications of simplification rules and time of the solver, and a
+            cancellation event (see ``Budget``)
+
+        Raises
+        ------
+        logics.classes.exceptions.SolverError
+            If it cannot find a derivation
+        logics.classes.exceptions.BudgetExceeded
+            If it runs out of its `budget`. Its ``partial_result`` has the derivation that was being extended (before
+            cleaning it), and the goals that it was trying to derive
+
         Examples
         --------
         See above for an example using the predefined classical solver instance
+
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.utils.solvers import classical_natural_deduction_solver
+        >>> from logics.utils.solvers.budget import Budget
+        >>> from logics.classes.exceptions import BudgetExceeded
+        >>> try:
+        ...     classical_natural_deduction_solver.solve(classical_parser.parse("A ∧ B / B ∧ A"),
+        ...                                              budget=Budget(max_nodes=2))
+        ... except BudgetExceeded as e:
+        ...     partial_result = e.partial_result
+        >>> partial_result.tree
+        0. ['∧', ['A'], ['B']]; premise; []
+        1. ['A']; E∧1; [0]
+        2. ['B']; E∧2; [0]
+        <BLANKLINE>
+        >>> [classical_parser.unparse(goal) for goal in partial_result.frontier]
+        ['B ∧ A', 'A']
         """
+        if budget is not None:
+            budget.start()
         goal = inference.conclusion
         derivation = Derivation([NaturalDeductionStep(content=p, justification='premise') for p in inference.premises])
-        derivation = self._solve_derivation(derivation, goal)   # Actually solves the derivation (using some derived rules)
+        # Actually solves the derivation (using some derived rules)
+        derivation = self._solve_derivation(derivation, goal, budget=budget)
         derivation = self._clean_derivation(derivation, inference)  # Erases unnecesary steps and replaces derived rules
         return derivation
 
     # ------------------------------------------------------------------------------------------------------------------
 
-    def _solve_derivation(self, derivation, goal, tried_existentials=None):
+    def _solve_derivation(self, derivation, goal, tried_existentials=None, budget=None):
         """First of the two algorithms of the solver, basically does the following:
         - First, checks is the goal is already present
         - If not, blindly derives things using elimination rules (some of them derived)
         - If it still did not find the goal, analizes the goal and sets a new goal using heuristics, may add things as
           suppositions in the process
+
+        The `budget` (if any) is passed on to the heuristics, which call this method again for the new goals
         """
+        self._spend_budget(budget, derivation, goal, nodes=1)
+
         # The goal is already present in the derivation (and not in a closed supposition), return it
         current_open_sups = self._get_current_open_sups(derivation)
         for step_idx in range(len(derivation)):
@@ -142,7 +184,7 @@ class NaturalDeductionSolver:
                 return derivation
 
         # Apply simplification rules (elimination + a couple more, see below)
-        derivation = self._apply_simplification_rules(derivation, goal)
+        derivation = self._apply_simplification_rules(derivation, goal, budget)
 
         # The goal has been reached by the application of the rules
         # (the second algorithm exits if it finds the goal, so the goal should be in the last step)
@@ -157,7 +199,13 @@ class NaturalDeductionSolver:
         for heuristic in self.heuristics:
             if heuristic.is_applicable(goal):
                 try:
-                    return heuristic.apply_heuristic(derivation, goal, self, tried_existentials)
+                    if budget is None:
+                        # Heuristics defined before budgets existed do not take one
+                        return heuristic.apply_heuristic(derivation, goal, self, tried_existentials)
+                    return heuristic.apply_heuristic(derivation, goal, self, tried_existentials, budget=budget)
+                except BudgetExceeded as e:
+                    e.partial_result.frontier.insert(0, goal)
+                    raise
                 except SolverError:
                     pass
 
@@ -165,9 +213,32 @@ class NaturalDeductionSolver:
         else:
             raise SolverError('Could not solve the derivation provided')
 
+    @staticmethod
+    def _spend_budget(budget, derivation, goal, nodes=0, rule_applications=0):
+        """If there is a budget, raises BudgetExceeded if it is exceeded, and adds to its counters otherwise"""
+        if budget is None:
+            return
+        reason = budget.exceeded()
+        if reason is not None:
+            raise BudgetExceeded(f'Could not solve the derivation provided. Budget exceeded ({reason})',
+                                 PartialResult(derivation, [goal], budget.counters(), reason))
+        budget.spend(nodes=nodes, rule_applications=rule_applications)
+
     # ------------------------------------------------------------------------------------------------------------------
 
-    def _apply_simplification_rules(self, derivation, goal):
+    def _simplification_rule_candidates(self, formula):
+        """Returns the names of the simplification rules whose first premise `formula` might be an instance of
+
+        The index is built the first time it is needed, and rebuilt if the simplification rules change
+        """
+        signature = tuple((rule_name, id(rule)) for rule_name, rule in self.simplification_rules.items())
+        if getattr(self, '_rule_index_signature', None) != signature:
+            self._rule_index = RuleIndex(self.language, {rule_name: rule.premises[0] for rule_name, rule
+                                                         in self.simplification_rules.items()})
+            self._rule_index_signature = signature
+        return self._rule_index.candidates(formula)
+
+    def _apply_simplification_rules(self, derivation, goal, budget=None):
         """Blindly derives everything it can but using only rules that simplify formulae, some of them derived
         (not things like I∨, which would be impossible to apply blindly)
 
@@ -195,7 +266,8 @@ class NaturalDeductionSolver:
                 if self._is_in_closed_supposition(step.open_suppositions, open_sups):
                     continue
 
-                for rule_name in self.simplification_rules:
+                # Only look at the rules whose first premise has the same shape as the step
+                for rule_name in self._simplification_rule_candidates(step.content):
                     # Check that the rule has not been applied to this step before
                     if step_idx in applied_rules[rule_name]:
                         continue
@@ -240,6 +312,7 @@ class NaturalDeductionSolver:
                             for formula_to_add in formulae_to_add:
                                 # Check if the conclusion is not already in the derivation (avoids freezing), add it
                                 if formula_to_add not in formulas_list:
+                                    self._spend_budget(budget, derivation, goal, rule_applications=1)
                                     formulas_list.append(formula_to_add)
                                     derivation.append(NaturalDeductionStep(content=formula_to_add,
                                                                            justification=rule_name,
@@ -396,7 +469,8 @@ class NaturalDeductionSolver:
 
     def _get_non_premise_replacement(self, hardcoded_derivation_step, subst_dict, derivation):
         # Overriden in the predicate solver
-        return hardcoded_derivation_step.instantiate(self.language, subst_dict)  # instantiate returns a deepcopy
+        # Steps are not modified in place, so the instance can share subformulae with the substitution dict
+        return hardcoded_derivation_step.instantiate(self.language, subst_dict, share_subformulae=True)
 
     # ------------------------------------------------------------------------------------------------------------------
     # ------------------------------------------------------------------------------------------------------------------
@@ -467,12 +541,14 @@ class Heuristic:
         """
         raise NotImplementedError()
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         """Applies the heuristic.
 
         Takes the current deriation, goal, current open suppositions and solver, and returns a derivation.
         The parameter `jump_steps` is present because of how the conjunction heuristic works (see the source code for
         the conjunction heuristic for more on this)
+        If the solver was given a budget, it is passed as the `budget` keyword argument (and must be passed on to
+        ``solver._solve_derivation``), otherwise it is not passed
         """
         raise SolverError()
 
@@ -486,10 +562,10 @@ class ConjunctionHeuristic(Heuristic):
     def is_applicable(self, goal):
         return goal.main_symbol == '∧'
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         deriv1 = deepcopy(derivation)
         # Solve the derivation of the first conjunct
-        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[1])
+        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[1], budget=budget)
         open_sups = solver._get_current_open_sups(derivation)
 
         # Save the step where the first conjunct is, for the introduction later
@@ -508,7 +584,8 @@ class ConjunctionHeuristic(Heuristic):
             return deriv1
 
         # Otherwise, if the second conjunct is different from the first, solve the derivation for the second conjunct
-        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[2], tried_existentials=tried_existentials)
+        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[2], tried_existentials=tried_existentials,
+                                          budget=budget)
 
         # Save the step where the second conjunct is, for the introduction later
         second_conjunct_step = solver._get_step_of_formula(goal[2], deriv1, open_sups)
@@ -526,7 +603,7 @@ class ConditionalHeuristic(Heuristic):
     def is_applicable(self, goal):
         return goal.main_symbol == '→'
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         deriv1 = deepcopy(derivation)
 
         # Add the antecedent as a supposition
@@ -536,7 +613,8 @@ class ConditionalHeuristic(Heuristic):
                                            on_steps=[], open_suppositions=copy(new_open_sups)))
 
         # Solve for the consequent
-        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[2], tried_existentials=tried_existentials)
+        deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[2], tried_existentials=tried_existentials,
+                                          budget=budget)
 
         # If deriv1 has one more step (the supposition), it is because the derivation already contained
         # the consequent, and therefore it just returned. We need to repeat the consequent to close it.
@@ -560,7 +638,7 @@ class DisjunctionHeuristic(Heuristic):
     def is_applicable(self, goal):
         return goal.main_symbol == '∨'
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         deriv1 = deepcopy(derivation)
         prev_open_sups = solver._get_current_open_sups(derivation)
 
@@ -568,7 +646,7 @@ class DisjunctionHeuristic(Heuristic):
         for disjunct in (1, 2):
             try:
                 deriv1 = solver._solve_derivation(derivation=deriv1, goal=goal[disjunct],
-                                                  tried_existentials=tried_existentials)
+                                                  tried_existentials=tried_existentials, budget=budget)
 
                 # Look for where the disjunct is (may not be the last step if it was present in the derivation)
                 step_num = solver._get_step_of_formula(goal[disjunct], deriv1, prev_open_sups)
@@ -576,6 +654,8 @@ class DisjunctionHeuristic(Heuristic):
                                                        on_steps=[step_num],
                                                        open_suppositions=copy(prev_open_sups)))
                 return deriv1
+            except BudgetExceeded:
+                raise
             except SolverError as e:
                 if disjunct == 1:
                     pass
@@ -593,7 +673,7 @@ class ReductioHeuristic(Heuristic):
     def is_applicable(self, goal):
         return goal != self.formula_class(['⊥'])
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         deriv1 = deepcopy(derivation)
 
         # Add the negation of the goal as a supposition (if the goal already is a negation, remove that negation)
@@ -612,7 +692,8 @@ class ReductioHeuristic(Heuristic):
 
         # Solve for falsum
         new_goal = self.formula_class(['⊥'])
-        deriv1 = solver._solve_derivation(derivation=deriv1, goal=new_goal, tried_existentials=tried_existentials)
+        deriv1 = solver._solve_derivation(derivation=deriv1, goal=new_goal, tried_existentials=tried_existentials,
+                                          budget=budget)
 
         # If deriv1 has one more step (the supposition), it is because the derivation already contained
         # falsum, and therefore it just returned. We need to repeat falsum to close it.
@@ -652,7 +733,7 @@ class EFSQHeuristic(Heuristic):
     def is_applicable(self, goal):
         return True
 
-    def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+    def apply_heuristic(self, derivation, goal, solver, tried_existentials, budget=None):
         open_sups = solver._get_current_open_sups(derivation)
         falsum_idx = solver._get_step_of_formula(self.formula_class(['⊥']), derivation, open_sups)
         if falsum_idx is not None:
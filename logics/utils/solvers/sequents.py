@@ -1,7 +1,8 @@
-from copy import deepcopy
+from copy import copy
 
 from logics.classes.propositional.proof_theories.sequents import Sequent, SequentNode
-from logics.classes.exceptions import SolverError
+from logics.classes.exceptions import SolverError, BudgetExceeded
+from logics.utils.solvers.budget import Budget, PartialResult
 
 
 class SequentReducer:
@@ -28,7 +29,7 @@ class SequentReducer:
         self.weakening_rule_names = weakening_rule_names
         # Will not take a SequentCalculus as argument because the same solver may work for more than one system
 
-    def reduce(self, sequent, sequent_calculus, premises=None, max_depth=100):
+    def reduce(self, sequent, sequent_calculus, premises=None, max_depth=100, budget=None):
         """Reduces a sequent using the rules of the system given, and returns a tree (a SequentNode with children).
 
         Will return the first reduction tree of a sequent that it finds, but there may be more. If it does not find any,
@@ -44,11 +45,17 @@ class SequentReducer:
             An optional list of sequents to use as premises, additionally to the axioms
         max_depth: int, optional
             The maximum depth that a tree can have. If it hits it, exits with a SolverError. Defaults to 100
+        budget: logics.utils.solvers.budget.Budget, optional
+            Limits on the sequents to reduce (the nodes), rule applications and time of the reducer, and a
+            cancellation event (see ``Budget``)
 
         Raises
         ------
         logics.classes.exceptions.SolverError
             If it cannot find a reduction for the given sequent or hits the max_depth limit
+        logics.classes.exceptions.BudgetExceeded
+            If it runs out of its `budget`. Its ``partial_result`` has the reduction that was being attempted, where
+            the sequents that were not reduced yet are leaves without justification (which are also its frontier)
 
         Examples
         --------
@@ -73,17 +80,31 @@ class SequentReducer:
         >>> tree3.print_tree(classical_parser)
         A, ~B ⇒  (~L)
         └── A ⇒ B (premise)
+        >>> from logics.utils.solvers.budget import Budget
+        >>> from logics.classes.exceptions import BudgetExceeded
+        >>> try:
+        ...     LKminEA_sequent_reducer.reduce(seq, LKminEA, budget=Budget(max_nodes=2))
+        ... except BudgetExceeded as e:
+        ...     e.partial_result.tree.print_tree(classical_parser)
+        Γ ⇒ Δ, A ∨ ~A (∨R1)
+        └── Γ ⇒ Δ, A, ~A (~R)
+            └── Γ, A ⇒ Δ, A
         """
         if premises is None:
             premises = list()
-        reduction, failed_reductions = self._standard_reduce(sequent, sequent_calculus, premises, max_depth)
+        if budget is None:
+            budget = Budget()
+        else:
+            budget.start()
+        reduction, failed_reductions = self._standard_reduce(sequent, sequent_calculus, premises, max_depth,
+                                                             budget=budget)
         if reduction is None:
             raise SolverError(f'Could not find reduction for {sequent}')
 
         return reduction
 
     def _standard_reduce(self, sequent, sequent_calculus, premises, max_depth,
-                         present_sequents=None, failed_reductions=None):
+                         present_sequents=None, failed_reductions=None, budget=None):
         """
         Simply checks for each rule in sequent_calculus.solver_rule_order (should be a list of strings (rule names)
         is applicable to sequent, and then instantiates and reduces the premises.
@@ -91,6 +112,7 @@ class SequentReducer:
         Will also avoid repeating a sequent in a branch
 
         Will return the first complete reduction it finds. If it finds none, will return (None, failed_reductions)
+        If it runs out of the budget, raises BudgetExceeded, and every call adds its node to the partial reduction
         """
         # print('-' * (100-max_depth), sequent)
         # print(sequent)
@@ -100,6 +122,13 @@ class SequentReducer:
             failed_reductions = list()
         if present_sequents is None:
             present_sequents = list()
+        if budget is not None:
+            reason = budget.exceeded()
+            if reason is not None:
+                node = SequentNode(content=sequent)
+                raise BudgetExceeded(f'Could not finish the reduction. Budget exceeded ({reason})',
+                                     PartialResult(node, [node], budget.counters(), reason))
+            budget.spend(nodes=1)
 
         # First check if the sequent given is a premise or an axiom
         for premise in premises:
@@ -116,13 +145,16 @@ class SequentReducer:
                 return weakening_reduction, failed_reductions
 
         # If not an axiom, check if the sequent is an instance of the conclusion of every rule
-        for rule_name in sequent_calculus.solver_rule_order:
+        # (only the rules whose conclusion has the same shape as the sequent can be applicable)
+        for rule_name in sequent_calculus.candidate_rules(sequent, sequent_calculus.solver_rule_order):
             rule = sequent_calculus.rules[rule_name]
             instance, possible_subst_dicts = sequent.is_instance_of(rule.content, sequent_calculus.language,
                                                                     return_subst_dicts=True)
             if instance:
                 # print('\t', rule_name, 'applicable to', sequent)
                 new_node = SequentNode(content=sequent, justification=rule_name)
+                if budget is not None:
+                    budget.spend(rule_applications=1)
 
                 # Get all the possible premise instantiations. Do this first because:
                 # - some possible dicts may yield different premise instantiations, but others may yield the same
@@ -132,7 +164,8 @@ class SequentReducer:
                     exit_dict = False
                     rule_premises = list()
                     for rule_premise in rule.children:
-                        instantiated_premise = rule_premise.content.instantiate(sequent_calculus.language, subst_dict)
+                        instantiated_premise = rule_premise.content.instantiate(sequent_calculus.language, subst_dict,
+                                                                                share_subformulae=True)
                         # Check if the premise is already in the path, or if a previous attempt of reduction failed
                         if instantiated_premise == sequent or instantiated_premise in present_sequents or \
                                 instantiated_premise in failed_reductions:
@@ -150,15 +183,21 @@ class SequentReducer:
                 correct_reduction = True
                 # print('\t', 'instantiated premises', possible_premise_instantiations)
                 for instantiated_premises in possible_premise_instantiations:
-                    for instantiated_premise in instantiated_premises:
+                    premise_reductions = list()  # For the partial reduction, if the budget is exceeded
+                    for premise_number, instantiated_premise in enumerate(instantiated_premises):
                         # print('\t\t', 'attempting reduction of', instantiated_premise)
                         if instantiated_premise not in failed_reductions:
-                            premise_reduction, failed_reductions = self._standard_reduce(instantiated_premise,
+                            try:
+                                premise_reduction, failed_reductions = self._standard_reduce(instantiated_premise,
                                                                           sequent_calculus,
                                                                           premises=premises,
                                                                           max_depth=max_depth-1,
                                                                           present_sequents=present_sequents + [sequent],
-                                                                          failed_reductions=failed_reductions)
+                                                                          failed_reductions=failed_reductions,
+                                                                          budget=budget)
+                            except BudgetExceeded as e:
+                                raise self._partial_reduction(e, new_node, premise_reductions,
+                                                              instantiated_premises[premise_number+1:])
                             # The reduction failed (the method returned None)
                             if premise_reduction is None:
                                 correct_reduction = False
@@ -167,6 +206,7 @@ class SequentReducer:
                                 break
                             # Premise reduction is a node (which may contain children)
                             premise_reduction.parent = new_node
+                            premise_reductions.append(premise_reduction)
 
                     if correct_reduction:
                         return new_node, failed_reductions
@@ -175,6 +215,17 @@ class SequentReducer:
         # print('\t\t', 'exit reduction of', sequent)
         return None, failed_reductions
 
+    @staticmethod
+    def _partial_reduction(exception, new_node, premise_reductions, pending_premises):
+        """Puts the partial reduction of a premise (that of the BudgetExceeded exception) below `new_node`, along with
+        the reductions of the previous premises and the premises that come after it (not reduced)"""
+        partial_result = exception.partial_result
+        pending = [SequentNode(content=premise) for premise in pending_premises]
+        new_node.children = premise_reductions + [partial_result.tree] + pending
+        partial_result.tree = new_node
+        partial_result.frontier.extend(pending)
+        return exception
+
     def _check_max_apparitions(self, sequent):
         """Checks that no formula appears more than max_apparitions_per_side in a sequent"""
         if self.max_apparitions_per_side:
@@ -226,6 +277,11 @@ class SequentReducer:
                     return new_node
         return None
 
+    @staticmethod
+    def _copy_sequent(sequent):
+        """Copies the sides of a sequent (so that they can be modified), but not the formulae in them"""
+        return Sequent([copy(side) for side in sequent])
+
     def _weaken_from_identity(self, formula, target_sequent, side_number, new_node):
         """
         Takes a formula (the one that will be in the identity axiom), a sequent (the one we want to reach) and generates
@@ -236,14 +292,14 @@ class SequentReducer:
 
         # We need to weaken in order, so first let's do backwards from index to 0
         for index_left in range(formula_index-1, -1, -1):
-            new_sequent = deepcopy(new_node.content)
+            new_sequent = self._copy_sequent(new_node.content)
             new_sequent[side_number].insert(0, target_side[index_left])
             new_node = SequentNode(content=new_sequent, justification=self.weakening_rule_names[side_number],
                                    children=[new_node])
 
         # Now walk forward from index
         for index_right in range(formula_index + 1, len(target_side)):
-            new_sequent = deepcopy(new_node.content)
+            new_sequent = self._copy_sequent(new_node.content)
             new_sequent[side_number].append(target_side[index_right])
             new_node = SequentNode(content=new_sequent, justification=self.weakening_rule_names[side_number],
                                    children=[new_node])
@@ -271,7 +327,7 @@ class SequentReducer:
             # target element does not coincide with the premise element to look for,
             # weaken the current content to add it
             if premise_elem is None or target_elem != premise_elem:
-                new_sequent = deepcopy(new_node.content)
+                new_sequent = self._copy_sequent(new_node.content)
                 new_sequent[side_number].insert(target_position, target_elem)
                 new_node = SequentNode(content=new_sequent, justification=self.weakening_rule_names[side_number],
                                        children=[new_node])
@@ -1,15 +1,109 @@
-from copy import deepcopy
+import warnings
+from heapq import heappush, heappop, heapify
+from itertools import count
 
-from anytree import PreOrderIter, LevelOrderIter
+from anytree import PreOrderIter
 
 from logics.classes.propositional import Formula, Inference
-from logics.classes.exceptions import SolverError
-from logics.classes.propositional.proof_theories.tableaux import TableauxNode
+from logics.classes.exceptions import BudgetExceeded
+from logics.classes.propositional.proof_theories.tableaux import TableauxNode, _NodeTemplate
 from logics.classes.propositional.proof_theories.metainferential_tableaux import (
     MetainferentialTableauxNode, MetainferentialTableauxStandard
 )
+from logics.utils.parsers.parser_utils import map_in_processes
+from logics.utils.solvers.budget import Budget, PartialResult
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+# PRIORITIES FOR THE AGENDA OF THE SOLVERS
+# A priority takes a node, the name of a rule applicable to it and the rule application (the nodes the rule adds to
+# each open branch, see TableauxSolver._rule_application), and returns a sortable value. Lower values go first.
+
+def _content_depth(content):
+    if isinstance(content, Inference):
+        return 1 + max((_content_depth(formula) for formula in content.premises + content.conclusions), default=0)
+    return content.depth
+
+
+def _is_literal(content):
+    # Atomic formulae and connectives applied to them (e.g. ~p), which are what closure rules usually look for
+    return isinstance(content, Formula) and (content.is_atomic or (len(content) == 2 and content[1].is_atomic))
+
+
+def _added_contents(rule_application):
+    stack = list(rule_application)
+    while stack:
+        template = stack.pop()
+        yield template.content
+        stack.extend(template.children)
+
+
+def level_order(node, rule_name, rule_application):
+    """Expands the nodes in level order (breadth-first), in the order in which they appear in the tree"""
+    return node.depth, tuple(ancestor.child_index for ancestor in node.path)
+
+
+def non_branching_first(node, rule_name, rule_application):
+    """Applies the rules that do not branch (alpha rules) before those that do (beta rules)"""
+    return len(rule_application)
+
+
+def closure_likely_first(node, rule_name, rule_application):
+    """Applies first the rules that add fewer nodes that are not literals (the literals are what close branches)"""
+    return sum(1 for content in _added_contents(rule_application) if not _is_literal(content))
+
+
+def smallest_formula_first(node, rule_name, rule_application):
+    """Expands the nodes with the smallest (least deep) formulae first"""
+    return _content_depth(node.content)
+
+
+def alpha_beta_priority(node, rule_name, rule_application):
+    """Non-branching rules first, then those likely to close branches, then the smallest formulae. This is the default
+    priority of ``TableauxSolver``"""
+    return (non_branching_first(node, rule_name, rule_application),
+            closure_likely_first(node, rule_name, rule_application),
+            smallest_formula_first(node, rule_name, rule_application))
+
+
+class TableauxStep:
+    """A step in the construction of a tableaux (see ``TableauxSolver.iter_solve``)
+
+    Attributes
+    ----------
+    number: int
+        The number of the step. The first one (``0``) is the beginning of the tableaux, the rest are rule applications
+    tree: logics.classes.propositional.proof_theories.TableauxNode
+        The tableaux (its root), as built up to and including this step
+    node: logics.classes.propositional.proof_theories.TableauxNode or None
+        The node that the rule was applied to (``None`` in the first step)
+    rule_name: str or None
+        The name of the rule (``None`` in the first step)
+    subst_dict: dict or None
+        The substitution dict of the rule application (``None`` in the first step)
+    added_nodes: list of logics.classes.propositional.proof_theories.TableauxNode
+        The nodes added in this step, in pre-order (for each branch)
+    closed_branches: list of logics.classes.propositional.proof_theories.TableauxNode
+        The leaves of the branches that were closed by this step
+    """
+
+    def __init__(self, number, tree, node, rule_name, subst_dict, added, tableaux_system):
+        self.number = number
+        self.tree = tree
+        self.node = node
+        self.rule_name = rule_name
+        self.subst_dict = subst_dict
+        self.added_nodes = [new_node for top_node in added for new_node in PreOrderIter(top_node)]
+        self.closed_branches = [leaf for top_node in added for leaf in top_node.leaves
+                                if tableaux_system.node_is_closed(leaf)]
+
+    def __repr__(self):
+        return f'TableauxStep(number={self.number}, rule_name={self.rule_name!r}, ' \
+               f'added_nodes={len(self.added_nodes)}, closed_branches={len(self.closed_branches)})'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
 class TableauxSolver:
     """Solver for tableaux systems
 
@@ -17,6 +111,9 @@ class TableauxSolver:
     nodes to it. Does not have the rules hardcoded. The ``solve`` method takes a tableaux system as parameter, and the
     tableaux solver will derive with the rules of the system you give it.
 
+    The rule applications that are pending are kept in an agenda, ordered by a priority. Each applicable rule is applied
+    once to each node (i.e. once in each branch below the node).
+
     Attributes
     ----------
     beggining_premise_index: int or None
@@ -25,12 +122,17 @@ class TableauxSolver:
     beggining_conclusion_index: int or None
         Class attribute representing the index that the conclusion has at the beggining of the derivation.
         ``None`` by default.
+    priority: callable
+        Class attribute, the default priority of the agenda (see the ``priority`` parameter of ``solve``).
+        ``alpha_beta_priority`` by default.
     """
     allow_repetition_of_nodes = True
     beggining_premise_index = None
     beggining_conclusion_index = None
+    priority = staticmethod(alpha_beta_priority)
 
-    def solve(self, inference, tableaux_system, beggining_index=None, max_depth=100):
+    def solve(self, inference, tableaux_system, beggining_index=None, max_depth=100, priority=None,
+              return_statistics=False, workers=None, split_depth=None, budget=None):
         """Builds a tableaux for an inference, given a tableaux system with which to operate.
 
         Parameters
@@ -45,6 +147,34 @@ class TableauxSolver:
             for S, T, TS, TS/ST, respectively)
         max_depth: int, optional
             The maximum depth that a tableaux can have. Default is 100. Set it to ``None`` if you want infinity.
+        priority: callable, optional
+            Order in which the rules are applied. Takes a node, the name of a rule applicable to it and the nodes
+            that the rule adds to each branch, and returns a sortable value (lower values go first, ties are broken by
+            the order in which the nodes were added). The module ``logics.utils.solvers.tableaux`` has
+            ``alpha_beta_priority`` (the default), ``non_branching_first``, ``closure_likely_first``,
+            ``smallest_formula_first`` and ``level_order``.
+        return_statistics: bool, optional
+            If ``True``, also returns a dict with the number of ``'rule_applications'``, the ``'max_agenda_size'``
+            and the ``'branching_factor'`` (the mean number of branches that each rule application opened). With
+            `workers`, a rule application that is pending in several of the branches given to the workers is counted
+            once in each of them.
+        workers: int, optional
+            If given, the tableaux is first built up to `split_depth`, and then the subtrees below each open branch are
+            built by a pool of `workers` processes and attached to it. The result is the same tree as without
+            `workers`. The tableaux system, the solver and `priority` must be picklable (e.g. `priority` must be
+            defined at the top level of a module)
+        split_depth: int, optional
+            With `workers`, the depth that every open branch must reach before the subtrees are given to the workers.
+            By default, the tree is built until it has at least ``4 * workers`` open branches
+        budget: logics.utils.solvers.budget.Budget, optional
+            Limits on the nodes, rule applications and time of the solver, and a cancellation event (see ``Budget``).
+            Cannot be given along with `workers`
+
+        Raises
+        ------
+        logics.classes.exceptions.BudgetExceeded
+            If the solver runs out of its `budget` or reaches `max_depth`. Its ``partial_result`` has the tableaux built
+            so far, its open leaves and the counters of the budget. It is a subclass of ``SolverError``
 
         Examples
         --------
@@ -61,7 +191,30 @@ class TableauxSolver:
                     └── ~~q (R~∧)
         >>> tree = standard_tableaux_solver.solve(classical_parser.parse("p ↔ ~(q → r) / ~~p ∨ q"), classical_tableaux_system)
         >>> tree.print_tree(classical_parser)
-        (p ↔ ~(q → r))
+        p ↔ ~(q → r)
+        └── ~(~~p ∨ q)
+            └── ~~~p (R~∨)
+                └── ~q (R~∨)
+                    └── ~p (R~~)
+                        ├── p (R↔)
+                        │   └── ~(q → r) (R↔)
+                        └── ~p (R↔)
+                            └── ~~(q → r) (R↔)
+                                └── q → r (R~~)
+                                    ├── ~q (R→)
+                                    └── r (R→)
+        >>> tree, statistics = standard_tableaux_solver.solve(classical_parser.parse("p ↔ ~(q → r) / ~~p ∨ q"),
+        ...                                                   classical_tableaux_system, return_statistics=True)
+        >>> statistics
+        {'rule_applications': 5, 'max_agenda_size': 2, 'branching_factor': 1.4}
+
+        With the order of the previous versions of the solver (rules applied in level order):
+
+        >>> from logics.utils.solvers.tableaux import level_order
+        >>> tree = standard_tableaux_solver.solve(classical_parser.parse("p ↔ ~(q → r) / ~~p ∨ q"),
+        ...                                       classical_tableaux_system, priority=level_order)
+        >>> tree.print_tree(classical_parser)
+        p ↔ ~(q → r)
         └── ~(~~p ∨ q)
             ├── p (R↔)
             │   └── ~(q → r) (R↔)
@@ -73,59 +226,461 @@ class TableauxSolver:
                 └── ~~(q → r) (R↔)
                     └── ~~~p (R~∨)
                         └── ~q (R~∨)
-                            └── (q → r) (R~~)
+                            └── q → r (R~~)
                                 └── ~p (R~~)
                                     ├── ~q (R→)
                                     └── r (R→)
         """
+        if priority is None:
+            priority = self.priority
+        budget = self._start_budget(budget, workers)
         tableaux = self._begin_tableaux(inference, beggining_index)
+        budget.spend(nodes=len(tableaux.descendants) + 1)
+        agenda, counter = self._initial_agenda(tableaux, tableaux_system, priority)
+        statistics = {'rule_applications': 0, 'opened_branches': 0, 'max_agenda_size': len(agenda)}
 
-        # For each node of the tableaux (including the ones we add dynamically)
-        for node in LevelOrderIter(tableaux):  # LevelOrder so that it does not get stuck on a branch
-            # We go rule by rule seeing if it can be applied
-            for rule_name in tableaux_system.rules:
-                result = tableaux_system.rule_is_applicable(node, rule_name, return_subst_dict=True)
-                applicable = result[0]
-                if applicable:
-                    # Get the rule and substitute the metavariables for formulae in it
-                    subst_dict = result[1]
-                    rule = tableaux_system.rules[rule_name]
-                    rule_application = self.apply_rule(tableaux_system, rule_name, rule, subst_dict)
-
-                    # Now get everything that isn't a premise in the tree obtained and add it to every open branch
-                    rule_application_last_prem = [n for n in PreOrderIter(rule_application) if
-                                                  n.justification is None][-1]
-                    for leaf in node.leaves:
-                        new_leaf = leaf
-                        if not tableaux_system.node_is_closed(leaf):
-                            rule_application_children = list()
-                            while rule_application_last_prem.children:
-                                # In order to put a copy of the rule child, we detach it, deepcopy, append
-                                # We reattach them all in the end so as to not modify the original order
-                                rule_child = rule_application_last_prem.children[0]
-                                rule_child.parent = None  # detach
-                                new_child = deepcopy(rule_child)  # copy
-                                if not self.allow_repetition_of_nodes:
-                                    if not (new_child.content, new_child.index) in [(n.content, n.index) for n in new_leaf.path]:
-                                        new_child.parent = leaf  # add the copy to the tableaux leaf
-                                        new_leaf = new_child
-                                else:
-                                    new_child.parent = leaf  # add the copy to the tableaux leaf
-                                    new_leaf = new_child
-                                rule_application_children.append(rule_child)  # save the child in a temp list
-                            rule_application_last_prem.children = rule_application_children  # reatach all
-
-                        # After applying the rule, check that you have not reached maximum depth
-                        if max_depth is not None and leaf.depth == max_depth:
-                            raise SolverError('Could not solve the tree. Maximum depth exceeded')
-
-                    if tableaux_system.tree_is_closed(tableaux):
-                        return tableaux
-
+        if workers is None:
+            self._expand(tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics, budget)
+        else:
+            self._expand(tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics, budget,
+                         split=(workers, split_depth))
+            leaves, tasks = self._branch_tasks(tableaux, agenda, counter, tableaux_system)
+            results = map_in_processes(_solve_branch, tasks, workers, initializer=_set_worker_solver,
+                                       initargs=(self, tableaux_system, priority, max_depth))
+            for leaf, (children, branch_statistics) in zip(leaves, results):
+                for child in children:
+                    child.parent = leaf
+                statistics['rule_applications'] += branch_statistics['rule_applications']
+                statistics['opened_branches'] += branch_statistics['opened_branches']
+                statistics['max_agenda_size'] = max(statistics['max_agenda_size'],
+                                                    branch_statistics['max_agenda_size'])
+
+        if return_statistics:
+            rule_applications = statistics['rule_applications']
+            return tableaux, {
+                'rule_applications': rule_applications,
+                'max_agenda_size': statistics['max_agenda_size'],
+                'branching_factor': statistics['opened_branches'] / rule_applications if rule_applications else 0,
+            }
         return tableaux
 
+    def _initial_agenda(self, tableaux, tableaux_system, priority):
+        """The agenda is a heap of the pending rule applications ``(priority, number, node, rule application, rule name,
+        substitution dict)``. The numbers are taken from a counter, and break ties between equal priorities (so the rest
+        is never compared). Returns the agenda and the counter"""
+        agenda = list()
+        counter = count()
+        for node in PreOrderIter(tableaux):
+            self._add_to_agenda(agenda, counter, node, tableaux_system, priority)
+        return agenda, counter
+
+    def _expand(self, tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics, budget,
+                split=None):
+        """Applies the rule applications of the agenda (and adds those of the new nodes) until it is empty or every
+        branch is closed. If `split` is given (a pair ``(workers, split_depth)``, see ``solve``), stops when the tree is
+        ready to be split among the workers"""
+        for _ in self._expand_steps(tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics,
+                                    budget, split):
+            pass
+
+    def _expand_steps(self, tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics, budget,
+                      split=None):
+        """Same as ``_expand``, but a generator. After each rule application, yields the node it was applied to, the
+        rule name, the substitution dict and the topmost nodes that were added (one for each branch)"""
+        # Number of open branches, updated as rules are applied (instead of looking at every leaf of the tree)
+        open_branches = sum(1 for leaf in tableaux.leaves if not tableaux_system.node_is_closed(leaf))
+
+        while agenda and open_branches:
+            if split is not None and self._split_reached(tableaux, tableaux_system, open_branches, *split):
+                return
+            reason = budget.exceeded()
+            if reason is not None:
+                raise self._budget_exceeded(tableaux, tableaux_system, budget, reason)
+            _, _, node, rule_application, rule_name, subst_dict = heappop(agenda)
+            if tableaux_system.node_is_closed(node):
+                continue  # Every branch below the node is closed
+            statistics['rule_applications'] += 1
+            statistics['opened_branches'] += len(rule_application)
+            budget.spend(rule_applications=1)
+
+            # Add the nodes of the rule application to every open branch (only the nodes are new, their contents are
+            # shared), and add the rules applicable to the new nodes to the agenda
+            added = list()
+            for leaf in node.leaves:
+                if not tableaux_system.node_is_closed(leaf):
+                    open_branches -= 1
+                    new_leaf = leaf
+                    for template in rule_application:
+                        if self.allow_repetition_of_nodes or \
+                                not self._is_repeated(tableaux_system, template, new_leaf):
+                            new_leaf = template.build(parent=leaf)  # add the nodes to the tableaux leaf
+                            added.append(new_leaf)
+                            for new_node in PreOrderIter(new_leaf):
+                                self._add_to_agenda(agenda, counter, new_node, tableaux_system, priority)
+                                budget.spend(nodes=1)
+                    open_branches += sum(1 for leaf2 in leaf.leaves if not tableaux_system.node_is_closed(leaf2))
+
+                # After applying the rule, check that you have not reached maximum depth
+                if max_depth is not None and leaf.depth == max_depth:
+                    raise self._budget_exceeded(tableaux, tableaux_system, budget, 'max_depth')
+            statistics['max_agenda_size'] = max(statistics['max_agenda_size'], len(agenda))
+            yield node, rule_name, subst_dict, added
+
+    def iter_solve(self, inference, tableaux_system, beggining_index=None, max_depth=100, priority=None, budget=None):
+        """Builds a tableaux for an inference step by step, as a generator of ``TableauxStep``.
+
+        The first step is the beginning of the tableaux (the premises and conclusions, with ``None`` as rule name),
+        and then there is a step for each rule application, right after it is applied (with the nodes it added and the
+        branches it closed). The tree is built as the steps are consumed, so the first step comes at once (regardless
+        of the size of the tableaux), and the consumer can pause (stop asking for steps), resume (ask again) or abort
+        (stop asking, or call the ``close`` method of the generator) at any point. The last step leaves the same tree
+        as ``solve`` with the same parameters.
+
+        Parameters
+        ----------
+        inference: logics.classes.propositional.Inference
+            The Inference to build a tableaux for
+        tableaux_system: logics.classes.propositional.proof_theories.TableauxSystem
+            A TableauxSystem or any class that inherits from it.
+        beggining_index: list or set, optional
+            Same as in ``solve``
+        max_depth: int, optional
+            Same as in ``solve``
+        priority: callable, optional
+            Same as in ``solve``
+        budget: logics.utils.solvers.budget.Budget, optional
+            Same as in ``solve``. It is checked before each rule application, so a cancel event can also stop a
+            consumer that is in another thread
+
+        Raises
+        ------
+        logics.classes.exceptions.BudgetExceeded
+            Same as in ``solve``, when a step is asked for
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.utils.solvers.tableaux import standard_tableaux_solver
+        >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+        >>> steps = standard_tableaux_solver.iter_solve(classical_parser.parse("~(p ∨ q) / ~p ∧ ~q"),
+        ...                                             classical_tableaux_system)
+        >>> step = next(steps)
+        >>> step.rule_name, [classical_parser.unparse(node.content) for node in step.added_nodes]
+        (None, ['~(p ∨ q)', '~(~p ∧ ~q)'])
+        >>> step = next(steps)
+        >>> step.rule_name, classical_parser.unparse(step.node.content), sorted(step.subst_dict)
+        ('R~∨', '~(p ∨ q)', ['A', 'B'])
+        >>> step.tree.print_tree(classical_parser)  # The tree built so far
+        ~(p ∨ q)
+        └── ~(~p ∧ ~q)
+            └── ~p (R~∨)
+                └── ~q (R~∨)
+        >>> for step in steps:
+        ...     print(step)
+        TableauxStep(number=2, rule_name='R~∧', added_nodes=2, closed_branches=2)
+        """
+        if priority is None:
+            priority = self.priority
+        budget = self._start_budget(budget, None)
+        tableaux = self._begin_tableaux(inference, beggining_index)
+        budget.spend(nodes=len(tableaux.descendants) + 1)
+        yield TableauxStep(0, tableaux, None, None, None, [tableaux], tableaux_system)
+
+        agenda, counter = self._initial_agenda(tableaux, tableaux_system, priority)
+        statistics = {'rule_applications': 0, 'opened_branches': 0, 'max_agenda_size': len(agenda)}
+        steps = self._expand_steps(tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics, budget)
+        for number, (node, rule_name, subst_dict, added) in enumerate(steps, 1):
+            yield TableauxStep(number, tableaux, node, rule_name, subst_dict, added, tableaux_system)
+
+    @staticmethod
+    def _start_budget(budget, workers):
+        """Starts the budget given to ``solve`` or ``check`` (an unlimited one if there is none, which only counts)"""
+        if budget is None:
+            return Budget()
+        if workers is not None:
+            raise ValueError('A budget cannot be given along with workers')
+        budget.start()
+        return budget
+
+    @staticmethod
+    def _budget_exceeded(tableaux, tableaux_system, budget, reason, frontier=None):
+        """Returns the ``BudgetExceeded`` exception to raise, with the tableaux built so far and its open leaves
+        (unless another `frontier` is given)"""
+        if frontier is None:
+            frontier = [leaf for leaf in tableaux.leaves if not tableaux_system.node_is_closed(leaf)]
+        if reason == 'max_depth':
+            message = 'Could not solve the tree. Maximum depth exceeded'
+        else:
+            message = f'Could not solve the tree. Budget exceeded ({reason})'
+        return BudgetExceeded(message, PartialResult(tableaux, frontier, budget.counters(), reason))
+
+    @staticmethod
+    def _split_reached(tableaux, tableaux_system, open_branches, workers, split_depth):
+        if split_depth is None:
+            return open_branches >= 4 * workers
+        return all(leaf.depth >= split_depth for leaf in tableaux.leaves if not tableaux_system.node_is_closed(leaf))
+
+    @staticmethod
+    def _branch_tasks(tableaux, agenda, counter, tableaux_system):
+        """Splits a partially built tableaux into independent tasks, one for each open branch. Returns the leaves of
+        the branches and the tasks.
+
+        A task has the nodes of the branch (as templates), the rule applications of the agenda that are pending in it
+        (with the position in the branch of their node instead of the node) and the next number of the counter. The
+        order of the rule applications of a branch is the same as if the whole tree were built at once, since their
+        numbers keep their order and those of new ones are greater.
+        """
+        next_number = next(counter)
+        leaves = list()
+        tasks = list()
+        for leaf in tableaux.leaves:
+            if tableaux_system.node_is_closed(leaf):
+                continue
+            path = leaf.path
+            positions = {id(node): position for position, node in enumerate(path)}
+            pending = [entry[:2] + (positions[id(entry[2])],) + entry[3:]
+                       for entry in agenda if id(entry[2]) in positions]
+            branch = [_NodeTemplate(node.__class__, node.content, node.index, node.justification) for node in path]
+            leaves.append(leaf)
+            tasks.append((branch, pending, next_number))
+        return leaves, tasks
+
+    @staticmethod
+    def _restore_branch(task):
+        """Builds the branch of a task (see ``_branch_tasks``), returns its leaf, agenda and counter"""
+        branch, pending, next_number = task
+        nodes = list()
+        parent = None
+        for template in branch:
+            parent = template.build(parent)
+            nodes.append(parent)
+        agenda = [entry[:2] + (nodes[entry[2]],) + entry[3:] for entry in pending]
+        heapify(agenda)
+        return parent, agenda, count(next_number)
+
+    def check(self, inference, tableaux_system, beggining_index=None, max_depth=100, priority=None, workers=None,
+              split_depth=None, budget=None):
+        """Determines whether an inference is valid, and gives a countermodel if it is not.
+
+        Unlike ``solve``, does not build the whole tableaux. Explores one branch at a time (depth-first, applying the
+        rules in the order given by `priority`), and stops at the first branch that is open and saturated (no rule is
+        left to apply to it). When a branch closes, goes back to the last rule application that opened several
+        branches and continues with the next one. Only the current branch (and, for every branching point, the pending
+        rule applications and the branches left to explore) is kept in memory.
+
+        Parameters
+        ----------
+        inference: logics.classes.propositional.Inference
+            The Inference to check
+        tableaux_system: logics.classes.propositional.proof_theories.TableauxSystem
+            A TableauxSystem or any class that inherits from it.
+        beggining_index: list or set, optional
+            Same as in ``solve``
+        max_depth: int, optional
+            The maximum depth that a branch can have. Default is 100. Set it to ``None`` if you want infinity.
+        priority: callable, optional
+            Same as in ``solve``
+        workers: int, optional
+            If given, the tableaux is first built as in ``solve`` up to `split_depth` (see ``solve``), and then each
+            open branch is explored depth-first by a pool of `workers` processes. As soon as one of them finds an open
+            and saturated branch, the rest stop. The countermodel can thus be different from the one found without
+            `workers` (and from one call to the next)
+        split_depth: int, optional
+            Same as in ``solve``
+        budget: logics.utils.solvers.budget.Budget, optional
+            Same as in ``solve``. The nodes of the branches that closed (and were discarded) also count
+
+        Raises
+        ------
+        logics.classes.exceptions.BudgetExceeded
+            If the solver runs out of its `budget` or reaches `max_depth`. The tableaux of its ``partial_result`` has
+            the current branch and the branches that were left to explore, and its frontier their open leaves
+
+        Returns
+        -------
+        tuple
+            A pair ``(is_valid, countermodel)``. If the inference is not valid, `countermodel` is the valuation of the
+            atomics given by the open branch (see the ``branch_valuation`` method of the tableaux system), ``None``
+            otherwise.
+
+        Examples
+        --------
+        >>> from logics.utils.parsers import classical_parser
+        >>> from logics.utils.solvers.tableaux import standard_tableaux_solver
+        >>> from logics.instances.propositional.tableaux import classical_tableaux_system
+        >>> standard_tableaux_solver.check(classical_parser.parse("~(p ∨ q) / ~p ∧ ~q"), classical_tableaux_system)
+        (True, None)
+        >>> is_valid, countermodel = standard_tableaux_solver.check(classical_parser.parse("p ∨ q, p → r / r ∧ q"),
+        ...                                                         classical_tableaux_system)
+        >>> is_valid, sorted(countermodel.items())
+        (False, [('p', '1'), ('q', '0'), ('r', '1')])
+        """
+        if priority is None:
+            priority = self.priority
+        budget = self._start_budget(budget, workers)
+        tableaux = self._begin_tableaux(inference, beggining_index)
+        budget.spend(nodes=len(tableaux.descendants) + 1)
+        agenda, counter = self._initial_agenda(tableaux, tableaux_system, priority)
+        atomics = inference.atomics_inside(tableaux_system.language)
+
+        if workers is None:
+            valid, leaf = self._check_branch(tableaux.leaves[0], agenda, counter, tableaux_system, priority, max_depth,
+                                             budget)
+            return valid, None if valid else tableaux_system.branch_valuation(leaf, atomics)
+
+        statistics = {'rule_applications': 0, 'opened_branches': 0, 'max_agenda_size': 0}
+        self._expand(tableaux, agenda, counter, tableaux_system, priority, max_depth, statistics, budget,
+                     split=(workers, split_depth))
+        leaves, tasks = self._branch_tasks(tableaux, agenda, counter, tableaux_system)
+        if not tasks:
+            return True, None
+        if not agenda:
+            # The tree was finished before splitting it, and has open branches
+            return False, tableaux_system.branch_valuation(leaves[0], atomics)
+        return self._check_in_processes(tasks, workers, tableaux_system, priority, max_depth, atomics)
+
+    def _check_branch(self, leaf, agenda, counter, tableaux_system, priority, max_depth, budget, cancel_event=None):
+        """Explores depth-first the subtree below `leaf`, given the agenda of its branch. Returns ``(True, None)`` if
+        every branch closes, and ``(False, leaf)`` with the leaf of the first open and saturated branch otherwise.
+        If `cancel_event` is given and is set while exploring, returns ``(None, None)``"""
+        # Each branching point is a list [node, branches left to explore below it, agenda at the node]
+        branching_points = list()
+
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None, None
+            reason = budget.exceeded()
+            if reason is not None:
+                raise self._check_budget_exceeded(leaf, branching_points, tableaux_system, budget, reason)
+            if tableaux_system.node_is_closed(leaf):
+                # Go back to the last branching point that still has branches to explore
+                while branching_points and not branching_points[-1][1]:
+                    branching_points.pop()
+                if not branching_points:
+                    return True, None
+                leaf, branches, agenda = branching_points[-1]
+                leaf.children = ()  # Discard the closed branch
+                branch = branches.pop()
+                agenda = list(agenda) if branches else agenda
+            elif not agenda:
+                return False, leaf  # Open and saturated branch
+            else:
+                node, rule_application = heappop(agenda)[2:4]
+                budget.spend(rule_applications=1)
+                branches = self._branches(tableaux_system, rule_application, leaf)
+                if not branches:
+                    continue
+                branch = branches.pop(0)
+                if branches:
+                    # The branches are explored in order (popping from the end), each one with a copy of the agenda
+                    branches.reverse()
+                    branching_points.append([leaf, branches, list(agenda)])
+
+            for template in branch:
+                leaf = template.node_class(content=template.content, index=template.index,
+                                           justification=template.justification, parent=leaf)
+                self._add_to_agenda(agenda, counter, leaf, tableaux_system, priority)
+                budget.spend(nodes=1)
+                if max_depth is not None and leaf.depth == max_depth:
+                    raise self._check_budget_exceeded(leaf, branching_points, tableaux_system, budget, 'max_depth')
+
+    def _check_budget_exceeded(self, leaf, branching_points, tableaux_system, budget, reason):
+        """The ``BudgetExceeded`` exception of ``_check_branch``. The branches left to explore are added to the tree
+        (below their branching point), so that it has every open branch"""
+        for point_leaf, branches, _ in branching_points:
+            for branch in reversed(branches):
+                node = point_leaf
+                for template in branch:
+                    node = template.node_class(content=template.content, index=template.index,
+                                               justification=template.justification, parent=node)
+        tableaux = leaf.root
+        return self._budget_exceeded(tableaux, tableaux_system, budget, reason)
+
+    def _check_in_processes(self, tasks, workers, tableaux_system, priority, max_depth, atomics):
+        """Explores the branches of the tasks (see ``_branch_tasks``) in a pool of processes, stopping them all when
+        one finds an open branch"""
+        # Imported here since they are slow to import, and only needed when using processes
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from multiprocessing import Event
+
+        cancel_event = Event()
+        initargs = (self, tableaux_system, priority, max_depth, atomics, cancel_event)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_solver, initargs=initargs) as executor:
+            futures = [executor.submit(_check_branch, task) for task in tasks]
+            try:
+                for future in as_completed(futures):
+                    valid, countermodel = future.result()
+                    if valid is False:
+                        return False, countermodel
+            finally:
+                # Stop the tasks that are running, and do not start the rest
+                cancel_event.set()
+                for future in futures:
+                    future.cancel()
+        return True, None
+
+    def _branches(self, tableaux_system, rule_application, leaf):
+        """The branches that a rule application adds below `leaf`, as lists of templates (from top to bottom)"""
+        branches = list()
+        previous = None
+        for template in rule_application:
+            # Same as in solve, a template is not added if its topmost node is already in the branch (or is the same
+            # as that of the previous template)
+            if not self.allow_repetition_of_nodes and (
+                    self._is_repeated(tableaux_system, template, leaf) or
+                    (previous is not None and
+                     previous.content == template.content and previous.index == template.index)):
+                continue
+            previous = template
+            branches.extend(template.paths())
+        return branches
+
+    def _add_to_agenda(self, agenda, counter, node, tableaux_system, priority):
+        """Adds to the agenda the application of every rule that is applicable to the node (if its branch is open)"""
+        if tableaux_system.node_is_closed(node):
+            return
+        # Only go through the rules that might be applicable
+        for rule_name in tableaux_system.candidate_rules(node):
+            applicable, subst_dict = tableaux_system.rule_is_applicable(node, rule_name, return_subst_dict=True)
+            if applicable:
+                # The nodes that the rule adds are instantiated once, they are the same for every open branch
+                rule_application = self._rule_application(tableaux_system, rule_name, subst_dict)
+                heappush(agenda, (priority(node, rule_name, rule_application), next(counter), node, rule_application,
+                                  rule_name, subst_dict))
+
+    def _rule_application(self, tableaux_system, rule_name, subst_dict):
+        """Returns the templates (see ``TableauxSystem._rule_template``) of the nodes that applying a rule adds to each
+        open branch, with the metavariables replaced by the values in `subst_dict`.
+
+        The templates are given by the tableaux system (see ``TableauxSystem._rule_nodes``), so that solvers and
+        ``is_correct_tree`` agree on them. If a subclass overrides the deprecated ``apply_rule``, they are taken from
+        the nodes below the last premise of the tree it returns.
+        """
+        if type(self).apply_rule not in (TableauxSolver.apply_rule, MetainferentialTableauxSolver.apply_rule):
+            warnings.warn(f"{type(self).__name__} overrides apply_rule, which is deprecated. The nodes that a rule "
+                          f"adds are given by the tableaux system", DeprecationWarning, stacklevel=2)
+            rule_application = self.apply_rule(tableaux_system, rule_name, tableaux_system.rules[rule_name],
+                                               subst_dict)
+            last_premise = [n for n in PreOrderIter(rule_application) if n.justification is None][-1]
+            return tuple(_NodeTemplate.from_node(child) for child in last_premise.children)
+        return tableaux_system._rule_nodes(rule_name, subst_dict)
+
     def apply_rule(self, tableaux_system, rule_name, rule, subst_dict):
-        return rule.instantiate(tableaux_system.language, subst_dict, instantiate_children=True)
+        """Returns the rule instantiated with the values in `subst_dict` (premises included).
+
+        .. deprecated::
+            The solvers no longer use this method unless a subclass overrides it. The nodes that a rule adds are given
+            by ``TableauxSystem._rule_nodes``.
+        """
+        warnings.warn("apply_rule is deprecated. The nodes that a rule adds are given by the tableaux system",
+                      DeprecationWarning, stacklevel=2)
+        return rule.instantiate(tableaux_system.language, subst_dict, instantiate_children=True,
+                                share_subformulae=True)
+
+    @staticmethod
+    def _is_repeated(tableaux_system, template, node):
+        """Whether the topmost node of a template has the same content and index as a node in the path to `node`"""
+        return tableaux_system._is_in_branch(template, node)
 
     def _begin_tableaux(self, inference, beggining_index=None):
         """
@@ -143,6 +698,39 @@ class TableauxSolver:
         return new_node.root
 
 
+# Processes that build or explore branches for TableauxSolver keep the solver, the system, etc. here
+_worker_solver = None
+
+
+def _set_worker_solver(solver, tableaux_system, priority, max_depth, atomics=None, cancel_event=None):
+    global _worker_solver
+    _worker_solver = (solver, tableaux_system, priority, max_depth, atomics, cancel_event)
+
+
+def _solve_branch(task):
+    """Builds the subtree below the branch of a task, returns its nodes (the children of the leaf of the branch) and the
+    statistics"""
+    solver, tableaux_system, priority, max_depth, _, _ = _worker_solver
+    leaf, agenda, counter = solver._restore_branch(task)
+    statistics = {'rule_applications': 0, 'opened_branches': 0, 'max_agenda_size': len(agenda)}
+    solver._expand(leaf.root, agenda, counter, tableaux_system, priority, max_depth, statistics, Budget())
+    children = leaf.children
+    leaf.children = ()
+    return children, statistics
+
+
+def _check_branch(task):
+    """Explores depth-first the branch of a task, returns ``(is_valid, countermodel)`` (``is_valid`` is ``None`` if
+    it was cancelled)"""
+    solver, tableaux_system, priority, max_depth, atomics, cancel_event = _worker_solver
+    leaf, agenda, counter = solver._restore_branch(task)
+    valid, leaf = solver._check_branch(leaf, agenda, counter, tableaux_system, priority, max_depth, Budget(),
+                                       cancel_event)
+    if valid is False:
+        return False, tableaux_system.branch_valuation(leaf, atomics)
+    return valid, None
+
+
 standard_tableaux_solver = TableauxSolver()
 
 
@@ -163,15 +751,13 @@ class IndexedTableauxSolver(TableauxSolver):
     >>> tree = indexed_tableaux_solver.solve(classical_parser.parse("~(p ∨ q) / ~~p ∧ ~~q"), LP_tableaux_system)
     >>> tree.print_tree(classical_parser)
     ~(p ∨ q), 1
-    └── (~~p ∧ ~~q), 0
-        └── (~p ∧ ~q), 1 (R~∨1)
-            ├── ~~p, 0 (R∧0)
-            │   └── ~p, 1 (R∧1)
-            │       └── ~q, 1 (R∧1)
-            │           └── p, 0 (R~~0)
-            └── ~~q, 0 (R∧0)
-                └── ~p, 1 (R∧1)
-                    └── ~q, 1 (R∧1)
+    └── ~~p ∧ ~~q, 0
+        └── ~p ∧ ~q, 1 (R~∨1)
+            └── ~p, 1 (R∧1)
+                └── ~q, 1 (R∧1)
+                    ├── ~~p, 0 (R∧0)
+                    │   └── p, 0 (R~~0)
+                    └── ~~q, 0 (R∧0)
                         └── q, 0 (R~~0)
     """
 
@@ -265,8 +851,14 @@ class MetainferentialTableauxSolver(TableauxSolver):
                                     └── ~p, {'i'} (singleton)
     >>> sk_tableaux.tree_is_closed(tree)
     False
+
+    Notes
+    -----
+    Since only the first node added by a rule is checked for repetitions, the order in which the hardcoded rules are
+    applied matters here. This solver keeps the ``level_order`` priority (the order of previous versions) by default.
     """
     allow_repetition_of_nodes = False
+    priority = staticmethod(level_order)
 
     def _begin_tableaux(self, inference, beggining_index):
         """
@@ -274,103 +866,34 @@ class MetainferentialTableauxSolver(TableauxSolver):
         """
         return MetainferentialTableauxNode(
             content=inference,
-            index=MetainferentialTableauxStandard(deepcopy(beggining_index), bar=True)
+            index=MetainferentialTableauxStandard(beggining_index, bar=True)
         )
 
     def apply_rule(self, tableaux_system, rule_name, rule, subst_dict):
-        # This is kind of a hack. Since some rules in this system are more complicated, we hardcode their instantiaton.
-        # e.g. they contain inference variables (which logics does not have) -inf0, inf1, lowering and lifting rules
-        # or require you to do complex operations on the standards (e.g. the singleton, intersection, and bar rules)
+        """Returns the rule instantiated with the values in `subst_dict` (premises included), also for the hardcoded
+        rules.
 
-        # Rules for inferences
-        if rule_name == "inf0" or rule_name == "inf1":
-            premises, conclusions = subst_dict['Γ'], subst_dict['Δ']
-            root_inference = Inference(premises=premises, conclusions=conclusions)
-            X, Y = subst_dict['X'], subst_dict['Y']
-
-            if rule_name == "inf0":
-                # Root node
-                last_node = MetainferentialTableauxNode(content=root_inference,
-                                                        index=MetainferentialTableauxStandard([X, Y], bar=True),
-                                                        justification=None)
-                # Premises
-                for premise in premises:
-                    last_node = MetainferentialTableauxNode(content=deepcopy(premise), index=deepcopy(X),
-                                                            justification="inf0", parent=last_node)
-                # Conclusions
-                Ybar = deepcopy(Y)
-                Ybar.bar = True
-                for conclusion in conclusions:
-                    last_node = MetainferentialTableauxNode(content=deepcopy(conclusion), index=deepcopy(Ybar),
-                                                            justification="inf0", parent=last_node)
-                return last_node.root
-
-            elif rule_name == "inf1":
-                # Root node
-                root_node = MetainferentialTableauxNode(
-                    content=Inference(premises=premises, conclusions=conclusions),
-                    index=MetainferentialTableauxStandard([subst_dict['X'], subst_dict['Y']]),
-                    justification=None
-                )
-                # Premises
-                Xbar = deepcopy(X)
-                Xbar.bar = True
-                for premise in premises:
-                    MetainferentialTableauxNode(content=deepcopy(premise), index=deepcopy(Xbar), justification="inf1",
-                                                parent=root_node)
-                # Conclusions
-                for conclusion in conclusions:
-                    MetainferentialTableauxNode(content=deepcopy(conclusion), index=deepcopy(Y), justification="inf1",
-                                                parent=root_node)
-                return root_node
-
-        # Rules for formulae
-        elif rule_name == "singleton" or rule_name == "intersection" or rule_name == "complement":
-            formula = subst_dict['A']
-            beginning_standard = subst_dict['X']
-
-            if rule_name == "singleton":
-                root = MetainferentialTableauxNode(content=deepcopy(formula), index=deepcopy(beginning_standard))
-                for value in beginning_standard.content:
-                    MetainferentialTableauxNode(
-                        content=deepcopy(formula),
-                        index=MetainferentialTableauxStandard(content={value}),
-                        justification='singleton',
-                        parent=root,
-                    )
-                return root
-
-            elif rule_name == "intersection":
-                beginning_standard2 = subst_dict['Y']
-                root = MetainferentialTableauxNode(content=deepcopy(formula), index=deepcopy(beginning_standard))
-                root2 = MetainferentialTableauxNode(content=deepcopy(formula), index=deepcopy(beginning_standard2),
-                                                    parent=root)
-                intersection_standard = MetainferentialTableauxStandard(
-                    content=beginning_standard.content.intersection(beginning_standard2.content), bar=False
-                )
-                MetainferentialTableauxNode(
-                    content=deepcopy(formula),
-                    index=intersection_standard,
-                    justification='intersection',
-                    parent=root2)
-                return root
-
-            elif rule_name == "complement":
-                new_standard = MetainferentialTableauxStandard(
-                    content=tableaux_system.base_indexes.difference(beginning_standard.content), bar=False
-                )
-                root = MetainferentialTableauxNode(content=deepcopy(formula), index=deepcopy(beginning_standard))
-                MetainferentialTableauxNode(
-                    content=deepcopy(formula),
-                    index=new_standard,
-                    justification='complement',
-                    parent=root
-                )
-                return root
+        .. deprecated::
+            The solver no longer uses this method unless a subclass overrides it. The nodes that the hardcoded rules
+            add are given by ``MetainferentialTableauxSystem._rule_nodes``.
+        """
+        if rule_name not in tableaux_system.hardcoded_rules:
+            return super().apply_rule(tableaux_system, rule_name, rule, subst_dict)
 
+        warnings.warn("apply_rule is deprecated. The nodes that a rule adds are given by the tableaux system",
+                      DeprecationWarning, stacklevel=2)
+        if rule_name == "inf0" or rule_name == "inf1":
+            root = last_premise = MetainferentialTableauxNode(
+                content=Inference(premises=subst_dict['Γ'], conclusions=subst_dict['Δ']),
+                index=MetainferentialTableauxStandard([subst_dict['X'], subst_dict['Y']], bar=rule_name == "inf0"))
+        elif rule_name == "intersection":
+            root = MetainferentialTableauxNode(content=subst_dict['A'], index=subst_dict['X'])
+            last_premise = MetainferentialTableauxNode(content=subst_dict['A'], index=subst_dict['Y'], parent=root)
         else:
-            # In every other case, the rules behave as usual, so we return the super method
-            return super().apply_rule(tableaux_system, rule_name, rule, subst_dict)
+            root = last_premise = MetainferentialTableauxNode(content=subst_dict['A'], index=subst_dict['X'])
+        for template in tableaux_system._rule_nodes(rule_name, subst_dict):
+            template.build(parent=last_premise)
+        return root
 
 
 metainferential_tableaux_solver = MetainferentialTableauxSolver()
@@ -66,6 +66,22 @@ class TestLanguageFormulaClasses(unittest.TestCase):
         self.assertEqual(cl_language.arity('W'), 1)  # predicate variable
         self.assertEqual(self.function_language.arity('f'), 1)
 
+    def test_classify(self):
+        language = self.function_language
+        self.assertEqual(language.classify('∀'), 'quantifier')
+        self.assertEqual(language.classify('α'), 'individual_metavariable')
+        self.assertEqual(language.classify('χ'), 'variable_metavariable')
+        self.assertEqual(language.classify('a12'), 'individual_constant')
+        self.assertEqual(language.classify('x3'), 'variable')
+        self.assertEqual(language.classify('P1'), 'predicate_letter')
+        self.assertEqual(language.classify('X2'), 'predicate_variable')
+        self.assertEqual(language.classify('g'), 'function_symbol')
+        self.assertIsNone(language.classify('α1'))
+        self.assertIsNone(language.classify(('f', 'a')))
+        self.assertEqual(language.arity('P1'), 1)
+        self.assertEqual(language.arity('X2'), 1)
+        self.assertEqual(arithmetic.classify('2.5'), 'individual_constant')
+
     def test_individual_and_variable_metavariables(self):
         # is_valid_predicate
         self.assertTrue(cl_language._is_valid_predicate('P'))   # predicate
@@ -138,6 +154,13 @@ class TestLanguageFormulaClasses(unittest.TestCase):
         self.assertTrue(cl_language.is_well_formed(self.m6))
         self.assertFalse(cl_language.is_well_formed(self.m8))
 
+        # Position of the first error
+        f = PredicateFormula(['∀', 'x', '∈', 'a', ['∧', ['P', 'x'], ['R', 'x']]])
+        self.assertEqual(self.function_language.well_formedness_error(f),
+                         ((4, 2), "['R', 'x'] is not well-formed: Incorrect number of arguments for 2-ary predicate R"))
+        self.assertEqual(self.function_language.well_formedness_error(self.m3)[0], ())
+        self.assertEqual(self.function_language.well_formedness_error(PredicateFormula(['∀', 'x', 'P']))[0], ())
+
         # formulae with individual and variable metavariables
         self.assertTrue(cl_language.is_well_formed(PredicateFormula(['P', 'α'])))
         self.assertTrue(cl_language.is_well_formed(PredicateFormula(['P', 'χ'])))
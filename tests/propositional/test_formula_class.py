@@ -1,4 +1,5 @@
 import unittest
+from copy import copy, deepcopy
 
 from logics.classes.propositional import Language, InfiniteLanguage, Formula
 
@@ -90,6 +91,82 @@ class TestFormulaClass(unittest.TestCase):
         self.assertTrue(Formula(['⊥']).is_well_formed(self.language))
         self.assertFalse(Formula(['*']).is_well_formed(self.language))
 
+    def test_well_formedness_error(self):
+        f = Formula(['&', ['~', ['p']], ['&', ['q'], ['~', '~', ['r']]]])
+        self.assertEqual(self.language.well_formedness_error(f),
+                         ((2, 2), "['~', '~', ['r']] is not well-formed: Number of arguments does not coincide with "
+                                  "the arity of the logical constant"))
+        # Errors in arguments are also reported when return_error is True
+        self.assertFalse(self.language.is_well_formed(f, return_error=True)[0])
+        self.assertEqual(self.language.well_formedness_error(Formula(['&', ['p'], ['s']]))[0], (2,))
+        self.assertEqual(self.language.well_formedness_error(Formula(['&', ['p'], 'q']))[0], ())
+
+        # Deeper than the recursion limit
+        deep = Formula(['p'])
+        for _ in range(5000):
+            deep = Formula(['~', deep])
+        self.assertTrue(self.language.is_well_formed(deep))
+
+    def test_well_formedness_cache(self):
+        language = Language(atomics=['p'], constant_arity_dict={'~': 1, '&': 2})
+        notp = Formula(['~', ['p']])
+        f = Formula(['&', notp, notp])
+        self.assertTrue(language.is_well_formed(f))
+        self.assertIs(notp._well_formed_in, f._well_formed_in)
+
+        # Marked formulae are not visited again
+        calls = []
+        language._atomic_error = lambda formula: calls.append(formula)
+        self.assertTrue(language.is_well_formed(Formula(['&', notp, ['p']])))
+        self.assertEqual(calls, [['p']])
+        del language._atomic_error
+
+        # Changing the vocabulary invalidates the marks
+        language.constant_arity_dict = {'&': 2}
+        self.assertFalse(language.is_well_formed(f))
+        self.assertTrue(self.language.is_well_formed(f))
+
+        # Copies are not marked (they may be modified)
+        self.assertFalse(hasattr(deepcopy(f), '_well_formed_in'))
+        self.assertFalse(hasattr(copy(f), '_well_formed_in'))
+
+        # Modifying a formula in place (at any depth) invalidates the marks
+        f = Formula(['&', ['p'], ['~', ['p']]])
+        self.assertTrue(self.language.is_well_formed(f))
+        f[1] = Formula(['&', ['p']])
+        self.assertFalse(self.language.is_well_formed(f))
+        f[1] = Formula(['p'])
+        self.assertTrue(self.language.is_well_formed(f))
+        f[2][1] = Formula(['~', '~', ['p']])
+        self.assertFalse(self.language.is_well_formed(f))
+        del f[2][1]
+        self.assertFalse(self.language.is_well_formed(f))
+        f[2].append(Formula(['q']))
+        self.assertTrue(self.language.is_well_formed(f))
+        f.pop()
+        self.assertFalse(self.language.is_well_formed(f))
+
+        # Modifying (or building) a formula that is not marked keeps the marks of the rest
+        f = Formula(['&', ['p'], ['~', ['p']]])
+        self.assertTrue(self.language.is_well_formed(f))
+        mark = f._well_formed_in
+        g = Formula(['~'])
+        g.append(f)
+        Formula(['&', ['A'], ['~', ['B']]]).instantiate(self.language, {'A': f, 'B': f})
+        self.assertTrue(self.language.is_well_formed(f))
+        self.assertEqual(f._well_formed_in, mark)
+        self.assertEqual(f[2]._well_formed_in, mark)
+
+    def test_deepcopy(self):
+        notp = Formula(['~', ['p']])
+        f = Formula(['∧', notp, ['∨', notp, ['q']]])
+        f2 = deepcopy(f)
+        self.assertEqual(f, f2)
+        self.assertIsNot(f2[1], notp)
+        self.assertIs(f2[1], f2[2][1])  # repeated subformulae are still shared
+        f2[2][2][0] = 'r'
+        self.assertEqual(f[2][2], Formula(['q']))
+
     def test_substitute_subformulae(self):
         p = Formula(['p'])
         q = Formula(['q'])
@@ -136,6 +213,40 @@ class TestFormulaClass(unittest.TestCase):
                          Formula(['∨', ['~', ['p']], ['∨', ['~', ['p']], ['q']]]))
         # Might need more testing than this
 
+    def test_share_subformulae(self):
+        p = Formula(['p'])
+        notq = Formula(['~', ['q']])
+        f = Formula(['&', ['~', p], ['&', notq, ['A']]])
+
+        # Default behavior: nothing is shared
+        g = f.substitute(Formula(['A']), Formula(['r']))
+        self.assertEqual(g, Formula(['&', ['~', ['p']], ['&', ['~', ['q']], ['r']]]))
+        self.assertIsNot(g[1], f[1])
+
+        # Shared: only the changed spine is new
+        g = f.substitute(Formula(['A']), Formula(['r']), share_subformulae=True)
+        self.assertEqual(g, Formula(['&', ['~', ['p']], ['&', ['~', ['q']], ['r']]]))
+        self.assertIs(g[1], f[1])
+        self.assertIs(g[2][1], f[2][1])
+        self.assertIsNot(g[2], f[2])
+        self.assertEqual(f, Formula(['&', ['~', ['p']], ['&', ['~', ['q']], ['A']]]))
+        self.assertIs(f.substitute(Formula(['r']), Formula(['q']), share_subformulae=True), f)
+
+        g = f.instantiate(self.language, {'A': notq}, share_subformulae=True)
+        self.assertEqual(g, Formula(['&', ['~', ['p']], ['&', ['~', ['q']], ['~', ['q']]]]))
+        self.assertIs(g[1], f[1])
+        self.assertIs(g[2][2], notq)
+        self.assertIs(g[1].instantiate(self.language, {}, share_subformulae=True), g[1])
+        self.assertIsNot(g[1].instantiate(self.language, {}), g[1])
+
+        cond = Formula(['→', ['A'], ['B']])
+        disj = Formula(['∨', ['~', ['A']], ['B']])
+        h = Formula(['&', ['~', ['p']], ['→', ['p'], ['q']]])
+        g = h.schematic_substitute(self.language, cond, disj, share_subformulae=True)
+        self.assertEqual(g, Formula(['&', ['~', ['p']], ['∨', ['~', ['p']], ['q']]]))
+        self.assertIs(g[1], h[1])
+        self.assertIs(g[2][2], h[2][2])
+
     def test_metavariables(self):
         A = Formula(['A'])
         R = Formula(['R'])
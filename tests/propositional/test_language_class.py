@@ -33,6 +33,33 @@ class TestLanguageClass(unittest.TestCase):
         self.assertFalse(self.language.is_sentential_constant_string('⊥⊥'))
         self.assertFalse(self.language.is_sentential_constant_string('p'))
 
+    def test_classify(self):
+        self.assertEqual(self.language.classify('p'), 'atomic')
+        self.assertEqual(self.language.classify('#'), 'constant')
+        self.assertEqual(self.language.classify('⊤'), 'sentential_constant')
+        self.assertIsNone(self.language.classify('p1'))
+        self.assertIsNone(self.language.classify(['p']))
+        self.assertEqual(self.infinite_language.classify('p1'), 'atomic')
+        self.assertEqual(self.infinite_language.classify('q0123'), 'atomic')
+        self.assertIsNone(self.infinite_language.classify('p1q'))
+        self.assertIsNone(self.infinite_language.classify('⊥1'))
+
+        # Reassigning the vocabulary recompiles the classifier
+        language = Language(atomics=['p'], metavariables=['A'])
+        self.assertFalse(language.is_atomic_string('q'))
+        language.atomics = ['p', 'q']
+        self.assertTrue(language.is_atomic_string('q'))
+        # In-place modifications need an explicit refresh
+        language.metavariables.append('B')
+        language.refresh_classifier()
+        self.assertTrue(language.is_metavariable_string('B'))
+
+        # The cache is bounded
+        language.symbol_cache_size = 10
+        for i in range(100):
+            language.classify(f'p{i}')
+        self.assertLessEqual(len(language._classifier.cache), 10)
+
     # Tests for is_well_formed are in test_formula_class
 
 
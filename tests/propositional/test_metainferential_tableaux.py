@@ -1,9 +1,13 @@
+import pickle
 import unittest
+from copy import deepcopy
 
 from logics.classes.propositional.proof_theories.metainferential_tableaux import (
     MetainferentialTableauxStandard, MetainferentialTableauxNode
 )
 from logics.classes.propositional import Formula, Inference
+from logics.classes.errors import ErrorCode
+from logics.classes.serialization import dumps, loads
 from logics.instances.propositional.languages import classical_infinite_language as lang
 from logics.instances.propositional.metainferential_tableaux import SK_metainferential_tableaux_system as sk_tableaux
 from logics.utils.parsers import classical_parser
@@ -34,6 +38,31 @@ class TestMetainferentialTableauxSystem(unittest.TestCase):
         self.assertEqual(standard.content[1].level, 1)  # ST
         self.assertEqual(standard.content[1].content[0].level, 0)  # S
 
+    def test_standard_interning(self):
+        T = {'1', 'i'}
+        S = {'1'}
+        TS = [T, S]
+        standard = MetainferentialTableauxStandard([TS, TS], bar=True)  # Sublists can be shared
+        self.assertIs(standard, MetainferentialTableauxStandard([[{'1', 'i'}, {'1'}], [{'1', 'i'}, {'1'}]], bar=True))
+        self.assertIs(standard.content[0], standard.content[1])
+        self.assertEqual(standard.level, 2)
+        self.assertEqual(TS, [{'1', 'i'}, {'1'}])  # The lists given are not modified
+        self.assertIsNot(standard, standard.content[0])
+        self.assertEqual(len({standard, standard.with_bar(False), standard.with_bar(True)}), 2)
+        self.assertIs(standard.with_bar(False).with_bar(True), standard)
+
+        # Immutable, copies are the same object
+        with self.assertRaises(AttributeError):
+            standard.bar = False
+        self.assertIs(deepcopy(standard), standard)
+        self.assertIs(pickle.loads(pickle.dumps(standard)), standard)
+        self.assertIs(loads(dumps(standard)), standard)
+
+        S = MetainferentialTableauxStandard(S)
+        self.assertEqual(S.complement({'1', 'i', '0'}), MetainferentialTableauxStandard({'i', '0'}))
+        self.assertIs(S.complement({'1', 'i', '0'}), S.complement({'0', 'i', '1'}))
+        self.assertEqual(repr(MetainferentialTableauxStandard(set(), bar=True)), '-set()')
+
     def test_standard_is_instance_of(self):
         simple_standard = MetainferentialTableauxStandard({'1', 'i'}, bar=False)  # T
         # Index variable
@@ -319,4 +348,149 @@ class TestMetainferentialTableauxSystem(unittest.TestCase):
         self.assertFalse(sk_tableaux.rule_is_applicable(node1, 'inf0'))
         self.assertTrue(sk_tableaux.rule_is_applicable(node1, 'inf1'))
         self.assertTrue(sk_tableaux.rule_is_applicable(node2, 'inf0'))
-        self.assertFalse(sk_tableaux.rule_is_applicable(node2, 'inf1'))
\ No newline at end of file
+        self.assertFalse(sk_tableaux.rule_is_applicable(node2, 'inf1'))
+
+    def test_rule_nodes_inferences(self):
+        T, S = MetainferentialTableauxStandard({'1', 'i'}), MetainferentialTableauxStandard({'1'})
+        Tbar = MetainferentialTableauxStandard({'1', 'i'}, bar=True)
+        Sbar = MetainferentialTableauxStandard({'1'}, bar=True)
+
+        # inf0
+        subst_dict = {'Γ': [Formula(['p']), Formula(['q'])], 'Δ': [Formula(['p'])], 'X': T, 'Y': S}
+        templates = sk_tableaux._rule_nodes('inf0', subst_dict)
+        """
+        p, q / p, -[{'1', 'i'}, {'1'}]
+        └── p, {'1', 'i'} (inf0)
+            └── q, {'1', 'i'} (inf0)
+                └── p, -{'1'} (inf0)
+        """
+        self.assertEqual(len(templates), 1)
+        # First node: p, T
+        template = templates[0]
+        self.assertEqual(template.content, Formula(['p']))
+        self.assertEqual(template.index, T)
+        self.assertEqual(template.justification, 'inf0')
+        self.assertEqual(len(template.children), 1)
+        # Second node: q, T
+        template = template.children[0]
+        self.assertEqual(template.content, Formula(['q']))
+        self.assertEqual(template.index, T)
+        self.assertEqual(len(template.children), 1)
+        # Third node: p, -S
+        template = template.children[0]
+        self.assertEqual(template.content, Formula(['p']))
+        self.assertEqual(template.index, Sbar)
+        self.assertEqual(len(template.children), 0)
+
+        # ----------------------------------------------------
+        # inf1
+        templates = sk_tableaux._rule_nodes('inf1', subst_dict)
+        """
+        p, q / p, [{'1', 'i'}, {'1'}]
+        ├── p, -{'1', 'i'} (inf1)
+        ├── q, -{'1', 'i'} (inf1)
+        └── p, {'1'} (inf1)
+        """
+        self.assertEqual([(t.content, t.index, t.justification) for t in templates],
+                         [(Formula(['p']), Tbar, 'inf1'), (Formula(['q']), Tbar, 'inf1'),
+                          (Formula(['p']), S, 'inf1')])
+        self.assertTrue(all(len(t.children) == 0 for t in templates))
+
+    def test_rule_nodes_formulae(self):
+        T, S = MetainferentialTableauxStandard({'1', 'i'}), MetainferentialTableauxStandard({'1'})
+        N, F = MetainferentialTableauxStandard({'0', 'i'}), MetainferentialTableauxStandard({'0'})
+        Sbar = MetainferentialTableauxStandard({'1'}, bar=True)
+
+        # Singleton (the values of the standard go in sorted order)
+        templates = sk_tableaux._rule_nodes('singleton', {'A': Formula(['p']), 'X': T})
+        """
+        p, {'1', 'i'}
+        ├── p, {'1'} (singleton)
+        └── p, {'i'} (singleton)
+        """
+        self.assertEqual([(t.content, t.index, t.justification) for t in templates],
+                         [(Formula(['p']), S, 'singleton'),
+                          (Formula(['p']), MetainferentialTableauxStandard({'i'}), 'singleton')])
+        self.assertTrue(all(len(t.children) == 0 for t in templates))
+
+        # ----------------------------------------------------
+        # intersection
+        templates = sk_tableaux._rule_nodes('intersection', {'A': Formula(['p']), 'X': T, 'Y': N})
+        """
+        p, {'i', '1'}
+        └── p, {'i', '0'}
+            └── p, {'i'} (intersection)
+        """
+        self.assertEqual(len(templates), 1)
+        self.assertEqual(templates[0].content, Formula(['p']))
+        self.assertEqual(templates[0].index, MetainferentialTableauxStandard({'i'}))
+        self.assertEqual(templates[0].justification, 'intersection')
+        self.assertEqual(len(templates[0].children), 0)
+
+        templates = sk_tableaux._rule_nodes('intersection', {'A': Formula(['p']), 'X': S, 'Y': F})
+        self.assertEqual(templates[0].index.content, set())
+
+        # ----------------------------------------------------
+        # complement
+        templates = sk_tableaux._rule_nodes('complement', {'A': Formula(['p']), 'X': Sbar})
+        """
+        p, -{'1'}
+        └── p, {'0', 'i'} (complement)
+        """
+        self.assertEqual(len(templates), 1)
+        self.assertEqual(templates[0].content, Formula(['p']))
+        self.assertEqual(templates[0].index, N)
+        self.assertEqual(templates[0].justification, 'complement')
+        self.assertEqual(len(templates[0].children), 0)
+
+    def test_is_correct_tree(self):
+        from logics.utils.solvers.tableaux import metainferential_tableaux_solver
+        TS, ST = [{'1', 'i'}, {'1'}], [{'1'}, {'1', 'i'}]
+        cases = [
+            ('p / p', ST), ('p / q', ST), ('p ∧ q / p ∨ r', TS), ('p ∨ ~q, q / p', [{'1'}, {'1'}]),
+            ('(p / q) // (q / p)', [TS, ST]), ('(/ p ∧ ~p) // (/ q)', [ST, TS]),
+        ]
+        for string, standard in cases:
+            inference = classical_parser.parse(string)
+            tree = metainferential_tableaux_solver.solve(inference, sk_tableaux, beggining_index=standard)
+            self.assertTrue(sk_tableaux.is_correct_tree(tree))
+            self.assertTrue(sk_tableaux.is_correct_tree(tree, inference))
+            self.assertEqual(sk_tableaux.is_correct_tree(tree, inference, return_error_list=True), (True, []))
+
+        # Wrong inference at the root
+        inference = classical_parser.parse('p ∧ q / p')
+        tree = metainferential_tableaux_solver.solve(inference, sk_tableaux, beggining_index=ST)
+        self.assertTrue(sk_tableaux.is_correct_tree(tree, inference))
+        correct, error_list = sk_tableaux.is_correct_tree(tree, classical_parser.parse('p / p'),
+                                                          return_error_list=True)
+        self.assertFalse(correct)
+        self.assertEqual([error.code for error in error_list],
+                         [ErrorCode.TBL_PREMISE_NOT_PRESENT, ErrorCode.TBL_INCORRECT_PREMISE])
+        self.assertFalse(sk_tableaux.is_correct_tree(tree, Inference(premises=[inference], conclusions=[])))
+
+        # A node removed (the rule of the node above it was not applied)
+        leaf = tree.leaves[0]
+        parent = leaf.parent
+        leaf.parent = None
+        correct, error_list = sk_tableaux.is_correct_tree(tree, inference, return_error_list=True)
+        self.assertFalse(correct)
+        self.assertEqual(error_list[0].code, ErrorCode.TBL_RULE_NOT_APPLIED)
+
+        # A node with a wrong standard
+        leaf.parent = parent
+        self.assertTrue(sk_tableaux.is_correct_tree(tree, inference))
+        MetainferentialTableauxNode(Formula(['q']), index=MetainferentialTableauxStandard({'0'}),
+                                    justification='R∧1', parent=tree.children[0])
+        correct, error_list = sk_tableaux.is_correct_tree(tree, inference, return_error_list=True)
+        self.assertFalse(correct)
+        self.assertIn(ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, [error.code for error in error_list])
+
+        # A node that is already in the branch is not expected (here, p, {'1'} is not added by R∨1)
+        tree = metainferential_tableaux_solver.solve(classical_parser.parse('p, p ∨ q / r'), sk_tableaux,
+                                                     beggining_index=ST)
+        self.assertEqual([n.content for n in tree.descendants if n.justification == 'R∨1'], [Formula(['q'])])
+        self.assertTrue(sk_tableaux.is_correct_tree(tree))
+        disjunction = tree.children[0].children[0].children[0]
+        MetainferentialTableauxNode(Formula(['p']), index=MetainferentialTableauxStandard({'1'}),
+                                    justification='R∨1', parent=disjunction)
+        self.assertFalse(sk_tableaux.is_correct_tree(tree))
@@ -0,0 +1,77 @@
+import unittest
+
+from logics.classes.propositional.proof_theories import TableauxNode
+from logics.classes.propositional.proof_theories.rule_index import RuleIndex
+from logics.instances.propositional.languages import classical_infinite_language as cl_language
+from logics.instances.propositional.tableaux import (
+    classical_tableaux_system, classical_indexed_tableaux_system, FDE_tableaux_system
+)
+from logics.instances.propositional.sequents import LK, LKmin_order
+from logics.utils.parsers import classical_parser
+from logics.utils.formula_generators.generators_biased import random_formula_generator
+from logics.utils.solvers.natural_deduction import classical_natural_deduction_solver as nd_solver
+
+
+class TestRuleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = RuleIndex(cl_language, {
+            'R~~': classical_parser.parse('~~A'),
+            'R∧': classical_parser.parse('A ∧ B'),
+            'R~∧': classical_parser.parse('~(A ∧ B)'),
+            'Rid': classical_parser.parse('A ∧ A'),
+            'Rp': classical_parser.parse('p ∨ A'),
+            'Rany': classical_parser.parse('A'),
+            'Rnone': None,
+        })
+
+    def test_candidates(self):
+        self.assertEqual(self.index.candidates(classical_parser.parse('~~(p ∧ q)')), ['R~~', 'Rany', 'Rnone'])
+        # Repeated metavariables are not checked by the index
+        self.assertEqual(self.index.candidates(classical_parser.parse('p ∧ q')), ['R∧', 'Rid', 'Rany', 'Rnone'])
+        self.assertEqual(self.index.candidates(classical_parser.parse('~(p ∧ q)')), ['R~∧', 'Rany', 'Rnone'])
+        self.assertEqual(self.index.candidates(classical_parser.parse('p ∨ q')), ['Rp', 'Rany', 'Rnone'])
+        self.assertEqual(self.index.candidates(classical_parser.parse('q ∨ q')), ['Rany', 'Rnone'])
+        self.assertEqual(self.index.candidates(classical_parser.parse('q')), ['Rany', 'Rnone'])
+        self.assertEqual(len(self.index), 7)
+
+    def test_max_depth(self):
+        index = RuleIndex(cl_language, {'R~~~': classical_parser.parse('~~~A')}, max_depth=1)
+        # Only the main symbol is looked at
+        self.assertEqual(index.candidates(classical_parser.parse('~p')), ['R~~~'])
+        self.assertEqual(index.candidates(classical_parser.parse('p ∧ q')), [])
+
+    def test_tableaux_candidates_are_conservative(self):
+        for system in (classical_tableaux_system, classical_indexed_tableaux_system, FDE_tableaux_system):
+            for _ in range(100):
+                formula = random_formula_generator.random_formula(depth=3, atomics=['p', 'q'],
+                                                                  language=cl_language, exact_depth=False)
+                for index in (None, 0, 1):
+                    node = TableauxNode(content=formula, index=index)
+                    candidates = system.candidate_rules(node)
+                    applicable = [r for r in system.rules if system.rule_is_applicable(node, r)]
+                    self.assertTrue(set(applicable) <= set(candidates))
+                    self.assertEqual(candidates, [r for r in system.rules if r in candidates])  # order is kept
+
+    def test_sequent_candidates(self):
+        sequent = classical_parser.parse('Gamma, A ∧ B, ~C ==> Delta, A ∨ B')
+        candidates = LK.candidate_rules(sequent, LKmin_order)
+        self.assertEqual(candidates, ['~L', '∧L1', '∧L2', '∨R1', '∨R2', 'WL', 'WR', 'CL', 'CR', 'EL', 'ER'])
+        for rule_name in LKmin_order:
+            if sequent.is_instance_of(LK.rules[rule_name].content, LK.language):
+                self.assertIn(rule_name, candidates)
+
+        sequent2 = classical_parser.parse('~A ==>')
+        self.assertEqual(LK.candidate_rules(sequent2, ['~L', '~R', '∧L1', 'WL']), ['~L', 'WL'])
+
+    def test_natural_deduction_candidates(self):
+        for _ in range(100):
+            formula = random_formula_generator.random_formula(depth=2, atomics=['p', 'q'],
+                                                              language=nd_solver.language, exact_depth=False)
+            candidates = nd_solver._simplification_rule_candidates(formula)
+            for rule_name, rule in nd_solver.simplification_rules.items():
+                if formula.is_instance_of(rule.premises[0], nd_solver.language):
+                    self.assertIn(rule_name, candidates)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import io
+import pickle
+import unittest
+from copy import copy, deepcopy
+
+from logics.classes.propositional import Formula, Inference
+from logics.classes.propositional.proof_theories import Sequent, TableauxNode
+from logics.classes.propositional.proof_theories.metainferential_tableaux import MetainferentialTableauxStandard
+from logics.classes.predicate.semantics import Model
+from logics.classes.serialization import dumps, loads, ObjectWriter, ObjectReader
+from logics.instances.propositional.tableaux import classical_tableaux_system
+from logics.utils.parsers import classical_parser
+from logics.utils.parsers.predicate_parser import classical_predicate_parser
+from logics.utils.solvers.tableaux import standard_tableaux_solver
+
+
+class TestSerialization(unittest.TestCase):
+    def test_round_trip(self):
+        objects = [
+            classical_parser.parse('(p ∧ q) ∨ ~(p ∧ q)'),
+            classical_parser.parse('p, p → q / q'),
+            classical_parser.parse('(p / q) // (q / p)'),
+            classical_parser.parse('Gamma, A ∧ B ==> Delta'),
+            classical_parser.parse_derivation('p → (p → p); ax1\np; premise\np → p; mp; [0, 1]'),
+            classical_predicate_parser.parse('∀x ∈ a (P(x) → ∃y R(x, f(y)))'),
+            MetainferentialTableauxStandard([[{'1', 'i'}, {'1'}], 'X'], bar=True),
+            Model({'domain': {1, 2}, 'a': 1, 'P': {1}, 'R': {(1, 1), (1, 2)}, 'f': {((1,), 2), ((2,), 1)}}),
+            [None, True, False, 0, -3, 2 ** 70, 1.5, b'\x00', (1, 'a'), frozenset({1}), {'k': [1.0]}],
+        ]
+        for obj in objects:
+            new = loads(dumps(obj))
+            self.assertEqual(type(new), type(obj))
+            if isinstance(obj, MetainferentialTableauxStandard):
+                self.assertEqual(new.content[0].content, obj.content[0].content)
+                self.assertEqual(new.bar, obj.bar)
+            else:
+                self.assertEqual(new, obj)
+            self.assertEqual(type(pickle.loads(pickle.dumps(obj))), type(obj))
+
+        f = objects[0]
+        self.assertIsInstance(f[1][1], Formula)
+        self.assertEqual(Formula.from_bytes(f.to_bytes()), f)
+        self.assertRaises(TypeError, Inference.from_bytes, f.to_bytes())
+        self.assertEqual(objects[1].premises, loads(dumps(objects[1])).premises)
+        self.assertEqual(loads(dumps(objects[2])).level, 2)
+        self.assertIsInstance(loads(dumps(objects[3])), Sequent)
+
+    def test_shared_objects(self):
+        p = Formula(['p'])
+        f = Formula(['∧', p, p])
+        g = loads(dumps(f))
+        self.assertIs(g[1], g[2])
+        self.assertLess(len(dumps(f)), len(dumps(Formula(['∧', ['p'], ['p']]))))
+
+    def test_trees(self):
+        tree = standard_tableaux_solver.solve(classical_parser.parse('(p ∨ q) ∧ r / r ∧ (q ∨ p)'),
+                                              classical_tableaux_system)
+        for new in (loads(dumps(tree)), pickle.loads(pickle.dumps(tree)), TableauxNode.from_bytes(tree.to_bytes())):
+            self.assertIsNone(new.parent)
+            self.assertEqual([(n.content, n.index, n.justification) for n in new.descendants],
+                             [(n.content, n.index, n.justification) for n in tree.descendants])
+            self.assertTrue(classical_tableaux_system.tree_is_closed(new))
+
+        # A subtree is serialized without its ancestors
+        subtree = loads(dumps(tree.children[0]))
+        self.assertIsNone(subtree.parent)
+        self.assertEqual(len(subtree.descendants), len(tree.children[0].descendants))
+
+        # Deeper than the recursion limit
+        node = root = TableauxNode(content=Formula(['p']))
+        for _ in range(1500):
+            node = TableauxNode(content=Formula(['q']), parent=node)
+        node = loads(dumps(root))
+        depth = 0
+        while node.children:
+            node = node.children[0]
+            depth += 1
+        self.assertEqual(depth, 1500)
+
+    def test_copy(self):
+        f = classical_parser.parse('p ∧ ~q')
+        shallow = copy(f)
+        self.assertEqual(shallow, f)
+        self.assertIs(shallow[1], f[1])
+        deep = deepcopy(f)
+        self.assertEqual(deep, f)
+        self.assertIsNot(deep[1], f[1])
+
+        tree = standard_tableaux_solver.solve(classical_parser.parse('p / p ∨ q'), classical_tableaux_system)
+        copied = deepcopy(tree)
+        self.assertEqual(len(copied.descendants), len(tree.descendants))
+        self.assertIsNot(copied.children[0], tree.children[0])
+
+    def test_errors(self):
+        self.assertRaises(TypeError, dumps, Model({'domain': {1}, 'f': lambda x: x}))
+        self.assertRaises(ValueError, loads, b'not a logics object')
+        self.assertRaises(ValueError, loads, dumps(Formula(['p']))[:-1])
+
+        # Models with callables are still picklable the standard way
+        model = Model({'domain': {1}, 'P': {1}, 'b': abs})
+        self.assertEqual(pickle.loads(pickle.dumps(model)), model)
+
+    def test_stream(self):
+        objects = [classical_parser.parse('p'), classical_parser.parse('p / q'), Formula(['~', ['q']])]
+        file = io.BytesIO()
+        ObjectWriter(file).write_many(objects)
+        file.seek(0)
+        self.assertEqual(list(ObjectReader(file)), objects)
+        self.assertEqual(list(ObjectReader(io.BytesIO(b''))), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,14 @@
 import unittest
+from copy import deepcopy
 
-from logics.classes.propositional.proof_theories.tableaux import TableauxNode, ConstructiveTreeSystem
+from logics.classes.propositional.proof_theories.tableaux import TableauxNode, ConstructiveTreeSystem, \
+    ManyValuedTableauxSystem, TableauxSystem
 from logics.classes.propositional import Formula, Inference
 from logics.classes.errors import ErrorCode, CorrectionError
 from logics.instances.propositional.languages import classical_infinite_language as lang
-from logics.instances.propositional.tableaux import classical_tableaux_system, classical_indexed_tableaux_system
+from logics.instances.propositional.tableaux import classical_tableaux_system, classical_indexed_tableaux_system, \
+    FDE_tableaux_system, K3_tableaux_system, LP_tableaux_system
+from logics.utils.parsers import classical_parser
 
 
 class TestTableauxSystem(unittest.TestCase):
@@ -78,10 +82,115 @@ class TestTableauxSystem(unittest.TestCase):
         self.assertFalse(classical_tableaux_system.node_is_closed(self.n8))
         self.assertFalse(classical_tableaux_system.tree_is_closed(self.n5))
 
+        # Only the branches from the node given are looked at, and the closure cached in the tree is kept
+        self.assertTrue(classical_tableaux_system.tree_is_closed(self.n2))  # ~p and ~~p
+        self.assertFalse(classical_tableaux_system.tree_is_closed(self.n3))  # ~~p and p
+        self.assertIn(classical_tableaux_system, self.n4.__dict__['_closure_states'])
+        self.assertTrue(classical_tableaux_system.node_is_closed(self.n4))
+        k1 = TableauxNode(content=Formula(['q']), index=1)
+        k2 = TableauxNode(content=Formula(['p']), index=1, parent=k1)
+        k3 = TableauxNode(content=Formula(['~', ['p']]), index=1, parent=k2)
+        TableauxNode(content=Formula(['r']), index=1, parent=k3)
+        self.assertTrue(K3_tableaux_system.tree_is_closed(k1))
+        self.assertTrue(K3_tableaux_system.tree_is_closed(k2))
+        self.assertFalse(K3_tableaux_system.tree_is_closed(k3))
+        # Closure rules without indexes look for the other member of the rule among the ancestors
+        slow_system = TableauxSystem(classical_tableaux_system.language, classical_tableaux_system.rules,
+                                     classical_tableaux_system.closure_rules)
+        slow_system.fast_node_is_closed_enabled = False
+        self.assertFalse(slow_system._closure_index()[0][2])
+        self.assertTrue(slow_system.tree_is_closed(self.n1))
+        self.assertTrue(slow_system.tree_is_closed(self.n2))
+        self.assertFalse(slow_system.tree_is_closed(self.n3))
+
         alone = TableauxNode(content=Formula(['p']))
         self.assertFalse(classical_tableaux_system.node_is_closed(alone))
         self.assertFalse(classical_tableaux_system.tree_is_closed(alone))
 
+    def test_is_closed_after_modifications(self):
+        # The closure of branches is cached in the nodes, check that it is updated when the tree changes
+        self.assertFalse(classical_tableaux_system.tree_is_closed(self.n9))
+        n12 = TableauxNode(content=Formula(['~', ['q']]), parent=self.n11)
+        n13 = TableauxNode(content=Formula(['r']), parent=self.n10)  # n10 now has two children
+        n14 = TableauxNode(content=Formula(['~', ['r']]), parent=n13)
+        n15 = TableauxNode(content=Formula(['~', ['q']]), parent=n13)
+        '''
+        (p ∧ q)
+        └── p (R∧)
+            ├── q (R∧)
+            │   └── ~q
+            └── r
+                ├── ~r
+                └── ~q
+        '''
+        self.assertTrue(classical_tableaux_system.node_is_closed(n12))
+        self.assertTrue(classical_tableaux_system.node_is_closed(n14))
+        self.assertFalse(classical_tableaux_system.node_is_closed(n15))  # q is not in this branch
+        self.assertFalse(classical_tableaux_system.node_is_closed(self.n11))  # nor ~q in this one
+        self.assertFalse(classical_tableaux_system.tree_is_closed(self.n9))
+
+        # Moving a subtree
+        n13.parent = self.n11
+        self.assertTrue(classical_tableaux_system.node_is_closed(n15))
+        self.assertTrue(classical_tableaux_system.tree_is_closed(self.n9))
+        self.assertFalse(classical_tableaux_system.tree_is_closed(n13))
+        self.assertTrue(classical_tableaux_system.node_is_closed(n15))
+        n14.parent = None
+        self.assertFalse(classical_tableaux_system.node_is_closed(n14))
+
+        # Changing the content or the index of a node
+        n14.parent = n13
+        self.assertTrue(classical_tableaux_system.node_is_closed(n14))
+        n14.content = Formula(['~', ['s']])
+        self.assertFalse(classical_tableaux_system.node_is_closed(n14))
+        n13.content = Formula(['s'])
+        self.assertTrue(classical_tableaux_system.node_is_closed(n14))
+        n14.parent = None
+
+        # Copies do not keep the cached closure
+        copied = deepcopy(self.n9)
+        copied.leaves[-1].parent = None
+        self.assertFalse(classical_tableaux_system.tree_is_closed(copied))
+
+        # Each system keeps its own closure
+        self.assertTrue(classical_tableaux_system.tree_is_closed(self.n1))
+        self.assertFalse(classical_indexed_tableaux_system.tree_is_closed(self.n1))
+        self.n2.content, self.n2.index = Formula(['p']), 1
+        self.assertTrue(classical_indexed_tableaux_system.node_is_closed(self.n4))
+        self.n4.index = 1
+        self.assertFalse(classical_indexed_tableaux_system.node_is_closed(self.n4))
+
+    def test_closure_rules(self):
+        # K3 closes with A, 1 and ~A, 1 (and with A, 1 and A, 0), LP with A, 0 and ~A, 0
+        n1 = TableauxNode(content=Formula(['∧', ['p'], ['q']]), index=1)
+        n2 = TableauxNode(content=Formula(['~', ['∧', ['p'], ['q']]]), index=0, parent=n1)
+        n3 = TableauxNode(content=Formula(['∧', ['p'], ['q']]), index=0, parent=n2)
+        n4 = TableauxNode(content=Formula(['~', ['∧', ['p'], ['q']]]), index=1, parent=n1)
+        for system, closed in ((FDE_tableaux_system, (False, True, False)),
+                               (K3_tableaux_system, (False, True, True)),
+                               (LP_tableaux_system, (False, True, False))):
+            self.assertEqual((system.node_is_closed(n2), system.node_is_closed(n3), system.node_is_closed(n4)), closed)
+        self.assertTrue(K3_tableaux_system.tree_is_closed(n1))
+        self.assertFalse(LP_tableaux_system.tree_is_closed(n1))
+
+        # A closure rule where a member does not determine the other one
+        system = ManyValuedTableauxSystem(lang, rules=dict(), closure_rules=[
+            [TableauxNode(content=Formula(['∧', ['A'], ['B']]), index=1), TableauxNode(content=Formula(['B']), index=0)]
+        ])
+        n5 = TableauxNode(content=Formula(['q']), index=0)
+        n6 = TableauxNode(content=Formula(['∧', ['p'], ['q']]), index=1, parent=n5)
+        n7 = TableauxNode(content=Formula(['q']), index=0, parent=n6)
+        n8 = TableauxNode(content=Formula(['p']), index=0, parent=n1)
+        self.assertTrue(system.node_is_closed(n6))
+        self.assertTrue(system.node_is_closed(n7))
+        self.assertFalse(system.node_is_closed(n2))
+        self.assertFalse(system.node_is_closed(n3))
+        self.assertFalse(system.node_is_closed(n8))
+        n8.parent = None
+        n6.parent = n8
+        self.assertFalse(system.node_is_closed(n6))
+        self.assertTrue(system.node_is_closed(n7))
+
     def test_is_instance_of(self):
         an1 = TableauxNode(content=Formula(['A']))
         an2 = TableauxNode(content=Formula(['~', ['A']]))
@@ -254,8 +363,167 @@ class TestTableauxSystem(unittest.TestCase):
         self.assertEqual(error_list, [CorrectionError(code=ErrorCode.TBL_RULE_NOT_APPLIED, index=(0,),
                                                       description="Rule R↔ was not applied to node ['↔', ['p'], ['q']]")])
 
+        # Rules need not be applied in the order of the nodes (here R∧ is applied to the second premise first, and the
+        # branch closes before applying it to the first)
+        n1 = TableauxNode(content=Formula(['∧', ['r'], ['∧', ['p'], ['p']]]))
+        n2 = TableauxNode(content=Formula(['∧', ['r'], ['p']]), parent=n1)
+        n3 = TableauxNode(content=Formula(['~', ['r']]), parent=n2)
+        n4 = TableauxNode(content=Formula(['r']), justification='R∧', parent=n3)
+        n5 = TableauxNode(content=Formula(['p']), justification='R∧', parent=n4)
+        '''
+        r ∧ (p ∧ p)
+        └── r ∧ p
+            └── ~r
+                └── r (R∧)
+                    └── p (R∧)
+        '''
+        inf = Inference(premises=[n1.content, n2.content], conclusions=[Formula(['r'])])
+        correct, error_list = classical_tableaux_system.is_correct_tree(n1, inference=inf, return_error_list=True)
+        self.assertTrue(correct)
+        self.assertEqual(error_list, [])
+
         # More extensive tests (with the random argument generator) are made in tests/utils/test_tableaux_solver
 
+    def test_is_correct_tree_error_indexes(self):
+        # When some nodes of the tree could be part of more than one application of a rule, the nodes that complete an
+        # application are taken as such, and the errors go to the rest. These are the errors of some incorrect trees
+        def node(string, index=None, justification=None, parent=None):
+            return TableauxNode(content=classical_parser.parse(string), index=index, justification=justification,
+                                parent=parent)
+
+        def errors(tableaux_system, tree, inference):
+            correct, error_list = tableaux_system.is_correct_tree(tree, inference=classical_parser.parse(inference),
+                                                                 return_error_list=True)
+            self.assertFalse(correct)
+            return [(error.code, error.index) for error in error_list]
+
+        n1 = node('r ↔ q')
+        n2 = node('r ↔ r', parent=n1)
+        n3 = node('~q', parent=n2)
+        n4 = node('r', justification='R↔', parent=n3)
+        node('q', justification='R↔', parent=n4)
+        n6 = node('~r', justification='R↔', parent=n3)
+        n7 = node('p', justification='R↔', parent=n6)  # wrong, should be ~q
+        n8 = node('r', justification='R↔', parent=n7)
+        node('r', justification='R↔', parent=n8)
+        n10 = node('~r', justification='R↔', parent=n7)
+        node('~r', justification='R↔', parent=n10)
+        '''
+        r ↔ q
+        └── r ↔ r
+            └── ~q
+                ├── r (R↔)
+                │   └── q (R↔)
+                └── ~r (R↔)
+                    └── p (R↔)
+                        ├── r (R↔)
+                        │   └── r (R↔)
+                        └── ~r (R↔)
+                            └── ~r (R↔)
+        '''
+        # R↔ is applied to r ↔ r below p, so the r and ~r above (and q and p) are not an application of it
+        self.assertEqual(errors(classical_tableaux_system, n1, 'r ↔ q, r ↔ r / q'),
+                         [(ErrorCode.TBL_RULE_NOT_APPLIED, (0,)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 1)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 0, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 1, 0))])
+
+        n1 = node('q ∧ p', 1)
+        n2 = node('q ∧ (p ∨ p)', 1, parent=n1)
+        n3 = node('q ∨ q', 0, parent=n2)
+        n4 = node('~q', 1, 'R∧1', parent=n3)  # wrong, should be q
+        n5 = node('p', 1, 'R∧1', parent=n4)
+        n6 = node('q', 1, 'R∧1', parent=n5)
+        n7 = node('p ∨ p', 1, 'R∧1', parent=n6)
+        n8 = node('q', 0, 'R∨0', parent=n7)
+        node('q', 0, 'R∨0', parent=n8)
+        '''
+        q ∧ p, 1
+        └── q ∧ (p ∨ p), 1
+            └── q ∨ q, 0
+                └── ~q, 1 (R∧1)
+                    └── p, 1 (R∧1)
+                        └── q, 1 (R∧1)
+                            └── p ∨ p, 1 (R∧1)
+                                └── q, 0 (R∨0)
+                                    └── q, 0 (R∨0)
+        '''
+        # q and p ∨ p are the application of R∧1 to the second premise
+        self.assertEqual(errors(LP_tableaux_system, n1, 'q ∧ p, q ∧ (p ∨ p) / q ∨ q'),
+                         [(ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 0, 0))])
+
+        n1 = node('(p ∧ p) ∨ ~p', 1)
+        n2 = node('(q ∨ p) ∧ p', 1, parent=n1)
+        n3 = node('~r', 0, parent=n2)
+        n4 = node('p ∧ p', 1, 'R∨1', parent=n3)
+        n5 = node('q ∨ p', 1, 'R∧1', parent=n4)
+        n6 = node('p', 1, 'R∧1', parent=n5)
+        n7 = node('p', 1, 'R∧1', parent=n6)
+        n8 = node('p', 1, 'R∧1', parent=n7)
+        node('q', 1, 'R∨1', parent=n8)
+        node('p', 1, 'R∨1', parent=n8)
+        n11 = node('~p', 1, 'R∨1', parent=n3)
+        n12 = node('p', 1, 'R∧1', parent=n11)  # wrong, should be q ∨ p
+        n13 = node('q ∨ p', 1, 'R∧1', parent=n12)
+        node('q', 1, 'R∨1', parent=n13)
+        node('p', 1, 'R∨1', parent=n13)
+        '''
+        (p ∧ p) ∨ ~p, 1
+        └── (q ∨ p) ∧ p, 1
+            └── ~r, 0
+                ├── p ∧ p, 1 (R∨1)
+                │   └── q ∨ p, 1 (R∧1)
+                │       └── p, 1 (R∧1)
+                │           └── p, 1 (R∧1)
+                │               └── p, 1 (R∧1)
+                │                   ├── q, 1 (R∨1)
+                │                   └── p, 1 (R∨1)
+                └── ~p, 1 (R∨1)
+                    └── p, 1 (R∧1)
+                        └── q ∨ p, 1 (R∧1)
+                            ├── q, 1 (R∨1)
+                            └── p, 1 (R∨1)
+        '''
+        # In the left branch, the two p below q ∨ p are the application of R∧1 to p ∧ p
+        self.assertEqual(errors(LP_tableaux_system, n1, '(p ∧ p) ∨ ~p, (q ∨ p) ∧ p / ~r'),
+                         [(ErrorCode.TBL_RULE_NOT_APPLIED, (0, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 0, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 1, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 0, 0, 0)),
+                          (ErrorCode.TBL_RULE_INCORRECTLY_APPLIED, (0, 0, 0, 1, 0, 0))])
+
+    def test_is_correct_tree_many(self):
+        n1 = TableauxNode(content=Formula(['~', ['~', ['~', ['~', ['p']]]]]), index=0)
+        n2 = TableauxNode(content=Formula(['~', ['p']]), index=0, parent=n1)
+        n3 = TableauxNode(content=Formula(['~', ['~', ['~', ['p']]]]), index=0, justification='R~~', parent=n2)
+        n4 = TableauxNode(content=Formula(['p']), index=0, justification='R~~', parent=n3)
+        n5 = TableauxNode(content=Formula(['∨', ['p'], ['q']]))
+        n6 = TableauxNode(content=Formula(['~', ['p']]), parent=n5)
+        n7 = TableauxNode(content=Formula(['p']), justification='R∨', parent=n6)
+        trees = [self.n1, self.n5, self.n9, n1, n5]
+        inferences = [None, Inference(premises=[Formula(['∨', ['p'], ['q']])], conclusions=[Formula(['p'])]),
+                      Inference(premises=[Formula(['∧', ['p'], ['q']])], conclusions=[Formula(['q'])]), None,
+                      Inference(premises=[Formula(['∨', ['p'], ['q']])], conclusions=[Formula(['p'])])]
+        expected = [classical_tableaux_system.is_correct_tree(tree, inference, return_error_list=True)[1]
+                    for tree, inference in zip(trees, inferences)]
+        self.assertEqual([errors == [] for errors in expected], [True, True, False, False, False])
+
+        self.assertEqual(list(classical_tableaux_system.is_correct_tree_many(trees, inferences)), expected)
+        # Lazy with generators, and without inferences
+        errors = classical_tableaux_system.is_correct_tree_many(tree for tree in trees)
+        self.assertEqual(next(errors), [])
+        self.assertEqual(list(errors), [classical_tableaux_system.is_correct_tree(tree, return_error_list=True)[1]
+                                        for tree in trees[1:]])
+        # exit_on_first_error
+        self.assertEqual(list(classical_tableaux_system.is_correct_tree_many(trees, inferences,
+                                                                             exit_on_first_error=True)),
+                         [errors[:1] for errors in expected])
+        # In processes
+        self.assertEqual(list(classical_tableaux_system.is_correct_tree_many(trees, inferences, workers=2)),
+                         expected)
+
     def test_classical_indexed_tableaux(self):
         # Node is closed
         n1 = TableauxNode(content=Formula(['p']), index=1)
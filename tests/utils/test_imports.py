@@ -0,0 +1,91 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from logics.utils.parsers import classical_parser
+from logics.instances.propositional import sequents
+
+
+def modules_loaded_by(module):
+    """Imports module in a fresh interpreter, returns the modules that were loaded"""
+    code = f'import json, sys\nimport {module}\nprint(json.dumps(sorted(sys.modules)))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return set(json.loads(output))
+
+
+# The rules of the sequent calculi, as they were written before they were precompiled. For each rule, the string of
+# its conclusion and those of its premises
+LK_RULES = {
+    'EL': ('Gamma, Lambda, Sigma, Delta ==> Pi', ['Gamma, Sigma, Lambda, Delta ==> Pi']),
+    'ER': ('Gamma ==> Delta, Lambda, Sigma, Pi', ['Gamma ==> Delta, Sigma, Lambda, Pi']),
+    'WL': ('Pi, Gamma ==> Delta', ['Gamma ==> Delta']),
+    'WR': ('Gamma ==> Delta, Pi', ['Gamma ==> Delta']),
+    'CL': ('Pi, Gamma ==> Delta', ['Pi, Pi, Gamma ==> Delta']),
+    'CR': ('Gamma ==> Delta, Pi', ['Gamma ==> Delta, Pi, Pi']),
+    'Cut': ('Gamma, Pi ==> Delta, Sigma', ['Gamma ==> Delta, A', 'A, Pi ==> Sigma']),
+    '~L': ('~A, Gamma ==> Delta', ['Gamma ==> Delta, A']),
+    '~R': ('Gamma ==> Delta, ~A', ['A, Gamma ==> Delta']),
+    '∧L1': ('A & B, Gamma ==> Delta', ['A, Gamma ==> Delta']),
+    '∧L2': ('A & B, Gamma ==> Delta', ['B, Gamma ==> Delta']),
+    '∧R': ('Gamma ==> Delta, A & B', ['Gamma ==> Delta, A', 'Gamma ==> Delta, B']),
+    '∨L': ('A or B, Gamma ==> Delta', ['A, Gamma ==> Delta', 'B, Gamma ==> Delta']),
+    '∨R1': ('Gamma ==> Delta, A or B', ['Gamma ==> Delta, A']),
+    '∨R2': ('Gamma ==> Delta, A or B', ['Gamma ==> Delta, B']),
+    '→L': ('A then B, Gamma, Pi ==> Delta, Sigma', ['Gamma ==> Delta, A', 'B, Pi ==> Sigma']),
+    '→R': ('Gamma ==> Delta, A then B', ['A, Gamma ==> Delta, B']),
+}
+LKMINEA_RULES = {
+    'WL': ('Gamma, Lambda, Delta ==> Sigma', ['Gamma, Delta ==> Sigma']),
+    'WR': ('Gamma ==> Pi, Lambda, Sigma', ['Gamma ==> Pi, Sigma']),
+    'CL1': ('Gamma, Lambda, Delta, Pi ==> Sigma', ['Gamma, Lambda, Delta, Lambda, Pi ==> Sigma']),
+    'CL2': ('Gamma, Delta, Lambda, Pi ==> Sigma', ['Gamma, Lambda, Delta, Lambda, Pi ==> Sigma']),
+    'CR1': ('Gamma ==> Delta, Lambda, Pi, Sigma', ['Gamma ==> Delta, Lambda, Pi, Lambda, Sigma']),
+    'CR2': ('Gamma ==> Delta, Pi, Lambda, Sigma', ['Gamma ==> Delta, Lambda, Pi, Lambda, Sigma']),
+    '~L': ('Gamma, ~A, Delta ==> Pi, Sigma', ['Gamma, Delta ==> Pi, A, Sigma']),
+    '~R': ('Gamma, Delta ==> Pi, ~A, Sigma', ['Gamma, A, Delta ==> Pi, Sigma']),
+    '∧L1': ('Gamma, A & B, Delta, Pi ==> Sigma', ['Gamma, A, Delta, B, Pi ==> Sigma']),
+    '∧L2': ('Gamma, Delta, A & B, Pi ==> Sigma', ['Gamma, A, Delta, B, Pi ==> Sigma']),
+    '∧R': ('Gamma ==> Delta, A & B, Pi', ['Gamma ==> Delta, A, Pi', 'Gamma ==> Delta, B, Pi']),
+    '∨L': ('Gamma, A or B, Delta ==> Pi', ['Gamma, A, Delta ==> Pi', 'Gamma, B, Delta ==> Pi']),
+    '∨R1': ('Gamma ==> Delta, A or B, Pi, Sigma', ['Gamma ==> Delta, A, Pi, B, Sigma']),
+    '∨R2': ('Gamma ==> Delta, Pi, A or B, Sigma', ['Gamma ==> Delta, A, Pi, B, Sigma']),
+}
+
+
+class TestImports(unittest.TestCase):
+    def test_lazy_imports(self):
+        modules = modules_loaded_by('logics.instances.propositional.sequents')
+        self.assertNotIn('logics.utils.parsers.standard_parser', modules)
+
+        modules = modules_loaded_by('logics.utils.parsers')
+        self.assertNotIn('logics.utils.parsers.standard_parser', modules)
+        self.assertNotIn('logics.utils.parsers.predicate_parser', modules)
+        self.assertNotIn('concurrent.futures.process', modules)
+
+        modules = modules_loaded_by('logics.utils.solvers')
+        self.assertNotIn('logics.utils.solvers.tableaux', modules)
+
+        modules = modules_loaded_by('logics.classes.predicate.semantics.models')
+        self.assertNotIn('logics.utils.parsers.predicate_parser', modules)
+
+        from logics.utils import parsers, solvers
+        self.assertIn('modal_parser', dir(parsers))
+        self.assertEqual(parsers.classical_predicate_parser.__class__.__name__, 'PredicateParser')
+        self.assertEqual(solvers.standard_tableaux_solver.__class__.__name__, 'TableauxSolver')
+        self.assertRaises(AttributeError, getattr, parsers, 'nonexistent_parser')
+
+    def test_precompiled_sequents(self):
+        # The rules of the sequent calculi are written already parsed, check that they are what the parser returns
+        self.assertEqual(sequents.identity, classical_parser.parse('A ==> A'))
+        lkmin_rules = {name: rule for name, rule in LK_RULES.items() if name != 'Cut'}
+        for calculus, rules in ((sequents.LK, LK_RULES), (sequents.LKmin, lkmin_rules),
+                                (sequents.LKminEA, LKMINEA_RULES)):
+            self.assertEqual(calculus.axioms, {'identity': classical_parser.parse('A ==> A')})
+            self.assertEqual(list(calculus.rules), list(rules))
+            for name, (conclusion, premises) in rules.items():
+                rule = calculus.rules[name]
+                self.assertEqual(rule.content, classical_parser.parse(conclusion), name)
+                self.assertEqual([child.content for child in rule.children],
+                                 [classical_parser.parse(premise) for premise in premises], name)
+                self.assertTrue(all(not child.children for child in rule.children), name)
@@ -1,9 +1,11 @@
 import unittest
+from threading import Event, Thread
 
-from logics.classes.exceptions import SolverError
+from logics.classes.exceptions import SolverError, BudgetExceeded
 from logics.utils.parsers import classical_parser
 from logics.classes.propositional.proof_theories import Derivation, NaturalDeductionStep
 from logics.utils.solvers import classical_natural_deduction_solver as solver, classical_natural_deduction_solver2 as solver2
+from logics.utils.solvers.budget import Budget
 from logics.utils.formula_generators.generators_biased import random_formula_generator
 from logics.instances.propositional.languages import classical_infinite_language_with_sent_constants_nobiconditional \
     as cl_language
@@ -207,6 +209,88 @@ class TestNaturalDeductionSolver(unittest.TestCase):
 
         # print(f'Could not find invalid inference in {not_found_invalid} cases')
 
+    def test_budget(self):
+        inference = classical_parser.parse('p → q, q → r / (s ∨ p) → (s ∨ r)')
+        derivation = solver.solve(inference)
+        self.assertEqual(solver.solve(inference, budget=Budget(max_nodes=100, timeout=60)), derivation)
+
+        with self.assertRaises(BudgetExceeded) as context:
+            solver.solve(inference, budget=Budget(max_nodes=3))
+        partial_result = context.exception.partial_result
+        self.assertEqual(partial_result.reason, 'max_nodes')
+        self.assertEqual(partial_result.counters['nodes'], 3)
+        # The goals go from the conclusion to the last one attempted
+        self.assertEqual(partial_result.frontier[0], inference.conclusion)
+        self.assertEqual(len(partial_result.frontier), 4)
+        self.assertEqual(partial_result.tree[:2], derivation[:2])
+
+        # The heuristics that try something else when a goal cannot be derived do not catch it
+        with self.assertRaises(BudgetExceeded) as context:
+            solver.solve(classical_parser.parse('q / p ∨ q'), budget=Budget(max_nodes=2))
+        self.assertEqual(context.exception.partial_result.frontier,
+                         [classical_parser.parse(goal) for goal in ('p ∨ q', 'p', '⊥')])
+        # The solver does not keep the budget
+        self.assertEqual(solver.solve(inference), derivation)
+
+    def test_heuristic_without_budget(self):
+        # Heuristics with the signature of previous versions (without budget) work when no budget is given
+        from logics.utils.solvers.natural_deduction import NaturalDeductionSolver, ConjunctionHeuristic
+
+        class OldConjunctionHeuristic(ConjunctionHeuristic):
+            applied = 0
+
+            def apply_heuristic(self, derivation, goal, solver, tried_existentials):
+                self.applied += 1
+                return super().apply_heuristic(derivation, goal, solver, tried_existentials)
+
+        old_heuristic = OldConjunctionHeuristic()
+        heuristics = [old_heuristic if isinstance(heuristic, ConjunctionHeuristic) else heuristic
+                      for heuristic in solver.heuristics]
+        old_solver = NaturalDeductionSolver(solver.language, solver.simplification_rules,
+                                            solver.derived_rules_derivations, heuristics)
+        inference = classical_parser.parse('A ∧ B / B ∧ A')
+        self.assertEqual(old_solver.solve(inference), solver.solve(inference))
+        self.assertEqual(old_heuristic.applied, 1)
+
+    def test_budget_in_threads(self):
+        # The budget is passed along the calls, so the budgets of solve calls in different threads are not mixed up
+        inference = classical_parser.parse('p → q, q → r / (s ∨ p) → (s ∨ r)')
+        budget = Budget()
+        solver.solve(inference, budget=budget)
+        expected = (budget.nodes, budget.rule_applications)
+
+        class WaitingBudget(Budget):
+            # The first time it is spent, waits for the other thread
+            def __init__(self, spent, wait_for):
+                super().__init__()
+                self.spent, self.wait_for = spent, wait_for
+
+            def spend(self, nodes=0, rule_applications=0):
+                if not self.spent.is_set():
+                    self.spent.set()
+                    self.wait_for.wait(timeout=10)
+                super().spend(nodes=nodes, rule_applications=rule_applications)
+
+        first_started, second_started, first_finished = Event(), Event(), Event()
+        first_budget = WaitingBudget(first_started, wait_for=second_started)
+        second_budget = WaitingBudget(second_started, wait_for=first_finished)
+
+        def first():
+            solver.solve(inference, budget=first_budget)
+            first_finished.set()
+
+        def second():
+            first_started.wait(timeout=10)
+            solver.solve(inference, budget=second_budget)
+
+        threads = [Thread(target=first), Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((first_budget.nodes, first_budget.rule_applications), expected)
+        self.assertEqual((second_budget.nodes, second_budget.rule_applications), expected)
+
     def test_alt_solver(self):
         # Test with valid arguments and see that they are solved correctly
         unsolved = 0
@@ -1,15 +1,20 @@
+import io
 import unittest
 import warnings
+from unittest import mock
 
 from logics.utils.parsers import classical_parser, modal_parser, LFI_parser
+from logics.utils.parsers.standard_parser import StandardParser
 from logics.instances.predicate.languages import arithmetic_truth_language
-from logics.utils.parsers.predicate_parser import classical_predicate_parser, \
+from logics.utils.parsers.predicate_parser import ArithmeticTruthParser, classical_predicate_parser, \
     arithmetic_parser, realnumber_arithmetic_parser, arithmetic_truth_parser
 from logics.classes.propositional import Formula, Inference
 from logics.classes.predicate import PredicateFormula
 from logics.classes.propositional.proof_theories import DerivationStep, Derivation, Sequent
+from logics.classes.errors import CorrectionError
 from logics.classes.exceptions import LevelsWarning, NotWellFormed
-from logics.utils.parsers.parser_utils import separate_arguments, get_main_constant
+from logics.utils.parsers.parser_utils import separate_arguments, get_main_constant, godel_encode, godel_decode, \
+    CacheInfo
 
 
 class TestPropositionalParser(unittest.TestCase):
@@ -36,6 +41,12 @@ class TestPropositionalParser(unittest.TestCase):
         self.assertEqual(classical_parser._prepare_to_parse('p/q//p/p'), 'p/1]q/2]p/1]p')
         self.assertEqual(classical_parser._prepare_to_parse('p / q & p // q'), 'p/1]q∧p/2]q')
         self.assertEqual(classical_parser._prepare_to_parse('/q // q/'), '/1]q/2]q/1]')
+        # Expressions replaced by separators count towards the level of the separator
+        self.assertEqual(classical_parser._prepare_to_parse('p |= q'), 'p/1]q')
+        self.assertEqual(classical_parser._prepare_to_parse('p /|= q / /'), 'p/2]q/1]/1]')
+        # The longest expression is replaced ('v' is also a key)
+        self.assertEqual(classical_parser._prepare_to_parse('p or verum'), 'p∨⊤')
+        self.assertEqual(classical_parser.parse('p or verum'), Formula(['∨', self.p, ['⊤']]))
 
     def test_parse_formula(self):
         """Tests both parse and unparse formulae"""
@@ -80,6 +91,117 @@ class TestPropositionalParser(unittest.TestCase):
         self.assertRaises(NotWellFormed, classical_parser.parse, 'p~p')
         self.assertRaises(NotWellFormed, classical_parser.parse, '(p or q or p)')
 
+    def test_parse_formula_structure(self):
+        # Prefix notation for binary constants, also after unary constants
+        self.assertEqual(classical_parser.parse('~∧(p, ~q)'), Formula(['~', ['∧', self.p, ['~', self.q]]]))
+        self.assertEqual(classical_parser.parse('∨(p ∧ q, q)'), Formula(['∨', ['∧', self.p, self.q], self.q]))
+        self.assertRaises(NotWellFormed, classical_parser.parse, '∧(p, q, p)')
+
+        # Deep formulae do not hit the recursion limit
+        # (formulae this deep cannot be compared with ==, so they are walked)
+        formula = classical_parser.parse('(q → ' * 3000 + 'p' + ')' * 3000)
+        for _ in range(3000):
+            self.assertEqual(formula.main_symbol, '→')
+            self.assertEqual(formula[1], self.q)
+            formula = formula[2]
+        self.assertEqual(formula, self.p)
+        formula = classical_parser.parse('~' * 3000 + 'p')
+        for _ in range(3000):
+            self.assertEqual(formula.main_symbol, '~')
+            formula = formula[1]
+        self.assertEqual(formula, self.p)
+
+        # Errors report the position in the (prepared) string
+        with self.assertRaises(NotWellFormed) as context:
+            classical_parser.parse('(p ∧ q))')
+        self.assertIn('position 5', str(context.exception))
+        with self.assertRaises(NotWellFormed) as context:
+            classical_parser.parse('p ∧ (q ∨ ~)')
+        self.assertIn('position 6', str(context.exception))
+        with self.assertRaises(NotWellFormed) as context:
+            classical_parser.parse('p ∧ (q ∨ q ∨ q)')
+        self.assertIn('position 6', str(context.exception))
+
+    def test_cache(self):
+        parser = StandardParser(language=classical_parser.language,
+                                parse_replacement_dict=dict(classical_parser.parse_replacement_dict),
+                                infix_cts=classical_parser.infix_cts, cache_size=2)
+        f = parser.parse('p and q')
+        f2 = parser.parse('p and q')
+        self.assertEqual(f, f2)
+        self.assertIsNot(f, f2)
+        f2[1][0] = 'r'  # Does not modify the cached formula
+        self.assertEqual(parser.parse('p and q'), Formula(['∧', self.p, self.q]))
+        self.assertEqual(parser.parse('p / q'), Inference([self.p], [self.q]))
+        parser.parse('~p')
+        parser.parse('p and q')  # discarded
+        self.assertEqual(parser.cache_info()['parse'], (2, 4, 2, 2))
+
+        # Changing the replacements empties the cache
+        parser.parse_replacement_dict['and'] = '∨'
+        self.assertEqual(parser.parse('~p'), Formula(['~', self.p]))
+        self.assertEqual(parser.cache_info()['parse'].currsize, 1)
+
+        # Unparse
+        f = Formula(['∧', self.p, self.q])
+        self.assertEqual(parser.unparse(f), 'p ∧ q')
+        self.assertEqual(parser.unparse(f), 'p ∧ q')
+        f[0] = '∨'
+        self.assertEqual(parser.unparse(f), 'p ∨ q')
+        self.assertEqual(parser.cache_info()['unparse'], (1, 2, 2, 1))
+
+        parser.cache_clear()
+        self.assertEqual(parser.cache_info()['parse'], (0, 0, 2, 0))
+        parser.set_cache_size(0)
+        self.assertEqual(parser.cache_info(), {'parse': None, 'unparse': None})
+        self.assertEqual(parser.parse('p and q'), Formula(['∧', self.p, self.q]))
+
+    def test_iter_parse(self):
+        lines = io.StringIO('p / q\n\n~p\n(p\nGamma ==> p\n')
+        parsed = list(classical_parser.iter_parse(lines, on_error='collect'))
+        self.assertEqual(parsed[:2], [Inference([self.p], [self.q]), Formula(['~', self.p])])
+        self.assertIsInstance(parsed[2], CorrectionError)
+        self.assertEqual(parsed[2].index, 4)
+        self.assertEqual(parsed[3], Sequent([['Γ'], [self.p]]))
+
+        with self.assertRaises(NotWellFormed) as context:
+            list(classical_parser.iter_parse(['p', 'p / p', 'q'], kind='formula'))
+        self.assertIn('Line 2', str(context.exception))
+        self.assertEqual(list(classical_parser.iter_parse('p\np / p\nq', kind='formula', on_error='skip')),
+                         [self.p, self.q])
+        self.assertRaises(ValueError, next, classical_parser.iter_parse(['p'], kind='formulae'))
+
+        # Derivations are separated by blank lines
+        derivations = list(classical_parser.iter_parse(['p; premise', 'p ∨ q; I∨; [0]; []', '', '', 'q; premise'],
+                                                       kind='natural_deduction'))
+        self.assertEqual(len(derivations), 2)
+        self.assertEqual(derivations[0][1].content, Formula(['∨', self.p, self.q]))
+        self.assertEqual(derivations[1][0].justification, 'premise')
+        derivations = list(classical_parser.iter_parse(['p', '', 'p; premise; [x]', '', 'p; premise; [0',
+                                                        '', 'p; premise'], kind='derivation', on_error='collect'))
+        self.assertEqual([error.index for error in derivations[:3]], [1, 3, 5])
+        self.assertEqual(derivations[3][0].content, self.p)
+
+        # Errors that do not come from the input are not collected
+        with mock.patch.object(classical_parser, 'parse', side_effect=TypeError):
+            self.assertRaises(TypeError, list, classical_parser.iter_parse(['p'], on_error='collect'))
+
+        # In a pool of processes
+        lines = [f'p{i} / ~q{i}' if i % 7 else f'p{i} /// ' for i in range(300)]
+        self.assertEqual(list(classical_parser.iter_parse(lines, on_error='collect', workers=2, chunk_size=16)),
+                         list(classical_parser.iter_parse(lines, on_error='collect')))
+
+    def test_unparse_many(self):
+        strings = ['p ∧ ~q', '~∨(p, q)', '(p / q) //', 'Γ, p ⇒ Δ', 'p ∨ q | q |']
+        objects = [classical_parser.parse(string) for string in strings]
+        self.assertEqual(classical_parser.unparse_many(objects), ['p ∧ ~q', '~(p ∨ q)', '(p / q) //', 'Γ, p ⇒ Δ',
+                                                                  'p ∨ q | q | '])
+        self.assertEqual(classical_parser.unparse_many(objects), [classical_parser.unparse(o) for o in objects])
+
+        # Deep formulae do not hit the recursion limit
+        formula = classical_parser.parse('~' * 3000 + 'p')
+        self.assertEqual(classical_parser.unparse(formula), '~' * 3000 + 'p')
+
     def test_other_parsers(self):
         # Modal parser
         f_native = Formula(['□', self.p])
@@ -164,6 +286,33 @@ class TestPropositionalParser(unittest.TestCase):
         deriv2 = Derivation([step1, step3])
         self.assertEqual(deriv1, deriv2)
 
+        # Lazily, from a string or from lines
+        steps = classical_parser.iter_parse_derivation('p; premise\np ∨ q; I∨; [0]; [ ]', natural_deduction=True)
+        self.assertEqual(next(steps).content, self.p)
+        step = next(steps)
+        self.assertEqual((step.on_steps, step.open_suppositions), ([0], []))
+        self.assertRaises(StopIteration, next, steps)
+        self.assertEqual(list(classical_parser.iter_parse_derivation(io.StringIO(
+            'p → ((p → p) → p); ax1\n\n((p → (p → p)) → (p → p)); mp; [1,2]\n'))), deriv2)
+
+        # Incrementally, after editing some lines
+        lines = [f'p{i}; premise' for i in range(100)]
+        deriv = classical_parser.parse_derivation('\n'.join(lines), natural_deduction=True)
+        lines[10:12] = ['q; premise', 'q ∧ p0; I∧; [10, 0]; []', 'r; premise']
+        new_deriv = classical_parser.parse_derivation('\n'.join(lines), natural_deduction=True, previous=deriv,
+                                                      changed_lines=(10, 12))
+        self.assertEqual(new_deriv, classical_parser.parse_derivation('\n'.join(lines), natural_deduction=True))
+        self.assertIs(new_deriv[9], deriv[9])
+        self.assertIs(new_deriv[13], deriv[12])
+        del lines[0]
+        new_deriv2 = classical_parser.parse_derivation('\n'.join(lines), natural_deduction=True, previous=new_deriv,
+                                                       changed_lines=(0, 1))
+        self.assertEqual(len(new_deriv2), 100)
+        self.assertEqual(new_deriv2[10].on_steps, [10, 0])
+        self.assertRaises(ValueError, classical_parser.parse_derivation, '\n'.join(lines), previous=new_deriv)
+        self.assertRaises(ValueError, classical_parser.parse_derivation, 'p; premise', previous=new_deriv,
+                          changed_lines=(0, 1))
+
     def test_parse_sequents(self):
         # Two-sided
         s = classical_parser.parse('A ==> A')
@@ -273,6 +422,36 @@ class TestPredicateParser(unittest.TestCase):
         # f = realnumber_arithmetic_parser.parse('∀x1 1=1')
         # self.assertEqual(f, PredicateFormula(['∀', 'x1', ['=', '1', '1']]))
 
+    def test_parse_term_structure(self):
+        # Infix function symbols are found by longest match
+        self.assertEqual(arithmetic_parser.parse_term('0**s(0)'), ('**', '0', ('s', '0')))
+        self.assertEqual(arithmetic_parser.parse_term('(0*0)**0'), ('**', ('*', '0', '0'), '0'))
+        self.assertRaises(NotWellFormed, arithmetic_parser.parse_term, '0+0+0')
+        self.assertRaises(NotWellFormed, arithmetic_parser.parse_term, '(s(0))')
+        self.assertRaises(NotWellFormed, arithmetic_parser.parse_term, 's(0')
+
+        # Bounds, and infix constants in prefix notation after a quantifier
+        f = arithmetic_parser.parse('∀x ∈ s(0)+0 ∃y ∈ (x*x) y<x')
+        self.assertEqual(f, PredicateFormula(['∀', 'x', '∈', ('+', ('s', '0'), '0'),
+                                              ['∃', 'y', '∈', ('*', 'x', 'x'), ['<', 'y', 'x']]]))
+        f = classical_predicate_parser.parse('∀x ∧(P(x), P(a))')
+        self.assertEqual(f, PredicateFormula(['∀', 'x', ['∧', ['P', 'x'], ['P', 'a']]]))
+        self.assertRaises(NotWellFormed, classical_predicate_parser.parse, '∀x')
+        self.assertRaises(NotWellFormed, classical_predicate_parser.parse, '∀x ∈ a')
+
+        # Deeply nested terms do not hit the recursion limit
+        f = arithmetic_parser.parse('s(' * 3000 + '0' + ')' * 3000 + '=0')
+        term = f[1]
+        for _ in range(3000):
+            self.assertEqual(term[0], 's')
+            term = term[1]
+        self.assertEqual(term, '0')
+        t = arithmetic_parser.parse_term('0+(' * 3000 + '0+0' + ')' * 3000)
+        for _ in range(3000):
+            self.assertEqual(t[:2], ('+', '0'))
+            t = t[2]
+        self.assertEqual(t, ('+', '0', '0'))
+
     def test_unparse_formula(self):
         f = classical_predicate_parser.parse('P(a) ∧ R(a,b)')
         self.assertEqual(classical_predicate_parser.unparse(f), 'P(a) ∧ R(a, b)')
@@ -302,6 +481,28 @@ class TestPredicateParser(unittest.TestCase):
         self.assertEqual(arithmetic_truth_parser.parse('Tr(quote(0=0))'), PredicateFormula(['Tr', '0490']))
         self.assertTrue(arithmetic_truth_language.is_well_formed(arithmetic_truth_parser.parse('Tr(quote(0=0))')))
 
+        self.assertEqual(arithmetic_truth_parser.godel_encode('x0**x'), '518999951')
+        self.assertEqual(arithmetic_truth_parser.godel_decode('518999951'), 'x**x')
+        self.assertRaises(NotWellFormed, arithmetic_truth_parser.godel_encode, '0=T')
+        self.assertRaises(NotWellFormed, arithmetic_truth_parser.godel_decode, '0495')
+        self.assertRaises(NotWellFormed, arithmetic_truth_parser.godel_decode, '04909')
+
+        # Parsing codes
+        parser = ArithmeticTruthParser(godel_encoding_function=godel_encode, godel_decoding_function=godel_decode,
+                                       language=arithmetic_truth_language,
+                                       parse_replacement_dict=arithmetic_truth_parser.parse_replacement_dict,
+                                       infix_cts=['∧', '∨', '→', '↔'], infix_pred=['=', '<', '>'],
+                                       infix_func=['+', '*', '**'], code_cache_size=2)
+        code = parser.parse('Tr(⌜Tr(⌜0=0⌝) ∧ 0=0⌝)')[1]
+        f = parser.parse_code(code)
+        self.assertEqual(f, PredicateFormula(['∧', ['Tr', '0490'], ['=', '0', '0']]))
+        f[0] = '∨'  # Does not modify the cached formula
+        self.assertIs(parser.parse_code(code, copy=False), parser.parse_code(code, copy=False))
+        self.assertEqual(parser.parse_code(code, copy=False)[0], '∧')
+        self.assertEqual(parser.cache_info()['code'], CacheInfo(hits=3, misses=1, maxsize=2, currsize=1))
+        parser.cache_clear()
+        self.assertEqual(parser.cache_info()['code'], CacheInfo(hits=0, misses=0, maxsize=2, currsize=0))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,12 +1,13 @@
 import unittest
 
 from logics.utils.parsers import classical_parser
-from logics.classes.exceptions import SolverError
+from logics.classes.exceptions import SolverError, BudgetExceeded
 from logics.utils.formula_generators.generators_biased import random_formula_generator
 from logics.instances.propositional.languages import classical_infinite_language_noconditional as cl_language
 from logics.instances.propositional.many_valued_semantics import classical_mvl_semantics
 from logics.instances.propositional.sequents import LKminEA
 from logics.utils.solvers.sequents import LKminEA_sequent_reducer
+from logics.utils.solvers.budget import Budget
 
 
 class TestSequentReducer(unittest.TestCase):
@@ -45,6 +46,26 @@ class TestSequentReducer(unittest.TestCase):
         # tree.print_tree(classical_parser)
         self.assertTrue(LKminEA.is_correct_tree(tree, premises=[premise]))
 
+    def test_budget(self):
+        sequent = classical_parser.parse('Gamma ==> Delta, (A or not A) & (B or not B)')
+        tree = LKminEA_sequent_reducer.reduce(sequent, LKminEA, budget=Budget(max_nodes=100))
+        self.assertTrue(LKminEA.is_correct_tree(tree))
+
+        budget = Budget(max_nodes=2)
+        with self.assertRaises(BudgetExceeded) as context:
+            LKminEA_sequent_reducer.reduce(sequent, LKminEA, budget=budget)
+        partial_result = context.exception.partial_result
+        self.assertEqual(partial_result.reason, 'max_nodes')
+        self.assertEqual(partial_result.counters['nodes'], 2)
+        self.assertEqual(partial_result.tree.content, sequent)
+        # The sequents that were not reduced are the leaves without justification
+        self.assertEqual(partial_result.frontier, [leaf for leaf in partial_result.tree.leaves
+                                                   if leaf.justification is None])
+        self.assertTrue(partial_result.frontier)
+
+        self.assertRaises(BudgetExceeded, LKminEA_sequent_reducer.reduce, sequent, LKminEA,
+                          budget=Budget(timeout=0))
+
     def test_with_generator(self):
         # Test with valid arguments
         for _ in range(1000):
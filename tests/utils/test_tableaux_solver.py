@@ -1,16 +1,26 @@
 import unittest
+import warnings
+from threading import Event
+
+from anytree import PreOrderIter
 
 from logics.classes.propositional import Formula, Inference
-from logics.classes.propositional.proof_theories.metainferential_tableaux import MetainferentialTableauxStandard
-from logics.instances.propositional.tableaux import (
-    classical_tableaux_system, classical_indexed_tableaux_system, LP_tableaux_system, classical_constructive_tree_system
+from logics.classes.exceptions import SolverError, BudgetExceeded
+from logics.classes.propositional.proof_theories.metainferential_tableaux import (
+    MetainferentialTableauxStandard, MetainferentialTableauxNode
 )
-from logics.instances.propositional.metainferential_tableaux import (
-    metainferential_tableaux_rules, SK_metainferential_tableaux_system as sk_tableaux
+from logics.classes.propositional.proof_theories.tableaux import _NodeTemplate
+from logics.instances.propositional.tableaux import (
+    classical_tableaux_system, classical_indexed_tableaux_system, FDE_tableaux_system, K3_tableaux_system,
+    LP_tableaux_system, classical_constructive_tree_system
 )
+from logics.instances.propositional.metainferential_tableaux import SK_metainferential_tableaux_system as sk_tableaux
 from logics.utils.solvers.tableaux import (
-    standard_tableaux_solver, indexed_tableaux_solver, metainferential_tableaux_solver
+    TableauxSolver, MetainferentialTableauxSolver,
+    standard_tableaux_solver, indexed_tableaux_solver, metainferential_tableaux_solver,
+    level_order, non_branching_first, closure_likely_first, smallest_formula_first, alpha_beta_priority
 )
+from logics.utils.solvers.budget import Budget
 from logics.utils.parsers import classical_parser
 from logics.utils.formula_generators.generators_biased import random_formula_generator
 from logics.instances.propositional.languages import (
@@ -19,7 +29,7 @@ from logics.instances.propositional.languages import (
 )
 from logics.instances.propositional.languages import classical_infinite_language_noconditional as mvl_language
 from logics.instances.propositional.many_valued_semantics import (
-    classical_mvl_semantics, LP_mvl_semantics, K3_mvl_semantics
+    classical_mvl_semantics, LP_mvl_semantics, K3_mvl_semantics, FDE_mvl_semantics
 )
 
 
@@ -168,6 +178,280 @@ class TestTableauxSolver(unittest.TestCase):
                 print("ERROR LIST:", error_list)
                 raise e
 
+    def test_check(self):
+        # check agrees with the tree built by solve, and the countermodels it gives are counterexamples
+        systems = [
+            (classical_tableaux_system, classical_mvl_semantics, cl_language),
+            (classical_indexed_tableaux_system, classical_mvl_semantics, cl_language),
+            (FDE_tableaux_system, FDE_mvl_semantics, mvl_language),
+            (K3_tableaux_system, K3_mvl_semantics, mvl_language),
+            (LP_tableaux_system, LP_mvl_semantics, mvl_language),
+        ]
+        for system, semantics, language in systems:
+            for _ in range(50):
+                inf = random_formula_generator.random_inference(num_premises=2, num_conclusions=1, max_depth=3,
+                                                                atomics=['p', 'q', 'r'], language=language)
+                valid, countermodel = system.check(inf)
+                self.assertEqual(valid, system.tree_is_closed(system.solve_tree(inf)))
+                self.assertEqual(valid, system.is_valid(inf))
+                if valid:
+                    self.assertIsNone(countermodel)
+                else:
+                    self.assertEqual(set(countermodel), inf.atomics_inside(language))
+                    self.assertFalse(semantics.satisfies(inf, countermodel))
+
+        # The branches are explored depth-first, the first open one gives the countermodel
+        inf = classical_parser.parse('p ∨ q, r ∨ s / p')
+        self.assertEqual(classical_tableaux_system.check(inf), (False, {'p': '0', 'q': '1', 'r': '1', 's': '0'}))
+        inf = classical_parser.parse('p ∧ ~p / q')
+        self.assertEqual(FDE_tableaux_system.check(inf), (False, {'p': 'b', 'q': '0'}))
+        self.assertEqual(LP_tableaux_system.check(inf), (False, {'p': 'i', 'q': '0'}))
+        self.assertEqual(K3_tableaux_system.check(inf), (True, None))
+        inf = classical_parser.parse('p / q ∨ ~q')
+        self.assertEqual(K3_tableaux_system.check(inf), (False, {'p': '1', 'q': 'i'}))
+
+        # Maximum depth of the branches
+        inf = classical_parser.parse('p ∨ q, r ∨ s, p1 ∨ q1 / r1')
+        self.assertEqual(standard_tableaux_solver.check(inf, classical_tableaux_system, max_depth=7)[0], False)
+        self.assertRaises(SolverError, standard_tableaux_solver.check, inf, classical_tableaux_system, max_depth=6)
+
+    def test_workers(self):
+        # Building the subtrees in processes gives the same tree
+        inferences = [classical_parser.parse('(p ↔ q) ↔ (r ↔ s), p ∨ r / (q ↔ r) ∨ ~s'),
+                      classical_parser.parse('p ↔ q, q ↔ r, r ↔ s / p ↔ s')]
+        for inf in inferences:
+            for solver, system in ((standard_tableaux_solver, classical_tableaux_system),
+                                   (indexed_tableaux_solver, classical_indexed_tableaux_system)):
+                tree = solver.solve(inf, system)
+                for split_depth in (None, 4):
+                    tree2 = solver.solve(inf, system, workers=2, split_depth=split_depth)
+                    self.assertEqual([(node.content, node.index, node.justification, node.depth)
+                                      for node in PreOrderIter(tree)],
+                                     [(node.content, node.index, node.justification, node.depth)
+                                      for node in PreOrderIter(tree2)])
+                    self.assertTrue(system.is_correct_tree(tree2, inf))
+
+                valid, countermodel = solver.check(inf, system, workers=2)
+                self.assertEqual(valid, system.tree_is_closed(tree))
+                if not valid:
+                    self.assertFalse(classical_mvl_semantics.satisfies(inf, countermodel))
+
+    def test_rule_application(self):
+        # The rules are compiled once into their premises and the templates of the nodes they add
+        premises, branches = classical_tableaux_system._rule_template('R∨')
+        self.assertEqual([premise.content for premise in premises], [classical_parser.parse('A ∨ B')])
+        self.assertEqual([(template.content, template.justification) for template in branches],
+                         [(Formula(['A']), 'R∨'), (Formula(['B']), 'R∨')])
+        self.assertEqual(len(classical_tableaux_system._rule_template('R↔')[1]), 2)
+        self.assertEqual(len(classical_tableaux_system._rule_template('R↔')[1][0].children), 1)
+
+        # R∧ is applied to the two branches opened by R∨ (in level order), the new nodes share the same formulae
+        inference = classical_parser.parse('p ∨ q, r ∧ s / t')
+        tableaux = standard_tableaux_solver.solve(inference, classical_tableaux_system, priority=level_order)
+        r_nodes = [node for node in tableaux.descendants if node.content == Formula(['r'])]
+        self.assertEqual(len(r_nodes), 2)
+        self.assertIsNot(r_nodes[0], r_nodes[1])
+        self.assertIs(r_nodes[0].content, r_nodes[1].content)
+        self.assertEqual(r_nodes[0].justification, 'R∧')
+
+        # Applying the rule does not change the rule
+        self.assertEqual(classical_tableaux_system.rules['R∨'].content, classical_parser.parse('A ∨ B'))
+        self.assertEqual([child.content for child in classical_tableaux_system.rules['R∨'].children],
+                         [Formula(['A']), Formula(['B'])])
+
+    def test_apply_rule_deprecated(self):
+        # apply_rule still returns the instantiated rule, but warns
+        subst_dict = {'A': Formula(['p']), 'B': Formula(['q'])}
+        with self.assertWarns(DeprecationWarning):
+            rule_application = standard_tableaux_solver.apply_rule(classical_tableaux_system, 'R∨',
+                                                                   classical_tableaux_system.rules['R∨'], subst_dict)
+        self.assertEqual(rule_application.content, classical_parser.parse('p ∨ q'))
+        self.assertEqual([child.content for child in rule_application.children], [Formula(['p']), Formula(['q'])])
+
+        # If a subclass overrides it, the solver uses the nodes below the last premise of what it returns
+        class SwappedSolver(TableauxSolver):
+            def apply_rule(self, tableaux_system, rule_name, rule, subst_dict):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', DeprecationWarning)
+                    rule_application = super().apply_rule(tableaux_system, rule_name, rule, subst_dict)
+                if rule_name == 'R∨':
+                    rule_application.children = list(reversed(rule_application.children))
+                return rule_application
+
+        inference = classical_parser.parse('p ∨ q / r')
+        with self.assertWarns(DeprecationWarning):
+            tableaux = SwappedSolver().solve(inference, classical_tableaux_system)
+        self.assertEqual([leaf.content for leaf in tableaux.leaves], [Formula(['q']), Formula(['p'])])
+        tableaux = standard_tableaux_solver.solve(inference, classical_tableaux_system)
+        self.assertEqual([leaf.content for leaf in tableaux.leaves], [Formula(['p']), Formula(['q'])])
+
+    def test_priorities(self):
+        # Every priority gives a correct tree, that closes iff the inference is valid
+        priorities = [level_order, non_branching_first, closure_likely_first, smallest_formula_first,
+                      alpha_beta_priority]
+        for _ in range(25):
+            inference = random_formula_generator.random_inference(num_premises=2, num_conclusions=1, max_depth=3,
+                                                                  atomics=['p', 'q', 'r'], language=cl_language)
+            valid = classical_mvl_semantics.is_locally_valid(inference)
+            for priority in priorities:
+                tree = standard_tableaux_solver.solve(inference, classical_tableaux_system, priority=priority)
+                self.assertEqual(classical_tableaux_system.tree_is_closed(tree), valid)
+                self.assertTrue(classical_tableaux_system.is_correct_tree(tree, inference))
+
+                tree = indexed_tableaux_solver.solve(inference, classical_indexed_tableaux_system, priority=priority)
+                self.assertEqual(classical_indexed_tableaux_system.tree_is_closed(tree), valid)
+                self.assertTrue(classical_indexed_tableaux_system.is_correct_tree(tree, inference))
+
+        # The default applies the conjunction (which does not branch) before the disjunction, level_order does not
+        inference = classical_parser.parse('p ∨ q, r ∧ s / t')
+        tree = standard_tableaux_solver.solve(inference, classical_tableaux_system)
+        self.assertEqual([node.content for node in tree.leaves[0].path[3:]], [classical_parser.parse(x) for x in
+                                                                               ('r', 's', 'p')])
+        tree = standard_tableaux_solver.solve(inference, classical_tableaux_system, priority=level_order)
+        self.assertEqual([node.content for node in tree.leaves[0].path[3:]], [classical_parser.parse(x) for x in
+                                                                               ('p', 'r', 's')])
+
+    def test_statistics(self):
+        inference = classical_parser.parse('p ∨ q, r ∧ s / t')
+        tree, statistics = standard_tableaux_solver.solve(inference, classical_tableaux_system,
+                                                          return_statistics=True)
+        self.assertEqual(statistics, {'rule_applications': 2, 'max_agenda_size': 2, 'branching_factor': 1.5})
+
+        tree, statistics = standard_tableaux_solver.solve(classical_parser.parse('p / p'), classical_tableaux_system,
+                                                          return_statistics=True)
+        self.assertTrue(classical_tableaux_system.tree_is_closed(tree))
+        self.assertEqual(statistics, {'rule_applications': 0, 'max_agenda_size': 0, 'branching_factor': 0})
+
+    def test_budget(self):
+        inference = classical_parser.parse('(p ↔ q) ↔ (r ↔ s), p ∨ r / (q ↔ r) ∨ ~s')
+        tree, statistics = standard_tableaux_solver.solve(inference, classical_tableaux_system,
+                                                          return_statistics=True)
+
+        budget = Budget(max_rule_applications=4)
+        with self.assertRaises(BudgetExceeded) as context:
+            standard_tableaux_solver.solve(inference, classical_tableaux_system, budget=budget)
+        partial_result = context.exception.partial_result
+        self.assertEqual(partial_result.reason, 'max_rule_applications')
+        self.assertEqual(partial_result.counters['rule_applications'], 4)
+        self.assertEqual(partial_result.counters['nodes'], len(partial_result.tree.descendants) + 1)
+        self.assertEqual(partial_result.frontier, [leaf for leaf in partial_result.tree.leaves
+                                                   if not classical_tableaux_system.node_is_closed(leaf)])
+        # The same budget can be used again (the counters are reset)
+        self.assertRaises(BudgetExceeded, standard_tableaux_solver.solve, inference, classical_tableaux_system,
+                          budget=budget)
+        self.assertEqual(budget.rule_applications, 4)
+
+        # A budget that is large enough does not change the tree
+        budget = Budget(max_nodes=1000, max_rule_applications=1000, timeout=60)
+        tree2 = standard_tableaux_solver.solve(inference, classical_tableaux_system, budget=budget)
+        self.assertEqual([(node.content, node.justification) for node in PreOrderIter(tree)],
+                         [(node.content, node.justification) for node in PreOrderIter(tree2)])
+        self.assertEqual(budget.rule_applications, statistics['rule_applications'])
+        self.assertEqual(budget.nodes, len(tree.descendants) + 1)
+
+        budget = Budget(max_nodes=10)
+        with self.assertRaises(BudgetExceeded) as context:
+            standard_tableaux_solver.solve(inference, classical_tableaux_system, budget=budget)
+        self.assertEqual(context.exception.partial_result.reason, 'max_nodes')
+        self.assertGreaterEqual(budget.nodes, 10)
+
+        # Deadline, timeout and cancellation
+        for budget, reason in ((Budget(deadline=0), 'deadline'), (Budget(timeout=0), 'deadline')):
+            with self.assertRaises(BudgetExceeded) as context:
+                standard_tableaux_solver.solve(inference, classical_tableaux_system, budget=budget)
+            self.assertEqual(context.exception.partial_result.reason, reason)
+        cancel_event = Event()
+        budget = Budget(cancel_event=cancel_event)
+        standard_tableaux_solver.solve(inference, classical_tableaux_system, budget=budget)
+        cancel_event.set()
+        with self.assertRaises(BudgetExceeded) as context:
+            standard_tableaux_solver.check(inference, classical_tableaux_system, budget=budget)
+        self.assertEqual(context.exception.partial_result.reason, 'cancelled')
+
+        # Exceeding the maximum depth also gives a partial result (and is still a SolverError)
+        with self.assertRaises(SolverError) as context:
+            standard_tableaux_solver.solve(inference, classical_tableaux_system, max_depth=5)
+        self.assertIsInstance(context.exception, BudgetExceeded)
+        self.assertEqual(context.exception.partial_result.reason, 'max_depth')
+        self.assertGreaterEqual(context.exception.partial_result.tree.height, 5)
+
+        # With check, the branches left to explore are added to the partial tree
+        inference = classical_parser.parse('p ∨ q, r ∨ s / t')
+        with self.assertRaises(BudgetExceeded) as context:
+            standard_tableaux_solver.check(inference, classical_tableaux_system,
+                                           budget=Budget(max_rule_applications=2))
+        partial_result = context.exception.partial_result
+        self.assertEqual(partial_result.counters['rule_applications'], 2)
+        self.assertEqual([classical_parser.unparse(leaf.content) for leaf in partial_result.frontier], ['r', 's', 'q'])
+        for leaf in partial_result.frontier:
+            self.assertFalse(classical_tableaux_system.node_is_closed(leaf))
+
+        self.assertRaises(ValueError, standard_tableaux_solver.solve, inference, classical_tableaux_system,
+                          workers=2, budget=Budget())
+
+    def test_iter_solve(self):
+        inference = classical_parser.parse('(p ↔ q) ↔ (r ↔ s), p ∨ r / (q ↔ r) ∨ ~s')
+        tree, statistics = standard_tableaux_solver.solve(inference, classical_tableaux_system,
+                                                          return_statistics=True)
+        steps = list(standard_tableaux_solver.iter_solve(inference, classical_tableaux_system))
+        self.assertEqual(len(steps), statistics['rule_applications'] + 1)
+        self.assertEqual([step.number for step in steps], list(range(len(steps))))
+        self.assertIsNone(steps[0].rule_name)
+        self.assertEqual([node.content for node in steps[0].added_nodes],
+                         [node.content for node in PreOrderIter(steps[0].tree)][:3])
+        # The same tree as solve, and every node is added in some step
+        self.assertEqual([(node.content, node.justification) for node in PreOrderIter(tree)],
+                         [(node.content, node.justification) for node in PreOrderIter(steps[-1].tree)])
+        added_nodes = [node for step in steps for node in step.added_nodes]
+        self.assertEqual(set(added_nodes), set(PreOrderIter(steps[-1].tree)))
+        self.assertEqual(len(added_nodes), len(steps[-1].tree.descendants) + 1)
+        # Each closed branch is reported once, in the step that closed it
+        closed_branches = [leaf for step in steps for leaf in step.closed_branches]
+        self.assertEqual(len(closed_branches), len(set(closed_branches)))
+        self.assertEqual(set(closed_branches), {leaf for leaf in steps[-1].tree.leaves
+                                                if classical_tableaux_system.node_is_closed(leaf)})
+        for step in steps[1:]:
+            applicable, subst_dict = classical_tableaux_system.rule_is_applicable(step.node, step.rule_name,
+                                                                                  return_subst_dict=True)
+            self.assertTrue(applicable)
+            self.assertEqual(step.subst_dict, subst_dict)
+            for node in step.added_nodes:  # None if every branch below the node closed before the rule was applied
+                self.assertIn(step.node, node.path)
+
+        # The tree is built as the steps are consumed: pause, resume and abort
+        iterator = standard_tableaux_solver.iter_solve(inference, classical_tableaux_system)
+        step = next(iterator)
+        self.assertEqual(len(step.tree.descendants), 2)
+        step = next(iterator)
+        self.assertEqual(len(step.tree.descendants), 2 + len(step.added_nodes))
+        step = next(iterator)  # resumes where it was
+        self.assertEqual(step.number, 2)
+        iterator.close()
+        self.assertRaises(StopIteration, next, iterator)
+        self.assertEqual(len(step.tree.descendants) + 1, sum(len(s.added_nodes) for s in steps[:3]))
+
+        # Budgets and maximum depth
+        iterator = standard_tableaux_solver.iter_solve(inference, classical_tableaux_system,
+                                                       budget=Budget(max_rule_applications=3))
+        self.assertEqual(len([next(iterator) for _ in range(4)]), 4)
+        with self.assertRaises(BudgetExceeded) as context:
+            next(iterator)
+        self.assertEqual(context.exception.partial_result.reason, 'max_rule_applications')
+        with self.assertRaises(BudgetExceeded):
+            list(standard_tableaux_solver.iter_solve(inference, classical_tableaux_system, max_depth=5))
+
+        # Other solvers
+        inference = classical_parser.parse('p, p ∨ q / r')
+        steps = list(metainferential_tableaux_solver.iter_solve(inference, sk_tableaux,
+                                                                beggining_index=[{'1'}, {'1', 'i'}]))
+        tree = metainferential_tableaux_solver.solve(inference, sk_tableaux, beggining_index=[{'1'}, {'1', 'i'}])
+        self.assertEqual([(node.content, node.index) for node in PreOrderIter(tree)],
+                         [(node.content, node.index) for node in PreOrderIter(steps[-1].tree)])
+        self.assertEqual(steps[1].rule_name, 'inf0')
+        steps = list(standard_tableaux_solver.iter_solve(classical_parser.parse('p / p'), classical_tableaux_system))
+        self.assertEqual(len(steps), 1)
+        self.assertEqual(steps[0].closed_branches, list(steps[0].tree.leaves))
+
 
 class TestMetainferentialTableauxSolver(unittest.TestCase):
     def test_begin_tableaux(self):
@@ -177,171 +461,73 @@ class TestMetainferentialTableauxSolver(unittest.TestCase):
         self.assertEqual(initial_node.index, MetainferentialTableauxStandard([{'1', 'i'}, {'1'}], bar=True))
         self.assertEqual(len(initial_node.children), 0)
 
-    def test_apply_rule_inferences(self):
+    def test_apply_rule_deprecated(self):
+        # The deprecated apply_rule builds the hardcoded rules from MetainferentialTableauxSystem._rule_nodes
         T, S = MetainferentialTableauxStandard({'1', 'i'}), MetainferentialTableauxStandard({'1'})
-        Tbar = MetainferentialTableauxStandard({'1', 'i'}, bar=True)
-        Sbar = MetainferentialTableauxStandard({'1'}, bar=True)
-
-        # inf0
         subst_dict = {'Γ': [Formula(['p']), Formula(['q'])], 'Δ': [Formula(['p'])], 'X': T, 'Y': S}
-        applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, "inf0",
-                                                                  metainferential_tableaux_rules['inf0'], subst_dict)
-        # print(applied_rule.print_tree(classical_parser))
-        """
-        p, q / p, -[{'1', 'i'}, {'1'}]
-        └── p, {'1', 'i'} (inf0)
-            └── q, {'1', 'i'} (inf0)
-                └── p, -{'1'} (inf0)
-        """
-        # First node: p, q / p, -TS
+        with self.assertWarns(DeprecationWarning):
+            applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, "inf0", sk_tableaux.rules['inf0'],
+                                                                      subst_dict)
         self.assertEqual(applied_rule.content, Inference(premises=[Formula(['p']), Formula(['q'])],
                                                          conclusions=[Formula(['p'])]))
         self.assertEqual(applied_rule.index, MetainferentialTableauxStandard([T, S], bar=True))
-        self.assertEqual(len(applied_rule.children), 1)
-        # Second node: p, T
-        child = applied_rule.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, T)
-        self.assertEqual(len(child.children), 1)
-        # Third node: q, T
-        child = child.children[0]
-        self.assertEqual(child.content, Formula(['q']))
-        self.assertEqual(child.index, T)
-        self.assertEqual(len(child.children), 1)
-        # Third node: p, -S
-        child = child.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, Sbar)
-        self.assertEqual(len(child.children), 0)
-
-        # ----------------------------------------------------
-        # inf1
-        applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, "inf1",
-                                                                  metainferential_tableaux_rules['inf1'], subst_dict)
-        # print(applied_rule.print_tree(classical_parser))
-        """
-        p, q / p, [{'1', 'i'}, {'1'}]
-        ├── p, -{'1', 'i'} (inf1)
-        ├── q, -{'1', 'i'} (inf1)
-        └── p, {'1'} (inf1)
-        """
-        # First node: p, q / p, TS
-        self.assertEqual(applied_rule.content, Inference(premises=[Formula(['p']), Formula(['q'])],
-                                                         conclusions=[Formula(['p'])]))
-        self.assertEqual(applied_rule.index, MetainferentialTableauxStandard([T, S], bar=False))
-        self.assertEqual(len(applied_rule.children), 3)
-        # Second node: p, -T
-        child = applied_rule.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, Tbar)
-        self.assertEqual(len(child.children), 0)
-        # Third node: q, -T
-        child = applied_rule.children[1]
-        self.assertEqual(child.content, Formula(['q']))
-        self.assertEqual(child.index, Tbar)
-        self.assertEqual(len(child.children), 0)
-        # Third node: p, S
-        child = applied_rule.children[2]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, S)
-        self.assertEqual(len(child.children), 0)
-
-    def test_apply_rule_formulae(self):
-        T, S = MetainferentialTableauxStandard({'1', 'i'}), MetainferentialTableauxStandard({'1'})
-        N, F = MetainferentialTableauxStandard({'0', 'i'}), MetainferentialTableauxStandard({'0'})
-        Tbar = MetainferentialTableauxStandard({'1', 'i'}, bar=True)
-        Sbar = MetainferentialTableauxStandard({'1'}, bar=True)
-
-        # Singleton
-        subst_dict = {'A': Formula(['p']), 'X': T}
-        applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, 'singleton',
-                                                                  metainferential_tableaux_rules['singleton'],
-                                                                  subst_dict)
-        # print(applied_rule.print_tree(classical_parser))
-        """
-        p, {'1', 'i'}
-        ├── p, {'1'} (singleton)
-        └── p, {'i'} (singleton)
-        """
-        # First node: p, T
-        self.assertEqual(applied_rule.content, Formula(['p']))
-        self.assertEqual(applied_rule.index, T)
-        self.assertEqual(len(applied_rule.children), 2)
-        # Second node: p, 1
-        child = applied_rule.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(len(child.index.content), 1)
-        # since the basic indexes are sets, the rule can return the two in different order
-        if child.index.content == {'1'}:
-            one_first = True
-        elif child.index.content == {'i'}:
-            one_first = False
-        else:
-            raise ValueError("incorrect standard for the first child node")
-        self.assertEqual(len(child.children), 0)
-        # Third node: p, i
-        child = applied_rule.children[1]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(len(child.index.content), 1)
-        if one_first:
-            self.assertEqual(child.index, MetainferentialTableauxStandard({'i'}))
-        else:
-            self.assertEqual(child.index, MetainferentialTableauxStandard({'1'}))
-        self.assertEqual(len(child.children), 0)
-
-        # ----------------------------------------------------
-        # intersection
-        subst_dict = {'A': Formula(['p']), 'X': T, 'Y': N}
-        applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, 'intersection',
-                                                                  metainferential_tableaux_rules['intersection'],
-                                                                  subst_dict)
-        # print(applied_rule.print_tree(classical_parser))
-        """
-        p, {'i', '1'}
-        └── p, {'i', '0'}
-            └── p, {'i'}
-        """
-        # First node: p, T
-        self.assertEqual(applied_rule.content, Formula(['p']))
-        self.assertEqual(applied_rule.index, T)
-        self.assertEqual(len(applied_rule.children), 1)
-        # Second node: p, N
-        child = applied_rule.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, N)
-        self.assertEqual(len(child.children), 1)
-        # Third node: p, i
-        child = child.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, MetainferentialTableauxStandard({'i'}))
-        self.assertEqual(len(child.children), 0)
-
-        subst_dict = {'A': Formula(['p']), 'X': S, 'Y': F}
-        applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, 'intersection',
-                                                                  sk_tableaux.rules['intersection'],
-                                                                  subst_dict)
-        self.assertEqual(applied_rule.leaves[0].index.content, set())
-
-        # ----------------------------------------------------
-        # bar
-        subst_dict = {'A': Formula(['p']), 'X': Sbar}
-        applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, 'complement',
-                                                                  metainferential_tableaux_rules['complement'],
-                                                                  subst_dict)
-        # print(applied_rule.print_tree(classical_parser))
-        """
-        p, -{'1'}
-        └── p, {'0', 'i'}
-        """
-        # First node: p, T
-        self.assertEqual(applied_rule.content, Formula(['p']))
-        self.assertEqual(applied_rule.index, Sbar)
-        self.assertEqual(len(applied_rule.children), 1)
-        # Second node: p, N
-        child = applied_rule.children[0]
-        self.assertEqual(child.content, Formula(['p']))
-        self.assertEqual(child.index, N)
-        self.assertEqual(len(child.children), 0)
+        self.assertEqual([(node.content, node.index, node.justification) for node in applied_rule.descendants],
+                         [(Formula(['p']), T, 'inf0'), (Formula(['q']), T, 'inf0'),
+                          (Formula(['p']), MetainferentialTableauxStandard({'1'}, bar=True), 'inf0')])
+
+        # intersection has two premises, the node it adds goes below the last one
+        subst_dict = {'A': Formula(['p']), 'X': T, 'Y': S}
+        with self.assertWarns(DeprecationWarning):
+            applied_rule = metainferential_tableaux_solver.apply_rule(sk_tableaux, "intersection",
+                                                                      sk_tableaux.rules['intersection'], subst_dict)
+        self.assertEqual([(node.content, node.index, node.justification) for node in PreOrderIter(applied_rule)],
+                         [(Formula(['p']), T, None), (Formula(['p']), S, None),
+                          (Formula(['p']), MetainferentialTableauxStandard({'1'}), 'intersection')])
+
+        # A subclass that overrides it is still used by the solver
+        class CountingSolver(MetainferentialTableauxSolver):
+            applied = 0
+
+            def apply_rule(self, tableaux_system, rule_name, rule, subst_dict):
+                self.applied += 1
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', DeprecationWarning)
+                    return super().apply_rule(tableaux_system, rule_name, rule, subst_dict)
+
+        inference = classical_parser.parse('(/ p ∧ ~p) // (/q)')
+        solver = CountingSolver()
+        with self.assertWarns(DeprecationWarning):
+            tree = solver.solve(inference, sk_tableaux, beggining_index=[[{'1', 'i'}, {'1'}], [{'1'}, {'1', 'i'}]])
+        self.assertGreater(solver.applied, 0)
+        expected = metainferential_tableaux_solver.solve(inference, sk_tableaux,
+                                                         beggining_index=[[{'1', 'i'}, {'1'}], [{'1'}, {'1', 'i'}]])
+        self.assertEqual([(node.content, node.index, node.justification) for node in PreOrderIter(tree)],
+                         [(node.content, node.index, node.justification) for node in PreOrderIter(expected)])
+
+    def test_repeated_nodes(self):
+        # Nodes are looked up by their key in the branch, so equal standards have equal keys
+        S1 = MetainferentialTableauxStandard([{'1'}, {'1', 'i'}])
+        S2 = MetainferentialTableauxStandard([{'1'}, {'i', '1'}])
+        node1 = MetainferentialTableauxNode(content=classical_parser.parse('p / q'), index=S1)
+        node2 = MetainferentialTableauxNode(content=classical_parser.parse('p / q'), index=S2)
+        self.assertEqual(sk_tableaux._literal_key(node1), sk_tableaux._literal_key(node2))
+        node2.index = MetainferentialTableauxStandard([{'1'}, {'1', 'i'}], bar=True)
+        self.assertNotEqual(sk_tableaux._literal_key(node1), sk_tableaux._literal_key(node2))
+        node2 = MetainferentialTableauxNode(content=classical_parser.parse('p'), index=S1)
+        self.assertNotEqual(sk_tableaux._literal_key(node1), sk_tableaux._literal_key(node2))
+
+        # The solver looks for a node to add in the path to the leaf, not in other branches
+        root = MetainferentialTableauxNode(content=classical_parser.parse('p / q'), index=S1)
+        left = MetainferentialTableauxNode(content=Formula(['p']), index=MetainferentialTableauxStandard({'1'}),
+                                           parent=root)
+        right = MetainferentialTableauxNode(content=Formula(['q']), index=MetainferentialTableauxStandard({'1'}),
+                                            parent=root)
+        template = _NodeTemplate.from_node(MetainferentialTableauxNode(content=Formula(['p']),
+                                                                       index=MetainferentialTableauxStandard({'1'})))
+        self.assertTrue(metainferential_tableaux_solver._is_repeated(sk_tableaux, template, left))
+        self.assertFalse(metainferential_tableaux_solver._is_repeated(sk_tableaux, template, right))
+        template = _NodeTemplate.from_node(node1)
+        self.assertTrue(metainferential_tableaux_solver._is_repeated(sk_tableaux, template, right))
 
     def test_some_inferences(self):
         meta_explosion = classical_parser.parse('(/ p ∧ ~p) // (/q)')
@@ -405,6 +591,13 @@ class TestMetainferentialTableauxSolver(unittest.TestCase):
         """
         self.assertFalse(sk_tableaux.tree_is_closed(tree))
 
+        # Same with check, which gives the values of the atomics in the first open branch
+        self.assertEqual(metainferential_tableaux_solver.check(
+            meta_explosion, sk_tableaux, beggining_index=[[{'1', 'i'}, {'1'}], [{'1'}, {'1', 'i'}]]), (True, None))
+        self.assertEqual(metainferential_tableaux_solver.check(
+            meta_explosion, sk_tableaux, beggining_index=[[{'1'}, {'1', 'i'}], [{'1'}, {'1', 'i'}]]),
+            (False, {'p': 'i', 'q': '0'}))
+
     def test_with_generator(self):
         T = {'1', 'i'}
         S = {'1'}